@@ -1,7 +1,173 @@
 import json
+from datetime import date
+
+from django.conf import settings
 from django.contrib import admin
+from django.contrib.admin.views.main import ChangeList
+from django.core.paginator import Paginator
+from django.db import connection
+from django.utils import formats, timezone
+from django.utils.functional import cached_property
 from django.utils.html import format_html
-from .models import EventoDeAcceso
+from django.utils.text import capfirst
+from django.utils.translation import gettext as _
+
+from system_core import cache as cache_sistema
+
+from .models import (EventoDeAcceso, EjecucionModelo, EjecucionPipeline, EtapaPipeline, ResumenDia,
+                     SolicitudProcesamiento)
+
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+# MODO RENDIMIENTO DEL LISTADO DE EVENTOS - SPRINT 7 (settings.ADMIN_MODO_RENDIMIENTO)
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+
+# Con filtros el conteo se detiene aquí (el listado muestra a lo sumo esta cantidad)
+LIMITE_CONTEO_ADMIN = 10_000
+
+# Segundos de caché de las opciones de filtros y fechas (también se invalidan al ingerir)
+TIMEOUT_OPCIONES_ADMIN = 300
+
+# Segundos de caché del total de filas sin filtros (SQLite)
+TIMEOUT_CONTEO_ADMIN = 60
+
+
+def conteo_estimado(modelo):
+    """
+        Filas de la tabla sin recorrerla en cada página: estadísticas del planner
+        en PostgreSQL; si no hay (o en SQLite) un COUNT(*) real cacheado en el
+        espacio 'dashboard' (se invalida al ingerir, detectar o vaciar la tabla).
+        MAX(id) no sirve: después de borrados mostraría páginas que no existen.
+    """
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass',
+                           [modelo._meta.db_table])
+            fila = cursor.fetchone()
+        if fila and fila[0] > 0:
+            return fila[0]
+    return cache_sistema.obtener_o_calcular(
+        cache_sistema.DASHBOARD, 'admin', 'conteo', modelo._meta.label_lower,
+        calcular=lambda: modelo.objects.order_by().count(),
+        timeout=TIMEOUT_CONTEO_ADMIN,
+    )
+
+
+class PaginadorEstimado(Paginator):
+    """Sin filtros: conteo estimado. Con filtros: COUNT acotado a LIMITE_CONTEO_ADMIN filas"""
+
+    acotado = False
+
+    @cached_property
+    def count(self):
+        consulta = self.object_list
+        if not consulta.query.where:
+            return conteo_estimado(consulta.model)
+        total = consulta.order_by()[:LIMITE_CONTEO_ADMIN].count()
+        # Al llegar al tope el total real puede ser mayor: se muestra como aproximado
+        self.acotado = total >= LIMITE_CONTEO_ADMIN
+        return total
+
+
+class ListadoEventos(ChangeList):
+    """El listado no muestra el JSON crudo: no se lee de la BD"""
+
+    def get_queryset(self, request, exclude_parameters=None):
+        return super().get_queryset(request, exclude_parameters).defer('detalles')
+
+    @property
+    def conteo_mostrado(self):
+        """result_count para las plantillas: '10000+' si el COUNT filtrado llegó al tope"""
+        if getattr(self.paginator, 'acotado', False):
+            return f'{self.result_count}+'
+        return self.result_count
+
+
+class FiltroTipoEvento(admin.SimpleListFilter):
+    """Mismo filtro que list_filter 'tipo_evento', con las opciones cacheadas (sin DISTINCT en cada página)"""
+    title = 'tipo evento'
+    parameter_name = 'tipo_evento__exact'
+
+    def lookups(self, request, model_admin):
+        tipos = cache_sistema.obtener_o_calcular(
+            cache_sistema.DASHBOARD, 'admin', 'tipos_evento',
+            calcular=lambda: list(EventoDeAcceso.objects.order_by('tipo_evento')
+                                  .values_list('tipo_evento', flat=True).distinct()),
+            timeout=TIMEOUT_OPCIONES_ADMIN,
+        )
+        return [(tipo, tipo) for tipo in tipos]
+
+    def queryset(self, request, queryset):
+        if self.value():
+            return queryset.filter(tipo_evento=self.value())
+        return queryset
+
+
+def dias_con_eventos():
+    """Días (en TIME_ZONE) con actividad según ResumenDia: DISTINCT sobre su índice, cacheado"""
+    return cache_sistema.obtener_o_calcular(
+        cache_sistema.DASHBOARD, 'admin', 'dias_con_eventos',
+        calcular=lambda: list(ResumenDia.objects.order_by('periodo').values_list('periodo', flat=True).distinct()),
+        timeout=TIMEOUT_OPCIONES_ADMIN,
+    )
+
+
+def jerarquia_fechas(cl):
+    """
+        Mismo contexto que el tag {% date_hierarchy %} del admin, armado con los
+        días de dias_con_eventos() en lugar de MIN/MAX y DISTINCT por fecha sobre
+        todos los eventos en cada página.
+    """
+    campo = cl.date_hierarchy
+    campo_anio, campo_mes, campo_dia = f'{campo}__year', f'{campo}__month', f'{campo}__day'
+    anio, mes, dia = (cl.params.get(c) for c in (campo_anio, campo_mes, campo_dia))
+    dias = dias_con_eventos()
+
+    def enlace(filtros):
+        return cl.get_query_string(filtros, [f'{campo}__'])
+
+    if not (anio or mes or dia) and dias:
+        # Nivel inicial según el rango, igual que el admin
+        if dias[0].year == dias[-1].year:
+            anio = dias[0].year
+            if dias[0].month == dias[-1].month:
+                mes = dias[0].month
+
+    if anio and mes and dia:
+        elegido = date(int(anio), int(mes), int(dia))
+        return {
+            'show': True,
+            'back': {'link': enlace({campo_anio: anio, campo_mes: mes}),
+                     'title': capfirst(formats.date_format(elegido, 'YEAR_MONTH_FORMAT'))},
+            'choices': [{'title': capfirst(formats.date_format(elegido, 'MONTH_DAY_FORMAT'))}],
+        }
+    if anio and mes:
+        return {
+            'show': True,
+            'back': {'link': enlace({campo_anio: anio}), 'title': str(anio)},
+            'choices': [
+                {'link': enlace({campo_anio: anio, campo_mes: mes, campo_dia: d.day}),
+                 'title': capfirst(formats.date_format(d, 'MONTH_DAY_FORMAT'))}
+                for d in dias if d.year == int(anio) and d.month == int(mes)
+            ],
+        }
+    if anio:
+        meses = sorted({d.replace(day=1) for d in dias if d.year == int(anio)})
+        return {
+            'show': True,
+            'back': {'link': enlace({}), 'title': _('All dates')},
+            'choices': [
+                {'link': enlace({campo_anio: anio, campo_mes: m.month}),
+                 'title': capfirst(formats.date_format(m, 'YEAR_MONTH_FORMAT'))}
+                for m in meses
+            ],
+        }
+    return {
+        'show': True,
+        'back': None,
+        'choices': [{'link': enlace({campo_anio: str(a)}), 'title': str(a)}
+                    for a in sorted({d.year for d in dias})],
+    }
+
 
 @admin.register(EventoDeAcceso)
 class EventoDeAccesoAdmin(admin.ModelAdmin):
@@ -98,6 +264,43 @@ class EventoDeAccesoAdmin(admin.ModelAdmin):
     actions_on_bottom = True
     list_per_page = 50  # Mostrar 50 eventos por página
 
+    # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+    # MODO RENDIMIENTO - SPRINT 7
+    # Conteos estimados, opciones de filtro cacheadas, jerarquía de fechas desde
+    # ResumenDia y listado sin 'detalles'. Los días son los de TIME_ZONE (como
+    # ResumenDia), aunque el request tenga otra zona activa.
+    # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+
+    @property
+    def show_full_result_count(self):
+        # El "(N en total)" junto al buscador es un segundo COUNT(*) de toda la tabla
+        return not settings.ADMIN_MODO_RENDIMIENTO
+
+    def get_list_filter(self, request):
+        if not settings.ADMIN_MODO_RENDIMIENTO:
+            return self.list_filter
+        return [FiltroTipoEvento if f == 'tipo_evento' else f for f in self.list_filter]
+
+    def get_paginator(self, request, queryset, per_page, orphans=0, allow_empty_first_page=True):
+        if not settings.ADMIN_MODO_RENDIMIENTO:
+            return super().get_paginator(request, queryset, per_page, orphans, allow_empty_first_page)
+        return PaginadorEstimado(queryset, per_page, orphans, allow_empty_first_page)
+
+    def get_changelist(self, request, **kwargs):
+        return ListadoEventos if settings.ADMIN_MODO_RENDIMIENTO else super().get_changelist(request, **kwargs)
+
+    def changelist_view(self, request, extra_context=None):
+        if not settings.ADMIN_MODO_RENDIMIENTO:
+            return super().changelist_view(request, extra_context)
+
+        with timezone.override(timezone.get_default_timezone()):
+            respuesta = super().changelist_view(request, extra_context)
+            contexto = getattr(respuesta, 'context_data', None) or {}
+            if 'cl' in contexto:
+                contexto['jerarquia_fechas'] = jerarquia_fechas(contexto['cl'])
+                respuesta.render()
+        return respuesta
+
     # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
     # PERMISOS 
     # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
@@ -220,4 +423,90 @@ class EventoDeAccesoAdmin(admin.ModelAdmin):
 
     admin.site.site_header = '🔐 Sistema de Monitoreo SGSI'
     admin.site.site_title = 'Admin - SGSI'
-    admin.site.index_title = 'Bienvenido al Panel de Administración'
\ No newline at end of file
+    admin.site.index_title = 'Bienvenido al Panel de Administración'
+
+
+@admin.register(EjecucionModelo)
+class EjecucionModeloAdmin(admin.ModelAdmin):
+    """
+        Historial de evaluaciones del Isolation Forest (solo lectura) - SPRINT 7
+    """
+    list_display = [
+        'fecha',
+        'tipo',
+        'promovido',
+        'total_eventos',
+        'total_anomalias',
+        'deriva_contaminacion',
+        'score_p95',
+        'estabilidad_etiquetas',
+        'psi_scores',
+        'duracion_segundos',
+    ]
+    list_filter = ['tipo', 'promovido']
+    ordering = ['-fecha']
+    date_hierarchy = 'fecha'
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(SolicitudProcesamiento)
+class SolicitudProcesamientoAdmin(admin.ModelAdmin):
+    """
+        Cola del worker de ML (solo lectura) - SPRINT 7
+    """
+    list_display = ['id', 'tipo', 'estado', 'solicitado_por', 'fecha_creacion', 'fecha_inicio', 'fecha_fin']
+    list_filter = ['tipo', 'estado']
+    ordering = ['-fecha_creacion']
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+class EtapaPipelineInline(admin.TabularInline):
+    model = EtapaPipeline
+    fields = ['nombre', 'repeticiones', 'duracion_segundos', 'filas_por_segundo', 'paginas', 'bytes_descargados',
+              'eventos_vistos', 'eventos_conservados', 'eventos_insertados', 'eventos_actualizados', 'errores',
+              'rss_pico_mb']
+    readonly_fields = fields
+    extra = 0
+    can_delete = False
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(EjecucionPipeline)
+class EjecucionPipelineAdmin(admin.ModelAdmin):
+    """
+        Historial de ejecuciones de recolección, ETL y ML (solo lectura) - SPRINT 7
+    """
+    list_display = [
+        'inicio',
+        'pipeline',
+        'estado',
+        'duracion_segundos',
+        'eventos_vistos',
+        'eventos_insertados',
+        'filas_por_segundo',
+        'bytes_descargados',
+        'rss_pico_mb',
+        'errores',
+    ]
+    list_filter = ['pipeline', 'estado']
+    ordering = ['-inicio']
+    date_hierarchy = 'inicio'
+    inlines = [EtapaPipelineInline]
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
@@ -1,182 +1,155 @@
-import os
+import logging
+import time
+import numpy as np
 import pandas as pd
-import joblib
 from sklearn.ensemble import IsolationForest
-from sklearn.preprocessing import LabelEncoder
-from sklearn.metrics import silhouette_score, davies_bouldin_score
-from django.conf import settings
 from django.utils import timezone
 from datetime import timedelta     
 from .models import EventoDeAcceso
-
-def generar_explicacion(row):
+from .evaluacion import evaluar_modelo, registrar_ejecucion
+from .codificacion import CodificadorEventos, construir_matriz
+from .dimensiones import COLUMNAS_CODIGOS, decodificar_dimensiones
+from .ejecuciones import ejecucion_pipeline, paso_pipeline, sumar
+from .modelo_ml import PERCENTILES_REFERENCIA, cargar_bundle, guardar_bundle
+from .puntuacion import calcular_severidad, generar_explicacion, puntuar
+from .resumenes import recalcular_resumenes
+from system_core import cache as cache_sistema
+
+logger = logging.getLogger(__name__)
+
+def cargar_ventana(eventos_qs):
     """
-    SPRINT 6: Genera una explicación legible (Heurística)
-    basada en los datos del evento anómalo.
+    DataFrame de la ventana de entrenamiento: códigos enteros de las
+    dimensiones (los textos se traducen una vez por valor).
     """
-    motivos = []
-
-    # 1. Análisis de Hora (Ej: Fuera de horario laboral 7am - 8pm)
-    # Ajusta estos rangos según la realidad de tu empresa
-    if row['hora'] < 7 or row['hora'] > 17:
-        motivos.append(f"Horario inusual ({row['hora']}:00)")
-    
-    # 2. Análisis de Día (Sábado=5, Domingo=6)
-    if row['dia_de_semana'] >= 5:
-        motivos.append("Acceso en fin de semana")
-
-    # 3. Análisis de Score
-    if not motivos:
-        motivos.append("Patrón atípico detectado por la IA")
+    return decodificar_dimensiones(pd.DataFrame(list(eventos_qs.values('id', *COLUMNAS_CODIGOS))))
 
-    return ", ".join(motivos)
 
-def ejecutar_deteccion_anomalias():
+@ejecucion_pipeline('deteccion')
+def ejecutar_deteccion_anomalias(evaluar=False):
     """
     SPRINT 5 & 6: Pipeline completo de ML + Explicabilidad.
+    SPRINT 7: Si evaluar=True se ejecuta la etapa de evaluación y se guarda
+    en el historial (EjecucionModelo) en lugar de imprimir métricas.
     """
-    
+    inicio = time.perf_counter()
+
     # --- 1. CONFIGURACIÓN Y CARGA DE DATOS ---
     DIAS_DE_VENTANA = 180 
+    CONTAMINACION = 0.05
     fecha_limite = timezone.now() - timedelta(days=DIAS_DE_VENTANA)
 
-    print(f"\n🧠 [IA] Iniciando entrenamiento con ventana de {DIAS_DE_VENTANA} días...")
+    logger.info("🧠 [IA] Iniciando entrenamiento con ventana de %d días...", DIAS_DE_VENTANA)
 
     eventos_qs = EventoDeAcceso.objects.filter(timestamp__gte=fecha_limite)
     total_eventos = eventos_qs.count()
 
     if total_eventos < 50:
-        print(f"⚠️ [IA] Datos insuficientes ({total_eventos}). Se requieren mínimo 50.")
+        logger.warning("⚠️ [IA] Datos insuficientes (%d). Se requieren mínimo 50.", total_eventos)
         return 0
     
-    print(f"📊 [IA] Cargando {total_eventos} eventos en memoria...")
+    logger.info("📊 [IA] Cargando %d eventos en memoria...", total_eventos, extra={'eventos_ventana': total_eventos})
 
     # Convertir QuerySet a DataFrame
-    df = pd.DataFrame(list(eventos_qs.values(
-        'id', 'email_usuario', 'direccion_ip', 'tipo_evento', 'archivo_id', 'timestamp'
-    )))
-    df['timestamp'] = pd.to_datetime(df['timestamp'])
+    with paso_pipeline('ml_carga'):
+        df = cargar_ventana(eventos_qs)
+        sumar(eventos_vistos=len(df))
 
     # --- 2. INGENIERÍA DE CARACTERÍSTICAS (FEATURE ENGINEERING) ---
-    print("🛠️ [IA] Preprocesando características...")
-
-    # Extracción de características temporales (Normalización temporal)
-    df['hora'] = df['timestamp'].dt.hour
-    df['dia_de_semana'] = df['timestamp'].dt.dayofweek 
+    logger.info("🛠️ [IA] Preprocesando características...")
 
-    # Codificación de variables categóricas
-    encoders = {}
-    features_categoricos = ['email_usuario', 'direccion_ip', 'tipo_evento', 'archivo_id']
-    
-    for col in features_categoricos:
-        if col in df.columns: # Asegurarse que la columna existe
-            le = LabelEncoder()
-            # Convertimos a string para evitar errores con valores nulos
-            df[col] = df[col].astype(str)
-            df[col] = le.fit_transform(df[col])
-            encoders[col] = le
-
-    # Selección de features finales para el modelo
-    features_modelo = ['email_usuario', 'direccion_ip', 'tipo_evento', 'archivo_id', 'hora', 'dia_de_semana']
-    X = df[features_modelo]
+    # Frequency encoding + hashing trick (mismo codificador que usará el scoring)
+    with paso_pipeline('ml_preprocesamiento'):
+        codificador = CodificadorEventos().fit(df)
+        df, X = construir_matriz(df, codificador)
+    features_modelo = list(X.columns)
     
     # --- 3. ENTRENAMIENTO DEL MODELO (TRAINING) ---
-    print("🤖 [IA] Entrenando Isolation Forest (n_estimators=100, contamination=0.05)...")
+    logger.info("🤖 [IA] Entrenando Isolation Forest (n_estimators=100, contamination=0.05)...")
     
     # Parámetros definidos en la propuesta
     modelo = IsolationForest(
         n_estimators=100,       # Número de árboles
-        contamination=0.05,     # Esperamos un 5% de anomalías
+        contamination=CONTAMINACION, # Esperamos un 5% de anomalías
         max_samples='auto',     # Muestreo automático
         random_state=42,        # Reproducibilidad
         n_jobs=-1               # Usar todos los núcleos del CPU (-1 es mejor rendimiento)
     ) 
 
-    modelo.fit(X)
-
-    # --- 4. EVALUACIÓN DEL MODELO (METRICS) ---
-    try:
-        # Usamos una muestra si hay demasiados datos para no congelar el equipo
-        if len(X) > 20000:
-            X_sample = X.sample(n=10000, random_state=42)
-            labels_sample = modelo.predict(X_sample)
+    with paso_pipeline('ml_entrenamiento'):
+        modelo.fit(X)
 
-            # 1. Silueta (Silhouette Score)
-            score_silueta = silhouette_score(X_sample, labels_sample)
-
-            # 2. Davies-Bouldin Score
-            score_db = davies_bouldin_score(X_sample, labels_sample)
+    # --- 4. MODELO PREVIO ---
+    # Si se va a evaluar, conservamos el modelo anterior para medir estabilidad
+    modelo_previo = None
+    if evaluar:
+        try:
+            bundle_previo = cargar_bundle()
+            if bundle_previo and bundle_previo['features'] == features_modelo:
+                modelo_previo = bundle_previo['modelo']
+        except Exception as e:
+            logger.warning("⚠️ [IA] No se pudo cargar el modelo previo: %s", e)
+
+    # --- 5. PREDICCIÓN Y SCORING ---
+    logger.info("🔍 [IA] Detectando anomalías y calculando scores...")
+
+    # Una sola pasada por los árboles (score_samples) para obtener:
+    # - Predicción (-1 = Anomalía, 1 = Normal)
+    # - Score normalizado para el Dashboard (0.5 - decision_function, 0 a 1)
+    with paso_pipeline('ml_puntuacion'):
+        predicciones, scores_normalizados = puntuar(modelo, X)
+
+    # Serialización: el modelo se guarda con la distribución de scores como referencia de deriva
+    referencia = np.percentile(scores_normalizados, PERCENTILES_REFERENCIA)
+    archivo_pkl = guardar_bundle(modelo, codificador, features_modelo, referencia)
+    logger.info("💾 [IA] Modelo serializado guardado en: %s", archivo_pkl)
 
-        else:
-            labels = modelo.predict(X)
-            score_silueta = silhouette_score(X, labels)
-            score_db = davies_bouldin_score(X, labels)
+    df['es_anomalia'] = [True if p == -1 else False for p in predicciones]
+    df['anomaly_score'] = scores_normalizados
 
-        print(f"📈 [IA] Métricas de Evaluación:")
-        print(f"   - Silhouette Score: {score_silueta:.4f} (Mayor es mejor)")
-        print(f"   - Davies-Bouldin:   {score_db:.4f} (Menor es mejor)")
+    # Filtrar solo las que resultaron anómalas para actualizar la BD
+    anomalias_df = df[df['es_anomalia'] == True]
     
-    except Exception as e:
-        print(f"⚠️ [IA] No se pudo calcular métrica de silueta: {e}")
+    ids_anomalos = anomalias_df['id'].tolist()
 
-    # --- 5. SERIALIZACIÓN (GUARDAR MODELOS) ---
-    ruta_modelo = os.path.join(settings.BASE_DIR, 'monitoreo', 'ml_models')
-    os.makedirs(ruta_modelo, exist_ok=True)
-    archivo_pkl = os.path.join(ruta_modelo, 'isolation_forest.pkl')
+    # --- 6. EVALUACIÓN OPCIONAL (METRICS, O(n)) ---
+    if evaluar:
+        metricas = evaluar_modelo(X, predicciones, scores_normalizados, CONTAMINACION, modelo_previo)
+        metricas['promovido'] = True  # La detección completa siempre reemplaza el modelo
+        ejecucion = registrar_ejecucion(metricas, duracion_segundos=time.perf_counter() - inicio)
+        logger.info("📈 [IA] Evaluación registrada en historial (ejecución #%d).", ejecucion.id)
 
-    joblib.dump(modelo, archivo_pkl)
-    print(f"💾 [IA] Modelo serializado guardado en: {archivo_pkl}")
+    # --- 7. PERSISTENCIA EN BASE DE DATOS ---
+    logger.info("📝 [IA] Actualizando %d eventos anómalos en BD...", len(ids_anomalos))
 
-    # --- 6. PREDICCIÓN Y SCORING ---
-    print("🔍 [IA] Detectando anomalías y calculando scores...")
+    with paso_pipeline('ml_persistencia'):
+        # A. Limpiar marcas anteriores en la ventana (Reset)
+        eventos_qs.update(es_anomalia=False, anomaly_score=0.0, severidad='BAJA', motivo_anomalia=None)
 
-    # Predicción (-1 = Anomalía, 1 = Normal)
-    predicciones = modelo.predict(X)
+        # B. Actualizar anomalías detectadas
+        count = 0
+        for index, row in anomalias_df.iterrows():
+            try:
+                evento = EventoDeAcceso.objects.get(id=row['id'])
+                evento.es_anomalia = True
+                evento.anomaly_score = float(row['anomaly_score'])
 
-    # Score de anomalía (Valores negativos son más anómalos)
-    scores_raw = modelo.decision_function(X)
+                # Asignar severidad basada en el score
+                evento.severidad = calcular_severidad(evento.anomaly_score)
 
-    # Normalizamos el score para que quede bonito en el Dashboard (0 a 1)
-    scores_normalizados = 0.5 - scores_raw 
+                # Sprint 6: Guardar explicación heurística
+                evento.motivo_anomalia = generar_explicacion(row)
 
-    df['es_anomalia'] = [True if p == -1 else False for p in predicciones]
-    df['anomaly_score'] = scores_normalizados
+                evento.save() # Esto dispara signals si las hay
+                count += 1
 
-    # Filtrar solo las que resultaron anómalas para actualizar la BD
-    anomalias_df = df[df['es_anomalia'] == True]
-    
-    ids_anomalos = anomalias_df['id'].tolist()
-
-    # --- 7. PERSISTENCIA EN BASE DE DATOS ---
-    print(f"📝 [IA] Actualizando {len(ids_anomalos)} eventos anómalos en BD...")
+            except EventoDeAcceso.DoesNotExist:
+                continue
 
-    # A. Limpiar marcas anteriores en la ventana (Reset)
-    eventos_qs.update(es_anomalia=False, anomaly_score=0.0, severidad='BAJA', motivo_anomalia=None)
+        # C. Las marcas de la ventana cambiaron: recalcular sus series de tiempo
+        recalcular_resumenes(desde=fecha_limite)
+        cache_sistema.invalidar(cache_sistema.DASHBOARD)
+        sumar(eventos_actualizados=count)
 
-    # B. Actualizar anomalías detectadas
-    count = 0
-    for index, row in anomalias_df.iterrows():
-        try:
-            evento = EventoDeAcceso.objects.get(id=row['id'])
-            evento.es_anomalia = True
-            evento.anomaly_score = float(row['anomaly_score'])
-
-            # Asignar severidad basada en el score
-            if evento.anomaly_score > 0.75:
-                evento.severidad = 'CRITICA'
-            elif evento.anomaly_score > 0.60:
-                evento.severidad = 'ALTA'
-            else:
-                evento.severidad = 'MEDIA'
-
-            # Sprint 6: Guardar explicación heurística
-            evento.motivo_anomalia = generar_explicacion(row)
-
-            evento.save() # Esto dispara signals si las hay
-            count += 1
-
-        except EventoDeAcceso.DoesNotExist:
-            continue
-    
-    print(f"✅ [IA] Proceso finalizado. {count} anomalías registradas.")
+    logger.info("✅ [IA] Proceso finalizado. %d anomalías registradas.", count, extra={'anomalias': count})
     return count
\ No newline at end of file
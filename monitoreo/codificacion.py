@@ -0,0 +1,89 @@
+import numpy as np
+import pandas as pd
+
+from .perfiles import FEATURES_PERFIL, cargar_perfiles, caracteristicas_perfil
+
+# Valor de reemplazo para nulos (IP N/A, archivo sin ID, etc.)
+VALOR_NULO = '__nulo__'
+
+# Frequency encoding: frecuencia relativa del valor en la ventana de entrenamiento
+COLUMNAS_FRECUENCIA = ['email_usuario', 'direccion_ip', 'tipo_evento', 'archivo_id']
+
+# Hashing trick: cubeta fija por valor (no requiere ajuste, no crece con la cardinalidad)
+COLUMNAS_HASH = {
+    'email_usuario': 256,
+    'direccion_ip': 1024,
+    'archivo_id': 4096,
+}
+
+FEATURES_TEMPORALES = ['hora', 'dia_de_semana']
+
+
+def _limpiar(serie):
+    """Normaliza nulos sin forzar un astype(str) sobre toda la columna"""
+    return serie.where(serie.notna(), VALOR_NULO)
+
+
+def hash_cubetas(serie, n_cubetas):
+    """
+    Asigna cada valor a una de n_cubetas con un hash vectorizado (SipHash de pandas).
+    Es determinístico entre procesos y no necesita haber visto el valor antes.
+    """
+    hashes = pd.util.hash_array(_limpiar(serie).to_numpy(dtype=object), categorize=True)
+    return (hashes % np.uint64(n_cubetas)).astype(np.int64)
+
+
+class CodificadorEventos:
+    """
+        SPRINT 7: Codificación de variables categóricas compartida por
+        entrenamiento y scoring (reemplaza los LabelEncoder ordinales).
+
+        - freq_<col>: frecuencia relativa del valor en el entrenamiento
+          (valores nunca vistos -> 0.0, búsqueda en tiempo constante).
+        - hash_<col>: cubeta del hashing trick (ancho fijo).
+    """
+
+    def __init__(self):
+        self.frecuencias = {}
+
+    @property
+    def features(self):
+        return [f'freq_{c}' for c in COLUMNAS_FRECUENCIA] + [f'hash_{c}' for c in COLUMNAS_HASH]
+
+    def fit(self, df):
+        """Calcula las tablas de frecuencia (conteo por hash, sin ordenar)"""
+        for col in COLUMNAS_FRECUENCIA:
+            conteos = _limpiar(df[col]).value_counts(normalize=True, sort=False)
+            self.frecuencias[col] = conteos.to_dict()
+        return self
+
+    def transform(self, df):
+        """Retorna un DataFrame con las columnas codificadas, alineado al índice de df"""
+        codificado = pd.DataFrame(index=df.index)
+
+        for col in COLUMNAS_FRECUENCIA:
+            tabla = self.frecuencias.get(col, {})
+            codificado[f'freq_{col}'] = _limpiar(df[col]).map(tabla).fillna(0.0).astype(float)
+
+        for col, n_cubetas in COLUMNAS_HASH.items():
+            codificado[f'hash_{col}'] = hash_cubetas(df[col], n_cubetas)
+
+        return codificado
+
+
+def construir_matriz(df, codificador):
+    """
+    Ingeniería de características común a entrenamiento y scoring.
+    df debe traer 'email_usuario', 'direccion_ip', 'tipo_evento', 'archivo_id' y 'timestamp'.
+    Retorna (df enriquecido, X).
+    """
+    df['timestamp'] = pd.to_datetime(df['timestamp'], utc=True)
+    df['hora'] = df['timestamp'].dt.hour
+    df['dia_de_semana'] = df['timestamp'].dt.dayofweek
+
+    # Línea base por usuario (perfiles precalculados en la ingesta, sin re-escanear el histórico)
+    perfiles = cargar_perfiles(df['email_usuario'].unique())
+    df = caracteristicas_perfil(df, perfiles)
+
+    X = pd.concat([codificador.transform(df), df[FEATURES_TEMPORALES + FEATURES_PERFIL]], axis=1)
+    return df, X
@@ -0,0 +1,123 @@
+"""
+Dimensiones de eventos: actor, archivo e IP (SPRINT 7).
+
+Cada evento guarda enteros (dim_actor, dim_archivo, dim_ip) en vez de
+repetir los textos en los índices. La resolución valor -> pk pasa por una
+caché en memoria del proceso: en régimen la ingesta no consulta estas
+tablas, solo los valores nunca vistos van a la base de datos (una consulta
+por lote y un bulk_create para los nuevos).
+
+La caché solo aprende valores confirmados (transaction.on_commit): si la
+transacción de la ingesta se revierte no quedan pks inexistentes en memoria.
+"""
+from django.db import transaction
+
+from .models import Actor, Archivo, DireccionIP
+
+# Máximo de valores recordados por dimensión (al superarlo la caché se vacía)
+MAX_ENTRADAS = 200_000
+
+# SQLite limita la cantidad de parámetros por consulta
+TAMANO_CONSULTA = 500
+
+# (atributo del evento, FK del evento, modelo de la dimensión, campo clave)
+DIMENSIONES = [
+    ('email_usuario', 'dim_actor_id', Actor, 'email'),
+    ('archivo_id', 'dim_archivo_id', Archivo, 'id_drive'),
+    ('direccion_ip', 'dim_ip_id', DireccionIP, 'ip'),
+]
+
+
+class CacheDimensiones:
+    """Mapeo valor -> pk por dimensión, compartido por todas las ingestas del proceso"""
+
+    def __init__(self, max_entradas=MAX_ENTRADAS):
+        self.max_entradas = max_entradas
+        self._valores = {modelo: {} for _, _, modelo, _ in DIMENSIONES}
+
+    def limpiar(self):
+        for conocidos in self._valores.values():
+            conocidos.clear()
+
+    def _aprender(self, modelo, encontrados):
+        conocidos = self._valores[modelo]
+        if len(conocidos) + len(encontrados) > self.max_entradas:
+            conocidos.clear()
+        conocidos.update(encontrados)
+
+    def _consultar(self, modelo, campo, valores):
+        encontrados = {}
+        valores = list(valores)
+        for i in range(0, len(valores), TAMANO_CONSULTA):
+            encontrados.update(modelo.objects.filter(
+                **{f'{campo}__in': valores[i:i + TAMANO_CONSULTA]}
+            ).values_list(campo, 'pk'))
+        return encontrados
+
+    def resolver(self, modelo, campo, valores, extra=None):
+        """
+        Retorna {valor: pk} para los valores dados, creando los que no existan.
+        `extra` ({valor: {campo: dato}}) completa columnas de las filas nuevas.
+        """
+        conocidos = self._valores[modelo]
+        pedidos = {v for v in valores if v}
+        faltan = pedidos - conocidos.keys()
+
+        encontrados = self._consultar(modelo, campo, faltan) if faltan else {}
+        nuevos = faltan - encontrados.keys()
+        if nuevos:
+            extra = extra or {}
+            # ignore_conflicts: otro proceso pudo crear el mismo valor entre medio
+            modelo.objects.bulk_create(
+                [modelo(**{campo: v}, **extra.get(v, {})) for v in nuevos], ignore_conflicts=True
+            )
+            encontrados.update(self._consultar(modelo, campo, nuevos))
+
+        if encontrados:
+            transaction.on_commit(lambda: self._aprender(modelo, encontrados))
+        return {v: encontrados.get(v, conocidos.get(v)) for v in pedidos}
+
+
+cache_dimensiones = CacheDimensiones()
+
+
+def asignar_dimensiones(eventos):
+    """Completa dim_actor / dim_archivo / dim_ip de las instancias que no los tienen"""
+    for atributo, fk, modelo, campo in DIMENSIONES:
+        pendientes = [e for e in eventos if getattr(e, fk) is None and getattr(e, atributo)]
+        if not pendientes:
+            continue
+
+        extra = None
+        if modelo is Archivo:
+            extra = {e.archivo_id: {'nombre': (e.nombre_archivo or '')[:255] or None} for e in reversed(pendientes)}
+
+        pks = cache_dimensiones.resolver(modelo, campo, [getattr(e, atributo) for e in pendientes], extra)
+        for evento in pendientes:
+            setattr(evento, fk, pks[getattr(evento, atributo)])
+    return eventos
+
+
+# Columnas que cargan los loaders de ML: códigos enteros en lugar de textos
+COLUMNAS_CODIGOS = ['dim_actor_id', 'dim_ip_id', 'tipo_evento', 'dim_archivo_id', 'timestamp']
+
+
+def valores_dimension(modelo, campo, pks):
+    """{pk: valor} de una dimensión (solo los pks pedidos)"""
+    pks = [int(pk) for pk in set(pks) if pk == pk and pk is not None]  # pk == pk descarta NaN
+    resultado = {}
+    for i in range(0, len(pks), TAMANO_CONSULTA):
+        resultado.update(modelo.objects.filter(pk__in=pks[i:i + TAMANO_CONSULTA]).values_list('pk', campo))
+    return resultado
+
+
+def decodificar_dimensiones(df):
+    """
+    Agrega al DataFrame las columnas de texto (email_usuario, archivo_id,
+    direccion_ip) a partir de los códigos enteros. Cada valor distinto se lee
+    una sola vez de su dimensión; el mapeo por fila es vectorizado.
+    """
+    for atributo, fk, modelo, campo in DIMENSIONES:
+        if fk in df:
+            df[atributo] = df[fk].map(valores_dimension(modelo, campo, df[fk].unique()))
+    return df
@@ -0,0 +1,255 @@
+"""
+Historial de ejecuciones del pipeline (SPRINT 7).
+
+Recolección online, ETL histórico y detección guardan una fila por
+ejecución (EjecucionPipeline) y una por etapa (EtapaPipeline) con su
+duración, contadores de eventos y bytes, filas/s y memoria máxima de la
+propia ejecución:
+
+    with ejecucion_pipeline('recoleccion'):
+        with paso_pipeline('auditoria'):
+            ...
+            sumar(paginas=1, bytes_descargados=len(contenido))
+
+  - Cada paso es también una etapa de system_core.metricas (mismo nombre),
+    así no hace falta medir dos veces.
+  - sumar() suma al paso en curso y a su ejecución; fuera de una ejecución no
+    hace nada, por lo que las funciones instrumentadas se pueden llamar sueltas.
+  - Un paso que se repite (cada lote del ETL) acumula en la misma fila.
+  - La memoria (rss_pico_mb) es la RSS más alta observada durante la ejecución
+    o etapa: la RSS actual al abrir y cerrar cada paso y, si el pico del proceso
+    (ru_maxrss) creció mientras corría, ese pico. Así un worker de larga vida
+    no arrastra a todas sus ejecuciones el máximo de una anterior.
+  - Las etapas se guardan al cerrar la ejecución (un bulk_create); si falla el
+    guardado se registra en el log, nunca interrumpe el pipeline.
+
+Los contextos viajan por contextvars: para que los hilos del pool sumen a la
+etapa que los lanzó, enviar las tareas con contextvars.copy_context().run.
+"""
+import contextvars
+import logging
+import os
+import statistics
+import sys
+import threading
+import time
+from contextlib import ContextDecorator
+
+from django.conf import settings
+from django.utils import timezone
+
+from system_core.metricas import etapa
+
+from .models import EjecucionPipeline, EtapaPipeline
+
+try:
+    import resource
+except ImportError:  # Windows: sin getrusage no se registra la memoria
+    resource = None
+
+logger = logging.getLogger('sgsi.pipeline')
+
+CONTADORES = ['paginas', 'bytes_descargados', 'eventos_vistos', 'eventos_conservados',
+              'eventos_insertados', 'eventos_actualizados', 'errores']
+
+_ejecucion = contextvars.ContextVar('ejecucion_pipeline', default=None)
+_paso = contextvars.ContextVar('paso_pipeline', default=None)
+
+
+def rss_pico_mb():
+    """Memoria residente máxima del proceso hasta ahora (None si el SO no la informa)"""
+    if resource is None:
+        return None
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux la informa en KB, macOS en bytes
+    return round(pico / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+def rss_actual_mb():
+    """Memoria residente actual del proceso (None fuera de Linux)"""
+    try:
+        with open('/proc/self/statm') as statm:
+            paginas = int(statm.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return None
+    return round(paginas * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024), 1)
+
+
+class Acumulado:
+    """Contadores de una ejecución o etapa (las páginas pueden llegar desde varios hilos)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.valores = dict.fromkeys(CONTADORES, 0)
+        self.duracion = 0.0
+        self.repeticiones = 0
+        self.rss_pico_mb = None
+        self._pico_proceso_inicial = None
+
+    def iniciar_memoria(self):
+        """Toma la referencia de memoria al empezar"""
+        self._pico_proceso_inicial = rss_pico_mb()
+        self.observar_memoria()
+
+    def observar_memoria(self, *otros_picos):
+        """Sube rss_pico_mb a la RSS actual o al pico del proceso, si creció desde iniciar_memoria()"""
+        candidatos = [self.rss_pico_mb, rss_actual_mb(), *otros_picos]
+        pico_proceso = rss_pico_mb()
+        if pico_proceso is not None and pico_proceso > (self._pico_proceso_inicial or 0):
+            candidatos.append(pico_proceso)
+        candidatos = [valor for valor in candidatos if valor is not None]
+        self.rss_pico_mb = max(candidatos) if candidatos else None
+
+    def sumar(self, **contadores):
+        with self._lock:
+            for nombre, valor in contadores.items():
+                self.valores[nombre] += valor
+
+    def campos(self):
+        """Valores para el modelo, con filas/s calculadas"""
+        filas = self.valores['eventos_vistos'] or (self.valores['eventos_insertados']
+                                                   + self.valores['eventos_actualizados'])
+        return {
+            **self.valores,
+            'duracion_segundos': round(self.duracion, 4),
+            'filas_por_segundo': round(filas / self.duracion, 1) if self.duracion > 0 else 0.0,
+            'rss_pico_mb': self.rss_pico_mb,
+        }
+
+
+def sumar(**contadores):
+    """Suma contadores al paso en curso y a su ejecución (sin ejecución activa no hace nada)"""
+    ejecucion = _ejecucion.get()
+    if ejecucion is None:
+        return
+    ejecucion.acumulado.sumar(**contadores)
+    paso = _paso.get()
+    if paso is not None:
+        paso.sumar(**contadores)
+
+
+class ejecucion_pipeline(ContextDecorator):
+    """Una ejecución de un pipeline (ver EjecucionPipeline.PIPELINES)"""
+
+    def __init__(self, pipeline):
+        self.pipeline = pipeline
+
+    def _recreate_cm(self):
+        return ejecucion_pipeline(self.pipeline)
+
+    def __enter__(self):
+        self.acumulado = Acumulado()
+        self.acumulado.iniciar_memoria()
+        self.etapas = {}  # nombre -> Acumulado, en orden de aparición
+        try:
+            self.registro = EjecucionPipeline.objects.create(pipeline=self.pipeline)
+        except Exception:
+            logger.exception('No se pudo registrar la ejecución del pipeline', extra={'pipeline': self.pipeline})
+            self.registro = None
+
+        self._metrica = etapa(self.pipeline)
+        self._metrica.__enter__()
+        self._tokens = (_ejecucion.set(self), _paso.set(None))
+        self._inicio = time.perf_counter()
+        logger.info('Pipeline %s iniciado', self.pipeline, extra={
+            'pipeline': self.pipeline, 'ejecucion': self.registro.pk if self.registro else None,
+        })
+        return self
+
+    def __exit__(self, tipo_error, error, traza):
+        self.acumulado.duracion = time.perf_counter() - self._inicio
+        self.acumulado.observar_memoria()
+        _ejecucion.reset(self._tokens[0])
+        _paso.reset(self._tokens[1])
+        self._metrica.__exit__(tipo_error, error, traza)
+
+        campos = self.acumulado.campos()
+        estado = EjecucionPipeline.ERROR if tipo_error else EjecucionPipeline.OK
+        if self.registro is not None:
+            self._guardar(campos, estado, repr(error) if error else '')
+
+        nivel = logging.ERROR if tipo_error else logging.INFO
+        logger.log(nivel, 'Pipeline %s finalizado (%s) en %.2fs', self.pipeline, estado,
+                   self.acumulado.duracion, extra={'pipeline': self.pipeline, 'estado': estado, **campos})
+        if not tipo_error:
+            self._revisar_regresion(campos['filas_por_segundo'])
+        return False
+
+    def _guardar(self, campos, estado, error):
+        try:
+            for nombre, valor in campos.items():
+                setattr(self.registro, nombre, valor)
+            self.registro.estado = estado
+            self.registro.error = error
+            self.registro.fin = timezone.now()
+            self.registro.save()
+            EtapaPipeline.objects.bulk_create([
+                EtapaPipeline(ejecucion=self.registro, nombre=nombre, orden=orden,
+                              repeticiones=acumulado.repeticiones, **acumulado.campos())
+                for orden, (nombre, acumulado) in enumerate(self.etapas.items())
+            ])
+        except Exception:
+            logger.exception('No se pudo guardar el historial del pipeline', extra={'pipeline': self.pipeline})
+
+    def _revisar_regresion(self, filas_por_segundo):
+        """Aviso si el throughput cae muy por debajo de la mediana de las ejecuciones anteriores"""
+        if self.registro is None or not filas_por_segundo:
+            return
+        try:
+            anteriores = list(
+                EjecucionPipeline.objects.filter(pipeline=self.pipeline, estado=EjecucionPipeline.OK,
+                                                 filas_por_segundo__gt=0)
+                .exclude(pk=self.registro.pk).order_by('-inicio')
+                .values_list('filas_por_segundo', flat=True)[:settings.PIPELINE_HISTORIAL_REFERENCIA]
+            )
+        except Exception:
+            return
+        if not anteriores:
+            return
+        referencia = statistics.median(anteriores)
+        if filas_por_segundo < referencia * settings.PIPELINE_UMBRAL_REGRESION:
+            logger.warning('Regresión de rendimiento en %s: %.1f filas/s (mediana reciente %.1f)',
+                           self.pipeline, filas_por_segundo, referencia, extra={
+                               'pipeline': self.pipeline, 'filas_por_segundo': filas_por_segundo,
+                               'referencia_filas_por_segundo': referencia,
+                           })
+
+
+class paso_pipeline(ContextDecorator):
+    """Una etapa dentro de la ejecución en curso"""
+
+    def __init__(self, nombre):
+        self.nombre = nombre
+
+    def _recreate_cm(self):
+        return paso_pipeline(self.nombre)
+
+    def __enter__(self):
+        self._metrica = etapa(self.nombre)
+        self._metrica.__enter__()
+        ejecucion = _ejecucion.get()
+        self.acumulado = None
+        if ejecucion is not None:
+            self.acumulado = ejecucion.etapas.setdefault(self.nombre, Acumulado())
+            self.acumulado.iniciar_memoria()
+        self._token = _paso.set(self.acumulado)
+        self._inicio = time.perf_counter()
+        return self
+
+    def __exit__(self, tipo_error, error, traza):
+        duracion = time.perf_counter() - self._inicio
+        _paso.reset(self._token)
+        self._metrica.__exit__(tipo_error, error, traza)
+        if self.acumulado is None:
+            return False
+
+        if tipo_error:
+            self.acumulado.sumar(errores=1)
+            _ejecucion.get().acumulado.sumar(errores=1)
+        self.acumulado.duracion += duracion
+        self.acumulado.repeticiones += 1
+        self.acumulado.observar_memoria()
+        _ejecucion.get().acumulado.observar_memoria(self.acumulado.rss_pico_mb)
+        logger.debug('Etapa %s finalizada en %.2fs', self.nombre, duracion,
+                     extra={'etapa': self.nombre, **self.acumulado.valores})
+        return False
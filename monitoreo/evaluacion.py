@@ -0,0 +1,80 @@
+import numpy as np
+from .models import EjecucionModelo
+from .puntuacion import puntuar
+
+
+def estadisticas_scores(scores):
+    """
+    Resumen de la distribución de scores en tiempo lineal.
+    np.percentile usa selección parcial (introselect), no ordena el arreglo completo.
+    """
+    scores = np.asarray(scores, dtype=float)
+    p50, p95, p99 = np.percentile(scores, [50, 95, 99])
+
+    return {
+        'score_media': float(scores.mean()),
+        'score_desviacion': float(scores.std()),
+        'score_min': float(scores.min()),
+        'score_p50': float(p50),
+        'score_p95': float(p95),
+        'score_p99': float(p99),
+        'score_max': float(scores.max()),
+    }
+
+
+def deriva_contaminacion(predicciones, contaminacion_esperada):
+    """
+    Compara la fracción de anomalías observada contra la configurada en el modelo.
+    """
+    predicciones = np.asarray(predicciones)
+    observada = float((predicciones == -1).mean()) if len(predicciones) else 0.0
+
+    return {
+        'contaminacion_esperada': float(contaminacion_esperada),
+        'contaminacion_observada': observada,
+        'deriva_contaminacion': observada - float(contaminacion_esperada),
+    }
+
+
+def estabilidad_vs_modelo_previo(modelo_previo, X, predicciones, scores):
+    """
+    Concordancia de etiquetas y correlación de scores contra el modelo anterior.
+    Retorna None en ambas métricas si no hay modelo previo o no es compatible.
+    """
+    resultado = {'estabilidad_etiquetas': None, 'correlacion_scores': None}
+
+    if modelo_previo is None:
+        return resultado
+
+    try:
+        predicciones_previas, scores_previos = puntuar(modelo_previo, X)
+    except Exception:
+        # Modelo entrenado con otras características (versión anterior)
+        return resultado
+
+    resultado['estabilidad_etiquetas'] = float((predicciones_previas == np.asarray(predicciones)).mean())
+
+    if np.std(scores_previos) > 0 and np.std(scores) > 0:
+        resultado['correlacion_scores'] = float(np.corrcoef(scores_previos, scores)[0, 1])
+
+    return resultado
+
+
+def evaluar_modelo(X, predicciones, scores, contaminacion, modelo_previo=None):
+    """
+    SPRINT 7: Etapa de evaluación opcional (reemplaza Silhouette / Davies-Bouldin).
+    Todas las métricas son O(n) y se calculan sobre los scores ya obtenidos.
+    """
+    metricas = {
+        'total_eventos': len(predicciones),
+        'total_anomalias': int((np.asarray(predicciones) == -1).sum()),
+    }
+    metricas.update(estadisticas_scores(scores))
+    metricas.update(deriva_contaminacion(predicciones, contaminacion))
+    metricas.update(estabilidad_vs_modelo_previo(modelo_previo, X, predicciones, scores))
+    return metricas
+
+
+def registrar_ejecucion(metricas, duracion_segundos=0.0):
+    """Guarda las métricas en el historial de ejecuciones del modelo."""
+    return EjecucionModelo.objects.create(duracion_segundos=duracion_segundos, **metricas)
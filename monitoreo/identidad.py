@@ -0,0 +1,106 @@
+"""
+Identidad de eventos (SPRINT 7).
+
+Un evento se identifica por (timestamp, email, archivo, acción). El recolector
+online y la carga histórica usan las mismas funciones de este módulo, así un
+mismo evento produce siempre el mismo ID sin importar de dónde venga:
+
+  - El timestamp se normaliza a microsegundos desde epoch en UTC: da igual si
+    llega en UTC (API de Google) o en hora de Caracas (reportes JSON).
+  - El ID es BLAKE2b de 16 bytes (32 caracteres hex, mismo largo que el MD5
+    anterior) de los cuatro campos canónicos.
+
+La clave de deduplicación es la `huella`: BLAKE2b de 8 bytes del
+id_evento_google, guardada como entero de 64 bits con signo
+(BigIntegerField). El índice único pasa de comparar textos de 32+
+caracteres a comparar enteros de 8 bytes.
+
+id_evento_google se conserva como referencia legible (alertas, admin, GLPI).
+"""
+import hashlib
+from datetime import datetime, timedelta, timezone
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+MICROSEGUNDO = timedelta(microseconds=1)
+
+# Separador de campos que no aparece en emails, IDs de archivo ni acciones
+SEPARADOR = '\x1f'
+
+
+def timestamp_canonico(valor):
+    """
+    Microsegundos desde epoch (UTC). Acepta datetime (naive = UTC) o texto
+    ISO 8601 (también con sufijo 'Z' como lo entrega Google).
+    """
+    if isinstance(valor, str):
+        valor = datetime.fromisoformat(valor.replace('Z', '+00:00'))
+    if valor.tzinfo is None:
+        valor = valor.replace(tzinfo=timezone.utc)
+    # Aritmética entera: sin errores de redondeo de timestamp() en float
+    return (valor - EPOCH) // MICROSEGUNDO
+
+
+def timestamps_canonicos(valores):
+    """
+    Versión por lote de timestamp_canonico. Si recibe una columna datetime64
+    (numpy / pandas) la conversión es vectorizada; si no, una pasada por elemento.
+    """
+    dtype = getattr(valores, 'dtype', None)
+    if dtype is not None and dtype.kind == 'M':
+        import pandas as pd
+
+        indice = pd.DatetimeIndex(valores)
+        if indice.tz is not None:
+            indice = indice.tz_convert('UTC').tz_localize(None)
+        return indice.as_unit('us').asi8.tolist()
+    return [timestamp_canonico(valor) for valor in valores]
+
+
+def id_evento(timestamp, email, archivo_id, accion):
+    """ID único del evento (hex de 32 caracteres)"""
+    return ids_eventos([timestamp], [email], [archivo_id], [accion])[0]
+
+
+def ids_eventos(timestamps, emails, archivos, acciones):
+    """
+    IDs de un lote completo: columnas paralelas (listas, arrays o Series).
+    Los timestamps se normalizan de una vez y el hash corre en un solo bucle.
+    """
+    blake2b = hashlib.blake2b
+    return [
+        blake2b(f'{ts}{SEPARADOR}{email}{SEPARADOR}{archivo}{SEPARADOR}{accion}'.encode('utf-8'),
+                digest_size=16).hexdigest()
+        for ts, email, archivo, accion in zip(timestamps_canonicos(timestamps), emails, archivos, acciones)
+    ]
+
+
+def huella_evento(id_evento):
+    """Entero de 64 bits con signo, determinístico entre procesos y motores de BD"""
+    digest = hashlib.blake2b(id_evento.encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'big', signed=True)
+
+
+def huellas_eventos(ids):
+    """Versión por lote de huella_evento"""
+    blake2b = hashlib.blake2b
+    return [int.from_bytes(blake2b(i.encode('utf-8'), digest_size=8).digest(), 'big', signed=True) for i in ids]
+
+
+def asignar_ids(eventos):
+    """Completa id_evento_google (por lote) en instancias que no lo traen"""
+    sin_id = [e for e in eventos if not e.id_evento_google]
+    ids = ids_eventos(
+        [e.timestamp for e in sin_id], [e.email_usuario for e in sin_id],
+        [e.archivo_id for e in sin_id], [e.tipo_evento for e in sin_id],
+    )
+    for evento, id_generado in zip(sin_id, ids):
+        evento.id_evento_google = id_generado
+    return eventos
+
+
+def asignar_huellas(eventos):
+    """Completa la huella de instancias sin guardar (bulk_create / COPY no pasan por save())"""
+    sin_huella = [e for e in eventos if e.huella is None]
+    for evento, huella in zip(sin_huella, huellas_eventos([e.id_evento_google for e in sin_huella])):
+        evento.huella = huella
+    return eventos
@@ -0,0 +1,201 @@
+"""
+Ingesta masiva de eventos (SPRINT 7).
+
+En PostgreSQL los lotes viajan con COPY ... FROM STDIN a una tabla temporal
+y se integran con un solo INSERT ... ON CONFLICT (huella):
+  - DO NOTHING para la carga histórica (los eventos ya cargados se ignoran)
+  - DO UPDATE para el recolector online (se refrescan los datos del evento,
+    las marcas de anomalía solo se escriben al crear)
+
+En SQLite (o con INGESTA_COPY_POSTGRES = False) los comandos siguen usando
+update_or_create, y la carga histórica un INSERT ... ON CONFLICT DO NOTHING
+RETURNING por lotes (insertar_eventos) para saber qué filas entraron.
+
+copiar_filas / insertar_filas reciben filas ya preparadas (valores de BD):
+las usa la carga de eventos sintéticos para pasar por el mismo camino.
+"""
+import ipaddress
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models.signals import post_save
+
+from .dimensiones import asignar_dimensiones
+from .identidad import asignar_huellas
+from .models import EventoDeAcceso
+
+TABLA_STAGING = 'staging_eventodeacceso'
+
+# Columnas que el recolector online refresca cuando el evento ya existía
+CAMPOS_ACTUALIZABLES = [
+    'timestamp', 'email_usuario', 'archivo_id', 'nombre_archivo',
+    'tipo_evento', 'direccion_ip', 'detalles',
+    'dim_actor', 'dim_archivo', 'dim_ip',
+]
+
+
+# IP neutra para valores que no son direcciones válidas (igual que el reintento del recolector)
+IP_NEUTRA = '0.0.0.0'
+
+
+def ip_valida(ip):
+    """En PostgreSQL la columna es inet: una IP inválida haría fallar todo el COPY"""
+    if not ip:
+        return None
+    try:
+        ipaddress.ip_address(ip)
+        return ip
+    except ValueError:
+        return IP_NEUTRA
+
+
+def usar_copy():
+    """¿Está disponible la vía rápida COPY + ON CONFLICT?"""
+    return connection.vendor == 'postgresql' and getattr(settings, 'INGESTA_COPY_POSTGRES', True)
+
+
+def _campos():
+    return [f for f in EventoDeAcceso._meta.concrete_fields if not f.primary_key]
+
+
+def copiar_filas(columnas, filas, conflicto='DO NOTHING', retorno=None):
+    """
+    COPY de filas ya preparadas (valores de BD en el orden de `columnas`) a la
+    tabla de staging + un INSERT ... ON CONFLICT (huella) {conflicto} en la de eventos.
+
+    Con `retorno` (expresión de RETURNING) retorna las filas que devuelve el
+    INSERT; sin él, la cantidad de filas escritas.
+    """
+    tabla = connection.ops.quote_name(EventoDeAcceso._meta.db_table)
+    lista = ', '.join(connection.ops.quote_name(c) for c in columnas)
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        # Dentro de una transacción externa ON COMMIT DROP aún no borró la del lote anterior
+        cursor.execute(f'DROP TABLE IF EXISTS {TABLA_STAGING}')
+        cursor.execute(
+            f'CREATE TEMP TABLE {TABLA_STAGING} (LIKE {tabla} INCLUDING DEFAULTS) ON COMMIT DROP'
+        )
+
+        # psycopg 3: COPY en streaming, fila por fila, sin armar un INSERT gigante
+        with cursor.copy(f'COPY {TABLA_STAGING} ({lista}) FROM STDIN') as copia:
+            for fila in filas:
+                copia.write_row(fila)
+
+        # DISTINCT ON: un mismo evento repetido en el lote no puede actualizarse dos veces en el mismo INSERT
+        cursor.execute(
+            f'INSERT INTO {tabla} ({lista}) '
+            f'SELECT DISTINCT ON (huella) {lista} FROM {TABLA_STAGING} '
+            f'ON CONFLICT (huella) {conflicto}'
+            + (f' RETURNING {retorno}' if retorno else '')
+        )
+        return cursor.fetchall() if retorno else cursor.rowcount
+
+
+def insertar_filas(columnas, filas):
+    """
+    Filas ya preparadas, descartando las huellas existentes: COPY si está
+    disponible (usar_copy), si no INSERT ... ON CONFLICT DO NOTHING por lotes
+    (executemany). Retorna la cantidad de filas insertadas.
+    """
+    if usar_copy():
+        return copiar_filas(columnas, filas)
+
+    tabla = connection.ops.quote_name(EventoDeAcceso._meta.db_table)
+    lista = ', '.join(connection.ops.quote_name(c) for c in columnas)
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.executemany(
+            f'INSERT INTO {tabla} ({lista}) VALUES ({", ".join(["%s"] * len(columnas))}) '
+            f'ON CONFLICT (huella) DO NOTHING', filas)
+        return cursor.rowcount
+
+
+def insertar_eventos(eventos):
+    """
+    Inserta instancias de EventoDeAcceso (sin guardar) descartando las huellas
+    existentes: COPY si está disponible, si no INSERT ... ON CONFLICT DO NOTHING
+    RETURNING por lotes. Retorna solo las instancias que se insertaron (con su
+    pk): las que otro proceso cargó entre medio no se cuentan dos veces.
+    """
+    if usar_copy():
+        return copiar_eventos(eventos)[0]
+    if not eventos:
+        return []
+
+    asignar_dimensiones(asignar_huellas(eventos))
+    campos = _campos()
+    tabla = connection.ops.quote_name(EventoDeAcceso._meta.db_table)
+    lista = ', '.join(connection.ops.quote_name(f.column) for f in campos)
+    marcadores = '(' + ', '.join(['%s'] * len(campos)) + ')'
+    tamano = max(1, connection.ops.bulk_batch_size(campos, eventos))
+
+    por_huella = {e.huella: e for e in eventos}
+    insertados = []
+    with transaction.atomic(), connection.cursor() as cursor:
+        for i in range(0, len(eventos), tamano):
+            lote = eventos[i:i + tamano]
+            cursor.execute(
+                f'INSERT INTO {tabla} ({lista}) VALUES {", ".join([marcadores] * len(lote))} '
+                f'ON CONFLICT (huella) DO NOTHING RETURNING id, huella',
+                [f.get_db_prep_save(getattr(e, f.attname), connection) for e in lote for f in campos],
+            )
+            for pk, huella in cursor.fetchall():
+                evento = por_huella[huella]
+                evento.pk = pk
+                evento._state.adding = False
+                insertados.append(evento)
+    return insertados
+
+
+def copiar_eventos(eventos, actualizar=False):
+    """
+    Inserta instancias de EventoDeAcceso (sin guardar) vía COPY a staging +
+    INSERT ... ON CONFLICT. A los eventos insertados se les asigna su pk.
+
+    Retorna (insertados, actualizados): la lista de instancias nuevas y
+    la cantidad de eventos existentes que se refrescaron.
+    """
+    if not eventos:
+        return [], 0
+
+    asignar_dimensiones(asignar_huellas(eventos))
+    campos = _campos()
+
+    if actualizar:
+        asignaciones = ', '.join(
+            f'{c} = EXCLUDED.{c}'
+            for c in (connection.ops.quote_name(EventoDeAcceso._meta.get_field(n).column) for n in CAMPOS_ACTUALIZABLES)
+        )
+        conflicto = f'DO UPDATE SET {asignaciones}'
+    else:
+        conflicto = 'DO NOTHING'
+
+    def filas():
+        for evento in eventos:
+            evento.direccion_ip = ip_valida(evento.direccion_ip)
+            yield [f.get_db_prep_save(getattr(evento, f.attname), connection) for f in campos]
+
+    # xmax = 0 solo en las filas recién insertadas (las actualizadas tienen xmax de la transacción)
+    resultado = copiar_filas([f.column for f in campos], filas(), conflicto,
+                             retorno='id, huella, (xmax = 0) AS insertado')
+
+    por_huella = {e.huella: e for e in eventos}
+    insertados = []
+    for pk, huella, insertado in resultado:
+        if insertado:
+            evento = por_huella[huella]
+            evento.pk = pk
+            evento._state.adding = False
+            insertados.append(evento)
+
+    return insertados, len(resultado) - len(insertados)
+
+
+def notificar_anomalias(eventos):
+    """
+    COPY no dispara post_save: se emite la señal para los eventos insertados
+    como anomalía, igual que lo haría update_or_create (alertas por email).
+    """
+    for evento in eventos:
+        if evento.es_anomalia:
+            post_save.send(sender=EventoDeAcceso, instance=evento, created=True,
+                           update_fields=None, raw=False, using=connection.alias)
@@ -0,0 +1,173 @@
+import json
+import re
+import statistics
+import time
+from datetime import timedelta
+from pathlib import Path
+
+from django.contrib import admin
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from monitoreo.models import EventoDeAcceso
+from monitoreo.views import api_tendencias, calcular_kpis_dashboard, dashboard_monitoreo
+from system_core import cache as cache_sistema
+
+TABLA_EVENTOS = EventoDeAcceso._meta.db_table
+
+# Misma ventana que analisis.py / reentrenamiento
+DIAS_VENTANA_ML = 180
+
+# Patrones del plan que indican trabajo proporcional al tamaño de la tabla
+ALERTAS_PLAN = {
+    'sqlite': [
+        (re.compile(rf'^SCAN {TABLA_EVENTOS}$'), 'escaneo completo de eventos'),
+        (re.compile(r'USE TEMP B-TREE FOR ORDER BY'), 'ordenamiento sin índice'),
+    ],
+    'postgresql': [
+        (re.compile(rf'Seq Scan on {TABLA_EVENTOS}'), 'escaneo completo de eventos'),
+        (re.compile(r'^\s*(->\s*)?Sort\b'), 'ordenamiento sin índice'),
+    ],
+}
+
+
+def plan_consulta(sql, params=None):
+    """Líneas del plan de ejecución (EXPLAIN QUERY PLAN en SQLite, EXPLAIN en PostgreSQL)"""
+    prefijo = 'EXPLAIN QUERY PLAN ' if connection.vendor == 'sqlite' else 'EXPLAIN '
+    with connection.cursor() as cursor:
+        cursor.execute(prefijo + sql, params)
+        filas = cursor.fetchall()
+    return [fila[-1] for fila in filas]
+
+
+def alertas_plan(plan):
+    patrones = ALERTAS_PLAN.get(connection.vendor, [])
+    return sorted({motivo for linea in plan for patron, motivo in patrones if patron.search(linea.strip())})
+
+
+def escenarios():
+    """
+    (nombre, función) de cada patrón de consulta auditado: dashboard, admin
+    y carga de datos del modelo de ML. Todos son de solo lectura.
+    """
+    # Usuario en memoria (sin guardar): las vistas solo necesitan que esté autenticado
+    usuario = get_user_model()(username='auditoria', is_staff=True, is_superuser=True, is_active=True)
+    fabrica = RequestFactory()
+
+    def vista(funcion, ruta, **params):
+        def ejecutar():
+            request = fabrica.get(ruta, params)
+            request.user = usuario
+            respuesta = funcion(request)
+            if hasattr(respuesta, 'render'):
+                respuesta.render()
+        return ejecutar
+
+    admin_eventos = admin.site._registry[EventoDeAcceso]
+    ventana = lambda: EventoDeAcceso.objects.filter(timestamp__gte=timezone.now() - timedelta(days=DIAS_VENTANA_ML))
+
+    def carga_ventana_ml():
+        from monitoreo.analisis import cargar_ventana
+        cargar_ventana(ventana())
+
+    def muestra_reentrenamiento():
+        from monitoreo.reentrenamiento import cargar_muestra
+        cargar_muestra(timezone.now() - timedelta(days=DIAS_VENTANA_ML), 50000)
+
+    return [
+        ('dashboard_kpis', calcular_kpis_dashboard),
+        ('dashboard', vista(dashboard_monitoreo, '/monitoreo/dashboard/v2/')),
+        ('dashboard_anomalias', vista(dashboard_monitoreo, '/monitoreo/dashboard/v2/', anomalia='si')),
+        ('dashboard_severidad', vista(dashboard_monitoreo, '/monitoreo/dashboard/v2/', anomalia='CRITICA')),
+        ('dashboard_tipo', vista(dashboard_monitoreo, '/monitoreo/dashboard/v2/', tipo='download')),
+        ('dashboard_pagina_10', vista(dashboard_monitoreo, '/monitoreo/dashboard/v2/', page='10')),
+        ('tendencias_dia', vista(api_tendencias, '/monitoreo/api/tendencias/', agrupar='tipo')),
+        ('admin_listado', vista(admin_eventos.changelist_view, '/admin/monitoreo/eventodeacceso/')),
+        ('admin_anomalias', vista(admin_eventos.changelist_view, '/admin/monitoreo/eventodeacceso/',
+                                  es_anomalia__exact='1')),
+        ('admin_tipo', vista(admin_eventos.changelist_view, '/admin/monitoreo/eventodeacceso/',
+                             tipo_evento__exact='download')),
+        ('ml_ventana_180_dias', carga_ventana_ml),
+        ('ml_muestra_reentrenamiento', muestra_reentrenamiento),
+    ]
+
+
+class Command(BaseCommand):
+    help = 'Audita las consultas del dashboard, admin y ML: tiempos, planes (EXPLAIN) y escaneos sin índice.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeticiones', type=int, default=5, help='Ejecuciones por escenario (se usa la mediana)')
+        parser.add_argument('--solo', nargs='*', help='Nombres de escenarios a ejecutar')
+        parser.add_argument('--referencia', type=str, help='JSON de una auditoría previa para comparar tiempos')
+        parser.add_argument('--salida', type=str, help='Guarda el resultado en JSON (sirve como próxima referencia)')
+        parser.add_argument('--fallar-con-alertas', action='store_true',
+                            help='Termina con error si algún plan escanea la tabla de eventos completa')
+
+    def handle(self, *args, **options):
+        total = EventoDeAcceso.objects.count()
+        self.stdout.write(f"🔎 Auditando consultas sobre {total} eventos ({connection.vendor})...")
+
+        previa = {}
+        if options['referencia']:
+            previa = json.loads(Path(options['referencia']).read_text())['escenarios']
+
+        resultado = {'motor': connection.vendor, 'eventos': total, 'escenarios': {}}
+        for nombre, ejecutar in escenarios():
+            if options['solo'] and nombre not in options['solo']:
+                continue
+
+            # Sin caché: se mide la consulta, no la lectura de la caché
+            cache_sistema.invalidar(cache_sistema.DASHBOARD)
+            with CaptureQueriesContext(connection) as capturadas:
+                ejecutar()
+
+            tiempos = []
+            for _ in range(options['repeticiones']):
+                cache_sistema.invalidar(cache_sistema.DASHBOARD)
+                inicio = time.perf_counter()
+                ejecutar()
+                tiempos.append(time.perf_counter() - inicio)
+
+            consultas = []
+            for sql in dict.fromkeys(q['sql'] for q in capturadas.captured_queries):
+                if TABLA_EVENTOS not in sql:
+                    continue
+                plan = plan_consulta(sql)
+                consultas.append({'sql': sql, 'plan': plan, 'alertas': alertas_plan(plan)})
+
+            mediana_ms = round(statistics.median(tiempos) * 1000, 2)
+            resultado['escenarios'][nombre] = {
+                'mediana_ms': mediana_ms,
+                'consultas_totales': len(capturadas.captured_queries),
+                'consultas_eventos': consultas,
+            }
+            self._reportar(nombre, mediana_ms, consultas, previa.get(nombre))
+
+        if options['salida']:
+            Path(options['salida']).write_text(json.dumps(resultado, indent=2, ensure_ascii=False))
+
+        con_alertas = sorted(n for n, e in resultado['escenarios'].items()
+                             if any(c['alertas'] for c in e['consultas_eventos']))
+        if con_alertas and options['fallar_con_alertas']:
+            raise CommandError(f"Consultas sin índice adecuado en: {', '.join(con_alertas)}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Auditoría finalizada. Escenarios con alertas: {', '.join(con_alertas) or 'ninguno'}"
+        ))
+
+    def _reportar(self, nombre, mediana_ms, consultas, previo):
+        comparacion = ''
+        if previo:
+            antes = previo['mediana_ms']
+            comparacion = f" (antes {antes:.2f} ms, x{antes / mediana_ms:.1f})" if mediana_ms else ''
+        self.stdout.write(f"\n⏱️ {nombre}: {mediana_ms:.2f} ms{comparacion}")
+        for consulta in consultas:
+            marca = '⚠️' if consulta['alertas'] else '✅'
+            self.stdout.write(f"   {marca} {consulta['sql'][:110]}")
+            for linea in consulta['plan']:
+                self.stdout.write(f"        {linea}")
+            if consulta['alertas']:
+                self.stdout.write(self.style.WARNING(f"        -> {', '.join(consulta['alertas'])}"))
@@ -0,0 +1,127 @@
+import json
+import random
+import statistics
+import threading
+import time
+from datetime import timedelta
+from pathlib import Path
+
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connection, transaction
+from django.utils import timezone
+
+from monitoreo.models import EventoDeAcceso
+from monitoreo.views import calcular_kpis_dashboard
+
+# Los eventos sintéticos llevan este prefijo para poder borrarlos al terminar
+PREFIJO = 'bench_concurrencia_'
+
+PRAGMAS_REPORTADOS = ['journal_mode', 'synchronous', 'busy_timeout', 'mmap_size', 'cache_size', 'temp_store']
+
+
+def leer_pragmas():
+    """PRAGMAs efectivos de la conexión actual (solo SQLite)"""
+    if connection.vendor != 'sqlite':
+        return {}
+    pragmas = {}
+    with connection.cursor() as cursor:
+        for pragma in PRAGMAS_REPORTADOS:
+            cursor.execute(f'PRAGMA {pragma}')
+            fila = cursor.fetchone()
+            # mmap_size no devuelve fila en bases en memoria (tests)
+            pragmas[pragma] = fila[0] if fila else None
+    return pragmas
+
+
+def lectura_dashboard():
+    """Las consultas que hace el dashboard en cada carga (KPIs + primera página)"""
+    calcular_kpis_dashboard()
+    list(EventoDeAcceso.objects.order_by('-timestamp')[:20])
+
+
+def percentil(valores, p):
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(round(p / 100 * (len(ordenados) - 1))))]
+
+
+class Command(BaseCommand):
+    help = 'Benchmark: latencia de las lecturas del dashboard mientras otro hilo ingesta eventos en bloque.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--eventos', type=int, default=100000, help='Eventos sintéticos a insertar')
+        parser.add_argument('--lote', type=int, default=5000, help='Eventos por transacción de escritura')
+        parser.add_argument('--pausa-lecturas', type=float, default=0.05, help='Segundos entre lecturas')
+        parser.add_argument('--salida', type=str, help='Guarda el resultado en JSON')
+
+    def handle(self, *args, **options):
+        total, lote = options['eventos'], options['lote']
+        escritura = {'filas': 0, 'errores': 0, 'segundos': 0.0}
+
+        def escribir():
+            rng = random.Random(42)
+            ahora = timezone.now()
+            inicio = time.perf_counter()
+            try:
+                for desde in range(0, total, lote):
+                    objetos = [
+                        EventoDeAcceso(
+                            id_evento_google=f'{PREFIJO}{i}',
+                            email_usuario=f'usuario{rng.randrange(200)}@empresa.com',
+                            tipo_evento=rng.choice(['view', 'edit', 'download']),
+                            archivo_id=f'archivo_{rng.randrange(5000)}',
+                            nombre_archivo='benchmark.txt',
+                            direccion_ip=f'10.0.{rng.randrange(256)}.{rng.randrange(256)}',
+                            timestamp=ahora - timedelta(seconds=rng.randrange(180 * 86400)),
+                        )
+                        for i in range(desde, min(desde + lote, total))
+                    ]
+                    try:
+                        with transaction.atomic():
+                            EventoDeAcceso.objects.bulk_create(objetos, ignore_conflicts=True)
+                        escritura['filas'] += len(objetos)
+                    except OperationalError:
+                        escritura['errores'] += 1
+            finally:
+                escritura['segundos'] = time.perf_counter() - inicio
+                connection.close()  # conexión propia del hilo
+
+        self.stdout.write(f"PRAGMAs: {leer_pragmas()}")
+        self.stdout.write(f"Insertando {total} eventos en lotes de {lote} mientras se mide el dashboard...")
+
+        latencias, bloqueos = [], 0
+        hilo = threading.Thread(target=escribir)
+        hilo.start()
+        try:
+            while hilo.is_alive():
+                inicio = time.perf_counter()
+                try:
+                    lectura_dashboard()
+                    latencias.append(time.perf_counter() - inicio)
+                except OperationalError:
+                    # "database is locked": la lectura esperó busy_timeout y falló
+                    bloqueos += 1
+                time.sleep(options['pausa_lecturas'])
+        finally:
+            hilo.join()
+            borrados, _ = EventoDeAcceso.objects.filter(id_evento_google__startswith=PREFIJO).delete()
+            self.stdout.write(f"🧹 {borrados} eventos sintéticos eliminados.")
+
+        resultado = {
+            'pragmas': leer_pragmas(),
+            'escritura': {
+                'filas': escritura['filas'],
+                'lotes_fallidos': escritura['errores'],
+                'filas_por_segundo': round(escritura['filas'] / escritura['segundos'], 1) if escritura['segundos'] else 0.0,
+            },
+            'lecturas': {
+                'total': len(latencias),
+                'bloqueadas': bloqueos,
+                'p50_ms': round(statistics.median(latencias) * 1000, 2) if latencias else None,
+                'p95_ms': round(percentil(latencias, 95) * 1000, 2) if latencias else None,
+                'max_ms': round(max(latencias) * 1000, 2) if latencias else None,
+            },
+        }
+
+        self.stdout.write(json.dumps(resultado, indent=2))
+        if options['salida']:
+            Path(options['salida']).write_text(json.dumps(resultado, indent=2))
@@ -0,0 +1,84 @@
+import json
+import re
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Módulos que NO deben cargarse al arrancar Django (solo al sincronizar / detectar)
+MODULOS_PESADOS = ('pandas', 'numpy', 'scipy', 'sklearn', 'joblib', 'googleapiclient')
+
+PATRON_IMPORTTIME = re.compile(r'^import time:\s+\d+ \|\s+\d+ \|\s*(\S+)$')
+
+
+def medir_check_en_frio():
+    """
+    Ejecuta `manage.py check` en un proceso nuevo con -X importtime.
+    Retorna (segundos de pared, conjunto de módulos de primer nivel importados).
+    """
+    comando = [sys.executable, '-X', 'importtime', str(Path(settings.BASE_DIR) / 'manage.py'), 'check']
+
+    inicio = time.perf_counter()
+    resultado = subprocess.run(comando, capture_output=True, text=True, cwd=settings.BASE_DIR)
+    segundos = time.perf_counter() - inicio
+
+    if resultado.returncode != 0:
+        raise CommandError(f"manage.py check falló:\n{resultado.stderr[-2000:]}")
+
+    modulos = set()
+    for linea in resultado.stderr.splitlines():
+        coincidencia = PATRON_IMPORTTIME.match(linea)
+        if coincidencia:
+            modulos.add(coincidencia.group(1).split('.')[0])
+    return segundos, modulos
+
+
+class Command(BaseCommand):
+    help = 'Benchmark de arranque: mide `manage.py check` en frío y falla si cargan módulos pesados o si empeora.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeticiones', type=int, default=5, help='Procesos en frío a medir (se usa la mediana)')
+        parser.add_argument('--max-segundos', type=float, default=3.0, help='Tiempo máximo aceptado para la mediana')
+        parser.add_argument('--referencia', type=str, help='JSON con una medición previa para comparar')
+        parser.add_argument('--tolerancia', type=float, default=0.25, help='Empeoramiento relativo permitido contra la referencia')
+        parser.add_argument('--salida', type=str, help='Guarda el resultado en JSON (sirve como próxima referencia)')
+
+    def handle(self, *args, **options):
+        tiempos = []
+        modulos = set()
+        for _ in range(options['repeticiones']):
+            segundos, cargados = medir_check_en_frio()
+            tiempos.append(segundos)
+            modulos |= cargados
+
+        mediana = statistics.median(tiempos)
+        pesados = sorted(set(MODULOS_PESADOS) & modulos)
+        resultado = {
+            'mediana_segundos': round(mediana, 4),
+            'tiempos': [round(t, 4) for t in tiempos],
+            'modulos_pesados': pesados,
+        }
+        self.stdout.write(f"⏱️ manage.py check en frío: mediana {mediana:.3f}s ({len(tiempos)} corridas)")
+
+        if options['salida']:
+            Path(options['salida']).write_text(json.dumps(resultado, indent=2))
+
+        errores = []
+        if pesados:
+            errores.append(f"Módulos pesados cargados al arrancar: {', '.join(pesados)}")
+        if mediana > options['max_segundos']:
+            errores.append(f"Mediana {mediana:.3f}s supera el máximo de {options['max_segundos']:.3f}s")
+        if options['referencia']:
+            previa = json.loads(Path(options['referencia']).read_text())['mediana_segundos']
+            limite = previa * (1 + options['tolerancia'])
+            if mediana > limite:
+                errores.append(f"Regresión: {mediana:.3f}s contra {previa:.3f}s de referencia (límite {limite:.3f}s)")
+
+        if errores:
+            raise CommandError(' | '.join(errores))
+
+        self.stdout.write(self.style.SUCCESS("Sin regresiones en el tiempo de arranque."))
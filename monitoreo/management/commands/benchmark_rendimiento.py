@@ -0,0 +1,200 @@
+import json
+import platform
+import statistics
+import time
+from datetime import timedelta
+from pathlib import Path
+
+import django
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Max
+from django.test import RequestFactory
+from django.utils import timezone
+
+from monitoreo.dimensiones import cache_dimensiones
+from monitoreo.models import Actor, EventoDeAcceso, PerfilUsuario
+from monitoreo.resumenes import recalcular_resumenes
+from monitoreo.sinteticos import GeneradorSintetico
+from monitoreo.views import exportar_eventos
+from system_core import cache as cache_sistema
+
+from .auditar_consultas import escenarios as escenarios_consultas
+
+# Los eventos de los escenarios de ingesta usan este dominio para poder borrarlos al terminar
+DOMINIO_BENCHMARK = 'benchmark.invalid'
+
+# Escenarios de auditar_consultas que corresponden al dashboard
+PREFIJOS_DASHBOARD = ('dashboard', 'tendencias')
+
+# Escenarios que escriben en la BD o recorren toda la tabla: se miden menos veces
+ESCENARIOS_PESADOS = {'deteccion', 'exportacion_csv', 'exportacion_ndjson', 'exportacion_csv_gzip'}
+
+
+def percentil(valores, p):
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(round(p / 100 * (len(ordenados) - 1))))]
+
+
+class Command(BaseCommand):
+    help = ('Benchmark de ingesta, consultas del dashboard, detección y exportación sobre la BD actual '
+            '(generarla con generar_datos_simulados). La detección reescribe las marcas de anomalía y el '
+            'modelo: usar una BD de benchmark. Resultado en JSON comparable entre corridas.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeticiones', type=int, default=5, help='Mediciones por escenario (se usa la mediana)')
+        parser.add_argument('--repeticiones-pesadas', type=int, default=1,
+                            help='Mediciones de detección y exportación')
+        parser.add_argument('--eventos-ingesta', type=int, default=5_000, help='Eventos por lote de ingesta')
+        parser.add_argument('--semilla', type=int, default=7, help='Semilla de los eventos de ingesta')
+        parser.add_argument('--solo', nargs='*', help='Nombres de escenarios a ejecutar')
+        parser.add_argument('--referencia', type=str, help='JSON de una corrida previa para comparar')
+        parser.add_argument('--tolerancia', type=float, default=0.25,
+                            help='Empeoramiento relativo permitido contra la referencia')
+        parser.add_argument('--salida', type=str, help='Guarda el resultado en JSON (sirve como próxima referencia)')
+
+    def handle(self, *args, **options):
+        total = EventoDeAcceso.objects.count()
+        self.stdout.write(f"🏁 Benchmark sobre {total:,} eventos ({connection.vendor})...")
+
+        resultado = {
+            'fecha': timezone.now().isoformat(),
+            'motor': connection.vendor,
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'eventos': total,
+            'parametros': {k: options[k] for k in ('repeticiones', 'repeticiones_pesadas', 'eventos_ingesta', 'semilla')},
+            'escenarios': {},
+        }
+
+        self.ultimo_id = EventoDeAcceso.objects.aggregate(maximo=Max('id'))['maximo'] or 0
+        for nombre, ejecutar in self._escenarios(options):
+            if options['solo'] and nombre not in options['solo']:
+                continue
+            repeticiones = options['repeticiones_pesadas' if nombre in ESCENARIOS_PESADOS else 'repeticiones']
+            tiempos, filas, extra = [], 0, {}
+            for _ in range(repeticiones):
+                cache_sistema.invalidar(cache_sistema.DASHBOARD)
+                inicio = time.perf_counter()
+                medicion = ejecutar() or {}
+                tiempos.append(time.perf_counter() - inicio)
+                filas = medicion.pop('filas', filas)
+                extra = medicion
+            if nombre.startswith('ingesta'):
+                self._limpiar_ingesta()
+
+            mediana = statistics.median(tiempos)
+            resultado['escenarios'][nombre] = {
+                'mediana_ms': round(mediana * 1000, 2),
+                'p95_ms': round(percentil(tiempos, 95) * 1000, 2),
+                'min_ms': round(min(tiempos) * 1000, 2),
+                'repeticiones': repeticiones,
+                'filas': filas,
+                'filas_por_segundo': round(filas / mediana, 1) if filas and mediana else None,
+                **extra,
+            }
+            self._reportar(nombre, resultado['escenarios'][nombre])
+
+        if options['salida']:
+            Path(options['salida']).write_text(json.dumps(resultado, indent=2, ensure_ascii=False))
+
+        if options['referencia']:
+            self._comparar(resultado, json.loads(Path(options['referencia']).read_text()), options['tolerancia'])
+        self.stdout.write(self.style.SUCCESS("Benchmark finalizado."))
+
+    # --- Escenarios ---
+
+    def _escenarios(self, options):
+        """(nombre, función) de cada escenario; la función puede retornar {'filas': n, ...}"""
+        lista = [('ingesta_online', self._ingesta(options, online=True)),
+                 ('ingesta_etl', self._ingesta(options, online=False))]
+        lista += [(nombre, funcion) for nombre, funcion in escenarios_consultas() if nombre.startswith(PREFIJOS_DASHBOARD)]
+        lista.append(('deteccion', self._deteccion))
+        lista += [('exportacion_csv', self._exportacion(formato='csv')),
+                  ('exportacion_ndjson', self._exportacion(formato='ndjson')),
+                  ('exportacion_csv_gzip', self._exportacion(formato='csv', gzip='1'))]
+        return lista
+
+    def _ingesta(self, options, online):
+        """
+        Un lote de eventos nuevos por repetición, en el formato del recolector
+        online (guardar_eventos_en_db) o de la carga histórica (_guardar_lote).
+        Los eventos caen en el último día y se borran al terminar el escenario.
+        """
+        from .cargar_json_historico import Command as CargarJsonCommand
+        from .recolectar_eventos_reales import guardar_eventos_en_db
+
+        generador = GeneradorSintetico(usuarios=50, archivos=500, ips=100, dias=1, semilla=options['semilla'],
+                                       fin=timezone.now(), dominio=DOMINIO_BENCHMARK)
+        cantidad = options['eventos_ingesta']
+        # Lotes distintos en cada repetición (y entre online y ETL): siempre eventos nuevos
+        numeros = iter(range(1 if online else 10**6, 2 * 10**6))
+
+        def ejecutar():
+            lote = generador.lote(cantidad, next(numeros))
+            if online:
+                guardar_eventos_en_db(generador.formato_recolector(lote))
+            else:
+                CargarJsonCommand()._guardar_lote(generador.instancias(lote))
+            return {'filas': cantidad}
+        return ejecutar
+
+    def _deteccion(self):
+        from monitoreo.analisis import ejecutar_deteccion_anomalias
+
+        anomalias = ejecutar_deteccion_anomalias()
+        filas = EventoDeAcceso.objects.filter(timestamp__gte=timezone.now() - timedelta(days=180)).count()
+        return {'filas': filas, 'anomalias': anomalias}
+
+    def _exportacion(self, **params):
+        usuario = get_user_model()(username='benchmark', is_staff=True, is_superuser=True, is_active=True)
+        fabrica = RequestFactory()
+
+        def ejecutar():
+            request = fabrica.get('/monitoreo/exportar/', params)
+            request.user = usuario
+            respuesta = exportar_eventos(request)
+            total_bytes = lineas = 0
+            for bloque in respuesta.streaming_content:
+                total_bytes += len(bloque)
+                lineas += bloque.count(b'\n')
+            # CSV: sin contar el encabezado (con gzip las líneas no se pueden contar sin descomprimir)
+            filas = lineas - 1 if params.get('formato') == 'csv' else lineas
+            return {'filas': None if params.get('gzip') else filas, 'bytes': total_bytes}
+        return ejecutar
+
+    def _limpiar_ingesta(self):
+        """Borra los eventos de los escenarios de ingesta y lo que derivaron (resúmenes, perfiles, actores)"""
+        EventoDeAcceso.objects.filter(id__gt=self.ultimo_id).delete()
+        # Los eventos de ingesta cayeron en el último día
+        recalcular_resumenes(desde=timezone.now() - timedelta(days=2))
+        PerfilUsuario.objects.filter(email_usuario__endswith=f'@{DOMINIO_BENCHMARK}').delete()
+        Actor.objects.filter(email__endswith=f'@{DOMINIO_BENCHMARK}').delete()
+        cache_dimensiones.limpiar()
+        cache_sistema.invalidar(cache_sistema.DASHBOARD)
+
+    # --- Reporte ---
+
+    def _reportar(self, nombre, medicion):
+        detalle = f" | {medicion['filas_por_segundo']:,.0f} filas/s" if medicion['filas_por_segundo'] else ''
+        if 'bytes' in medicion:
+            detalle += f" | {medicion['bytes'] / 2**20:.1f} MB"
+        self.stdout.write(f"⏱️ {nombre}: {medicion['mediana_ms']:.2f} ms (p95 {medicion['p95_ms']:.2f}){detalle}")
+
+    def _comparar(self, resultado, referencia, tolerancia):
+        regresiones = []
+        for nombre, medicion in resultado['escenarios'].items():
+            previa = referencia.get('escenarios', {}).get(nombre)
+            if not previa or not previa['mediana_ms']:
+                continue
+            limite = previa['mediana_ms'] * (1 + tolerancia)
+            self.stdout.write(f"   {nombre}: {medicion['mediana_ms']:.2f} ms contra {previa['mediana_ms']:.2f} ms "
+                              f"(x{previa['mediana_ms'] / medicion['mediana_ms']:.2f})")
+            if medicion['mediana_ms'] > limite:
+                regresiones.append(f"{nombre} {medicion['mediana_ms']:.2f} ms > {limite:.2f} ms")
+        if referencia.get('eventos') != resultado['eventos']:
+            self.stdout.write(self.style.WARNING(
+                f"La referencia se midió con {referencia.get('eventos')} eventos y esta corrida con {resultado['eventos']}"))
+        if regresiones:
+            raise CommandError(f"Regresiones de rendimiento: {' | '.join(regresiones)}")
@@ -1,9 +1,19 @@
 import json
+import logging
+import os
 import pytz
-import hashlib
 from datetime import datetime
 from django.core.management.base import BaseCommand
+from monitoreo.ejecuciones import ejecucion_pipeline, paso_pipeline, sumar
 from monitoreo.models import EventoDeAcceso
+from monitoreo.identidad import asignar_huellas, asignar_ids
+from monitoreo.ingesta import insertar_eventos
+from monitoreo.perfiles import actualizar_perfiles
+from monitoreo.puntuacion import puntuar_eventos
+from monitoreo.resumenes import acumular_resumenes
+from system_core import cache as cache_sistema
+
+logger = logging.getLogger(__name__)
 
 class Command(BaseCommand):
     help = 'ETL Offline: Carga masiva de eventos históricos con filtrado y optimización por lotes.'
@@ -11,16 +21,6 @@ class Command(BaseCommand):
     def add_arguments(self, parser):
         parser.add_argument('ruta_json', type=str, help='Ruta al archivo JSON del reporte')
 
-    def generar_id_unico(self, fecha_iso, email, archivo_id, accion):
-        """
-        Genera un ID único (Hash MD5) basado en el contenido del evento.
-        Esto permite cargar múltiples JSONs sin duplicar eventos en la BD.
-        """
-        # Concatenamos los datos clave
-        raw_string = f"{fecha_iso}_{email}_{archivo_id}_{accion}"
-        # Retornamos el hash
-        return hashlib.md5(raw_string.encode('utf-8')).hexdigest()
-
     def es_relevante(self, accion, archivo_titulo):
         """
         FILTRADO DE RUIDO (Requisito Sprint 4):
@@ -36,6 +36,7 @@ class Command(BaseCommand):
             
         return True
 
+    @ejecucion_pipeline('etl_historico')
     def handle(self, *args, **options):
         ruta_archivo = options['ruta_json']
         self.stdout.write(self.style.WARNING(f"🚀 Iniciando ETL Offline desde: {ruta_archivo}"))
@@ -47,10 +48,11 @@ class Command(BaseCommand):
         contadores = {'procesados': 0, 'guardados': 0, 'filtrados': 0, 'errores': 0}
 
         try:
-            with open(ruta_archivo, 'r', encoding='utf-8') as f:
+            with paso_pipeline('etl_lectura'), open(ruta_archivo, 'r', encoding='utf-8') as f:
                 datos = json.load(f)
                 # Tu JSON tiene la lista en la clave 'eventos'
                 lista_eventos = datos.get('eventos', [])
+                sumar(bytes_descargados=os.path.getsize(ruta_archivo))
 
             self.stdout.write(f"📥 JSON cargado. Procesando {len(lista_eventos)} eventos...")
 
@@ -104,11 +106,8 @@ class Command(BaseCommand):
 
                     # --- CARGA (ETL) ---
                     
-                    # Generamos el ID hash para evitar duplicados si cargamos varios JSON
-                    id_google = self.generar_id_unico(aware_timestamp.isoformat(), email, archivo_id, accion)
-
+                    # El ID hash (evita duplicados si cargamos varios JSON) se calcula por lote en _guardar_lote
                     nuevo_evento = EventoDeAcceso(
-                        id_evento_google=id_google,
                         timestamp=aware_timestamp,
                         email_usuario=email,
                         archivo_id=archivo_id,
@@ -137,6 +136,10 @@ class Command(BaseCommand):
                 self._guardar_lote(lote_eventos)
                 contadores['guardados'] += len(lote_eventos)
 
+            sumar(eventos_vistos=contadores['procesados'], errores=contadores['errores'],
+                  eventos_conservados=contadores['procesados'] - contadores['filtrados'] - contadores['errores'])
+            logger.info("ETL finalizado", extra=contadores)
+
             self.stdout.write(self.style.SUCCESS("\n" + "="*40))
             self.stdout.write(self.style.SUCCESS(f"✅ ETL FINALIZADO"))
             self.stdout.write(f"   - Total Leídos: {contadores['procesados']}")
@@ -148,12 +151,36 @@ class Command(BaseCommand):
         except FileNotFoundError:
             self.stderr.write(self.style.ERROR(f"Archivo no encontrado: {ruta_archivo}"))
 
+    @paso_pipeline('etl_lote')
     def _guardar_lote(self, lista_objetos):
         """
-        Usa bulk_create con ignore_conflicts=True (SQLite)
+        Usa INSERT ... ON CONFLICT DO NOTHING (ver ingesta.insertar_eventos)
         Esto es lo que permite cargar varios JSONs sin que explote por duplicados.
+        En PostgreSQL el lote va por COPY a staging + INSERT ... ON CONFLICT DO NOTHING.
+        SPRINT 7: Los eventos que no existían se clasifican con el modelo antes
+        de insertarse y luego alimentan los perfiles de usuario.
+        (bulk_create no dispara signals: la carga histórica no envía alertas)
         """
         try:
-            EventoDeAcceso.objects.bulk_create(lista_objetos, ignore_conflicts=True)
+            # IDs y huellas de todo el lote de una vez (mismo módulo que el recolector online)
+            asignar_huellas(asignar_ids(lista_objetos))
+            # Una consulta por lote para saber qué eventos ya estaban cargados
+            existentes = set(EventoDeAcceso.objects.filter(
+                huella__in=[e.huella for e in lista_objetos]
+            ).values_list('huella', flat=True))
+            nuevos = list({
+                e.huella: e for e in lista_objetos if e.huella not in existentes
+            }.values())
+
+            puntuar_eventos(nuevos)
+            # Solo los realmente insertados (otro proceso pudo cargarlos entre medio):
+            # perfiles, resúmenes y contadores no suman los que se descartaron
+            nuevos = insertar_eventos(nuevos)
+            actualizar_perfiles(nuevos)
+            acumular_resumenes(nuevos)
+            cache_sistema.invalidar(cache_sistema.DASHBOARD)
+            sumar(eventos_insertados=len(nuevos))
         except Exception as e:
-            self.stderr.write(f"Error en lote: {e}")
\ No newline at end of file
+            self.stderr.write(f"Error en lote: {e}")
+            logger.exception("Error en lote de %d eventos", len(lista_objetos), extra={'lote': len(lista_objetos)})
+            sumar(errores=1)
\ No newline at end of file
@@ -4,7 +4,14 @@ from monitoreo.analisis import ejecutar_deteccion_anomalias
 class Command(BaseCommand):
     help = 'Ejecuta la deteccion de anomalias con Isolation Forest sobre los eventos de acceso.'
 
-    def handle(self, *args, **kwargs):
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--evaluate',
+            action='store_true',
+            help='Ejecuta la etapa de evaluacion (metricas O(n)) y la guarda en el historial de ejecuciones.'
+        )
+
+    def handle(self, *args, **options):
         self.stdout.write("Iniciando deteccion de anomalias...")
-        contador = ejecutar_deteccion_anomalias()
+        contador = ejecutar_deteccion_anomalias(evaluar=options['evaluate'])
         self.stdout.write(self.style.SUCCESS(f"Finalizado. Se detectaron y marcaron {contador} eventos como anomalias."))
\ No newline at end of file
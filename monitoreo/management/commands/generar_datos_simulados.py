@@ -1,42 +1,74 @@
-import random
-from datetime import datetime, timedelta
+import time
+
+from django.core.management import call_command
 from django.core.management.base import BaseCommand
-from monitoreo.models import EventoDeAcceso
+from django.db import connection, transaction
+
+from monitoreo.models import EventoDeAcceso, GLPITicket, PerfilUsuario
+from monitoreo.resumenes import recalcular_resumenes
+from monitoreo.sinteticos import TAMANO_LOTE, GeneradorSintetico, cargar_sinteticos
+from system_core import cache as cache_sistema
+
 
 class Command(BaseCommand):
-    help = 'Genera datos de eventos de acceso simulados para probar el modelo Isolation Forest'
-
-    def handle(self, *args, **kwargs):
-        self.stdout.write("Eliminando datos antiguos...")
-        EventoDeAcceso.objects.all().delete()
-
-        self.stdout.write("Generando datos simulados...")
-        emails_usuarios = [f"usuario{i}@thefactoryhka.com" for i in range(10)]
-        ips_normales = [f"192.168.1.{random.randint(10,50)}" for _ in range(5)]
-        archivos = [(f"file_id_{i}", f"diseno_{i}.svg") for i in range(20)]
-
-        # --- Generar Datos Normales (800 eventos) ---
-        for _ in range(800):
-            hora_evento = datetime.now() - timedelta(days=random.randint(0,6), hours=random.randint(8, 17))
-            EventoDeAcceso.objects.create(
-                email_usuario=random.choice(emails_usuarios),
-                direccion_ip=random.choice(ips_normales),
-                timestamp=hora_evento,
-                archivo_id=random.choice(archivos)[0],
-                nombre_archivo=random.choice(archivos)[1],
-                tipo_evento=random.choice(['view', 'edit']),
-            )
-        
-        # --- Generar Datos Anómalos (40 eventos) ---
-        for _ in range(40):
-            hora_evento = datetime.now() - timedelta(minutes=random.randint(1, 500), hours=random.choice([1, 2, 22, 23]))
-            EventoDeAcceso.objects.create(
-                email_usuario=random.choice(emails_usuarios),
-                direccion_ip = f"118.99.8.{random.randint(1,254)}", #Rango  de IP inusual
-                timestamp=hora_evento, #Horas inusuales
-                archivo_id="id_confidencial_123", #Archivo Sensible
-                nombre_archivo="financieros_2025.xlsx", 
-                tipo_evento='download', # Tipo de evento de alto riesgo
-            )
-        
-        self.stdout.write(self.style.SUCCESS("¡Se han generado los datos simulados exitosamente!"))
+    help = ('Genera eventos de acceso sintéticos (reproducibles con --semilla) para probar el modelo '
+            'y medir rendimiento: de miles a decenas de millones de eventos, insertados por lotes.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--eventos', type=int, default=100_000, help='Eventos a generar')
+        parser.add_argument('--usuarios', type=int, default=500)
+        parser.add_argument('--archivos', type=int, default=20_000)
+        parser.add_argument('--ips', type=int, default=2_000, help='IPs internas (las anomalías usan IPs externas)')
+        parser.add_argument('--dias', type=int, default=180, help='Días hacia atrás que cubren los eventos')
+        parser.add_argument('--anomalias', type=float, default=0.01, help='Fracción de anomalías inyectadas')
+        parser.add_argument('--semilla', type=int, default=42)
+        parser.add_argument('--lote', type=int, default=TAMANO_LOTE, help='Eventos por transacción')
+        parser.add_argument('--conservar', action='store_true',
+                            help='Agrega a los eventos existentes en lugar de reemplazarlos')
+        parser.add_argument('--perfiles', action='store_true',
+                            help='Reconstruye los perfiles de usuario al terminar (lento con millones de eventos)')
+
+    def handle(self, *args, **options):
+        if not options['conservar']:
+            self.stdout.write("Eliminando datos antiguos...")
+            self._vaciar()
+
+        generador = GeneradorSintetico(
+            usuarios=options['usuarios'], archivos=options['archivos'], ips=options['ips'], dias=options['dias'],
+            fraccion_anomalias=options['anomalias'], semilla=options['semilla'],
+        )
+        total = options['eventos']
+        self.stdout.write(f"Generando {total:,} eventos sintéticos (semilla {options['semilla']})...")
+
+        inicio = time.perf_counter()
+
+        def progreso(insertados, generados):
+            segundos = time.perf_counter() - inicio
+            self.stdout.write(f"   -> {generados:,}/{total:,} generados, {insertados:,} insertados "
+                              f"({generados / segundos:,.0f} eventos/s)", ending='\r')
+
+        insertados = cargar_sinteticos(generador, total, options['lote'], progreso)
+        segundos_carga = time.perf_counter() - inicio
+
+        # Series de tiempo del dashboard acordes a los datos nuevos
+        self.stdout.write("\nRecalculando resúmenes por hora y por día...")
+        recalcular_resumenes()
+        if options['perfiles']:
+            call_command('reconstruir_perfiles', stdout=self.stdout)
+        cache_sistema.invalidar(cache_sistema.DASHBOARD)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"¡Se han generado los datos simulados exitosamente! {insertados:,} eventos en {segundos_carga:.1f}s "
+            f"({insertados / segundos_carga if segundos_carga else 0:,.0f} eventos/s)"
+        ))
+
+    def _vaciar(self):
+        """
+        Borra eventos, tickets y perfiles con DELETE directos: el borrado del
+        ORM carga cada fila en memoria para resolver las relaciones.
+        """
+        with transaction.atomic():
+            GLPITicket.objects.all().delete()
+            PerfilUsuario.objects.all().delete()
+            with connection.cursor() as cursor:
+                cursor.execute(f'DELETE FROM {connection.ops.quote_name(EventoDeAcceso._meta.db_table)}')
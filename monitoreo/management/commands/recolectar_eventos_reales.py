@@ -1,9 +1,10 @@
 ### MODIFICACIÓN DJANGO: Imports necesarios para Django ###
+import contextvars
+import logging
 import os
 import time
 import json
 import pickle
-import hashlib
 from pathlib import Path
 from datetime import datetime, timedelta, timezone
 from concurrent.futures import ThreadPoolExecutor, as_completed
@@ -11,11 +12,22 @@ from concurrent.futures import ThreadPoolExecutor, as_completed
 from django.core.management.base import BaseCommand
 from django.conf import settings
 from monitoreo.models import EventoDeAcceso # <- Nuestro modelo de BD
+from monitoreo.dimensiones import asignar_dimensiones
+from monitoreo.ejecuciones import ejecucion_pipeline, paso_pipeline, sumar
+from monitoreo.identidad import huellas_eventos, ids_eventos
+from monitoreo.ingesta import copiar_eventos, notificar_anomalias, usar_copy
+from monitoreo.perfiles import actualizar_perfiles
+from monitoreo.puntuacion import puntuar_eventos
+from monitoreo.resumenes import acumular_resumenes
+from system_core import cache as cache_sistema
+from system_core.metricas import etapa
 from google.oauth2 import service_account
 from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
 # import re # No lo usaremos por ahora
 
+logger = logging.getLogger(__name__)
+
 # --- CONFIGURACIÓN CRÍTICA (Leída desde settings.py) ---
 SERVICE_ACCOUNT_FILE = settings.GOOGLE_SERVICE_ACCOUNT_FILE
 EMAIL_ADMIN = settings.GOOGLE_ADMIN_EMAIL
@@ -40,29 +52,17 @@ CACHE_EXPIRY_HOURS = 24
 
 # --- FUNCIONES AUXILIARES ---
 
-def generar_id_unico(fecha_iso, email, archivo_id, accion):
-    """
-        Generar un ID unico (Hash MD5) identico al del script de carga historica.
-        Esto evita duplicados al mezclar datos offline y online.
-    """
-    # Si la fecha es un objeto datetime, convertir a ISO string
-    if isinstance(fecha_iso, datetime):
-        fecha_iso = fecha_iso.isoformat()
-
-    raw_string = f"{fecha_iso}_{email}_{archivo_id}_{accion}"
-    return hashlib.md5(raw_string.encode('utf-8')).hexdigest()
-
 def autenticar_cuenta_servicio():
-    print("Autenticando con la cuenta de Servicio...")
+    logger.info("Autenticando con la cuenta de Servicio...")
     try:
         creds = service_account.Credentials.from_service_account_file(
             SERVICE_ACCOUNT_FILE, scopes=SCOPES
         )
         delegated_creds = creds.with_subject(EMAIL_ADMIN)
-        print("Autenticacion exitosa.")
+        logger.info("Autenticacion exitosa.")
         return delegated_creds
     except Exception as e:
-        print(f"Error durante la autenticacion: {e}")
+        logger.error("Error durante la autenticacion: %s", e)
         return None
 
 def cargar_inventario_cache():
@@ -74,13 +74,14 @@ def cargar_inventario_cache():
         if cache_time:
             age_hours = (datetime.now() - cache_time).total_seconds() / 3600
             if age_hours < CACHE_EXPIRY_HOURS:
-                print(f"✓ Usando inventario en cache (creado hace {age_hours:.1f} horas)")
+                logger.info("✓ Usando inventario en cache (creado hace %.1f horas)", age_hours,
+                            extra={'edad_horas': round(age_hours, 1)})
                 return cache_data['file_ids'], cache_data['folder_count']
             else:
-                print(f"⚠️  Cache expirado (edad: {age_hours:.1f} horas)")
+                logger.info("⚠️  Cache expirado (edad: %.1f horas)", age_hours)
         return None
     except Exception as e:
-        print(f"Error leyendo cache: {e}")
+        logger.warning("Error leyendo cache: %s", e)
         return None
 
 def guardar_inventario_cache(file_ids, folder_count):
@@ -93,12 +94,24 @@ def guardar_inventario_cache(file_ids, folder_count):
         }
         with open(INVENTORY_CACHE_FILE, 'wb') as f:
             pickle.dump(cache_data, f)
-        print("✓ Inventario guardado en cache")
+        logger.info("✓ Inventario guardado en cache")
     except Exception as e:
-        print(f"⚠️  No se pudo guardar cache: {e}")
+        logger.warning("⚠️  No se pudo guardar cache: %s", e)
 
+def ejecutar_contando(solicitud):
+    """execute() de una solicitud de la API de Google sumando la página y sus bytes al pipeline"""
+    postproc = solicitud.postproc
+
+    def contar(respuesta, contenido):
+        sumar(paginas=1, bytes_descargados=len(contenido))
+        return postproc(respuesta, contenido)
+
+    solicitud.postproc = contar
+    return solicitud.execute()
+
+@paso_pipeline('inventario')
 def lista_ids_archivos_optimizado(service, folder_id):
-    print("Construyendo inventario optimizado...")
+    logger.info("Construyendo inventario optimizado...")
     all_folder_ids = {folder_id}
     folders_to_process = [folder_id]
     folder_count = 0
@@ -111,14 +124,14 @@ def lista_ids_archivos_optimizado(service, folder_id):
             page_token = None
             while True:
                 try:
-                    response = service.files().list(
+                    response = ejecutar_contando(service.files().list(
                         q=f"'{current_folder}' in parents and mimeType='application/vnd.google-apps.folder' and trashed=false",
                         includeItemsFromAllDrives=True,
                         supportsAllDrives=True,
                         pageToken=page_token,
                         fields='nextPageToken, files(id)',
                         pageSize=1000
-                    ).execute()
+                    ))
                     
                     for item in response.get("files", []):
                         folder_id_item = item.get('id')
@@ -131,9 +144,10 @@ def lista_ids_archivos_optimizado(service, folder_id):
                     if not page_token:
                         break
                 except HttpError:
+                    sumar(errores=1)
                     break
     
-    print(f"  -> Encontradas {folder_count} carpetas")
+    logger.info("  -> Encontradas %d carpetas", folder_count, extra={'carpetas': folder_count})
     
     file_ids = set()
     folder_list = list(all_folder_ids)
@@ -147,14 +161,14 @@ def lista_ids_archivos_optimizado(service, folder_id):
         page_token = None
         while True:
             try:
-                response = service.files().list(
+                response = ejecutar_contando(service.files().list(
                     q=query,
                     includeItemsFromAllDrives=True,
                     supportsAllDrives=True,
                     pageToken=page_token,
                     fields='nextPageToken, files(id)',
                     pageSize=1000
-                ).execute()
+                ))
                 
                 for item in response.get("files", []):
                     file_ids.add(item.get('id'))
@@ -163,46 +177,51 @@ def lista_ids_archivos_optimizado(service, folder_id):
                 if not page_token:
                     break
             except HttpError:
+                sumar(errores=1)
                 break
             
         if (i + 20) % 100 == 0 and i > 0:
-            print(f"  -> Procesadas {min(i + 20, len(folder_list))} de {len(folder_list)} carpetas...")
+            logger.info("  -> Procesadas %d de %d carpetas...", min(i + 20, len(folder_list)), len(folder_list))
     
     return file_ids, folder_count
 
 def obtener_pagina_auditoria(admin_service, start_time_iso, page_token=None):
     for intento in range(MAX_RETRIES):
         try:
-            results = admin_service.activities().list(
+            results = ejecutar_contando(admin_service.activities().list(
                 userKey='all',
                 applicationName='drive',
                 startTime=start_time_iso,
                 maxResults=BATCH_SIZE,
                 pageToken=page_token
-            ).execute()
+            ))
             return results.get('items', []), results.get('nextPageToken')
         except Exception as e:
             if intento < MAX_RETRIES - 1:
                 time.sleep(2 ** intento)
                 continue
+            logger.warning("Página de auditoría descartada tras %d intentos: %s", MAX_RETRIES, e)
+            sumar(errores=1)
             return [], None
     return [], None
 
+@paso_pipeline('auditoria')
 def consultar_auditoria_optimizado(credentials, start_time_iso, target_file_ids):
     admin_service = build('admin', 'reports_v1', credentials=credentials)
     
-    print("  Obteniendo primera página...")
+    logger.info("  Obteniendo primera página...")
     first_page, first_token = obtener_pagina_auditoria(admin_service, start_time_iso)
     
     eventos_relevantes = filtrar_pagina(first_page, target_file_ids)
     total_eventos = len(first_page)
     
     if not first_token:
-        print(f"  ✓ Solo hay una página. Total: {total_eventos} eventos")
+        logger.info("  ✓ Solo hay una página. Total: %d eventos", total_eventos)
+        sumar(eventos_vistos=total_eventos, eventos_conservados=len(eventos_relevantes))
         return eventos_relevantes, total_eventos
     
-    print(f"  Primera página: {len(first_page)} eventos, {len(eventos_relevantes)} relevantes")
-    print("  Descargando páginas restantes (paralelismo conservador)...")
+    logger.info("  Primera página: %d eventos, %d relevantes", len(first_page), len(eventos_relevantes))
+    logger.info("  Descargando páginas restantes (paralelismo conservador)...")
     
     target_ids_set = set(target_file_ids)
     pending_tokens = [first_token]
@@ -218,7 +237,9 @@ def consultar_auditoria_optimizado(credentials, start_time_iso, target_file_ids)
                 if token not in processed_tokens:
                     processed_tokens.add(token)
                     service = build('admin', 'reports_v1', credentials=credentials)
-                    future = executor.submit(procesar_pagina_completa, service, start_time_iso, token, target_ids_set)
+                    # Con el contexto copiado las páginas se suman a esta etapa del pipeline
+                    future = executor.submit(contextvars.copy_context().run, procesar_pagina_completa,
+                                             service, start_time_iso, token, target_ids_set)
                     futures[future] = token
             
             if futures:
@@ -241,7 +262,10 @@ def consultar_auditoria_optimizado(credentials, start_time_iso, target_file_ids)
                                     pending_tokens.append(next_token)
                                 
                                 if completed % 100 == 0:
-                                    print(f"  -> Páginas: {completed} | Total eventos: {total_eventos:,} | Relevantes: {len(eventos_relevantes):,}")
+                                    logger.info("  -> Páginas: %d | Total eventos: %s | Relevantes: %s",
+                                                completed, f"{total_eventos:,}", f"{len(eventos_relevantes):,}",
+                                                extra={'paginas': completed, 'eventos_vistos': total_eventos,
+                                                       'eventos_conservados': len(eventos_relevantes)})
                             
                             del futures[future]
                         except Exception as e:
@@ -255,7 +279,8 @@ def consultar_auditoria_optimizado(credentials, start_time_iso, target_file_ids)
                 except Exception:
                     time.sleep(1)
     
-    print(f"  ✓ Descarga completada: {completed} páginas")
+    logger.info("  ✓ Descarga completada: %d páginas", completed)
+    sumar(eventos_vistos=total_eventos, eventos_conservados=len(eventos_relevantes))
     return eventos_relevantes, total_eventos
 
 def procesar_pagina_completa(admin_service, start_time_iso, page_token, target_ids_set):
@@ -304,69 +329,153 @@ def filtrar_pagina(activities, target_ids_set):
     
     return eventos_relevantes
 
-# --- GUARDADO EN BD ESTANDARIZADO (HASH MD5) ---
+# --- GUARDADO EN BD ESTANDARIZADO (monitoreo.identidad) ---
 
+@paso_pipeline('ingesta_lote')
 def guardar_eventos_en_db(eventos_relevantes):
     """
         Carga eventos usando el mismo generador de IDs que el proceso Offline.
+        SPRINT 7: Los eventos nuevos se clasifican con el modelo ANTES de
+        insertarse, así la fila se escribe una sola vez con su anomalía.
+        Retorna la cantidad de eventos nuevos.
     """
-    print(f"\n--- Paso 3: Cargando {len(eventos_relevantes)} eventos en BD ---")
+    logger.info("--- Paso 3: Cargando %d eventos en BD ---", len(eventos_relevantes))
     
     eventos_creados = 0
     eventos_actualizados = 0
-    
-    for evento in eventos_relevantes:
-        try:
-            # Usamos MD5 para ser consistentes con el histórico
-            google_id = generar_id_unico(
-                evento['timestamp'],
-                evento['usuario'],
-                evento['archivo_id'],
-                evento['accion']
-            )
-
-            obj, created = EventoDeAcceso.objects.update_or_create(
-                id_evento_google = google_id, # Usamos el ID único
-                defaults={
-                    'timestamp': evento['timestamp'],
-                    'email_usuario': evento['usuario'],
-                    'archivo_id': evento['archivo_id'],
-                    'nombre_archivo': evento['archivo_titulo'],
-                    'tipo_evento': evento['accion'],
-                    'direccion_ip': evento['ip'],
-                    'detalles': evento.get('detalles_json', {}),
-                }
-            )
+    nuevos = []  # Solo los eventos nuevos alimentan los perfiles de usuario
+
+    # 1. Calcular IDs de todo el lote y detectar cuáles ya existen (una consulta por bloque)
+    # Mismo módulo de identidad que el histórico: IDs idénticos online y offline
+    ids = ids_eventos(
+        [e['timestamp'] for e in eventos_relevantes],
+        [e['usuario'] for e in eventos_relevantes],
+        [e['archivo_id'] for e in eventos_relevantes],
+        [e['accion'] for e in eventos_relevantes],
+    )
+    # La búsqueda va por la huella de 64 bits (índice único de enteros)
+    huellas = huellas_eventos(ids)
+    existentes = set()
+    for i in range(0, len(huellas), BATCH_SIZE):
+        existentes.update(EventoDeAcceso.objects.filter(
+            huella__in=huellas[i:i + BATCH_SIZE]
+        ).values_list('huella', flat=True))
+
+    # 2. Scoring del lote de eventos nuevos con el modelo cacheado
+    clasificados = {
+        google_id: EventoDeAcceso(
+            timestamp=evento['timestamp'],
+            email_usuario=evento['usuario'],
+            archivo_id=evento['archivo_id'],
+            tipo_evento=evento['accion'],
+            direccion_ip=evento['ip'],
+        )
+        for google_id, huella, evento in zip(ids, huellas, eventos_relevantes)
+        if huella not in existentes
+    }
+    anomalias = puntuar_eventos(list(clasificados.values()))
+
+    # 3a. PostgreSQL: COPY a staging + INSERT ... ON CONFLICT DO UPDATE (un solo viaje por lote)
+    if usar_copy():
+        eventos_db = []
+        for google_id, huella, evento in zip(ids, huellas, eventos_relevantes):
+            instancia = clasificados.get(google_id) or EventoDeAcceso()
+            instancia.id_evento_google = google_id
+            instancia.huella = huella
+            instancia.timestamp = evento['timestamp']
+            instancia.email_usuario = evento['usuario']
+            instancia.archivo_id = evento['archivo_id']
+            instancia.nombre_archivo = evento['archivo_titulo']
+            instancia.tipo_evento = evento['accion']
+            instancia.direccion_ip = evento['ip']
+            instancia.detalles = evento.get('detalles_json', {})
+            eventos_db.append(instancia)
+
+        nuevos, eventos_actualizados = copiar_eventos(eventos_db, actualizar=True)
+        eventos_creados = len(nuevos)
+        notificar_anomalias(nuevos)
+
+    else:
+        # 3b. Resto de motores: upsert por evento (dispara signals), las marcas de anomalía solo se escriben al crear
+        # Códigos de actor / archivo / IP resueltos por lote, no evento por evento
+        dimensiones = asignar_dimensiones([
+            EventoDeAcceso(email_usuario=e['usuario'], archivo_id=e['archivo_id'],
+                           nombre_archivo=e['archivo_titulo'], direccion_ip=e['ip'])
+            for e in eventos_relevantes
+        ])
+        for google_id, huella, evento, dims in zip(ids, huellas, eventos_relevantes, dimensiones):
+            defaults = {
+                'timestamp': evento['timestamp'],
+                'email_usuario': evento['usuario'],
+                'archivo_id': evento['archivo_id'],
+                'nombre_archivo': evento['archivo_titulo'],
+                'tipo_evento': evento['accion'],
+                'direccion_ip': evento['ip'],
+                'detalles': evento.get('detalles_json', {}),
+                'dim_actor_id': dims.dim_actor_id,
+                'dim_archivo_id': dims.dim_archivo_id,
+                'dim_ip_id': dims.dim_ip_id,
+            }
+            instancia = clasificados.get(google_id)
+            create_defaults = dict(defaults, id_evento_google=google_id)
+            if instancia is not None:
+                create_defaults.update({
+                    'es_anomalia': instancia.es_anomalia,
+                    'anomaly_score': instancia.anomaly_score,
+                    'severidad': instancia.severidad,
+                    'motivo_anomalia': instancia.motivo_anomalia,
+                })
+
+            try:
+                obj, created = EventoDeAcceso.objects.update_or_create(
+                    huella=huella, # Clave compacta del ID único
+                    defaults=defaults,
+                    create_defaults=create_defaults,
+                )
             
-            if created:
-                eventos_creados += 1
-            else:
-                eventos_actualizados += 1
+                if created:
+                    eventos_creados += 1
+                    nuevos.append(obj)
+                else:
+                    eventos_actualizados += 1
         
-        except Exception as e:
-            if "direccion_ip" in str(e):
-                 # Reintento con IP neutra si falla la validacion
-                 try:
-                    EventoDeAcceso.objects.update_or_create(
-                        id_evento_google=google_id,
-                        defaults={
-                            'timestamp': evento['timestamp'],
-                            'email_usuario': evento['usuario'],
-                            'archivo_id': evento['archivo_id'],
-                            'nombre_archivo': evento['archivo_titulo'],
-                            'tipo_evento': evento['accion'],
-                            'direccion_ip': '0.0.0.0', 
-                            'detalles': evento.get('detalles_json', {}),
-                        }
-                    )
-                 except:
-                     pass
-
-    print(f"✓ Carga a BD completada.")
-    print(f"  -> Nuevos: {eventos_creados} | Actualizados: {eventos_actualizados}")
+            except Exception as e:
+                if "direccion_ip" in str(e):
+                     # Reintento con IP neutra si falla la validacion
+                     try:
+                        defaults['direccion_ip'] = create_defaults['direccion_ip'] = '0.0.0.0'
+                        defaults['dim_ip_id'] = create_defaults['dim_ip_id'] = None  # save() lo resuelve
+                        obj, created = EventoDeAcceso.objects.update_or_create(
+                            huella=huella,
+                            defaults=defaults,
+                            create_defaults=create_defaults,
+                        )
+                        if created:
+                            eventos_creados += 1
+                            nuevos.append(obj)
+                     except:
+                         sumar(errores=1)
+                else:
+                    logger.warning("Evento descartado (%s): %s", google_id, e)
+                    sumar(errores=1)
+
+    # Perfiles de comportamiento por usuario y resúmenes por hora / día (actualización incremental)
+    actualizar_perfiles(nuevos)
+    acumular_resumenes(nuevos)
+
+    # KPIs del dashboard obsoletos
+    cache_sistema.invalidar(cache_sistema.DASHBOARD)
+
+    sumar(eventos_insertados=eventos_creados, eventos_actualizados=eventos_actualizados)
+    logger.info("✓ Carga a BD completada. Nuevos: %d | Actualizados: %d | Anomalías al ingresar: %d",
+                eventos_creados, eventos_actualizados, anomalias,
+                extra={'eventos_insertados': eventos_creados, 'eventos_actualizados': eventos_actualizados,
+                       'anomalias': anomalias})
+    return eventos_creados
 
 # --- BACKUP COMPLETO ---
 
+@paso_pipeline('respaldo')
 def guardar_reporte_json_desde_bd():
     """
         Exporta TODOS los eventos (Históricos + Nuevos) a un solo JSON consolidado.
@@ -378,7 +487,7 @@ def guardar_reporte_json_desde_bd():
 
         cache_dir.mkdir(parents=True, exist_ok= True)
 
-        print(f"\n📁 Generando Backup Consolidado en: {report_path}")
+        logger.info("📁 Generando Backup Consolidado en: %s", report_path)
 
         # Obtenemos TODO para no perder historia
         eventos_db = EventoDeAcceso.objects.all().order_by('-timestamp').values()
@@ -410,11 +519,11 @@ def guardar_reporte_json_desde_bd():
         with open(report_path, 'w', encoding='utf-8') as f:
             json.dump(reporte, f, indent= 2, ensure_ascii=False)
 
-        print(f"✓ Backup actualizado: {len(eventos_list)} eventos totales.")
+        logger.info("✓ Backup actualizado: %d eventos totales.", len(eventos_list))
         return True
 
     except Exception as e:
-        print(f"Error guardando reporte JSON {e}")
+        logger.error("Error guardando reporte JSON %s", e)
         return False
 
 def refrescar_token_google():
@@ -431,7 +540,7 @@ def refrescar_token_google():
 
         if age_hours >= CACHE_EXPIRY_HOURS:
             cache_file.unlink()
-            print(f"Token caducado eliminado (edad: {age_hours:.1f} hours)")
+            logger.info("Token caducado eliminado (edad: %.1f hours)", age_hours)
 
         return True
     except:
@@ -446,6 +555,7 @@ class GoogleDriveCollector:
     def __init__(self):
         self.credentials = None
         
+    @etapa('recoleccion_google')
     def obtener_eventos(self):
         # Reutilizamos la lógica del comando, pero retornando la lista
         # Nota: Por simplicidad, instanciamos el comando para ejecutar su logica central
@@ -473,14 +583,19 @@ class Command(BaseCommand):
 
     def handle(self, *args, **kwargs):
         self.stdout.write(self.style.SUCCESS("INICIANDO RECOLECCIÓN REAL (ONLINE)"))
-        
+        self.recolectar()
+        self.stdout.write(self.style.SUCCESS("\n✓ PROCESO ONLINE FINALIZADO"))
+
+    @ejecucion_pipeline('recoleccion')
+    def recolectar(self):
         # 1. Autenticación
-        print("\n📌 Verificando token de autenticación...")
+        logger.info("📌 Verificando token de autenticación...")
         refrescar_token_google()
         credentials = autenticar_cuenta_servicio()
         
         if not credentials:
             self.stderr.write("Error de credenciales. Abortando.")
+            sumar(errores=1)
             return
 
         # 2. Inventario
@@ -495,7 +610,7 @@ class Command(BaseCommand):
             t_ids, count = lista_ids_archivos_optimizado(svc, TARGET_FOLDER_ID)
             guardar_inventario_cache(t_ids, count)
         
-        print(f"  -> Archivos a monitorear: {len(t_ids)}")
+        logger.info("  -> Archivos a monitorear: %d", len(t_ids), extra={'archivos': len(t_ids)})
 
         # 3. Auditoría
         self.stdout.write('\n--- Paso 2: Auditoría ---')
@@ -509,10 +624,8 @@ class Command(BaseCommand):
         if eventos:
             guardar_eventos_en_db(eventos)
         else:
-            print("  No hay eventos relevantes nuevos para guardar.")
+            logger.info("  No hay eventos relevantes nuevos para guardar.")
 
         # 5. Backup Automático
-        print("\n📁 Actualizando Backup Consolidado (Full Snapshot)...")
+        logger.info("📁 Actualizando Backup Consolidado (Full Snapshot)...")
         guardar_reporte_json_desde_bd()
-
-        self.stdout.write(self.style.SUCCESS("\n✓ PROCESO ONLINE FINALIZADO"))
\ No newline at end of file
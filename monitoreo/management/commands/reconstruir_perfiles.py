@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+from monitoreo.models import EventoDeAcceso, PerfilUsuario
+from monitoreo.perfiles import actualizar_perfiles
+
+class Command(BaseCommand):
+    help = 'Reconstruye desde cero los perfiles de comportamiento por usuario (solo para la carga inicial).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=5000, help='Eventos procesados por lote')
+
+    def handle(self, *args, **options):
+        tamano_lote = options['lote']
+
+        self.stdout.write("Eliminando perfiles existentes...")
+        PerfilUsuario.objects.all().delete()
+
+        # Recorremos la tabla con un iterador para no cargar todo en memoria
+        eventos_qs = EventoDeAcceso.objects.only(
+            'email_usuario', 'direccion_ip', 'archivo_id', 'tipo_evento', 'timestamp'
+        ).order_by('id')
+
+        lote, total = [], 0
+        for evento in eventos_qs.iterator(chunk_size=tamano_lote):
+            lote.append(evento)
+            if len(lote) >= tamano_lote:
+                actualizar_perfiles(lote)
+                total += len(lote)
+                lote = []
+                self.stdout.write(f"   -> Progreso: {total} eventos procesados...", ending='\r')
+
+        if lote:
+            actualizar_perfiles(lote)
+            total += len(lote)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"\nPerfiles reconstruidos: {PerfilUsuario.objects.count()} usuarios, {total} eventos."
+        ))
\ No newline at end of file
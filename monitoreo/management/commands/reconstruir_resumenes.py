@@ -0,0 +1,26 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from monitoreo.models import ResumenDia, ResumenHora
+from monitoreo.resumenes import recalcular_resumenes
+from system_core import cache as cache_sistema
+
+class Command(BaseCommand):
+    help = 'Reconstruye los resúmenes por hora y por día desde los eventos (carga inicial o reparación).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dias', type=int, help='Solo los últimos N días (por defecto, todo el histórico)')
+
+    def handle(self, *args, **options):
+        desde = timezone.now() - timedelta(days=options['dias']) if options['dias'] else None
+
+        self.stdout.write("Recalculando resúmenes...")
+        recalcular_resumenes(desde=desde)
+        cache_sistema.invalidar(cache_sistema.DASHBOARD)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Resúmenes reconstruidos: {ResumenHora.objects.count()} filas por hora, "
+            f"{ResumenDia.objects.count()} filas por día."
+        ))
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+from monitoreo.reentrenamiento import reentrenar_modelo
+
+class Command(BaseCommand):
+    help = 'Reentrenamiento programado: muestra de tamaño fijo, reemplazo de árboles antiguos y promoción solo si hay deriva.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dias', type=int, default=180, help='Ventana de datos considerada')
+        parser.add_argument('--dias-recientes', type=int, default=7, help='Datos usados para los árboles nuevos')
+        parser.add_argument('--muestra', type=int, default=50000, help='Tamaño máximo de la muestra de reservorio')
+        parser.add_argument('--arboles-nuevos', type=int, default=20, help='Árboles antiguos reemplazados por ejecución')
+        parser.add_argument('--umbral-psi', type=float, default=0.1, help='PSI mínimo para promover el nuevo modelo')
+        parser.add_argument('--forzar', action='store_true', help='Promover el nuevo modelo aunque no haya deriva')
+
+    def handle(self, *args, **options):
+        self.stdout.write("Iniciando reentrenamiento programado...")
+        ejecucion = reentrenar_modelo(
+            dias_ventana=options['dias'],
+            dias_recientes=options['dias_recientes'],
+            tamano_muestra=options['muestra'],
+            arboles_nuevos=options['arboles_nuevos'],
+            umbral_psi=options['umbral_psi'],
+            forzar=options['forzar'],
+        )
+
+        if ejecucion is None:
+            self.stdout.write(self.style.WARNING("No se reentrenó el modelo (datos insuficientes)."))
+        elif ejecucion.promovido:
+            self.stdout.write(self.style.SUCCESS(f"Nueva versión promovida (ejecución #{ejecucion.id})."))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"Modelo vigente conservado (ejecución #{ejecucion.id}, PSI={ejecucion.psi_scores:.4f})."))
\ No newline at end of file
@@ -0,0 +1,41 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from monitoreo.puntuacion import obtener_bundle
+from monitoreo.worker import procesar_pendientes, recuperar_interrumpidas
+
+
+class Command(BaseCommand):
+    help = 'Worker de ML: procesa la cola de sincronización / detección con el modelo precargado.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--intervalo', type=float, default=2.0, help='Segundos entre consultas a la cola vacía')
+        parser.add_argument('--una-vez', action='store_true', help='Procesar lo pendiente y terminar')
+
+    def handle(self, *args, **options):
+        # Precarga: pandas / scikit-learn y el bundle quedan en memoria para todas las solicitudes
+        import monitoreo.analisis  # noqa: F401
+        bundle = obtener_bundle()
+        self.stdout.write(f"🤖 Worker ML iniciado (modelo {'cargado' if bundle else 'no entrenado aún'}).")
+
+        recuperadas = recuperar_interrumpidas()
+        if recuperadas:
+            self.stdout.write(self.style.WARNING(f"{recuperadas} solicitudes interrumpidas vueltas a la cola."))
+
+        try:
+            while True:
+                # Proceso de larga duración: descarta conexiones caídas o vencidas
+                close_old_connections()
+                procesadas = procesar_pendientes()
+                if procesadas:
+                    # La detección pudo generar un bundle nuevo: se recarga antes de la próxima solicitud
+                    obtener_bundle()
+                    self.stdout.write(f"✓ {procesadas} solicitudes procesadas.")
+
+                if options['una_vez']:
+                    break
+                time.sleep(options['intervalo'])
+        except KeyboardInterrupt:
+            self.stdout.write("Worker detenido.")
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.18 on 2026-10-19 09:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('monitoreo', '0006_eventodeacceso_motivo_anomalia'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EjecucionModelo',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateTimeField(auto_now_add=True, db_index=True)),
+                ('total_eventos', models.IntegerField(default=0)),
+                ('total_anomalias', models.IntegerField(default=0)),
+                ('contaminacion_esperada', models.FloatField(default=0.0)),
+                ('contaminacion_observada', models.FloatField(default=0.0)),
+                ('deriva_contaminacion', models.FloatField(default=0.0, help_text='Contaminación observada - esperada')),
+                ('score_media', models.FloatField(default=0.0)),
+                ('score_desviacion', models.FloatField(default=0.0)),
+                ('score_min', models.FloatField(default=0.0)),
+                ('score_p50', models.FloatField(default=0.0)),
+                ('score_p95', models.FloatField(default=0.0)),
+                ('score_p99', models.FloatField(default=0.0)),
+                ('score_max', models.FloatField(default=0.0)),
+                ('estabilidad_etiquetas', models.FloatField(blank=True, help_text='Fracción de eventos con la misma etiqueta que el modelo anterior', null=True)),
+                ('correlacion_scores', models.FloatField(blank=True, help_text='Correlación de Pearson entre scores del modelo nuevo y el anterior', null=True)),
+                ('duracion_segundos', models.FloatField(default=0.0)),
+            ],
+            options={
+                'verbose_name': 'Ejecución del Modelo',
+                'verbose_name_plural': 'Ejecuciones del Modelo',
+                'ordering': ['-fecha'],
+            },
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-19 09:57
+
+import monitoreo.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('monitoreo', '0007_ejecucionmodelo'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PerfilUsuario',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('email_usuario', models.EmailField(max_length=254, unique=True, verbose_name='Usuario Actor')),
+                ('histograma_horas', models.JSONField(default=monitoreo.models.histograma_horas_vacio)),
+                ('ips_habituales', models.JSONField(blank=True, default=dict)),
+                ('archivos_habituales', models.JSONField(blank=True, default=dict)),
+                ('total_eventos', models.IntegerField(default=0)),
+                ('total_descargas', models.IntegerField(default=0)),
+                ('primer_dia', models.DateField(blank=True, null=True)),
+                ('ultimo_dia', models.DateField(blank=True, null=True)),
+                ('fecha_actualizacion', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Perfil de Usuario',
+                'verbose_name_plural': 'Perfiles de Usuario',
+                'ordering': ['email_usuario'],
+            },
+        ),
+    ]
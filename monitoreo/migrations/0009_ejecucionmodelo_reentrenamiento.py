@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-19 10:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('monitoreo', '0008_perfilusuario'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ejecucionmodelo',
+            name='promovido',
+            field=models.BooleanField(default=False, help_text='Si el modelo de esta ejecución reemplazó al modelo vigente'),
+        ),
+        migrations.AddField(
+            model_name='ejecucionmodelo',
+            name='psi_scores',
+            field=models.FloatField(blank=True, help_text='Population Stability Index de los scores contra la referencia del modelo vigente', null=True),
+        ),
+        migrations.AddField(
+            model_name='ejecucionmodelo',
+            name='tipo',
+            field=models.CharField(choices=[('deteccion', 'Detección completa'), ('reentrenamiento', 'Reentrenamiento programado')], default='deteccion', max_length=20),
+        ),
+    ]
@@ -0,0 +1,39 @@
+from django.db import migrations
+
+# Índices específicos de PostgreSQL (en SQLite la migración no hace nada)
+INDICES = [
+    # BRIN sobre timestamp: la tabla crece en orden cronológico, el índice ocupa
+    # unos pocos KB y sirve a los filtros por ventana (180 días, rangos del dashboard)
+    ('idx_evento_timestamp_brin',
+     'CREATE INDEX IF NOT EXISTS idx_evento_timestamp_brin '
+     'ON monitoreo_eventodeacceso USING brin ("timestamp")'),
+    # Parcial: el dashboard y las alertas solo leen anomalías, una fracción mínima de la tabla
+    ('idx_evento_anomalias_recientes',
+     'CREATE INDEX IF NOT EXISTS idx_evento_anomalias_recientes '
+     'ON monitoreo_eventodeacceso (severidad, "timestamp" DESC) WHERE es_anomalia'),
+]
+
+
+def crear_indices(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for _, sql in INDICES:
+        schema_editor.execute(sql)
+
+
+def eliminar_indices(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for nombre, _ in INDICES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {nombre}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('monitoreo', '0010_solicitudprocesamiento'),
+    ]
+
+    operations = [
+        migrations.RunPython(crear_indices, eliminar_indices),
+    ]
@@ -0,0 +1,52 @@
+from django.db import migrations, models
+
+from monitoreo.identidad import huella_evento
+
+TAMANO_LOTE = 5000
+
+
+def calcular_huellas(apps, schema_editor):
+    """Completa la huella de los eventos existentes por lotes (memoria acotada)"""
+    EventoDeAcceso = apps.get_model('monitoreo', 'EventoDeAcceso')
+    pendientes = EventoDeAcceso.objects.filter(huella__isnull=True).only('id', 'id_evento_google')
+
+    lote = []
+    for evento in pendientes.iterator(chunk_size=TAMANO_LOTE):
+        evento.huella = huella_evento(evento.id_evento_google)
+        lote.append(evento)
+        if len(lote) >= TAMANO_LOTE:
+            EventoDeAcceso.objects.bulk_update(lote, ['huella'])
+            lote = []
+    if lote:
+        EventoDeAcceso.objects.bulk_update(lote, ['huella'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('monitoreo', '0011_indices_postgres'),
+    ]
+
+    operations = [
+        # 1. Columna sin restricción para poder poblarla
+        migrations.AddField(
+            model_name='eventodeacceso',
+            name='huella',
+            field=models.BigIntegerField(editable=False, null=True,
+                                         help_text='Hash de 64 bits del ID del evento (índice único compacto)'),
+        ),
+        # 2. Huella de los eventos ya cargados (mismo hash que la ingesta)
+        migrations.RunPython(calcular_huellas, migrations.RunPython.noop),
+        # 3. El índice único pasa del texto al entero de 8 bytes
+        migrations.AlterField(
+            model_name='eventodeacceso',
+            name='huella',
+            field=models.BigIntegerField(editable=False, null=True, unique=True,
+                                         help_text='Hash de 64 bits del ID del evento (índice único compacto)'),
+        ),
+        migrations.AlterField(
+            model_name='eventodeacceso',
+            name='id_evento_google',
+            field=models.CharField(help_text='ID unico del evento en Google Drive Activity API', max_length=255),
+        ),
+    ]
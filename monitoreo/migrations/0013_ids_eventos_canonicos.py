@@ -0,0 +1,66 @@
+import hashlib
+from datetime import timezone
+from zoneinfo import ZoneInfo
+
+from django.db import migrations
+
+from monitoreo.identidad import huella_evento, id_evento
+
+TAMANO_LOTE = 5000
+
+# Zona horaria con la que la carga histórica formateaba sus fechas
+ZONA_HISTORICO = ZoneInfo('America/Caracas')
+
+
+def _md5_legado(fecha_iso, email, archivo_id, accion):
+    """Los dos generar_id_unico anteriores: MD5 del isoformat() tal como llegaba"""
+    return hashlib.md5(f"{fecha_iso}_{email}_{archivo_id}_{accion}".encode('utf-8')).hexdigest()
+
+
+def canonizar_ids(apps, schema_editor):
+    """
+    Recalcula ID y huella de los eventos cargados con el MD5 anterior (online
+    en UTC u offline en hora de Caracas). Los IDs que no salieron de ese hash
+    (datos simulados, benchmarks) no se tocan. Si el ID canónico ya lo tomó
+    otro evento del mismo instante, la fila conserva su ID anterior: no se
+    borran eventos en una migración.
+    """
+    EventoDeAcceso = apps.get_model('monitoreo', 'EventoDeAcceso')
+    eventos = EventoDeAcceso.objects.only('id', 'id_evento_google', 'huella', 'timestamp',
+                                          'email_usuario', 'archivo_id', 'tipo_evento')
+
+    asignadas = set()
+    lote = []
+    for evento in eventos.iterator(chunk_size=TAMANO_LOTE):
+        campos = (evento.email_usuario, evento.archivo_id, evento.tipo_evento)
+        legados = {
+            _md5_legado(evento.timestamp.astimezone(zona).isoformat(), *campos)
+            for zona in (timezone.utc, ZONA_HISTORICO)
+        }
+        if evento.id_evento_google not in legados:
+            continue
+
+        nuevo_id = id_evento(evento.timestamp, *campos)
+        huella = huella_evento(nuevo_id)
+        if huella in asignadas:
+            continue
+        asignadas.add(huella)
+
+        evento.id_evento_google, evento.huella = nuevo_id, huella
+        lote.append(evento)
+        if len(lote) >= TAMANO_LOTE:
+            EventoDeAcceso.objects.bulk_update(lote, ['id_evento_google', 'huella'])
+            lote = []
+    if lote:
+        EventoDeAcceso.objects.bulk_update(lote, ['id_evento_google', 'huella'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('monitoreo', '0012_eventodeacceso_huella'),
+    ]
+
+    operations = [
+        migrations.RunPython(canonizar_ids, migrations.RunPython.noop),
+    ]
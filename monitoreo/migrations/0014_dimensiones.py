@@ -0,0 +1,111 @@
+# Generated by Django 5.2.18 on 2026-10-19 10:28
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Max, OuterRef, Subquery
+
+TAMANO_LOTE = 5000
+
+
+def poblar_dimensiones(apps, schema_editor):
+    """
+    Crea una fila por valor distinto de email / archivo / IP y enlaza los
+    eventos existentes con un UPDATE ... = (SELECT ...) por dimensión.
+    """
+    EventoDeAcceso = apps.get_model('monitoreo', 'EventoDeAcceso')
+    Actor = apps.get_model('monitoreo', 'Actor')
+    Archivo = apps.get_model('monitoreo', 'Archivo')
+    DireccionIP = apps.get_model('monitoreo', 'DireccionIP')
+    eventos = EventoDeAcceso.objects.order_by()
+
+    Actor.objects.bulk_create(
+        (Actor(email=email) for email in eventos.values_list('email_usuario', flat=True).distinct().iterator()),
+        batch_size=TAMANO_LOTE,
+    )
+    Archivo.objects.bulk_create(
+        (Archivo(id_drive=fila['archivo_id'], nombre=fila['nombre'])
+         for fila in eventos.exclude(archivo_id__isnull=True).exclude(archivo_id='')
+                            .values('archivo_id').annotate(nombre=Max('nombre_archivo')).iterator()),
+        batch_size=TAMANO_LOTE,
+    )
+    DireccionIP.objects.bulk_create(
+        # GenericIPAddressField guarda los vacíos como NULL
+        (DireccionIP(ip=ip) for ip in eventos.exclude(direccion_ip__isnull=True)
+                                              .values_list('direccion_ip', flat=True).distinct().iterator()),
+        batch_size=TAMANO_LOTE,
+    )
+
+    EventoDeAcceso.objects.update(dim_actor=Subquery(
+        Actor.objects.filter(email=OuterRef('email_usuario')).values('pk')[:1]))
+    EventoDeAcceso.objects.update(dim_archivo=Subquery(
+        Archivo.objects.filter(id_drive=OuterRef('archivo_id')).values('pk')[:1]))
+    EventoDeAcceso.objects.update(dim_ip=Subquery(
+        DireccionIP.objects.filter(ip=OuterRef('direccion_ip')).values('pk')[:1]))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('monitoreo', '0013_ids_eventos_canonicos'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Actor',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('email', models.EmailField(max_length=254, unique=True, verbose_name='Usuario Actor')),
+            ],
+            options={
+                'verbose_name': 'Actor',
+                'verbose_name_plural': 'Actores',
+            },
+        ),
+        migrations.CreateModel(
+            name='Archivo',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('id_drive', models.CharField(help_text='ID del archivo en Google Drive', max_length=255, unique=True)),
+                ('nombre', models.CharField(blank=True, help_text='Nombre con el que se vio el archivo por primera vez', max_length=255, null=True)),
+            ],
+            options={
+                'verbose_name': 'Archivo',
+                'verbose_name_plural': 'Archivos',
+            },
+        ),
+        migrations.CreateModel(
+            name='DireccionIP',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ip', models.CharField(max_length=45, unique=True)),
+            ],
+            options={
+                'verbose_name': 'Dirección IP',
+                'verbose_name_plural': 'Direcciones IP',
+            },
+        ),
+        migrations.RemoveIndex(
+            model_name='eventodeacceso',
+            name='idx_user_time',
+        ),
+        migrations.AddField(
+            model_name='eventodeacceso',
+            name='dim_actor',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='eventos', to='monitoreo.actor'),
+        ),
+        migrations.AddField(
+            model_name='eventodeacceso',
+            name='dim_archivo',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='eventos', to='monitoreo.archivo'),
+        ),
+        migrations.AddField(
+            model_name='eventodeacceso',
+            name='dim_ip',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='eventos', to='monitoreo.direccionip'),
+        ),
+        migrations.RunPython(poblar_dimensiones, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='eventodeacceso',
+            index=models.Index(fields=['dim_actor', 'timestamp'], name='idx_actor_time'),
+        ),
+    ]
@@ -0,0 +1,75 @@
+# Generated by Django 5.2.18 on 2026-10-19 10:35
+
+from datetime import timezone
+
+from django.db import migrations, models
+from django.db.models import Count, Q
+from django.db.models.functions import TruncDate, TruncHour
+
+TAMANO_LOTE = 5000
+
+
+def poblar_resumenes(apps, schema_editor):
+    """Resúmenes iniciales con los eventos ya cargados (mismo GROUP BY que recalcular_resumenes)"""
+    EventoDeAcceso = apps.get_model('monitoreo', 'EventoDeAcceso')
+    for nombre, truncar in (('ResumenHora', TruncHour), ('ResumenDia', TruncDate)):
+        modelo = apps.get_model('monitoreo', nombre)
+        filas = EventoDeAcceso.objects.order_by().annotate(
+            periodo=truncar('timestamp', tzinfo=timezone.utc)
+        ).values('periodo', 'dim_actor', 'tipo_evento', 'severidad', 'dim_archivo').annotate(
+            total=Count('id'), anomalias=Count('id', filter=Q(es_anomalia=True))
+        )
+        modelo.objects.bulk_create(
+            (modelo(periodo=f['periodo'], actor=f['dim_actor'] or 0, archivo=f['dim_archivo'] or 0,
+                    tipo_evento=f['tipo_evento'], severidad=f['severidad'],
+                    total=f['total'], anomalias=f['anomalias'])
+             for f in filas.iterator(chunk_size=TAMANO_LOTE)),
+            batch_size=TAMANO_LOTE,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('monitoreo', '0014_dimensiones'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumenDia',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('actor', models.BigIntegerField(default=0, help_text='pk de Actor')),
+                ('archivo', models.BigIntegerField(default=0, help_text='pk de Archivo (0 = sin archivo)')),
+                ('tipo_evento', models.CharField(max_length=50)),
+                ('severidad', models.CharField(max_length=20)),
+                ('total', models.BigIntegerField(default=0)),
+                ('anomalias', models.BigIntegerField(default=0)),
+                ('periodo', models.DateField(help_text='Día (UTC)')),
+            ],
+            options={
+                'verbose_name': 'Resumen por Día',
+                'verbose_name_plural': 'Resúmenes por Día',
+                'constraints': [models.UniqueConstraint(fields=('periodo', 'actor', 'tipo_evento', 'severidad', 'archivo'), name='uniq_resumen_dia')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ResumenHora',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('actor', models.BigIntegerField(default=0, help_text='pk de Actor')),
+                ('archivo', models.BigIntegerField(default=0, help_text='pk de Archivo (0 = sin archivo)')),
+                ('tipo_evento', models.CharField(max_length=50)),
+                ('severidad', models.CharField(max_length=20)),
+                ('total', models.BigIntegerField(default=0)),
+                ('anomalias', models.BigIntegerField(default=0)),
+                ('periodo', models.DateTimeField(help_text='Inicio de la hora (UTC)')),
+            ],
+            options={
+                'verbose_name': 'Resumen por Hora',
+                'verbose_name_plural': 'Resúmenes por Hora',
+                'constraints': [models.UniqueConstraint(fields=('periodo', 'actor', 'tipo_evento', 'severidad', 'archivo'), name='uniq_resumen_hora')],
+            },
+        ),
+        migrations.RunPython(poblar_resumenes, migrations.RunPython.noop),
+    ]
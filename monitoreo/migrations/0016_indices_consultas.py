@@ -0,0 +1,73 @@
+# Generated by Django 5.2.18 on 2026-10-19 10:41
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# idx_anomalias_recientes reemplaza al índice parcial de 0011 (solo PostgreSQL):
+# mantener los dos duplicaría el costo de escritura sin servir a otras consultas
+INDICE_REEMPLAZADO = 'idx_evento_anomalias_recientes'
+
+
+def eliminar_indice_reemplazado(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(f'DROP INDEX IF EXISTS {INDICE_REEMPLAZADO}')
+
+
+def restaurar_indice_reemplazado(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(f'CREATE INDEX IF NOT EXISTS {INDICE_REEMPLAZADO} '
+                          f'ON monitoreo_eventodeacceso (severidad, "timestamp" DESC) WHERE es_anomalia')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('monitoreo', '0015_resumenes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='eventodeacceso',
+            name='dim_actor',
+            field=models.ForeignKey(blank=True, db_index=False, editable=False, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='eventos', to='monitoreo.actor'),
+        ),
+        migrations.AlterField(
+            model_name='eventodeacceso',
+            name='es_anomalia',
+            field=models.BooleanField(default=False, help_text='Marcado por el modelo de IA como una anomalía.'),
+        ),
+        migrations.AlterField(
+            model_name='eventodeacceso',
+            name='severidad',
+            field=models.CharField(choices=[('BAJA', 'Baja'), ('MEDIA', 'Media'), ('ALTA', 'Alta'), ('CRITICA', 'Crítica')], default='BAJA', help_text='Nivel de criticidad de la anomalia', max_length=20),
+        ),
+        migrations.AlterField(
+            model_name='eventodeacceso',
+            name='timestamp',
+            field=models.DateTimeField(help_text='Fecha y hora exacta del evento (UTC)', verbose_name='Fecha y Hora'),
+        ),
+        migrations.AlterField(
+            model_name='eventodeacceso',
+            name='tipo_evento',
+            field=models.CharField(help_text="Ej: 'view', 'download', 'edit', move", max_length=50),
+        ),
+        migrations.AddIndex(
+            model_name='eventodeacceso',
+            index=models.Index(fields=['tipo_evento', '-timestamp'], name='idx_tipo_time'),
+        ),
+        migrations.AddIndex(
+            model_name='eventodeacceso',
+            index=models.Index(fields=['severidad', '-timestamp'], name='idx_severidad_time'),
+        ),
+        migrations.AddIndex(
+            model_name='eventodeacceso',
+            index=models.Index(condition=models.Q(('es_anomalia', True)), fields=['-timestamp'], name='idx_anomalias_recientes'),
+        ),
+        migrations.RunPython(eliminar_indice_reemplazado, restaurar_indice_reemplazado),
+        migrations.AddIndex(
+            model_name='eventodeacceso',
+            index=models.Index(fields=['timestamp', 'dim_actor', 'dim_ip', 'tipo_evento', 'dim_archivo'], name='idx_ventana_ml'),
+        ),
+    ]
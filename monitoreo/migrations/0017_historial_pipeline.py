@@ -0,0 +1,68 @@
+# Generated by Django 5.2.18 on 2026-10-19 11:06
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('monitoreo', '0016_indices_consultas'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EjecucionPipeline',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('duracion_segundos', models.FloatField(default=0.0)),
+                ('paginas', models.IntegerField(default=0, help_text='Páginas descargadas de la API')),
+                ('bytes_descargados', models.BigIntegerField(default=0)),
+                ('eventos_vistos', models.BigIntegerField(default=0, help_text='Eventos leídos / procesados')),
+                ('eventos_conservados', models.BigIntegerField(default=0, help_text='Eventos que pasaron los filtros')),
+                ('eventos_insertados', models.BigIntegerField(default=0)),
+                ('eventos_actualizados', models.BigIntegerField(default=0)),
+                ('errores', models.IntegerField(default=0)),
+                ('filas_por_segundo', models.FloatField(default=0.0, help_text='eventos_vistos / duracion_segundos')),
+                ('rss_pico_mb', models.FloatField(blank=True, help_text='Memoria residente máxima del proceso', null=True)),
+                ('pipeline', models.CharField(choices=[('recoleccion', 'Recolección online (Google)'), ('sincronizacion', 'Sincronización desde el dashboard'), ('etl_historico', 'ETL offline (JSON histórico)'), ('deteccion', 'Detección de anomalías')], max_length=30)),
+                ('estado', models.CharField(choices=[('en_curso', 'En curso'), ('ok', 'Completada'), ('error', 'Error')], default='en_curso', max_length=20)),
+                ('inicio', models.DateTimeField(default=django.utils.timezone.now)),
+                ('fin', models.DateTimeField(blank=True, null=True)),
+                ('error', models.TextField(blank=True, default='')),
+            ],
+            options={
+                'verbose_name': 'Ejecución del Pipeline',
+                'verbose_name_plural': 'Ejecuciones del Pipeline',
+                'ordering': ['-inicio'],
+                'indexes': [models.Index(fields=['pipeline', 'inicio'], name='idx_pipeline_inicio')],
+            },
+        ),
+        migrations.CreateModel(
+            name='EtapaPipeline',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('duracion_segundos', models.FloatField(default=0.0)),
+                ('paginas', models.IntegerField(default=0, help_text='Páginas descargadas de la API')),
+                ('bytes_descargados', models.BigIntegerField(default=0)),
+                ('eventos_vistos', models.BigIntegerField(default=0, help_text='Eventos leídos / procesados')),
+                ('eventos_conservados', models.BigIntegerField(default=0, help_text='Eventos que pasaron los filtros')),
+                ('eventos_insertados', models.BigIntegerField(default=0)),
+                ('eventos_actualizados', models.BigIntegerField(default=0)),
+                ('errores', models.IntegerField(default=0)),
+                ('filas_por_segundo', models.FloatField(default=0.0, help_text='eventos_vistos / duracion_segundos')),
+                ('rss_pico_mb', models.FloatField(blank=True, help_text='Memoria residente máxima del proceso', null=True)),
+                ('nombre', models.CharField(max_length=50)),
+                ('orden', models.PositiveSmallIntegerField(default=0)),
+                ('repeticiones', models.IntegerField(default=0)),
+                ('ejecucion', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='etapas', to='monitoreo.ejecucionpipeline')),
+            ],
+            options={
+                'verbose_name': 'Etapa del Pipeline',
+                'verbose_name_plural': 'Etapas del Pipeline',
+                'ordering': ['ejecucion', 'orden'],
+                'constraints': [models.UniqueConstraint(fields=('ejecucion', 'nombre'), name='uniq_etapa_pipeline')],
+            },
+        ),
+    ]
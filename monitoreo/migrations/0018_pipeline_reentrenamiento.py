@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 11:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('monitoreo', '0017_historial_pipeline'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='ejecucionpipeline',
+            name='pipeline',
+            field=models.CharField(choices=[('recoleccion', 'Recolección online (Google)'), ('sincronizacion', 'Sincronización desde el dashboard'), ('etl_historico', 'ETL offline (JSON histórico)'), ('deteccion', 'Detección de anomalías'), ('reentrenamiento', 'Reentrenamiento programado')], max_length=30),
+        ),
+    ]
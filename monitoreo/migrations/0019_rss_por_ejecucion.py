@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-19 11:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('monitoreo', '0018_pipeline_reentrenamiento'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='ejecucionpipeline',
+            name='rss_pico_mb',
+            field=models.FloatField(blank=True, help_text='Memoria residente máxima observada durante la ejecución / etapa', null=True),
+        ),
+        migrations.AlterField(
+            model_name='etapapipeline',
+            name='rss_pico_mb',
+            field=models.FloatField(blank=True, help_text='Memoria residente máxima observada durante la ejecución / etapa', null=True),
+        ),
+    ]
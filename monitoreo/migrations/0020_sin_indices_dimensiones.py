@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-19 11:56
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('monitoreo', '0019_rss_por_ejecucion'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='eventodeacceso',
+            name='dim_archivo',
+            field=models.ForeignKey(blank=True, db_index=False, editable=False, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='eventos', to='monitoreo.archivo'),
+        ),
+        migrations.AlterField(
+            model_name='eventodeacceso',
+            name='dim_ip',
+            field=models.ForeignKey(blank=True, db_index=False, editable=False, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='eventos', to='monitoreo.direccionip'),
+        ),
+    ]
@@ -0,0 +1,52 @@
+from datetime import timezone as dt_timezone
+from zoneinfo import ZoneInfo
+
+from django.conf import settings
+from django.db import migrations
+from django.db.models import Count, Q
+from django.db.models.functions import TruncDate
+
+# ResumenDia pasa de días UTC a días en TIME_ZONE: las filas existentes se
+# reconstruyen desde los eventos (mismo GROUP BY que resumenes.recalcular_resumenes)
+TAMANO_LOTE = 5000
+
+
+def reconstruir_dias(apps, zona):
+    EventoDeAcceso = apps.get_model('monitoreo', 'EventoDeAcceso')
+    ResumenDia = apps.get_model('monitoreo', 'ResumenDia')
+
+    ResumenDia.objects.all().delete()
+    filas = EventoDeAcceso.objects.order_by().annotate(periodo=TruncDate('timestamp', tzinfo=zona)).values(
+        'periodo', 'dim_actor', 'tipo_evento', 'severidad', 'dim_archivo'
+    ).annotate(total=Count('id'), anomalias=Count('id', filter=Q(es_anomalia=True)))
+
+    lote = []
+    for fila in filas.iterator(chunk_size=TAMANO_LOTE):
+        lote.append(ResumenDia(
+            periodo=fila['periodo'], actor=fila['dim_actor'] or 0, archivo=fila['dim_archivo'] or 0,
+            tipo_evento=fila['tipo_evento'], severidad=fila['severidad'],
+            total=fila['total'], anomalias=fila['anomalias'],
+        ))
+        if len(lote) >= TAMANO_LOTE:
+            ResumenDia.objects.bulk_create(lote)
+            lote = []
+    ResumenDia.objects.bulk_create(lote)
+
+
+def dias_en_zona_local(apps, schema_editor):
+    reconstruir_dias(apps, ZoneInfo(settings.TIME_ZONE))
+
+
+def dias_en_utc(apps, schema_editor):
+    reconstruir_dias(apps, dt_timezone.utc)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('monitoreo', '0020_sin_indices_dimensiones'),
+    ]
+
+    operations = [
+        migrations.RunPython(dias_en_zona_local, dias_en_utc),
+    ]
@@ -0,0 +1,54 @@
+from django.db import migrations, models
+
+from monitoreo.identidad import huella_evento
+
+TAMANO_LOTE = 5000
+
+
+def completar_huellas(apps, schema_editor):
+    """
+    Huella de las filas que quedaron sin ella (cargas por fuera del ORM entre
+    0012 y ahora). Si la huella ya la tiene otro evento con el mismo ID, la
+    fila conserva sus datos con una huella derivada de su pk: no se borran
+    eventos en una migración.
+    """
+    EventoDeAcceso = apps.get_model('monitoreo', 'EventoDeAcceso')
+    pendientes = EventoDeAcceso.objects.filter(huella__isnull=True).only('id', 'id_evento_google')
+
+    def guardar(lote):
+        ocupadas = set(EventoDeAcceso.objects.filter(huella__in=[e.huella for e in lote])
+                       .values_list('huella', flat=True))
+        for evento in lote:
+            if evento.huella in ocupadas:
+                evento.huella = huella_evento(f'{evento.id_evento_google}#{evento.pk}')
+            ocupadas.add(evento.huella)
+        EventoDeAcceso.objects.bulk_update(lote, ['huella'])
+
+    lote = []
+    for evento in pendientes.iterator(chunk_size=TAMANO_LOTE):
+        evento.huella = huella_evento(evento.id_evento_google)
+        lote.append(evento)
+        if len(lote) >= TAMANO_LOTE:
+            guardar(lote)
+            lote = []
+    if lote:
+        guardar(lote)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('monitoreo', '0021_resumen_dia_zona_local'),
+    ]
+
+    operations = [
+        # 1. Ninguna fila sin huella (mismo hash que la ingesta)
+        migrations.RunPython(completar_huellas, migrations.RunPython.noop),
+        # 2. NOT NULL: la deduplicación por huella no deja pasar filas sin clave
+        migrations.AlterField(
+            model_name='eventodeacceso',
+            name='huella',
+            field=models.BigIntegerField(editable=False, unique=True,
+                                         help_text='Hash de 64 bits del ID del evento (índice único compacto)'),
+        ),
+    ]
@@ -0,0 +1,60 @@
+import os
+import joblib
+from django.conf import settings
+from django.utils import timezone
+from system_core import cache as cache_sistema
+
+ARCHIVO_BUNDLE = 'isolation_forest.pkl'
+
+
+def ruta_bundle():
+    """Ruta del archivo serializado del modelo (settings.ML_MODELS_DIR)"""
+    ruta_modelo = getattr(settings, 'ML_MODELS_DIR', os.path.join(settings.BASE_DIR, 'monitoreo', 'ml_models'))
+    os.makedirs(ruta_modelo, exist_ok=True)
+    return os.path.join(ruta_modelo, ARCHIVO_BUNDLE)
+
+
+# Percentiles guardados como distribución de referencia de los scores
+PERCENTILES_REFERENCIA = list(range(0, 101, 10))
+
+
+def guardar_bundle(modelo, codificador, features, referencia_scores=None):
+    """
+    Serializa el modelo junto con su codificador y la lista de features,
+    para que el scoring use exactamente la misma codificación que el entrenamiento.
+    referencia_scores: percentiles de los scores de entrenamiento (detección de deriva).
+
+    Se escribe a un archivo temporal y se reemplaza de forma atómica para que
+    los procesos que están puntuando nunca lean un bundle a medio escribir.
+    """
+    bundle = {
+        'modelo': modelo,
+        'codificador': codificador,
+        'features': list(features),
+        'version': timezone.now().isoformat(),
+        'referencia_scores': list(referencia_scores) if referencia_scores is not None else None,
+    }
+    archivo_pkl = ruta_bundle()
+    temporal = f"{archivo_pkl}.tmp"
+    joblib.dump(bundle, temporal)
+    os.replace(temporal, archivo_pkl)
+
+    # Avisa a los demás procesos (scoring en ingesta, dashboard) que hay un modelo nuevo
+    cache_sistema.invalidar(cache_sistema.MODELO)
+    cache_sistema.invalidar(cache_sistema.DASHBOARD)
+    return archivo_pkl
+
+
+def cargar_bundle(archivo_pkl=None):
+    """
+    Carga el bundle del modelo. Retorna None si no existe.
+    Los .pkl antiguos (solo el IsolationForest) se envuelven sin codificador.
+    """
+    archivo_pkl = archivo_pkl or ruta_bundle()
+    if not os.path.exists(archivo_pkl):
+        return None
+
+    contenido = joblib.load(archivo_pkl)
+    if isinstance(contenido, dict):
+        return contenido
+    return {'modelo': contenido, 'codificador': None, 'features': None, 'version': None, 'referencia_scores': None}
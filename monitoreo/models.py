@@ -1,7 +1,62 @@
 from django.db import models
 from django.utils import timezone
 
-# Create your models here.
+from .identidad import asignar_huellas, huella_evento
+
+# ============================================================================
+# SPRINT 7: DIMENSIONES (actor, archivo, IP)
+# ============================================================================
+# Cada valor distinto se guarda una sola vez; los eventos lo referencian con
+# un entero. Se pueblan durante la ingesta (ver monitoreo/dimensiones.py).
+
+class Actor(models.Model):
+    """Usuario que realiza las acciones (dimensión de EventoDeAcceso)"""
+    email = models.EmailField(unique=True, verbose_name="Usuario Actor")
+
+    class Meta:
+        verbose_name = "Actor"
+        verbose_name_plural = "Actores"
+
+    def __str__(self):
+        return self.email
+
+
+class Archivo(models.Model):
+    """Archivo de Google Drive (dimensión de EventoDeAcceso)"""
+    id_drive = models.CharField(max_length=255, unique=True, help_text="ID del archivo en Google Drive")
+    nombre = models.CharField(max_length=255, null=True, blank=True,
+                              help_text="Nombre con el que se vio el archivo por primera vez")
+
+    class Meta:
+        verbose_name = "Archivo"
+        verbose_name_plural = "Archivos"
+
+    def __str__(self):
+        return self.nombre or self.id_drive
+
+
+class DireccionIP(models.Model):
+    """Dirección IP de origen (dimensión de EventoDeAcceso). Texto: guarda también valores como 'N/A'"""
+    ip = models.CharField(max_length=45, unique=True)
+
+    class Meta:
+        verbose_name = "Dirección IP"
+        verbose_name_plural = "Direcciones IP"
+
+    def __str__(self):
+        return self.ip
+
+
+class EventoQuerySet(models.QuerySet):
+    """bulk_create no pasa por save(): huella y dimensiones se completan acá (SPRINT 7)"""
+
+    def bulk_create(self, objs, *args, **kwargs):
+        from .dimensiones import asignar_dimensiones
+
+        objs = asignar_dimensiones(asignar_huellas(list(objs)))
+        return super().bulk_create(objs, *args, **kwargs)
+
+
 class EventoDeAcceso(models.Model):
     """
         Tabla principal de eventos (Logs de Auditoría).
@@ -11,10 +66,16 @@ class EventoDeAcceso(models.Model):
     # Identificador único del evento provisto por Google (Vital para evitar duplicados al sincronizar)
     id_evento_google = models.CharField(
         max_length=255,
-        unique=True,
         help_text="ID unico del evento en Google Drive Activity API"
     )
 
+    # SPRINT 7: Clave de deduplicación compacta (BLAKE2b-64 del id_evento_google)
+    huella = models.BigIntegerField(
+        unique=True,
+        editable=False,
+        help_text="Hash de 64 bits del ID del evento (índice único compacto)"
+    )
+
     # Datos del Evento
     email_usuario = models.EmailField(
         help_text="Email del usuario que realizo la accion",
@@ -23,7 +84,6 @@ class EventoDeAcceso(models.Model):
     )
     tipo_evento = models.CharField(
         max_length=50, 
-        db_index=True,
         help_text="Ej: 'view', 'download', 'edit', move"
     )
     archivo_id = models.CharField(
@@ -40,17 +100,29 @@ class EventoDeAcceso(models.Model):
         help_text="Direccion IP desde dinde se realizo la accion"
     )
 
+    # SPRINT 7: Referencias enteras a las dimensiones (los textos de arriba se
+    # conservan por ahora para alertas, admin, filtros del dashboard y GLPI).
+    # Siguiente paso: eliminar archivo_id y direccion_ip, que pasarán a leerse de
+    # dim_archivo / dim_ip; email_usuario y nombre_archivo se quedan (filtros y alertas).
+    dim_actor = models.ForeignKey(Actor, on_delete=models.PROTECT, null=True, blank=True,
+                                  related_name='eventos', editable=False,
+                                  db_index=False)  # cubierto por idx_actor_time
+    # Sin índice propio: nadie filtra por archivo o IP sueltos (la ventana de ML usa idx_ventana_ml)
+    # y las dimensiones no se borran, así que el chequeo de PROTECT no lo necesita
+    dim_archivo = models.ForeignKey(Archivo, on_delete=models.PROTECT, null=True, blank=True,
+                                    related_name='eventos', editable=False, db_index=False)
+    dim_ip = models.ForeignKey(DireccionIP, on_delete=models.PROTECT, null=True, blank=True,
+                               related_name='eventos', editable=False, db_index=False)
+
     # Temporalidad
     timestamp = models.DateTimeField(
         verbose_name="Fecha y Hora",
         help_text="Fecha y hora exacta del evento (UTC)",
-        db_index=True,
     )
 
     # Datos de Anomalia (Entidad Anomaly integrada)
     es_anomalia = models.BooleanField(
         default=False, 
-        db_index=True,
         help_text="Marcado por el modelo de IA como una anomalía."
     )
     anomaly_score = models.FloatField(
@@ -66,7 +138,6 @@ class EventoDeAcceso(models.Model):
             ('ALTA', 'Alta'),
             ('CRITICA', 'Crítica')
         ],
-        db_index=True,
         help_text='Nivel de criticidad de la anomalia'
     )
 
@@ -80,6 +151,8 @@ class EventoDeAcceso(models.Model):
     # Evidencia Forense
     detalles = models.JSONField(null=True, blank=True, help_text="Datos originales en crudo de la API.")
 
+    objects = EventoQuerySet.as_manager()
+
     class Meta:
         # Ordena los eventos del mas reciente al mas antiguo
         verbose_name = "Evento de Acceso"
@@ -88,13 +161,85 @@ class EventoDeAcceso(models.Model):
         
         # ÍNDICES COMPUESTOS (Requisito Sprint 3: queries comunes)
         indexes = [
-            models.Index(fields=['email_usuario', 'timestamp'], name='idx_user_time'),
+            # SPRINT 7: (entero, timestamp) en vez de (email, timestamp): índice mucho más angosto
+            models.Index(fields=['dim_actor', 'timestamp'], name='idx_actor_time'),
             models.Index(fields=['es_anomalia', 'severidad'], name='idx_anomaly_sev'),
+
+            # SPRINT 7: Índices según las consultas reales (ver `manage.py auditar_consultas`).
+            # Reemplazan los índices simples de tipo_evento, severidad, es_anomalia y timestamp.
+            # Dashboard / admin: filtro por tipo o severidad, ordenado por fecha (sin ordenar en memoria)
+            models.Index(fields=['tipo_evento', '-timestamp'], name='idx_tipo_time'),
+            models.Index(fields=['severidad', '-timestamp'], name='idx_severidad_time'),
+            # "Últimas anomalías": índice parcial, solo la fracción anómala de la tabla (reemplaza al de 0011)
+            models.Index(fields=['-timestamp'], condition=models.Q(es_anomalia=True),
+                         name='idx_anomalias_recientes'),
+            # Ventana de 180 días del modelo de ML: cubre las columnas que carga (lectura solo del índice)
+            models.Index(fields=['timestamp', 'dim_actor', 'dim_ip', 'tipo_evento', 'dim_archivo'],
+                         name='idx_ventana_ml'),
         ]
 
     def __str__(self):
         return f"{self.timestamp} - {self.email_usuario} - {self.tipo_evento}"
+
+    def save(self, *args, **kwargs):
+        # La huella se deriva del ID: create(), save() y update_or_create() la completan solos
+        if self.huella is None:
+            self.huella = huella_evento(self.id_evento_google)
+        # Igual con las dimensiones (import diferido: dimensiones importa este módulo)
+        from .dimensiones import asignar_dimensiones
+        asignar_dimensiones([self])
+        super().save(*args, **kwargs)
     
+def histograma_horas_vacio():
+    """Default del histograma de horas: 24 contadores en cero"""
+    return [0] * 24
+
+
+class PerfilUsuario(models.Model):
+    """
+        Línea base de comportamiento por usuario (SPRINT 7).
+        Se actualiza de forma incremental en cada ingesta, así el modelo
+        puede comparar cada evento contra el histórico del usuario sin
+        re-escanear toda la tabla de eventos.
+    """
+    email_usuario = models.EmailField(unique=True, verbose_name="Usuario Actor")
+
+    # Histograma de actividad por hora del día (UTC, mismo criterio que analisis.py)
+    histograma_horas = models.JSONField(default=histograma_horas_vacio)
+
+    # IPs y archivos habituales: {valor: conteo}, acotados a los más frecuentes
+    ips_habituales = models.JSONField(default=dict, blank=True)
+    archivos_habituales = models.JSONField(default=dict, blank=True)
+
+    total_eventos = models.IntegerField(default=0)
+    total_descargas = models.IntegerField(default=0)
+
+    primer_dia = models.DateField(null=True, blank=True)
+    ultimo_dia = models.DateField(null=True, blank=True)
+
+    fecha_actualizacion = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Perfil de Usuario"
+        verbose_name_plural = "Perfiles de Usuario"
+        ordering = ['email_usuario']
+
+    def __str__(self):
+        return f"Perfil {self.email_usuario} ({self.total_eventos} eventos)"
+
+    @property
+    def volumen_diario(self):
+        """Promedio de eventos por día en el periodo observado"""
+        if not self.primer_dia or not self.ultimo_dia:
+            return 0.0
+        dias = (self.ultimo_dia - self.primer_dia).days + 1
+        return self.total_eventos / dias
+
+    @property
+    def tasa_descargas(self):
+        """Fracción de eventos que son descargas"""
+        return self.total_descargas / self.total_eventos if self.total_eventos else 0.0
+
 class GLPITicket(models.Model):
     """
         Tabla para la integración con Mesa de Ayuda.
@@ -142,5 +287,248 @@ class GLPITicket(models.Model):
 
     def __str__(self):
         return f"Ticket GLPI #{self.ticket_id} - {self.estado}"
-            
-    
+
+class EjecucionModelo(models.Model):
+    """
+        Historial de ejecuciones del Isolation Forest.
+        Guarda las métricas de la etapa de evaluación opcional (--evaluate),
+        todas calculadas en tiempo lineal sobre los scores del modelo,
+        y las decisiones del reentrenamiento programado.
+    """
+    TIPOS_EJECUCION = [
+        ('deteccion', 'Detección completa'),
+        ('reentrenamiento', 'Reentrenamiento programado'),
+    ]
+
+    fecha = models.DateTimeField(auto_now_add=True, db_index=True)
+    tipo = models.CharField(max_length=20, choices=TIPOS_EJECUCION, default='deteccion')
+
+    total_eventos = models.IntegerField(default=0)
+    total_anomalias = models.IntegerField(default=0)
+
+    # Deriva de contaminación: diferencia entre lo esperado y lo observado
+    contaminacion_esperada = models.FloatField(default=0.0)
+    contaminacion_observada = models.FloatField(default=0.0)
+    deriva_contaminacion = models.FloatField(
+        default=0.0,
+        help_text="Contaminación observada - esperada"
+    )
+
+    # Distribución de scores normalizados (0.5 - decision_function)
+    score_media = models.FloatField(default=0.0)
+    score_desviacion = models.FloatField(default=0.0)
+    score_min = models.FloatField(default=0.0)
+    score_p50 = models.FloatField(default=0.0)
+    score_p95 = models.FloatField(default=0.0)
+    score_p99 = models.FloatField(default=0.0)
+    score_max = models.FloatField(default=0.0)
+
+    # Estabilidad respecto al modelo anterior (None si no había modelo previo)
+    estabilidad_etiquetas = models.FloatField(
+        null=True,
+        blank=True,
+        help_text="Fracción de eventos con la misma etiqueta que el modelo anterior"
+    )
+    correlacion_scores = models.FloatField(
+        null=True,
+        blank=True,
+        help_text="Correlación de Pearson entre scores del modelo nuevo y el anterior"
+    )
+
+    # Reentrenamiento: deriva de la distribución de scores y decisión de promoción
+    psi_scores = models.FloatField(
+        null=True,
+        blank=True,
+        help_text="Population Stability Index de los scores contra la referencia del modelo vigente"
+    )
+    promovido = models.BooleanField(
+        default=False,
+        help_text="Si el modelo de esta ejecución reemplazó al modelo vigente"
+    )
+
+    duracion_segundos = models.FloatField(default=0.0)
+
+    class Meta:
+        verbose_name = "Ejecución del Modelo"
+        verbose_name_plural = "Ejecuciones del Modelo"
+        ordering = ['-fecha']
+
+    def __str__(self):
+        return f"Ejecución {self.fecha:%Y-%m-%d %H:%M} - {self.total_anomalias}/{self.total_eventos} anomalías"
+
+
+class SolicitudProcesamiento(models.Model):
+    """
+        Cola en BD para el worker de ML (manage.py worker_ml).
+        Las vistas web solo encolan; la sincronización y la detección
+        corren en un proceso aparte que mantiene el modelo cargado.
+    """
+    TIPOS = [
+        ('deteccion', 'Detección de anomalías'),
+        ('sincronizacion', 'Sincronización con Google Drive'),
+    ]
+
+    PENDIENTE = 'pendiente'
+    EN_PROCESO = 'en_proceso'
+    COMPLETADA = 'completada'
+    ERROR = 'error'
+    ESTADOS = [
+        (PENDIENTE, 'Pendiente'),
+        (EN_PROCESO, 'En proceso'),
+        (COMPLETADA, 'Completada'),
+        (ERROR, 'Error'),
+    ]
+
+    tipo = models.CharField(max_length=20, choices=TIPOS)
+    estado = models.CharField(max_length=20, choices=ESTADOS, default=PENDIENTE)
+    solicitado_por = models.CharField(max_length=150, blank=True, default='')
+
+    fecha_creacion = models.DateTimeField(auto_now_add=True)
+    fecha_inicio = models.DateTimeField(null=True, blank=True)
+    fecha_fin = models.DateTimeField(null=True, blank=True)
+
+    resultado = models.JSONField(default=dict, blank=True)
+    error = models.TextField(blank=True, default='')
+
+    class Meta:
+        verbose_name = "Solicitud de Procesamiento"
+        verbose_name_plural = "Solicitudes de Procesamiento"
+        ordering = ['fecha_creacion']
+        indexes = [
+            models.Index(fields=['estado', 'fecha_creacion'], name='idx_solicitud_cola'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_tipo_display()} #{self.pk} ({self.estado})"
+
+
+# ============================================================================
+# SPRINT 7: RESÚMENES PRE-AGREGADOS (series de tiempo)
+# ============================================================================
+# Conteos por periodo (UTC) x actor x tipo x severidad x archivo. La ingesta
+# los incrementa y la detección recalcula su ventana (ver monitoreo/resumenes.py),
+# así las gráficas de tendencia no recorren la tabla de eventos.
+
+class ResumenBase(models.Model):
+    # Códigos de las dimensiones (0 = sin valor). Sin FK: son datos derivados y
+    # el 0 permite que la restricción única agrupe también los eventos sin archivo
+    actor = models.BigIntegerField(default=0, help_text="pk de Actor")
+    archivo = models.BigIntegerField(default=0, help_text="pk de Archivo (0 = sin archivo)")
+    tipo_evento = models.CharField(max_length=50)
+    severidad = models.CharField(max_length=20)
+
+    total = models.BigIntegerField(default=0)
+    anomalias = models.BigIntegerField(default=0)
+
+    class Meta:
+        abstract = True
+
+
+class ResumenHora(ResumenBase):
+    periodo = models.DateTimeField(help_text="Inicio de la hora (UTC)")
+
+    class Meta:
+        verbose_name = "Resumen por Hora"
+        verbose_name_plural = "Resúmenes por Hora"
+        constraints = [
+            models.UniqueConstraint(fields=['periodo', 'actor', 'tipo_evento', 'severidad', 'archivo'],
+                                    name='uniq_resumen_hora'),
+        ]
+
+    def __str__(self):
+        return f"{self.periodo:%Y-%m-%d %H}h - {self.tipo_evento}: {self.total}"
+
+
+class ResumenDia(ResumenBase):
+    periodo = models.DateField(help_text="Día (UTC)")
+
+    class Meta:
+        verbose_name = "Resumen por Día"
+        verbose_name_plural = "Resúmenes por Día"
+        constraints = [
+            models.UniqueConstraint(fields=['periodo', 'actor', 'tipo_evento', 'severidad', 'archivo'],
+                                    name='uniq_resumen_dia'),
+        ]
+
+    def __str__(self):
+        return f"{self.periodo:%Y-%m-%d} - {self.tipo_evento}: {self.total}"
+
+
+# ============================================================================
+# SPRINT 7: HISTORIAL DE EJECUCIONES DEL PIPELINE (recolección, ETL, ML)
+# ============================================================================
+# Una fila por ejecución y una por etapa de esa ejecución, con los contadores
+# de rendimiento (ver monitoreo/ejecuciones.py). Permite seguir la tendencia
+# del throughput de ingesta y detectar regresiones entre versiones.
+
+class MetricasPipelineBase(models.Model):
+    duracion_segundos = models.FloatField(default=0.0)
+
+    paginas = models.IntegerField(default=0, help_text="Páginas descargadas de la API")
+    bytes_descargados = models.BigIntegerField(default=0)
+    eventos_vistos = models.BigIntegerField(default=0, help_text="Eventos leídos / procesados")
+    eventos_conservados = models.BigIntegerField(default=0, help_text="Eventos que pasaron los filtros")
+    eventos_insertados = models.BigIntegerField(default=0)
+    eventos_actualizados = models.BigIntegerField(default=0)
+    errores = models.IntegerField(default=0)
+
+    filas_por_segundo = models.FloatField(default=0.0, help_text="eventos_vistos / duracion_segundos")
+    rss_pico_mb = models.FloatField(null=True, blank=True, help_text="Memoria residente máxima observada durante la ejecución / etapa")
+
+    class Meta:
+        abstract = True
+
+
+class EjecucionPipeline(MetricasPipelineBase):
+    PIPELINES = [
+        ('recoleccion', 'Recolección online (Google)'),
+        ('sincronizacion', 'Sincronización desde el dashboard'),
+        ('etl_historico', 'ETL offline (JSON histórico)'),
+        ('deteccion', 'Detección de anomalías'),
+        ('reentrenamiento', 'Reentrenamiento programado'),
+    ]
+
+    EN_CURSO = 'en_curso'
+    OK = 'ok'
+    ERROR = 'error'
+    ESTADOS = [
+        (EN_CURSO, 'En curso'),
+        (OK, 'Completada'),
+        (ERROR, 'Error'),
+    ]
+
+    pipeline = models.CharField(max_length=30, choices=PIPELINES)
+    estado = models.CharField(max_length=20, choices=ESTADOS, default=EN_CURSO)
+    inicio = models.DateTimeField(default=timezone.now)
+    fin = models.DateTimeField(null=True, blank=True)
+    error = models.TextField(blank=True, default='')
+
+    class Meta:
+        verbose_name = "Ejecución del Pipeline"
+        verbose_name_plural = "Ejecuciones del Pipeline"
+        ordering = ['-inicio']
+        indexes = [
+            models.Index(fields=['pipeline', 'inicio'], name='idx_pipeline_inicio'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_pipeline_display()} {self.inicio:%Y-%m-%d %H:%M} ({self.estado})"
+
+
+class EtapaPipeline(MetricasPipelineBase):
+    """Una etapa que se repite en la ejecución (p. ej. un lote del ETL) acumula en la misma fila"""
+    ejecucion = models.ForeignKey(EjecucionPipeline, on_delete=models.CASCADE, related_name='etapas')
+    nombre = models.CharField(max_length=50)
+    orden = models.PositiveSmallIntegerField(default=0)
+    repeticiones = models.IntegerField(default=0)
+
+    class Meta:
+        verbose_name = "Etapa del Pipeline"
+        verbose_name_plural = "Etapas del Pipeline"
+        ordering = ['ejecucion', 'orden']
+        constraints = [
+            models.UniqueConstraint(fields=['ejecucion', 'nombre'], name='uniq_etapa_pipeline'),
+        ]
+
+    def __str__(self):
+        return f"{self.nombre}: {self.duracion_segundos:.2f}s"
@@ -0,0 +1,91 @@
+"""
+Motor de scoring del Isolation Forest (SPRINT 7).
+
+Este módulo NO importa Django a propósito: sus funciones se ejecutan en
+procesos hijos del pool, que solo necesitan numpy / joblib / sklearn.
+"""
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+import joblib
+import numpy as np
+
+# Por debajo de este número de filas no compensa levantar procesos
+UMBRAL_PARALELO = 200_000
+
+# Modelo cargado en cada proceso del pool (una sola vez por proceso)
+_MODELO_WORKER = None
+
+
+def _inicializar_worker(archivo_modelo):
+    """
+    Carga el modelo en el proceso hijo, una vez por proceso.
+    Sin mmap: los árboles de sklearn copian sus arrays al deserializarse,
+    así que cada worker tiene su propia copia del bosque de todas formas.
+    """
+    global _MODELO_WORKER
+    contenido = joblib.load(archivo_modelo)
+    _MODELO_WORKER = contenido['modelo'] if isinstance(contenido, dict) else contenido
+
+
+def _puntuar_fragmento(args):
+    """Calcula score_samples sobre un rango de filas de la matriz memory-mapped"""
+    archivo_matriz, inicio, fin = args
+    X = np.load(archivo_matriz, mmap_mode='r')
+    fragmento = np.asarray(X[inicio:fin])
+    columnas = getattr(_MODELO_WORKER, 'feature_names_in_', None)
+    if columnas is not None:
+        # Entrenado con un DataFrame: mismas columnas, sin el aviso de "feature names" en cada fragmento
+        import pandas as pd
+        fragmento = pd.DataFrame(fragmento, columns=columnas, copy=False)
+    return _MODELO_WORKER.score_samples(fragmento)
+
+
+def _score_samples_paralelo(modelo, X, archivo_modelo, n_procesos):
+    """Reparte la matriz en fragmentos entre un pool de procesos"""
+    n_procesos = n_procesos or os.cpu_count() or 1
+
+    with tempfile.TemporaryDirectory() as directorio:
+        # La matriz viaja a los workers como archivo .npy memory-mapped, no por pickle
+        archivo_matriz = os.path.join(directorio, 'matriz.npy')
+        np.save(archivo_matriz, np.ascontiguousarray(X, dtype=np.float64))
+
+        # Sin archivo propio se toma una copia del modelo en memoria para esta corrida:
+        # el offset_ que se aplica después es el de ese mismo modelo
+        if archivo_modelo is None:
+            archivo_modelo = os.path.join(directorio, 'modelo.joblib')
+            joblib.dump(modelo, archivo_modelo)
+
+        n_filas = len(X)
+        tamano = -(-n_filas // (n_procesos * 4))  # ~4 fragmentos por proceso para balancear carga
+        fragmentos = [(archivo_matriz, i, min(i + tamano, n_filas)) for i in range(0, n_filas, tamano)]
+
+        with ProcessPoolExecutor(max_workers=n_procesos, initializer=_inicializar_worker,
+                                 initargs=(archivo_modelo,)) as pool:
+            return np.concatenate(list(pool.map(_puntuar_fragmento, fragmentos)))
+
+
+def puntuar_matriz(modelo, X, archivo_modelo=None, n_procesos=None, umbral_paralelo=UMBRAL_PARALELO):
+    """
+    Recorre los árboles UNA sola vez (score_samples) y deriva de ahí
+    la etiqueta y el score normalizado, en lugar de llamar a predict()
+    y decision_function() por separado.
+
+    Retorna (predicciones, scores_normalizados):
+      - predicciones: -1 anomalía, 1 normal (igual que modelo.predict)
+      - scores_normalizados: 0.5 - decision_function (igual que el dashboard)
+
+    archivo_modelo: archivo (modelo o bundle) con el MISMO modelo que `modelo`,
+    que no cambie durante la corrida; evita volver a serializar el modelo.
+    Solo la matriz se comparte entre workers (memory-map); el modelo se
+    carga completo en cada proceso del pool.
+    """
+    if len(X) >= umbral_paralelo and (n_procesos or os.cpu_count() or 1) > 1:
+        scores_raw = _score_samples_paralelo(modelo, X, archivo_modelo, n_procesos)
+    else:
+        scores_raw = modelo.score_samples(X)
+
+    decision = scores_raw - modelo.offset_
+    predicciones = np.where(decision < 0, -1, 1)
+    return predicciones, 0.5 - decision
@@ -0,0 +1,151 @@
+from collections import Counter, defaultdict
+from datetime import timezone as dt_timezone
+
+import numpy as np
+import pandas as pd
+from django.db import transaction
+from django.utils import timezone
+
+from .identidad import asignar_huellas
+from .models import PerfilUsuario, histograma_horas_vacio
+
+# Cuántas IPs / archivos habituales se conservan por usuario (acota el tamaño del perfil)
+MAX_ELEMENTOS_HABITUALES = 50
+
+# Acciones que cuentan como descarga / extracción de información
+TIPOS_DESCARGA = ('download',)
+
+# Columnas que se agregan a la matriz de características del modelo
+FEATURES_PERFIL = ['rareza_hora', 'rareza_ip', 'rareza_archivo', 'tasa_descargas', 'volumen_diario']
+
+
+def _recortar(conteos):
+    """Conserva solo los N valores más frecuentes"""
+    if len(conteos) <= MAX_ELEMENTOS_HABITUALES:
+        return dict(conteos)
+    return dict(Counter(conteos).most_common(MAX_ELEMENTOS_HABITUALES))
+
+
+def actualizar_perfiles(eventos):
+    """
+    SPRINT 7: Actualiza de forma incremental los perfiles de los usuarios
+    con un lote de eventos NUEVOS (instancias de EventoDeAcceso).
+
+    Se agrupa el lote en memoria y se escribe con una consulta de lectura
+    más un bulk_create / bulk_update, sin importar el tamaño del lote.
+    """
+    if not eventos:
+        return 0
+
+    # Un mismo evento repetido en el lote cuenta una vez (misma clave que la ingesta)
+    eventos = list({e.huella: e for e in asignar_huellas(list(eventos))}.values())
+
+    # 1. Agregar el lote por usuario
+    lote = defaultdict(lambda: {
+        'horas': [0] * 24, 'ips': Counter(), 'archivos': Counter(),
+        'total': 0, 'descargas': 0, 'dias': set(),
+    })
+
+    for evento in eventos:
+        ts = evento.timestamp.astimezone(dt_timezone.utc)
+        agregado = lote[evento.email_usuario]
+        agregado['horas'][ts.hour] += 1
+        agregado['total'] += 1
+        agregado['dias'].add(ts.date())
+        if evento.direccion_ip:
+            agregado['ips'][evento.direccion_ip] += 1
+        if evento.archivo_id:
+            agregado['archivos'][evento.archivo_id] += 1
+        if evento.tipo_evento in TIPOS_DESCARGA:
+            agregado['descargas'] += 1
+
+    # 2. Fusionar con los perfiles existentes
+    with transaction.atomic():
+        existentes = PerfilUsuario.objects.select_for_update().in_bulk(
+            list(lote.keys()), field_name='email_usuario'
+        )
+        nuevos, modificados = [], []
+        ahora = timezone.now()
+
+        for email, agregado in lote.items():
+            perfil = existentes.get(email)
+            if perfil is None:
+                perfil = PerfilUsuario(email_usuario=email, histograma_horas=histograma_horas_vacio())
+                nuevos.append(perfil)
+            else:
+                modificados.append(perfil)
+
+            perfil.histograma_horas = [a + b for a, b in zip(perfil.histograma_horas, agregado['horas'])]
+            perfil.ips_habituales = _recortar(Counter(perfil.ips_habituales) + agregado['ips'])
+            perfil.archivos_habituales = _recortar(Counter(perfil.archivos_habituales) + agregado['archivos'])
+            perfil.total_eventos += agregado['total']
+            perfil.total_descargas += agregado['descargas']
+
+            primer_dia, ultimo_dia = min(agregado['dias']), max(agregado['dias'])
+            perfil.primer_dia = min(perfil.primer_dia, primer_dia) if perfil.primer_dia else primer_dia
+            perfil.ultimo_dia = max(perfil.ultimo_dia, ultimo_dia) if perfil.ultimo_dia else ultimo_dia
+            perfil.fecha_actualizacion = ahora
+
+        PerfilUsuario.objects.bulk_create(nuevos)
+        PerfilUsuario.objects.bulk_update(modificados, [
+            'histograma_horas', 'ips_habituales', 'archivos_habituales',
+            'total_eventos', 'total_descargas', 'primer_dia', 'ultimo_dia', 'fecha_actualizacion',
+        ])
+
+    return len(lote)
+
+
+def cargar_perfiles(emails):
+    """Retorna {email: PerfilUsuario} para los usuarios indicados (una sola consulta)"""
+    return PerfilUsuario.objects.in_bulk(list(set(emails)), field_name='email_usuario')
+
+
+def _frecuencia_por_par(df, columna, perfiles, atributo, totales):
+    """Frecuencia relativa de (usuario, valor) según el perfil; 0 si el valor no es habitual."""
+    conteos = {
+        (email, valor): cantidad
+        for email, perfil in perfiles.items()
+        for valor, cantidad in getattr(perfil, atributo).items()
+    }
+    if not conteos:
+        return np.zeros(len(df))
+
+    indice = pd.MultiIndex.from_arrays([df['email_usuario'].astype(str), df[columna].astype(str)])
+    valores = pd.Series(conteos).reindex(indice).fillna(0).to_numpy(dtype=float)
+    return np.divide(valores, totales, out=np.zeros(len(df)), where=totales > 0)
+
+
+def caracteristicas_perfil(df, perfiles):
+    """
+    SPRINT 7: Une los perfiles a la matriz de características (vectorizado).
+    df debe tener 'email_usuario', 'direccion_ip', 'archivo_id' sin codificar y 'hora'.
+
+    rareza_* = 1 - frecuencia relativa del valor para ese usuario
+    (1.0 = nunca visto en su historial, 0.0 = lo único que hace).
+    """
+    emails = list(perfiles.keys())
+    codigos = pd.Categorical(df['email_usuario'], categories=emails).codes
+    tiene_perfil = codigos >= 0
+
+    if emails:
+        histogramas = np.array([perfiles[e].histograma_horas for e in emails], dtype=float)
+        totales_perfil = np.array([perfiles[e].total_eventos for e in emails], dtype=float)
+        descargas = np.array([perfiles[e].tasa_descargas for e in emails], dtype=float)
+        volumen = np.array([perfiles[e].volumen_diario for e in emails], dtype=float)
+    else:
+        histogramas = np.zeros((1, 24))
+        totales_perfil = descargas = volumen = np.zeros(1)
+
+    idx = np.where(tiene_perfil, codigos, 0)
+    totales = np.where(tiene_perfil, totales_perfil[idx], 0.0)
+    horas = df['hora'].to_numpy(dtype=int)
+
+    freq_hora = np.divide(histogramas[idx, horas], totales, out=np.zeros(len(df)), where=totales > 0)
+
+    df['tiene_perfil'] = tiene_perfil
+    df['rareza_hora'] = 1.0 - freq_hora
+    df['rareza_ip'] = 1.0 - _frecuencia_por_par(df, 'direccion_ip', perfiles, 'ips_habituales', totales)
+    df['rareza_archivo'] = 1.0 - _frecuencia_por_par(df, 'archivo_id', perfiles, 'archivos_habituales', totales)
+    df['tasa_descargas'] = np.where(tiene_perfil, descargas[idx], 0.0)
+    df['volumen_diario'] = np.where(tiene_perfil, volumen[idx], 0.0)
+    return df
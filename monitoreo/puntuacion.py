@@ -0,0 +1,150 @@
+import logging
+import os
+import pandas as pd
+from django.conf import settings
+from system_core import cache as cache_sistema
+
+from .codificacion import construir_matriz
+from .modelo_ml import cargar_bundle, ruta_bundle
+from .motor_puntuacion import UMBRAL_PARALELO, puntuar_matriz
+
+logger = logging.getLogger(__name__)
+
+# Cache del bundle por proceso: se recarga solo si cambia el archivo en disco o la versión publicada
+_BUNDLE_CACHE = {'ruta': None, 'mtime': None, 'version': None, 'bundle': None}
+
+# Un valor se considera inusual para el usuario si representa menos del 5% de su historial
+UMBRAL_RAREZA = 0.95
+
+def generar_explicacion(row):
+    """
+    SPRINT 6: Genera una explicación legible (Heurística)
+    basada en los datos del evento anómalo.
+    SPRINT 7: Si el usuario tiene perfil, se compara contra SU comportamiento habitual.
+    """
+    motivos = []
+
+    # 1. Análisis de Hora
+    if row.get('tiene_perfil'):
+        if row['rareza_hora'] >= UMBRAL_RAREZA:
+            motivos.append(f"Horario inusual para el usuario ({row['hora']}:00)")
+    # Sin perfil: horario laboral genérico (7am - 5pm)
+    elif row['hora'] < 7 or row['hora'] > 17:
+        motivos.append(f"Horario inusual ({row['hora']}:00)")
+    
+    # 2. Análisis de Día (Sábado=5, Domingo=6)
+    if row['dia_de_semana'] >= 5:
+        motivos.append("Acceso en fin de semana")
+
+    # 3. Análisis de IP y Archivo contra el perfil del usuario
+    if row.get('tiene_perfil'):
+        if row['rareza_ip'] >= UMBRAL_RAREZA:
+            motivos.append("IP no habitual para el usuario")
+        if row['rareza_archivo'] >= UMBRAL_RAREZA:
+            motivos.append("Archivo fuera de su patrón habitual")
+
+    # 4. Análisis de Score
+    if not motivos:
+        motivos.append("Patrón atípico detectado por la IA")
+
+    return ", ".join(motivos)
+
+
+def calcular_severidad(score):
+    """Asigna severidad basada en el score normalizado (solo para anomalías)"""
+    if score > 0.75:
+        return 'CRITICA'
+    elif score > 0.60:
+        return 'ALTA'
+    return 'MEDIA'
+
+
+def puntuar(modelo, X, archivo_modelo=None):
+    """
+    Punto de entrada del motor de scoring con la configuración del proyecto.
+    Matrices grandes se reparten en un pool de procesos (ML_SCORING_UMBRAL_PARALELO).
+    """
+    return puntuar_matriz(
+        modelo, X,
+        archivo_modelo=archivo_modelo,
+        n_procesos=getattr(settings, 'ML_SCORING_PROCESOS', None),
+        umbral_paralelo=getattr(settings, 'ML_SCORING_UMBRAL_PARALELO', UMBRAL_PARALELO),
+    )
+
+
+def obtener_bundle():
+    """
+    Retorna el bundle del modelo cacheado en memoria.
+    Se vuelve a leer de disco solo cuando el entrenamiento genera uno nuevo:
+    guardar_bundle incrementa la versión del espacio 'modelo' en la caché
+    compartida, y el mtime cubre los archivos copiados a mano.
+    """
+    archivo_pkl = ruta_bundle()
+    try:
+        mtime = os.path.getmtime(archivo_pkl)
+    except OSError:
+        return None
+
+    version = cache_sistema.version(cache_sistema.MODELO)
+    if (_BUNDLE_CACHE['ruta'], _BUNDLE_CACHE['mtime'], _BUNDLE_CACHE['version']) != (archivo_pkl, mtime, version):
+        _BUNDLE_CACHE.update(ruta=archivo_pkl, mtime=mtime, version=version, bundle=cargar_bundle(archivo_pkl))
+
+    return _BUNDLE_CACHE['bundle']
+
+
+def puntuar_eventos(eventos):
+    """
+    SPRINT 7: Scoring en la ingesta.
+    Marca instancias de EventoDeAcceso (aún sin guardar) con es_anomalia,
+    anomaly_score, severidad y motivo_anomalia usando el bundle cacheado,
+    para que cada fila se escriba una sola vez ya clasificada.
+
+    Retorna la cantidad de anomalías. Si no hay modelo entrenado con
+    codificador (o el scoring está desactivado) los eventos quedan como normales.
+    Un error al puntuar (p. ej. un bundle con features que el codificador ya no
+    produce) se registra y deja los eventos sin clasificar: la ingesta nunca
+    pierde filas por el modelo, y 'Detectar IA' los clasifica después.
+    """
+    if not eventos or not getattr(settings, 'ML_SCORING_EN_INGESTA', True):
+        return 0
+
+    bundle = obtener_bundle()
+    if not bundle or not bundle.get('codificador'):
+        return 0
+
+    try:
+        df = pd.DataFrame({
+            'email_usuario': [e.email_usuario for e in eventos],
+            'direccion_ip': [e.direccion_ip for e in eventos],
+            'tipo_evento': [e.tipo_evento for e in eventos],
+            'archivo_id': [e.archivo_id for e in eventos],
+            'timestamp': [e.timestamp for e in eventos],
+        })
+        df, X = construir_matriz(df, bundle['codificador'])
+        X = X[bundle['features']]
+
+        # Sin archivo_modelo: el bundle en disco puede ser reemplazado por un reentrenamiento
+        # mientras se puntúa, y los workers usarían otro modelo que el del umbral (offset_)
+        predicciones, scores_normalizados = puntuar(bundle['modelo'], X)
+        motivos = {i: generar_explicacion(df.iloc[i]) for i, prediccion in enumerate(predicciones)
+                   if prediccion == -1}
+    except Exception:
+        logger.exception('❌ Falló el scoring en la ingesta; los eventos se guardan sin clasificar',
+                         extra={'eventos': len(eventos)})
+        return 0
+
+    # Se marca solo después de puntuar todo el lote: un error no deja eventos a medio clasificar
+    for i, (evento, score) in enumerate(zip(eventos, scores_normalizados)):
+        if i in motivos:
+            evento.es_anomalia = True
+            evento.anomaly_score = float(score)
+            evento.severidad = calcular_severidad(evento.anomaly_score)
+            evento.motivo_anomalia = motivos[i]
+        else:
+            # Mismo criterio que el reset de analisis.py para eventos normales
+            evento.es_anomalia = False
+            evento.anomaly_score = 0.0
+            evento.severidad = 'BAJA'
+            evento.motivo_anomalia = None
+
+    return len(motivos)
@@ -0,0 +1,232 @@
+import copy
+import logging
+import random
+import time
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+from django.utils import timezone
+from sklearn import __version__ as VERSION_SKLEARN
+from sklearn.ensemble import IsolationForest
+
+from .codificacion import CodificadorEventos, construir_matriz
+from .dimensiones import COLUMNAS_CODIGOS, decodificar_dimensiones
+from .ejecuciones import ejecucion_pipeline, paso_pipeline, sumar
+from .evaluacion import evaluar_modelo, registrar_ejecucion
+from .modelo_ml import PERCENTILES_REFERENCIA, cargar_bundle, guardar_bundle
+from .models import EjecucionModelo, EventoDeAcceso
+from .puntuacion import puntuar
+
+logger = logging.getLogger(__name__)
+
+# Atributos por árbol de IsolationForest (scikit-learn 1.3+): los dos privados
+# son las profundidades precalculadas que usa score_samples
+ATRIBUTOS_POR_ARBOL = ('estimators_', 'estimators_features_',
+                       '_decision_path_lengths', '_average_path_length_per_tree')
+
+# Versiones de scikit-learn [desde, hasta) con esa estructura verificada. Fuera del
+# rango no se combinan árboles (bosque completo), aunque los atributos existan:
+# un cambio de significado no se detecta con hasattr
+VERSIONES_SKLEARN_COMBINABLES = ((1, 3), (1, 10))
+
+
+def sklearn_combinable(version=None):
+    """¿La versión (por defecto, la instalada) de scikit-learn está en VERSIONES_SKLEARN_COMBINABLES?"""
+    try:
+        mayor_menor = tuple(int(parte) for parte in (version or VERSION_SKLEARN).split('.')[:2])
+    except ValueError:
+        return False
+    desde, hasta = VERSIONES_SKLEARN_COMBINABLES
+    return desde <= mayor_menor < hasta
+
+
+def semilla_reentrenamiento(modelo):
+    """
+    Semilla de los árboles nuevos: distinta en cada reentrenamiento (si no, cada
+    corrida sobre datos parecidos repite las mismas particiones) y reproducible
+    a partir del historial de ejecuciones.
+    """
+    base = modelo.random_state if isinstance(modelo.random_state, int) else 0
+    return base + EjecucionModelo.objects.filter(tipo='reentrenamiento').count() + 1
+
+def muestra_reservorio(iterable, tamano, semilla=42):
+    """
+    Algoritmo R: muestra uniforme de tamaño fijo sobre un flujo de longitud desconocida.
+    La memoria queda acotada a `tamano` filas sin importar el tamaño de la tabla.
+    """
+    rng = random.Random(semilla)
+    reservorio = []
+    for i, fila in enumerate(iterable):
+        if i < tamano:
+            reservorio.append(fila)
+        else:
+            j = rng.randint(0, i)
+            if j < tamano:
+                reservorio[j] = fila
+    return reservorio
+
+
+def cargar_muestra(desde, tamano, semilla=42):
+    """Muestra de reservorio de los eventos desde `desde`, como DataFrame"""
+    filas = EventoDeAcceso.objects.filter(timestamp__gte=desde).order_by().values_list(*COLUMNAS_CODIGOS)
+    muestra = muestra_reservorio(filas.iterator(chunk_size=5000), tamano, semilla)
+    return decodificar_dimensiones(pd.DataFrame(muestra, columns=COLUMNAS_CODIGOS))
+
+
+def indice_estabilidad(referencia, scores):
+    """
+    Population Stability Index entre la distribución de referencia (percentiles
+    guardados en el bundle) y los scores actuales. O(n).
+    < 0.1 sin cambio relevante, 0.1 - 0.25 cambio moderado, > 0.25 cambio fuerte.
+    """
+    bordes = np.unique(np.asarray(referencia, dtype=float))
+    if len(bordes) < 2:
+        return 0.0
+
+    bordes[0], bordes[-1] = -np.inf, np.inf
+    esperado = np.full(len(bordes) - 1, 1.0 / (len(bordes) - 1))
+    actual = np.histogram(scores, bins=bordes)[0] / max(len(scores), 1)
+
+    esperado = np.clip(esperado, 1e-6, None)
+    actual = np.clip(actual, 1e-6, None)
+    return float(np.sum((actual - esperado) * np.log(actual / esperado)))
+
+
+def reemplazar_arboles_antiguos(modelo, X_reciente, arboles_nuevos, semilla=None):
+    """
+    Entrena `arboles_nuevos` árboles con datos recientes en un bosque aparte
+    (mismo max_samples que el vigente, random_state=semilla) y arma una copia
+    del modelo con los árboles más recientes del vigente más los nuevos,
+    manteniendo constante el tamaño del bosque. El modelo vigente no se modifica.
+
+    Retorna None si los bosques no se pueden combinar sin cambiar la
+    normalización de los scores: menos filas recientes que max_samples o una
+    versión de scikit-learn fuera de VERSIONES_SKLEARN_COMBINABLES.
+    """
+    if len(X_reciente) < modelo.max_samples_:
+        return None
+    if not sklearn_combinable() or not all(hasattr(modelo, atributo) for atributo in ATRIBUTOS_POR_ARBOL):
+        return None
+
+    nuevo = IsolationForest(
+        n_estimators=arboles_nuevos,
+        contamination=modelo.contamination,
+        max_samples=modelo.max_samples_,
+        max_features=modelo.max_features,
+        random_state=semilla,
+        n_jobs=modelo.n_jobs,
+    ).fit(X_reciente)
+    if nuevo.max_samples_ != modelo.max_samples_ or not all(hasattr(nuevo, a) for a in ATRIBUTOS_POR_ARBOL):
+        return None
+
+    # Los árboles antiguos están al principio de cada lista
+    combinado = copy.copy(modelo)
+    for atributo in ATRIBUTOS_POR_ARBOL:
+        setattr(combinado, atributo,
+                list(getattr(modelo, atributo)[arboles_nuevos:]) + list(getattr(nuevo, atributo)))
+    combinado.set_params(n_estimators=len(combinado.estimators_))
+    return combinado
+
+
+@ejecucion_pipeline('reentrenamiento')
+def reentrenar_modelo(dias_ventana=180, dias_recientes=7, tamano_muestra=50000,
+                      arboles_nuevos=20, umbral_psi=0.1, contaminacion=0.05, forzar=False):
+    """
+    SPRINT 7: Reentrenamiento programado con costo acotado.
+
+    1. Muestra de reservorio de tamaño fijo sobre la ventana.
+    2. Si hay un modelo vigente compatible (misma codificación y features),
+       reutiliza sus árboles y reemplaza solo los más antiguos por árboles
+       entrenados con datos recientes. Si no, entrena un bosque completo.
+    3. Promueve el nuevo modelo solo si la distribución de scores del modelo
+       vigente se desplazó (PSI > umbral) o si se fuerza.
+
+    Retorna la EjecucionModelo registrada.
+    """
+    inicio = time.perf_counter()
+    ahora = timezone.now()
+
+    with paso_pipeline('ml_carga'):
+        df = cargar_muestra(ahora - timedelta(days=dias_ventana), tamano_muestra)
+        sumar(eventos_vistos=len(df))
+    if len(df) < 50:
+        logger.warning("⚠️ [IA] Datos insuficientes (%d). Se requieren mínimo 50.", len(df),
+                       extra={'eventos_muestra': len(df)})
+        return None
+
+    vigente = cargar_bundle()
+    compatible = bool(vigente and vigente.get('codificador') and vigente.get('referencia_scores'))
+
+    with paso_pipeline('ml_preprocesamiento'):
+        # Los árboles antiguos exigen la misma codificación y las mismas columnas
+        if compatible:
+            df, X = construir_matriz(df, vigente['codificador'])
+            compatible = set(vigente['features']).issubset(X.columns)
+        if compatible:
+            codificador = vigente['codificador']
+            X = X[vigente['features']]
+        else:
+            codificador = CodificadorEventos().fit(df)
+            df, X = construir_matriz(df, codificador)
+
+    psi = None
+    modelo = None
+    if compatible:
+        with paso_pipeline('ml_puntuacion'):
+            _, scores_vigentes = puntuar(vigente['modelo'], X)
+        psi = indice_estabilidad(vigente['referencia_scores'], scores_vigentes)
+        logger.info("📊 [IA] PSI de scores contra la referencia del modelo vigente: %.4f", psi,
+                    extra={'psi_scores': psi})
+
+        recientes = (df['timestamp'] >= ahora - timedelta(days=dias_recientes)).to_numpy()
+        if recientes.sum() < vigente['modelo'].max_samples_:
+            logger.info("⚠️ [IA] Pocos eventos recientes, se usan todos los de la muestra.",
+                        extra={'eventos_recientes': int(recientes.sum())})
+            recientes[:] = True
+
+        semilla = semilla_reentrenamiento(vigente['modelo'])
+        with paso_pipeline('ml_entrenamiento'):
+            modelo = reemplazar_arboles_antiguos(vigente['modelo'], X[recientes], arboles_nuevos, semilla)
+        if modelo is None:
+            logger.warning("⚠️ [IA] No se pueden combinar los árboles con el modelo vigente "
+                           "(scikit-learn %s), se entrena un bosque completo.", VERSION_SKLEARN,
+                           extra={'version_sklearn': VERSION_SKLEARN})
+        else:
+            logger.info("🌲 [IA] %d árboles nuevos (semilla %d)", arboles_nuevos, semilla,
+                        extra={'arboles_nuevos': arboles_nuevos, 'semilla': semilla})
+
+    if modelo is None:
+        with paso_pipeline('ml_entrenamiento'):
+            modelo = IsolationForest(
+                n_estimators=100,
+                contamination=contaminacion,
+                max_samples='auto',
+                random_state=42,
+                n_jobs=-1
+            ).fit(X)
+
+    # Umbral recalculado sobre la muestra completa de la ventana
+    # (una pasada con offset 0 da los score_samples crudos)
+    with paso_pipeline('ml_puntuacion'):
+        modelo.offset_ = 0.0
+        _, scores_crudos = puntuar(modelo, X)
+    modelo.offset_ = float(np.percentile(0.5 - scores_crudos, 100.0 * modelo.contamination))
+
+    scores_normalizados = scores_crudos + modelo.offset_
+    predicciones = np.where(scores_normalizados > 0.5, -1, 1)
+
+    promovido = forzar or not compatible or psi > umbral_psi
+    if promovido:
+        referencia = np.percentile(scores_normalizados, PERCENTILES_REFERENCIA)
+        with paso_pipeline('ml_persistencia'):
+            archivo_pkl = guardar_bundle(modelo, codificador, list(X.columns), referencia)
+        logger.info("💾 [IA] Nueva versión del modelo promovida: %s", archivo_pkl,
+                    extra={'promovido': True, 'psi_scores': psi})
+    else:
+        logger.info("✅ [IA] Distribución estable, se mantiene el modelo vigente.",
+                    extra={'promovido': False, 'psi_scores': psi})
+
+    metricas = evaluar_modelo(X, predicciones, scores_normalizados, modelo.contamination)
+    metricas.update(tipo='reentrenamiento', psi_scores=psi, promovido=promovido)
+    return registrar_ejecucion(metricas, duracion_segundos=time.perf_counter() - inicio)
@@ -1,9 +1,13 @@
+import logging
+
 from django.db.models.signals import post_save
 from django.dispatch import receiver
 from .models import EventoDeAcceso
 # Importamos EXACTAMENTE los nombres que definiste en utils_alertas
 from .utils_alertas import debe_enviar_alerta, enviar_alerta_anomalia
 
+logger = logging.getLogger(__name__)
+
 @receiver(post_save, sender=EventoDeAcceso)
 def notificar_anomalia_detectada(sender, instance, created, **kwargs):
     """
@@ -20,5 +24,5 @@ def notificar_anomalia_detectada(sender, instance, created, **kwargs):
         return
     
     # 3. Enviar alerta
-    print(f"🚀 Signal activada: Enviando alerta para evento {instance.id}")
+    logger.info("🚀 Signal activada: enviando alerta para el evento %s", instance.id, extra={'evento': instance.id})
     enviar_alerta_anomalia(instance)
\ No newline at end of file
@@ -0,0 +1,249 @@
+"""
+Eventos sintéticos a escala de producción (SPRINT 7).
+
+GeneradorSintetico arma lotes de eventos con numpy (sin bucles por evento)
+y una semilla fija: misma semilla + mismos parámetros = mismos eventos. La
+ventana termina en `fin` (por defecto el inicio de la hora actual: dos
+corridas dentro de la misma hora generan exactamente los mismos datos).
+
+  - Usuarios con actividad desigual (pocos usuarios generan la mayor parte
+    de los eventos) y 1-2 IPs habituales cada uno.
+  - Archivos con popularidad desigual y "equipos": cada usuario trabaja
+    sobre todo con los archivos de su equipo.
+  - Horario laboral en settings.TIME_ZONE, fines de semana con poca actividad.
+  - Anomalías inyectadas (fraccion_anomalias): madrugada, IP externa,
+    descarga de un archivo confidencial. Llevan detalles =
+    {"anomalia_inyectada": true}; las marcas es_anomalia quedan para el modelo.
+
+cargar_sinteticos() escribe los lotes con ingesta.insertar_filas (COPY a
+staging en PostgreSQL, INSERT ... ON CONFLICT (huella) DO NOTHING en SQLite),
+con los IDs, huellas y dimensiones que produciría la ingesta real.
+"""
+import json
+from datetime import datetime, time, timedelta
+from zoneinfo import ZoneInfo
+
+import numpy as np
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+
+from .dimensiones import cache_dimensiones
+from .identidad import EPOCH, MICROSEGUNDO, huellas_eventos, ids_eventos
+from .ingesta import insertar_filas
+from .models import Actor, Archivo, DireccionIP, EventoDeAcceso
+
+# (acción, peso) según la mezcla habitual del reporte de auditoría de Drive
+TIPOS_EVENTO = [
+    ('view', 0.55), ('edit', 0.20), ('preview', 0.10), ('download', 0.08),
+    ('print', 0.03), ('copy', 0.02), ('rename', 0.01), ('trash', 0.01),
+]
+
+# Peso relativo de cada hora local del día (0 a 23)
+PESOS_HORA = [0.2, 0.1, 0.1, 0.1, 0.1, 0.2, 0.5, 1.5, 5, 6, 6, 6, 3, 5, 6, 6, 5, 4, 2, 1, 0.8, 0.6, 0.4, 0.3]
+PESO_FIN_DE_SEMANA = 0.15
+
+# Anomalías: horas de madrugada e IPs de un rango que no usa ningún usuario (TEST-NET-3)
+HORAS_ANOMALAS = [0, 1, 2, 3, 4, 23]
+IPS_EXTERNAS = [f'203.0.113.{i}' for i in range(1, 255)]
+
+# Uso de la IP principal / secundaria del usuario (el resto: cualquier IP interna)
+PROB_IP_PRINCIPAL = 0.90
+PROB_IP_SECUNDARIA = 0.08
+
+USUARIOS_POR_EQUIPO = 25
+EXTENSIONES = ['docx', 'xlsx', 'pdf', 'pptx', 'txt']
+
+TAMANO_LOTE = 100_000
+MICROSEGUNDOS_DIA = 86_400 * 10**6
+
+DETALLES_ANOMALIA = json.dumps({'anomalia_inyectada': True})
+
+
+def _pesos_zipf(cantidad, exponente):
+    pesos = 1.0 / np.arange(1, cantidad + 1) ** exponente
+    return pesos / pesos.sum()
+
+
+class GeneradorSintetico:
+
+    def __init__(self, usuarios=500, archivos=20_000, ips=2_000, dias=180, fraccion_anomalias=0.01,
+                 semilla=42, fin=None, dominio='empresa.com'):
+        self.usuarios, self.archivos, self.ips, self.dias = usuarios, archivos, ips, dias
+        self.fraccion_anomalias = fraccion_anomalias
+        self.semilla = semilla
+
+        base = np.random.default_rng(semilla)
+        self.emails = np.array([f'usuario{i:05d}@{dominio}' for i in range(usuarios)], dtype=object)
+        self.ids_archivos = np.array([f'archivo_{i:07d}' for i in range(archivos)], dtype=object)
+        self.confidenciales = max(1, archivos // 1000)
+        self.nombres_archivos = np.array(
+            [f'confidencial_{i:04d}.xlsx' if i < self.confidenciales else f'documento_{i:07d}.{EXTENSIONES[i % 5]}'
+             for i in range(archivos)], dtype=object)
+        # IPs internas por índice; las externas van a continuación
+        self.direcciones_ip = np.array(
+            [f'10.{i // 65536 % 256}.{i // 256 % 256}.{i % 256}' for i in range(ips)] + IPS_EXTERNAS, dtype=object)
+
+        self.pesos_usuarios = base.permutation(_pesos_zipf(usuarios, 0.8))
+        self.pesos_archivos = _pesos_zipf(archivos, 1.0)
+        self.ip_principal = base.integers(ips, size=usuarios)
+        self.ip_secundaria = base.integers(ips, size=usuarios)
+        equipos = max(1, usuarios // USUARIOS_POR_EQUIPO)
+        self.desplazamiento_equipo = (np.arange(usuarios) % equipos) * (archivos // equipos)
+
+        self.tipos = np.array([t for t, _ in TIPOS_EVENTO], dtype=object)
+        self.pesos_tipos = np.array([p for _, p in TIPOS_EVENTO]) / sum(p for _, p in TIPOS_EVENTO)
+        self.indice_download = [t for t, _ in TIPOS_EVENTO].index('download')
+        self.pesos_horas = np.array(PESOS_HORA) / sum(PESOS_HORA)
+
+        # Medianoche local de cada día de la ventana (en µs UTC) y su peso por día de la semana
+        zona = ZoneInfo(settings.TIME_ZONE)
+        fin = fin or timezone.now().replace(minute=0, second=0, microsecond=0)
+        self.fin_us = int(fin.timestamp() * 10**6)
+        hoy = fin.astimezone(zona).date()
+        dias_ventana = [hoy - timedelta(days=d) for d in range(dias)]
+        self.medianoches_us = np.array(
+            [int(datetime.combine(d, time.min, tzinfo=zona).timestamp()) * 10**6 for d in dias_ventana], dtype=np.int64)
+        pesos_dias = np.array([PESO_FIN_DE_SEMANA if d.weekday() >= 5 else 1.0 for d in dias_ventana])
+        self.pesos_dias = pesos_dias / pesos_dias.sum()
+
+    def lote(self, cantidad, numero=0):
+        """
+        Columnas de un lote (arrays del mismo largo): índices de usuario,
+        archivo, IP y acción, timestamp en µs UTC y marca de anomalía inyectada.
+        Cada lote tiene su propio flujo aleatorio derivado de (semilla, numero).
+        """
+        rng = np.random.default_rng([self.semilla, numero])
+
+        usuario = rng.choice(self.usuarios, size=cantidad, p=self.pesos_usuarios)
+        archivo = (self.desplazamiento_equipo[usuario]
+                   + rng.choice(self.archivos, size=cantidad, p=self.pesos_archivos)) % self.archivos
+
+        sorteo_ip = rng.random(cantidad)
+        ip = np.where(sorteo_ip < PROB_IP_PRINCIPAL, self.ip_principal[usuario],
+                      np.where(sorteo_ip < PROB_IP_PRINCIPAL + PROB_IP_SECUNDARIA, self.ip_secundaria[usuario],
+                               rng.integers(self.ips, size=cantidad)))
+
+        tipo = rng.choice(len(self.tipos), size=cantidad, p=self.pesos_tipos)
+        hora = rng.choice(24, size=cantidad, p=self.pesos_horas)
+
+        anomalia = rng.random(cantidad) < self.fraccion_anomalias
+        n_anomalias = int(anomalia.sum())
+        if n_anomalias:
+            hora[anomalia] = rng.choice(HORAS_ANOMALAS, size=n_anomalias)
+            ip[anomalia] = self.ips + rng.integers(len(IPS_EXTERNAS), size=n_anomalias)
+            tipo[anomalia] = self.indice_download
+            archivo[anomalia] = rng.integers(self.confidenciales, size=n_anomalias)
+
+        dia = rng.choice(self.dias, size=cantidad, p=self.pesos_dias)
+        timestamp_us = (self.medianoches_us[dia] + hora.astype(np.int64) * 3_600 * 10**6
+                        + rng.integers(3_600 * 10**6, size=cantidad))
+        # Los eventos de hoy no pueden quedar en el futuro
+        futuro = timestamp_us > self.fin_us
+        timestamp_us[futuro] = self.fin_us - rng.integers(1, MICROSEGUNDOS_DIA, size=int(futuro.sum()))
+
+        return {'usuario': usuario, 'archivo': archivo, 'ip': ip, 'tipo': tipo,
+                'timestamp_us': timestamp_us, 'anomalia': anomalia}
+
+    def lotes(self, cantidad, tamano_lote=TAMANO_LOTE):
+        for numero, inicio in enumerate(range(0, cantidad, tamano_lote)):
+            yield self.lote(min(tamano_lote, cantidad - inicio), numero)
+
+    # --- Conversión a los formatos de entrada de la ingesta real ---
+
+    def valores(self, lote):
+        """Columnas de texto del lote: emails, ids y nombres de archivo, IPs, acciones"""
+        return {
+            'email_usuario': self.emails[lote['usuario']],
+            'archivo_id': self.ids_archivos[lote['archivo']],
+            'nombre_archivo': self.nombres_archivos[lote['archivo']],
+            'direccion_ip': self.direcciones_ip[lote['ip']],
+            'tipo_evento': self.tipos[lote['tipo']],
+        }
+
+    def fechas(self, lote):
+        return [EPOCH + us * MICROSEGUNDO for us in lote['timestamp_us'].tolist()]
+
+    def formato_recolector(self, lote):
+        """Lista de dicts como los que arma filtrar_pagina() del recolector online"""
+        valores = self.valores(lote)
+        return [
+            {'timestamp': ts, 'usuario': email, 'accion': accion, 'archivo_id': archivo,
+             'archivo_titulo': nombre, 'ip': ip, 'detalles_json': {}}
+            for ts, email, accion, archivo, nombre, ip in zip(
+                self.fechas(lote), valores['email_usuario'], valores['tipo_evento'], valores['archivo_id'],
+                valores['nombre_archivo'], valores['direccion_ip'])
+        ]
+
+    def instancias(self, lote):
+        """EventoDeAcceso sin guardar, como los que arma la carga histórica (sin ID ni huella)"""
+        valores = self.valores(lote)
+        return [
+            EventoDeAcceso(timestamp=ts, email_usuario=email, tipo_evento=accion, archivo_id=archivo,
+                           nombre_archivo=nombre, direccion_ip=ip)
+            for ts, email, accion, archivo, nombre, ip in zip(
+                self.fechas(lote), valores['email_usuario'], valores['tipo_evento'], valores['archivo_id'],
+                valores['nombre_archivo'], valores['direccion_ip'])
+        ]
+
+    def resolver_dimensiones(self):
+        """pks de Actor / Archivo / DireccionIP alineados con los índices del generador"""
+        pks = {}
+        for clave, modelo, campo, valores, extra in (
+            ('usuario', Actor, 'email', self.emails, None),
+            ('archivo', Archivo, 'id_drive', self.ids_archivos,
+             {i: {'nombre': n} for i, n in zip(self.ids_archivos, self.nombres_archivos)}),
+            ('ip', DireccionIP, 'ip', self.direcciones_ip, None),
+        ):
+            mapa = cache_dimensiones.resolver(modelo, campo, valores.tolist(), extra)
+            pks[clave] = np.array([mapa[v] for v in valores.tolist()], dtype=np.int64)
+        return pks
+
+
+def _timestamps_db(timestamp_us):
+    """Texto de timestamp en UTC, igual al que escribe Django (comparable como texto en SQLite)"""
+    texto = np.char.replace(np.datetime_as_string(timestamp_us.astype('datetime64[us]'), unit='us'), 'T', ' ')
+    if connection.vendor != 'sqlite':
+        texto = np.char.add(texto, '+00:00')
+    return texto.tolist()
+
+
+def cargar_sinteticos(generador, cantidad, tamano_lote=TAMANO_LOTE, progreso=None):
+    """
+    Genera e inserta `cantidad` eventos. Las dimensiones se resuelven una vez
+    para todo el universo del generador; cada lote es una transacción.
+    `progreso(insertados, generados)` se llama después de cada lote.
+    Retorna la cantidad de eventos insertados (los duplicados se descartan).
+    """
+    pks = generador.resolver_dimensiones()
+    columnas = [f.column for f in EventoDeAcceso._meta.concrete_fields if not f.primary_key]
+
+    insertados = generados = 0
+    for lote in generador.lotes(cantidad, tamano_lote):
+        valores = generador.valores(lote)
+        ids = ids_eventos(lote['timestamp_us'].astype('datetime64[us]'), valores['email_usuario'],
+                          valores['archivo_id'], valores['tipo_evento'])
+        n = len(ids)
+        datos = {
+            'id_evento_google': ids,
+            'huella': huellas_eventos(ids),
+            'email_usuario': valores['email_usuario'].tolist(),
+            'tipo_evento': valores['tipo_evento'].tolist(),
+            'archivo_id': valores['archivo_id'].tolist(),
+            'nombre_archivo': valores['nombre_archivo'].tolist(),
+            'direccion_ip': valores['direccion_ip'].tolist(),
+            'dim_actor_id': pks['usuario'][lote['usuario']].tolist(),
+            'dim_archivo_id': pks['archivo'][lote['archivo']].tolist(),
+            'dim_ip_id': pks['ip'][lote['ip']].tolist(),
+            'timestamp': _timestamps_db(lote['timestamp_us']),
+            'es_anomalia': [False] * n,
+            'anomaly_score': [0.0] * n,
+            'severidad': ['BAJA'] * n,
+            'motivo_anomalia': [None] * n,
+            'detalles': np.where(lote['anomalia'], DETALLES_ANOMALIA, None).tolist(),
+        }
+        insertados += insertar_filas(columnas, list(zip(*(datos[c] for c in columnas))))
+        generados += n
+        if progreso:
+            progreso(insertados, generados)
+    return insertados
@@ -1,11 +1,54 @@
-from django.test import TestCase, Client
+import asyncio
+import csv
+import gzip
+import json
+import os
+import tempfile
+from io import StringIO
+import numpy as np
+from unittest import skipUnless
+from unittest.mock import patch
+from django.db import connection
+from django.conf import settings
+from django.test import AsyncClient, TestCase, Client, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.core import mail
+from django.core.management import call_command
+from django.core.management.base import CommandError
 from django.core.cache import cache
 from django.urls import reverse
 from django.utils import timezone
-from datetime import timedelta
-from usuarios.models import UsuarioPersonalizado
-from .models import EventoDeAcceso
+import pytz
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from usuarios.models import Role, UsuarioPersonalizado
+import pandas as pd
+from .models import (Actor, Archivo, DireccionIP, EventoDeAcceso, EjecucionModelo, EjecucionPipeline, PerfilUsuario, ResumenDia,
+                     ResumenHora, SolicitudProcesamiento)
+from .analisis import ejecutar_deteccion_anomalias, generar_explicacion
+from .perfiles import actualizar_perfiles, cargar_perfiles, caracteristicas_perfil
+from .codificacion import CodificadorEventos, hash_cubetas
+from .modelo_ml import cargar_bundle, guardar_bundle
+from .puntuacion import puntuar_eventos, calcular_severidad
+from .motor_puntuacion import puntuar_matriz
+from .reentrenamiento import (muestra_reservorio, indice_estabilidad, reemplazar_arboles_antiguos, reentrenar_modelo,
+                              sklearn_combinable)
+from .management.commands.recolectar_eventos_reales import guardar_eventos_en_db
+from .management.commands.cargar_json_historico import Command as CargarJsonCommand
+from .evaluacion import estadisticas_scores, deriva_contaminacion
+from .admin import PaginadorEstimado
+from .views import CAMPOS_API_DEFECTO, bloques_exportacion, calcular_kpis_dashboard, lineas_exportacion
+from .ingesta import copiar_eventos, insertar_eventos, ip_valida, usar_copy
+from .identidad import huella_evento, id_evento, ids_eventos, timestamp_canonico
+from .ejecuciones import ejecucion_pipeline, paso_pipeline, sumar
+from .dimensiones import asignar_dimensiones, cache_dimensiones, decodificar_dimensiones, COLUMNAS_CODIGOS
+from .resumenes import acumular_resumenes, recalcular_resumenes
+from .sinteticos import GeneradorSintetico, cargar_sinteticos
+from .management.commands.auditar_consultas import plan_consulta
+from .transmision import RevisorCambios, Transmisor
+from .worker import encolar, procesar_pendientes, recuperar_interrumpidas
+from system_core import cache as cache_sistema
+from system_core.logs import FormateadorJSON
+from system_core.metricas import etapa, registro
 # Importamos las funciones de alerta del Sprint 6
 from .utils_alertas import debe_enviar_alerta, enviar_alerta_anomalia, puede_enviar_alerta
 class EventoDeAccesoModelTests(TestCase):
@@ -192,4 +235,1584 @@ class SistemaAlertaTests(TestCase):
         self.assertIn("ANOMALÍA CRITICA", email.subject) # Asunto correcto
         self.assertIn("datos_sensibles.pdf", email.subject) # Archivo en asunto
         self.assertIn("Acceso en horario inusual", email.body) # Motivo en el cuerpo
-        self.assertIn("hacker@test.com", email.body) # Usuario en el cuerpo
\ No newline at end of file
+        self.assertIn("hacker@test.com", email.body) # Usuario en el cuerpo
+
+    def test_error_de_envio_queda_en_el_log(self):
+        """Un fallo del servidor de correo se registra con la traza, no se imprime"""
+        self.evento.severidad = 'CRITICA'
+        with patch('monitoreo.utils_alertas.send_mail', side_effect=ConnectionRefusedError('smtp caído')), \
+                self.assertLogs('monitoreo.utils_alertas', level='ERROR') as logs:
+            self.assertFalse(enviar_alerta_anomalia(self.evento))
+        self.assertEqual(logs.records[0].evento, self.evento.id)
+        self.assertIsNotNone(logs.records[0].exc_info)
+
+def crear_eventos_prueba(cantidad, prefijo='evt'):
+    """Crea eventos variados para entrenar el modelo en los tests"""
+    ahora = timezone.now()
+    eventos = [
+        EventoDeAcceso(
+            id_evento_google=f'{prefijo}_{i}',
+            email_usuario=f'usuario{i % 5}@example.com',
+            direccion_ip=f'192.168.1.{i % 7}',
+            timestamp=ahora - timedelta(hours=i),
+            archivo_id=f'file{i % 9}',
+            nombre_archivo=f'archivo{i % 9}.pdf',
+            tipo_evento=['view', 'edit', 'download'][i % 3],
+        )
+        for i in range(cantidad)
+    ]
+    return EventoDeAcceso.objects.bulk_create(eventos)
+
+
+class EvaluacionModeloTests(TestCase):
+    """
+        Tests para la etapa de evaluación opcional del modelo (SPRINT 7)
+    """
+
+    def setUp(self):
+        self.dir_modelos = tempfile.TemporaryDirectory()
+        self.addCleanup(self.dir_modelos.cleanup)
+        crear_eventos_prueba(80)
+
+    def test_estadisticas_scores(self):
+        """Verificar el resumen lineal de la distribución de scores"""
+        stats = estadisticas_scores(np.arange(101, dtype=float))
+        self.assertEqual(stats['score_min'], 0.0)
+        self.assertEqual(stats['score_max'], 100.0)
+        self.assertAlmostEqual(stats['score_p50'], 50.0)
+        self.assertAlmostEqual(stats['score_p95'], 95.0)
+
+    def test_deriva_contaminacion(self):
+        """Verificar la deriva entre contaminación esperada y observada"""
+        metricas = deriva_contaminacion([-1, 1, 1, 1], 0.05)
+        self.assertAlmostEqual(metricas['contaminacion_observada'], 0.25)
+        self.assertAlmostEqual(metricas['deriva_contaminacion'], 0.20)
+
+    def test_deteccion_sin_evaluar_no_registra_historial(self):
+        """Sin --evaluate no se calculan métricas ni se guarda historial"""
+        with override_settings(ML_MODELS_DIR=self.dir_modelos.name):
+            ejecutar_deteccion_anomalias()
+        self.assertFalse(EjecucionModelo.objects.exists())
+
+    def test_deteccion_con_evaluar_registra_historial(self):
+        """Con evaluar=True se guarda la ejecución y la estabilidad contra el modelo previo"""
+        with override_settings(ML_MODELS_DIR=self.dir_modelos.name):
+            ejecutar_deteccion_anomalias(evaluar=True)
+            ejecutar_deteccion_anomalias(evaluar=True)
+
+        primera, segunda = EjecucionModelo.objects.order_by('id')
+        self.assertEqual(primera.total_eventos, 80)
+        self.assertIsNone(primera.estabilidad_etiquetas)
+        # Mismos datos y misma semilla -> el modelo nuevo coincide con el anterior
+        self.assertEqual(segunda.estabilidad_etiquetas, 1.0)
+
+
+class PerfilesUsuarioTests(TestCase):
+    """
+        Tests para los perfiles de comportamiento por usuario (SPRINT 7)
+    """
+
+    def _evento(self, hora, ip='10.0.0.1', archivo='file1', tipo='view', id_google=None):
+        ts = timezone.now().replace(hour=hora, minute=0, second=0, microsecond=0, tzinfo=dt_timezone.utc)
+        return EventoDeAcceso(
+            id_evento_google=id_google or f'perfil_{hora}_{ip}_{archivo}_{tipo}',
+            email_usuario='analista@example.com',
+            direccion_ip=ip,
+            timestamp=ts,
+            archivo_id=archivo,
+            tipo_evento=tipo,
+        )
+
+    def test_actualizacion_incremental(self):
+        """Dos lotes se acumulan sobre el mismo perfil"""
+        actualizar_perfiles([self._evento(9), self._evento(10, tipo='download')])
+        actualizar_perfiles([self._evento(9, ip='10.0.0.2')])
+
+        perfil = PerfilUsuario.objects.get(email_usuario='analista@example.com')
+        self.assertEqual(perfil.total_eventos, 3)
+        self.assertEqual(perfil.total_descargas, 1)
+        self.assertEqual(perfil.histograma_horas[9], 2)
+        self.assertEqual(perfil.ips_habituales, {'10.0.0.1': 2, '10.0.0.2': 1})
+
+    def test_eventos_repetidos_cuentan_una_vez(self):
+        """El mismo evento dos veces en el lote no infla el perfil"""
+        actualizar_perfiles([self._evento(9), self._evento(9), self._evento(10, tipo='download')])
+
+        perfil = PerfilUsuario.objects.get(email_usuario='analista@example.com')
+        self.assertEqual(perfil.total_eventos, 2)
+        self.assertEqual(perfil.histograma_horas[9], 1)
+        self.assertEqual(perfil.ips_habituales, {'10.0.0.1': 2})
+
+    def test_caracteristicas_rareza(self):
+        """Un horario y una IP nunca vistos tienen rareza 1.0"""
+        actualizar_perfiles([self._evento(9, id_google=f'rareza_{i}') for i in range(4)])
+
+        df = pd.DataFrame({
+            'email_usuario': ['analista@example.com', 'analista@example.com', 'nuevo@example.com'],
+            'direccion_ip': ['10.0.0.1', '8.8.8.8', '10.0.0.1'],
+            'archivo_id': ['file1', 'file1', 'file1'],
+            'hora': [9, 3, 9],
+        })
+        df = caracteristicas_perfil(df, cargar_perfiles(df['email_usuario']))
+
+        self.assertEqual(list(df['tiene_perfil']), [True, True, False])
+        self.assertEqual(df.loc[0, 'rareza_hora'], 0.0)
+        self.assertEqual(df.loc[1, 'rareza_hora'], 1.0)
+        self.assertEqual(df.loc[1, 'rareza_ip'], 1.0)
+
+    def test_explicacion_usa_perfil(self):
+        """Con perfil, el horario se juzga contra el historial del usuario"""
+        fila = pd.Series({
+            'hora': 3, 'dia_de_semana': 1, 'tiene_perfil': True,
+            'rareza_hora': 0.0, 'rareza_ip': 0.0, 'rareza_archivo': 1.0,
+        })
+        motivo = generar_explicacion(fila)
+        self.assertNotIn("Horario inusual", motivo)
+        self.assertIn("Archivo fuera de su patrón habitual", motivo)
+
+    def test_etl_offline_no_duplica_perfil(self):
+        """Recargar el mismo lote no vuelve a sumar eventos al perfil"""
+        comando = CargarJsonCommand()
+        comando._guardar_lote([self._evento(9, id_google='etl_1'), self._evento(11, id_google='etl_2')])
+        comando._guardar_lote([self._evento(9, id_google='etl_1'), self._evento(11, id_google='etl_2')])
+
+        perfil = PerfilUsuario.objects.get(email_usuario='analista@example.com')
+        self.assertEqual(perfil.total_eventos, 2)
+
+
+class CodificacionTests(TestCase):
+    """
+        Tests para la codificación por frecuencia + hashing trick (SPRINT 7)
+    """
+
+    def setUp(self):
+        self.df = pd.DataFrame({
+            'email_usuario': ['a@x.com', 'a@x.com', 'a@x.com', 'b@x.com'],
+            'direccion_ip': ['10.0.0.1', '10.0.0.1', None, '10.0.0.2'],
+            'tipo_evento': ['view', 'view', 'edit', 'view'],
+            'archivo_id': ['f1', 'f2', 'f1', 'f1'],
+        })
+
+    def test_frecuencias_y_valores_no_vistos(self):
+        """Valores vistos -> frecuencia relativa; no vistos -> 0.0"""
+        codificador = CodificadorEventos().fit(self.df)
+        nuevo = pd.DataFrame({
+            'email_usuario': ['a@x.com', 'intruso@x.com'],
+            'direccion_ip': ['10.0.0.1', '1.2.3.4'],
+            'tipo_evento': ['view', 'delete'],
+            'archivo_id': ['f1', 'f9'],
+        })
+        codificado = codificador.transform(nuevo)
+
+        self.assertEqual(list(codificado.columns), codificador.features)
+        self.assertAlmostEqual(codificado.loc[0, 'freq_email_usuario'], 0.75)
+        self.assertEqual(codificado.loc[1, 'freq_email_usuario'], 0.0)
+        self.assertEqual(codificado.loc[1, 'freq_tipo_evento'], 0.0)
+
+    def test_hash_deterministico_y_acotado(self):
+        """El hashing trick es estable y siempre cae dentro de las cubetas"""
+        serie = pd.Series(['a@x.com', 'b@x.com', 'a@x.com', None])
+        cubetas = hash_cubetas(serie, 16)
+        self.assertEqual(cubetas[0], cubetas[2])
+        self.assertTrue(((cubetas >= 0) & (cubetas < 16)).all())
+        self.assertTrue((cubetas == hash_cubetas(serie, 16)).all())
+
+    def test_bundle_incluye_codificador(self):
+        """El entrenamiento guarda modelo + codificador + features juntos"""
+        crear_eventos_prueba(60)
+        with tempfile.TemporaryDirectory() as dir_modelos, override_settings(ML_MODELS_DIR=dir_modelos):
+            ejecutar_deteccion_anomalias()
+            bundle = cargar_bundle()
+
+        self.assertIsInstance(bundle['codificador'], CodificadorEventos)
+        self.assertIn('freq_email_usuario', bundle['features'])
+        self.assertNotIn('email_usuario', bundle['features'])
+
+
+class PuntuacionIngestaTests(TestCase):
+    """
+        Tests para el scoring de eventos en la ingesta (SPRINT 7)
+    """
+
+    def setUp(self):
+        dir_modelos = tempfile.TemporaryDirectory()
+        self.addCleanup(dir_modelos.cleanup)
+        ajustes = override_settings(ML_MODELS_DIR=dir_modelos.name)
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+
+    def _evento_sospechoso(self):
+        return {
+            'timestamp': timezone.now().replace(hour=3, tzinfo=dt_timezone.utc),
+            'usuario': 'intruso@externo.com',
+            'accion': 'download',
+            'archivo_id': 'id_confidencial_123',
+            'archivo_titulo': 'financieros_2025.xlsx',
+            'ip': '118.99.8.1',
+            'detalles_json': {},
+        }
+
+    def test_sin_modelo_no_clasifica(self):
+        """Sin bundle entrenado los eventos quedan como normales"""
+        evento = EventoDeAcceso(email_usuario='a@x.com', tipo_evento='view', timestamp=timezone.now())
+        self.assertEqual(puntuar_eventos([evento]), 0)
+        self.assertFalse(evento.es_anomalia)
+
+    def test_severidad_por_score(self):
+        """Umbrales de severidad compartidos por detección e ingesta"""
+        self.assertEqual(calcular_severidad(0.8), 'CRITICA')
+        self.assertEqual(calcular_severidad(0.65), 'ALTA')
+        self.assertEqual(calcular_severidad(0.55), 'MEDIA')
+
+    def test_ingesta_online_escribe_anomalia_al_crear(self):
+        """El evento se inserta ya clasificado, sin esperar a 'Detectar IA'"""
+        crear_eventos_prueba(80)
+        ejecutar_deteccion_anomalias()
+
+        guardar_eventos_en_db([self._evento_sospechoso()])
+
+        evento = EventoDeAcceso.objects.get(email_usuario='intruso@externo.com')
+        self.assertTrue(evento.es_anomalia)
+        self.assertGreater(evento.anomaly_score, 0.5)
+        self.assertIn(evento.severidad, ['MEDIA', 'ALTA', 'CRITICA'])
+        self.assertTrue(evento.motivo_anomalia)
+
+    def test_bundle_incompatible_no_pierde_eventos(self):
+        """Si el scoring falla, el evento se guarda igual y queda sin clasificar"""
+        crear_eventos_prueba(80)
+        ejecutar_deteccion_anomalias()
+        bundle = cargar_bundle()
+        bundle['features'] = bundle['features'] + ['feature_eliminada']
+
+        with patch('monitoreo.puntuacion.obtener_bundle', return_value=bundle), \
+                self.assertLogs('monitoreo.puntuacion', level='ERROR'):
+            self.assertEqual(guardar_eventos_en_db([self._evento_sospechoso()]), 1)
+
+        evento = EventoDeAcceso.objects.get(email_usuario='intruso@externo.com')
+        self.assertFalse(evento.es_anomalia)
+
+    def test_ingesta_online_no_pisa_clasificacion_existente(self):
+        """Un evento repetido conserva la clasificación que ya tenía"""
+        crear_eventos_prueba(80)
+        ejecutar_deteccion_anomalias()
+        evento = self._evento_sospechoso()
+        guardar_eventos_en_db([evento])
+
+        EventoDeAcceso.objects.filter(email_usuario='intruso@externo.com').update(severidad='CRITICA')
+        guardar_eventos_en_db([evento])
+
+        self.assertEqual(EventoDeAcceso.objects.get(email_usuario='intruso@externo.com').severidad, 'CRITICA')
+
+
+class ReentrenamientoTests(TestCase):
+    """
+        Tests para el reentrenamiento programado (SPRINT 7)
+    """
+
+    def setUp(self):
+        dir_modelos = tempfile.TemporaryDirectory()
+        self.addCleanup(dir_modelos.cleanup)
+        ajustes = override_settings(ML_MODELS_DIR=dir_modelos.name)
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+        crear_eventos_prueba(120)
+
+    def test_muestra_reservorio_tamano_fijo(self):
+        """La muestra nunca supera el tamaño pedido y es reproducible"""
+        muestra = muestra_reservorio(range(10000), 100)
+        self.assertEqual(len(muestra), 100)
+        self.assertEqual(muestra, muestra_reservorio(range(10000), 100))
+        self.assertEqual(muestra_reservorio(range(5), 100), [0, 1, 2, 3, 4])
+
+    def test_indice_estabilidad(self):
+        """PSI ~0 con la misma distribución y alto si se desplaza"""
+        rng = np.random.default_rng(0)
+        base = rng.normal(0.4, 0.05, 5000)
+        referencia = np.percentile(base, list(range(0, 101, 10)))
+        self.assertLess(indice_estabilidad(referencia, rng.normal(0.4, 0.05, 5000)), 0.05)
+        self.assertGreater(indice_estabilidad(referencia, rng.normal(0.5, 0.05, 5000)), 0.25)
+
+    def test_sin_modelo_vigente_promueve(self):
+        """Sin modelo previo se entrena un bosque completo y se promueve"""
+        ejecucion = reentrenar_modelo(tamano_muestra=100)
+        self.assertTrue(ejecucion.promovido)
+        self.assertEqual(ejecucion.tipo, 'reentrenamiento')
+        self.assertEqual(ejecucion.total_eventos, 100)
+
+    def test_distribucion_estable_conserva_modelo(self):
+        """Con los mismos datos no hay deriva: se conserva la versión vigente"""
+        ejecutar_deteccion_anomalias()
+        version = cargar_bundle()['version']
+
+        ejecucion = reentrenar_modelo(umbral_psi=0.5)
+        self.assertFalse(ejecucion.promovido)
+        self.assertEqual(cargar_bundle()['version'], version)
+
+    def test_warm_start_mantiene_tamano_del_bosque(self):
+        """Se reemplazan árboles antiguos sin crecer el bosque"""
+        ejecutar_deteccion_anomalias()
+        arboles_previos = cargar_bundle()['modelo'].estimators_
+
+        reentrenar_modelo(arboles_nuevos=20, forzar=True)
+        modelo = cargar_bundle()['modelo']
+        self.assertEqual(len(modelo.estimators_), 100)
+        self.assertEqual(len(modelo._decision_path_lengths), 100)
+        # Los 80 árboles más recientes del modelo previo se conservan
+        self.assertEqual(
+            [a.tree_.node_count for a in modelo.estimators_[:80]],
+            [a.tree_.node_count for a in arboles_previos[20:]]
+        )
+
+    def test_combinar_no_modifica_el_modelo_vigente(self):
+        """Los árboles nuevos se entrenan aparte con el mismo max_samples"""
+        ejecutar_deteccion_anomalias()
+        vigente = cargar_bundle()['modelo']
+        X = pd.DataFrame(np.random.default_rng(0).random((300, vigente.n_features_in_)),
+                         columns=vigente.feature_names_in_)
+
+        combinado = reemplazar_arboles_antiguos(vigente, X, 20)
+        self.assertEqual(len(vigente.estimators_), 100)
+        self.assertEqual(combinado.max_samples_, vigente.max_samples_)
+        self.assertIs(combinado.estimators_[0], vigente.estimators_[20])
+        # Con menos filas que max_samples la normalización cambiaría: no se combinan
+        self.assertIsNone(reemplazar_arboles_antiguos(vigente, X[:vigente.max_samples_ - 1], 20))
+
+    def test_cada_reentrenamiento_usa_otra_semilla(self):
+        """Los árboles nuevos no repiten las particiones de la corrida anterior"""
+        from . import reentrenamiento
+        ejecutar_deteccion_anomalias()
+
+        with patch.object(reentrenamiento, 'reemplazar_arboles_antiguos',
+                          wraps=reentrenamiento.reemplazar_arboles_antiguos) as reemplazar:
+            reentrenar_modelo(forzar=True)
+            reentrenar_modelo(forzar=True)
+        semillas = [llamada.args[3] for llamada in reemplazar.call_args_list]
+        self.assertEqual(len(set(semillas)), 2)
+
+    def test_version_de_sklearn_fuera_de_rango_no_combina(self):
+        self.assertTrue(sklearn_combinable())
+        self.assertFalse(sklearn_combinable('1.2.2'))
+        self.assertFalse(sklearn_combinable('2.0.0'))
+        self.assertFalse(sklearn_combinable('dev'))
+
+        ejecutar_deteccion_anomalias()
+        vigente = cargar_bundle()['modelo']
+        X = pd.DataFrame(np.random.default_rng(0).random((300, vigente.n_features_in_)),
+                         columns=vigente.feature_names_in_)
+        with patch('monitoreo.reentrenamiento.VERSION_SKLEARN', '2.0.0'):
+            self.assertIsNone(reemplazar_arboles_antiguos(vigente, X, 20))
+
+    def test_features_distintas_reentrena_completo(self):
+        """Un bundle con otras columnas no rompe el reentrenamiento: se entrena desde cero"""
+        ejecutar_deteccion_anomalias()
+        bundle = cargar_bundle()
+        guardar_bundle(bundle['modelo'], bundle['codificador'], bundle['features'] + ['columna_retirada'],
+                       bundle['referencia_scores'])
+
+        ejecucion = reentrenar_modelo()
+        self.assertTrue(ejecucion.promovido)
+        self.assertNotIn('columna_retirada', cargar_bundle()['features'])
+
+    def test_registra_ejecucion_del_pipeline(self):
+        reentrenar_modelo(tamano_muestra=100)
+        ejecucion = EjecucionPipeline.objects.get(pipeline='reentrenamiento')
+        self.assertEqual(ejecucion.estado, EjecucionPipeline.OK)
+        self.assertEqual(ejecucion.eventos_vistos, 100)
+        self.assertIn('ml_entrenamiento', ejecucion.etapas.values_list('nombre', flat=True))
+
+
+class MotorPuntuacionTests(TestCase):
+    """
+        Tests para el motor de scoring de una sola pasada (SPRINT 7)
+    """
+
+    def setUp(self):
+        from sklearn.ensemble import IsolationForest
+        rng = np.random.default_rng(0)
+        self.X = rng.normal(size=(2000, 4))
+        self.modelo = IsolationForest(n_estimators=20, contamination=0.05, random_state=0).fit(self.X)
+
+    def test_equivale_a_predict_y_decision_function(self):
+        """Una sola pasada reproduce predict() y 0.5 - decision_function()"""
+        predicciones, scores = puntuar_matriz(self.modelo, self.X)
+        np.testing.assert_array_equal(predicciones, self.modelo.predict(self.X))
+        np.testing.assert_allclose(scores, 0.5 - self.modelo.decision_function(self.X))
+
+    def test_pool_de_procesos_mismo_resultado(self):
+        """Repartir la matriz entre procesos no cambia los scores"""
+        secuencial = puntuar_matriz(self.modelo, self.X)
+        paralelo = puntuar_matriz(self.modelo, self.X, n_procesos=2, umbral_paralelo=100)
+        np.testing.assert_array_equal(paralelo[0], secuencial[0])
+        np.testing.assert_allclose(paralelo[1], secuencial[1])
+
+    def test_workers_cargan_el_bundle_del_disco(self):
+        """Con archivo_modelo los workers cargan el bundle del disco en vez de una copia serializada"""
+        import joblib
+        with tempfile.TemporaryDirectory() as directorio:
+            archivo = os.path.join(directorio, 'bundle.pkl')
+            joblib.dump({'modelo': self.modelo, 'features': None}, archivo)
+            paralelo = puntuar_matriz(self.modelo, self.X, archivo_modelo=archivo, n_procesos=2, umbral_paralelo=100)
+        np.testing.assert_array_equal(paralelo[0], self.modelo.predict(self.X))
+        np.testing.assert_allclose(paralelo[1], 0.5 - self.modelo.decision_function(self.X))
+
+    def test_fragmento_conserva_nombres_de_features(self):
+        """Un modelo entrenado con DataFrame puntúa los fragmentos sin avisos de feature names"""
+        import warnings
+        from sklearn.ensemble import IsolationForest
+        from . import motor_puntuacion
+
+        columnas = [f'f{i}' for i in range(self.X.shape[1])]
+        modelo = IsolationForest(n_estimators=10, random_state=0).fit(pd.DataFrame(self.X, columns=columnas))
+        with tempfile.TemporaryDirectory() as directorio, patch.object(motor_puntuacion, '_MODELO_WORKER', modelo):
+            archivo = os.path.join(directorio, 'matriz.npy')
+            np.save(archivo, self.X)
+            with warnings.catch_warnings():
+                warnings.simplefilter('error')
+                scores = motor_puntuacion._puntuar_fragmento((archivo, 0, 50))
+        np.testing.assert_allclose(scores, modelo.score_samples(pd.DataFrame(self.X[:50], columns=columnas)))
+
+    @override_settings(ML_SCORING_PROCESOS=2, ML_SCORING_UMBRAL_PARALELO=1)
+    def test_ingesta_paralela_usa_el_modelo_cargado(self):
+        """Si el bundle en disco cambia durante la corrida, los workers siguen usando el modelo cargado"""
+        from sklearn.ensemble import IsolationForest
+        from . import puntuacion
+        with tempfile.TemporaryDirectory() as directorio, override_settings(ML_MODELS_DIR=directorio):
+            crear_eventos_prueba(120)
+            ejecutar_deteccion_anomalias()
+            bundle = cargar_bundle()
+            eventos = list(EventoDeAcceso.objects.all())
+            esperado = puntuar_eventos(eventos)
+
+            # Otro modelo promovido en disco: el bundle en memoria sigue siendo el anterior
+            otro = IsolationForest(n_estimators=5, random_state=1).fit(
+                np.random.default_rng(1).random((50, len(bundle['features']))))
+            guardar_bundle(otro, bundle['codificador'], bundle['features'])
+            with patch.object(puntuacion, 'obtener_bundle', return_value=bundle), \
+                    patch.dict(puntuacion._BUNDLE_CACHE, ruta=os.path.join(directorio, 'isolation_forest.pkl')):
+                self.assertEqual(puntuar_eventos(eventos), esperado)
+
+
+class CacheSistemaTests(TestCase):
+    """
+        Tests para la capa de caché con espacios de nombres (SPRINT 7)
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def test_invalidar_cambia_solo_su_espacio(self):
+        cache_sistema.guardar(cache_sistema.DASHBOARD, 'kpis', valor={'total_eventos': 1})
+        cache_sistema.guardar(cache_sistema.ALERTAS, 'x', valor=True)
+
+        cache_sistema.invalidar(cache_sistema.DASHBOARD)
+
+        self.assertIsNone(cache_sistema.obtener(cache_sistema.DASHBOARD, 'kpis'))
+        self.assertTrue(cache_sistema.obtener(cache_sistema.ALERTAS, 'x'))
+
+    def test_marcar_una_vez(self):
+        self.assertTrue(cache_sistema.marcar_una_vez(cache_sistema.ALERTAS, 'email', 7, timeout=60))
+        self.assertFalse(cache_sistema.marcar_una_vez(cache_sistema.ALERTAS, 'email', 7, timeout=60))
+
+    def test_marcas_y_contadores_en_bd_con_cache_de_archivos(self):
+        """Con FileBasedCache las operaciones atómicas van a la tabla ContadorCompartido"""
+        from usuarios.models import ContadorCompartido
+
+        with patch('system_core.cache._atomico', return_value=False):
+            self.assertTrue(cache_sistema.marcar_una_vez(cache_sistema.ALERTAS, 'email', 7, timeout=60))
+            self.assertFalse(cache_sistema.marcar_una_vez(cache_sistema.ALERTAS, 'email', 7, timeout=60))
+
+            self.assertEqual([cache_sistema.incrementar_contador('fallos', 60) for _ in range(3)], [1, 2, 3])
+            self.assertEqual(cache_sistema.leer_contadores(['fallos', 'otro']), {'fallos': 3})
+
+            # Vencida la ventana, el contador vuelve a empezar
+            ContadorCompartido.objects.update(expira=timezone.now() - timedelta(seconds=1))
+            self.assertEqual(cache_sistema.leer_contadores(['fallos']), {})
+            self.assertEqual(cache_sistema.incrementar_contador('fallos', 60), 1)
+            self.assertTrue(cache_sistema.marcar_una_vez(cache_sistema.ALERTAS, 'email', 7, timeout=60))
+
+            cache_sistema.borrar_contador('fallos')
+            self.assertEqual(cache_sistema.leer_contadores(['fallos']), {})
+
+    def test_kpis_dashboard_cacheados_e_invalidados_en_ingesta(self):
+        crear_eventos_prueba(5)
+        calcular = lambda: cache_sistema.obtener_o_calcular(
+            cache_sistema.DASHBOARD, 'kpis', calcular=calcular_kpis_dashboard)
+
+        self.assertEqual(calcular()['total_eventos'], 5)
+        with self.assertNumQueries(0):
+            self.assertEqual(calcular()['total_eventos'], 5)
+
+        CargarJsonCommand()._guardar_lote([
+            EventoDeAcceso(id_evento_google='etl_nuevo', email_usuario='etl@empresa.com',
+                           tipo_evento='view', archivo_id='f', nombre_archivo='f.txt',
+                           direccion_ip='10.0.0.1', timestamp=timezone.now())
+        ])
+        self.assertEqual(calcular()['total_eventos'], 6)
+
+
+class ArranqueTests(TestCase):
+    """
+        Tests del tiempo de arranque: dependencias pesadas solo bajo demanda (SPRINT 7)
+    """
+
+    def test_check_en_frio_no_carga_modulos_pesados(self):
+        from .management.commands.benchmark_importacion import MODULOS_PESADOS, medir_check_en_frio
+
+        _, modulos = medir_check_en_frio()
+        self.assertIn('django', modulos)
+        self.assertFalse(set(MODULOS_PESADOS) & modulos)
+
+
+class WorkerMLTests(TestCase):
+    """
+        Tests para la cola del worker de ML dedicado (SPRINT 7)
+    """
+
+    def setUp(self):
+        dir_modelos = tempfile.TemporaryDirectory()
+        self.addCleanup(dir_modelos.cleanup)
+        ajustes = override_settings(ML_MODELS_DIR=dir_modelos.name, ML_WORKER_DEDICADO=True)
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+
+        self.usuario = UsuarioPersonalizado.objects.create_user(username='analista', password='clave12345')
+        self.client.force_login(self.usuario)
+
+    def test_vista_encola_sin_ejecutar(self):
+        """Con worker dedicado la vista responde 202 y no corre la detección"""
+        response = self.client.post(reverse('monitoreo:api_detectar'))
+        self.assertEqual(response.status_code, 202)
+
+        # Un segundo clic reutiliza la solicitud pendiente
+        repetida = self.client.post(reverse('monitoreo:api_detectar'))
+        self.assertEqual(repetida.json()['solicitud_id'], response.json()['solicitud_id'])
+        self.assertEqual(SolicitudProcesamiento.objects.count(), 1)
+        self.assertFalse(EjecucionModelo.objects.exists())
+
+        estado = self.client.get(response.json()['estado_url']).json()
+        self.assertEqual(estado['estado'], SolicitudProcesamiento.PENDIENTE)
+        self.assertFalse(estado['terminada'])
+
+    def test_worker_procesa_deteccion(self):
+        crear_eventos_prueba(100)
+        solicitud = encolar('deteccion')
+
+        self.assertEqual(procesar_pendientes(), 1)
+
+        solicitud.refresh_from_db()
+        self.assertEqual(solicitud.estado, SolicitudProcesamiento.COMPLETADA)
+        self.assertGreater(solicitud.resultado['anomalias'], 0)
+        self.assertIsNotNone(cargar_bundle())
+
+        estado = self.client.get(reverse('monitoreo:api_estado_solicitud', args=[solicitud.pk])).json()
+        self.assertTrue(estado['terminada'])
+        self.assertTrue(estado['success'])
+
+    def test_error_queda_registrado_y_se_recuperan_interrumpidas(self):
+        fallida = encolar('deteccion')
+        SolicitudProcesamiento.objects.filter(pk=fallida.pk).update(tipo='desconocida')
+        interrumpida = SolicitudProcesamiento.objects.create(
+            tipo='sincronizacion', estado=SolicitudProcesamiento.EN_PROCESO)
+
+        procesar_pendientes()
+        fallida.refresh_from_db()
+        self.assertEqual(fallida.estado, SolicitudProcesamiento.ERROR)
+
+        self.assertEqual(recuperar_interrumpidas(), 1)
+        interrumpida.refresh_from_db()
+        self.assertEqual(interrumpida.estado, SolicitudProcesamiento.PENDIENTE)
+
+    def test_no_se_recuperan_solicitudes_de_otro_worker_vivo(self):
+        en_curso = SolicitudProcesamiento.objects.create(
+            tipo='deteccion', estado=SolicitudProcesamiento.EN_PROCESO, fecha_inicio=timezone.now())
+        colgada = SolicitudProcesamiento.objects.create(
+            tipo='deteccion', estado=SolicitudProcesamiento.EN_PROCESO,
+            fecha_inicio=timezone.now() - timedelta(seconds=settings.ML_WORKER_TIMEOUT_SOLICITUD + 60))
+
+        self.assertEqual(recuperar_interrumpidas(), 1)
+        en_curso.refresh_from_db()
+        colgada.refresh_from_db()
+        self.assertEqual(en_curso.estado, SolicitudProcesamiento.EN_PROCESO)
+        self.assertEqual(colgada.estado, SolicitudProcesamiento.PENDIENTE)
+
+
+class PerfilSQLiteTests(TestCase):
+    """
+        Tests del perfil de conexión de SQLite (SPRINT 7)
+    """
+
+    def test_pragmas_aplicados_en_la_conexion(self):
+        from .management.commands.benchmark_concurrencia import leer_pragmas
+
+        pragmas = leer_pragmas()
+        self.assertEqual(pragmas['synchronous'], 1)  # NORMAL
+        self.assertEqual(pragmas['busy_timeout'], 20000)
+        self.assertEqual(pragmas['cache_size'], -65536)
+
+
+class IngestaCopyTests(TestCase):
+    """
+        Tests de la ingesta por COPY + ON CONFLICT (SPRINT 7).
+        Los de COPY corren solo contra PostgreSQL (POSTGRES_DB=... python manage.py test).
+    """
+
+    def _evento(self, id_evento, **extra):
+        datos = dict(id_evento_google=id_evento, email_usuario='copy@empresa.com', tipo_evento='view',
+                     archivo_id='f1', nombre_archivo='f1.txt', direccion_ip='10.0.0.1',
+                     timestamp=timezone.now())
+        datos.update(extra)
+        return EventoDeAcceso(**datos)
+
+    def test_ip_valida(self):
+        self.assertEqual(ip_valida('10.0.0.1'), '10.0.0.1')
+        self.assertEqual(ip_valida('N/A'), '0.0.0.0')
+        self.assertIsNone(ip_valida(None))
+
+    @skipUnless(connection.vendor == 'sqlite', 'Ruta de respaldo SQLite')
+    def test_sqlite_usa_bulk_create(self):
+        self.assertFalse(usar_copy())
+
+    @skipUnless(connection.vendor == 'postgresql', 'Requiere PostgreSQL')
+    def test_copy_ignora_existentes_y_actualiza(self):
+        existente = self._evento('copy_1', es_anomalia=True, severidad='ALTA')
+        existente.save()
+
+        insertados, actualizados = copiar_eventos([self._evento('copy_1'), self._evento('copy_2')])
+        self.assertEqual([e.id_evento_google for e in insertados], ['copy_2'])
+        self.assertIsNotNone(insertados[0].pk)
+        self.assertEqual(actualizados, 0)
+
+        insertados, actualizados = copiar_eventos(
+            [self._evento('copy_1', nombre_archivo='renombrado.txt', direccion_ip='N/A')], actualizar=True)
+        self.assertEqual((len(insertados), actualizados), (0, 1))
+
+        existente.refresh_from_db()
+        self.assertEqual(existente.nombre_archivo, 'renombrado.txt')
+        # Las marcas de anomalía no se pisan al actualizar
+        self.assertTrue(existente.es_anomalia)
+
+
+class HuellaEventoTests(TestCase):
+    """
+        Tests de la clave de deduplicación de 64 bits (SPRINT 7)
+    """
+
+    def test_huella_determinista_y_de_64_bits(self):
+        huella = huella_evento('abc123')
+        self.assertEqual(huella, huella_evento('abc123'))
+        self.assertNotEqual(huella, huella_evento('abc124'))
+        self.assertTrue(-2**63 <= huella < 2**63)
+
+    def test_save_completa_la_huella(self):
+        evento = EventoDeAcceso.objects.create(
+            id_evento_google='id_con_huella', email_usuario='h@empresa.com', tipo_evento='view',
+            timestamp=timezone.now())
+        self.assertEqual(evento.huella, huella_evento('id_con_huella'))
+
+    def test_online_y_offline_mismo_id(self):
+        """El mismo instante en UTC (API de Google) y en hora de Caracas (JSON) da el mismo ID"""
+        online = datetime.fromisoformat('2025-03-10T14:30:00.000Z'.replace('Z', '+00:00'))
+        offline = pytz.timezone('America/Caracas').localize(datetime(2025, 3, 10, 10, 30))
+        self.assertEqual(id_evento(online, 'a@empresa.com', 'f1', 'view'),
+                         id_evento(offline, 'a@empresa.com', 'f1', 'view'))
+        self.assertEqual(timestamp_canonico('2025-03-10T14:30:00Z'), timestamp_canonico(offline))
+        self.assertNotEqual(id_evento(online, 'a@empresa.com', 'f1', 'view'),
+                            id_evento(online, 'a@empresa.com', 'f1', 'edit'))
+
+    def test_ids_por_lote_iguales_a_los_individuales(self):
+        """La vía vectorizada (columna datetime64 de pandas) coincide con la de datetimes sueltos"""
+        fechas = [timezone.now() - timedelta(minutes=7 * i) for i in range(50)]
+        emails = [f'u{i % 3}@empresa.com' for i in range(50)]
+        archivos = [f'f{i}' for i in range(50)]
+        acciones = ['view'] * 50
+        individuales = [id_evento(*fila) for fila in zip(fechas, emails, archivos, acciones)]
+        self.assertEqual(ids_eventos(fechas, emails, archivos, acciones), individuales)
+        self.assertEqual(ids_eventos(pd.Series(fechas), emails, archivos, acciones), individuales)
+
+    def test_etl_asigna_ids_por_lote(self):
+        momento = timezone.now()
+        evento = EventoDeAcceso(email_usuario='l@empresa.com', tipo_evento='view', archivo_id='f9',
+                                nombre_archivo='f9.txt', direccion_ip='10.0.0.1', timestamp=momento)
+        CargarJsonCommand()._guardar_lote([evento])
+        guardado = EventoDeAcceso.objects.get(email_usuario='l@empresa.com')
+        self.assertEqual(guardado.id_evento_google, id_evento(momento, 'l@empresa.com', 'f9', 'view'))
+        self.assertEqual(guardado.huella, huella_evento(guardado.id_evento_google))
+
+    def test_etl_deduplica_por_huella(self):
+        def lote():
+            return [EventoDeAcceso(id_evento_google='etl_dup', email_usuario='d@empresa.com',
+                                   tipo_evento='view', archivo_id='f', nombre_archivo='f.txt',
+                                   direccion_ip='10.0.0.1', timestamp=timezone.now())]
+
+        CargarJsonCommand()._guardar_lote(lote())
+        CargarJsonCommand()._guardar_lote(lote())
+        self.assertEqual(EventoDeAcceso.objects.filter(huella=huella_evento('etl_dup')).count(), 1)
+
+
+class DimensionesTests(TestCase):
+    """
+        Tests de las dimensiones actor / archivo / IP (SPRINT 7)
+    """
+
+    def setUp(self):
+        # captureOnCommitCallbacks ejecuta los on_commit aunque el test se revierta
+        cache_dimensiones.limpiar()
+        self.addCleanup(cache_dimensiones.limpiar)
+
+    def _evento(self, **kwargs):
+        datos = dict(email_usuario='dim@empresa.com', tipo_evento='view', archivo_id='f1',
+                     nombre_archivo='informe.pdf', direccion_ip='10.0.0.1', timestamp=timezone.now())
+        datos.update(kwargs)
+        return EventoDeAcceso(**datos)
+
+    def test_save_enlaza_dimensiones_sin_duplicar(self):
+        primero = self._evento(id_evento_google='d1')
+        primero.save()
+        segundo = self._evento(id_evento_google='d2', direccion_ip='10.0.0.2')
+        segundo.save()
+
+        self.assertEqual(primero.dim_actor_id, segundo.dim_actor_id)
+        self.assertEqual(primero.dim_archivo.nombre, 'informe.pdf')
+        self.assertNotEqual(primero.dim_ip_id, segundo.dim_ip_id)
+        self.assertEqual(Actor.objects.count(), 1)
+        self.assertEqual(Archivo.objects.count(), 1)
+        self.assertEqual(DireccionIP.objects.count(), 2)
+
+    def test_valores_conocidos_no_consultan_la_bd(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            asignar_dimensiones([self._evento()])
+
+        repetidos = [self._evento() for _ in range(10)]
+        with self.assertNumQueries(0):
+            asignar_dimensiones(repetidos)
+        self.assertTrue(all(e.dim_actor_id and e.dim_archivo_id and e.dim_ip_id for e in repetidos))
+
+    def test_sin_commit_la_cache_no_aprende(self):
+        """Si la transacción se revierte no deben quedar pks inexistentes en memoria"""
+        asignar_dimensiones([self._evento()])
+        with self.assertNumQueries(3):
+            asignar_dimensiones([self._evento()])
+
+    def test_archivo_nulo_sin_dimension(self):
+        evento = self._evento(id_evento_google='d3', archivo_id=None)
+        evento.save()
+        self.assertIsNone(evento.dim_archivo_id)
+        self.assertIsNotNone(evento.dim_actor_id)
+
+    def test_loader_ml_traduce_codigos(self):
+        crear_eventos_prueba(5)
+        df = pd.DataFrame(list(EventoDeAcceso.objects.values('id', *COLUMNAS_CODIGOS)))
+        df = decodificar_dimensiones(df)
+        esperado = dict(EventoDeAcceso.objects.values_list('id', 'email_usuario'))
+        self.assertEqual(dict(zip(df['id'], df['email_usuario'])), esperado)
+        esperado_ip = dict(EventoDeAcceso.objects.values_list('id', 'direccion_ip'))
+        self.assertEqual(dict(zip(df['id'], df['direccion_ip'])), esperado_ip)
+
+    def test_etl_asigna_dimensiones(self):
+        CargarJsonCommand()._guardar_lote([self._evento(id_evento_google='etl_dim')])
+        guardado = EventoDeAcceso.objects.get(id_evento_google='etl_dim')
+        self.assertEqual(guardado.dim_actor.email, 'dim@empresa.com')
+        self.assertEqual(guardado.dim_ip.ip, '10.0.0.1')
+
+
+class ResumenesTests(TestCase):
+    """
+        Tests de los resúmenes pre-agregados y la API de tendencias (SPRINT 7)
+    """
+
+    def setUp(self):
+        self.usuario = UsuarioPersonalizado.objects.create_user(username='analista', password='clave12345')
+        self.client.force_login(self.usuario)
+
+    def _filas(self, modelo):
+        return sorted(modelo.objects.values_list('periodo', 'actor', 'tipo_evento', 'severidad', 'archivo',
+                                                 'total', 'anomalias'))
+
+    def test_acumular_suma_en_la_misma_clave(self):
+        eventos = crear_eventos_prueba(30)
+        acumular_resumenes(eventos[:10])
+        acumular_resumenes(eventos[10:])
+
+        self.assertEqual(sum(ResumenHora.objects.values_list('total', flat=True)), 30)
+        self.assertEqual(sum(ResumenDia.objects.values_list('total', flat=True)), 30)
+        # Incremental y reconstruido desde cero dan lo mismo
+        incremental = (self._filas(ResumenHora), self._filas(ResumenDia))
+        recalcular_resumenes()
+        self.assertEqual((self._filas(ResumenHora), self._filas(ResumenDia)), incremental)
+
+    def test_recalcular_ventana_refleja_anomalias(self):
+        eventos = crear_eventos_prueba(10)
+        acumular_resumenes(eventos)
+        EventoDeAcceso.objects.filter(pk=eventos[0].pk).update(es_anomalia=True, severidad='ALTA')
+
+        recalcular_resumenes(desde=timezone.now() - timedelta(days=30))
+        self.assertEqual(sum(ResumenDia.objects.values_list('anomalias', flat=True)), 1)
+        self.assertEqual(ResumenDia.objects.filter(severidad='ALTA').count(), 1)
+        self.assertEqual(sum(ResumenDia.objects.values_list('total', flat=True)), 10)
+
+    def test_dias_cortados_en_la_zona_del_proyecto(self):
+        """Un evento a las 02:00 UTC es del día anterior en America/Caracas (UTC-4)"""
+        momento = datetime(2025, 3, 10, 2, 30, tzinfo=dt_timezone.utc)
+        EventoDeAcceso.objects.create(email_usuario='tz@empresa.com', tipo_evento='view',
+                                      id_evento_google='tz_1', timestamp=momento)
+        acumular_resumenes(EventoDeAcceso.objects.all())
+        self.assertEqual(ResumenDia.objects.get().periodo, date(2025, 3, 9))
+        self.assertEqual(ResumenHora.objects.get().periodo, momento.replace(minute=0))
+
+        # El recálculo de una ventana corta igual
+        recalcular_resumenes(desde=momento)
+        self.assertEqual(ResumenDia.objects.get().periodo, date(2025, 3, 9))
+        self.assertEqual(ResumenDia.objects.get().total, 1)
+
+    def test_insertar_eventos_retorna_solo_los_insertados(self):
+        """Un evento que otro proceso cargó entre medio no se cuenta en perfiles ni resúmenes"""
+        evento = lambda id_google: EventoDeAcceso(email_usuario='r@empresa.com', tipo_evento='view',
+                                                  id_evento_google=id_google, timestamp=timezone.now())
+        EventoDeAcceso.objects.create(email_usuario='r@empresa.com', tipo_evento='view',
+                                      id_evento_google='carrera_1', timestamp=timezone.now())
+
+        insertados = insertar_eventos([evento('carrera_1'), evento('carrera_2')])
+
+        self.assertEqual([e.id_evento_google for e in insertados], ['carrera_2'])
+        self.assertEqual(insertados[0].pk, EventoDeAcceso.objects.get(id_evento_google='carrera_2').pk)
+        self.assertEqual(EventoDeAcceso.objects.count(), 2)
+
+    def test_etl_actualiza_resumenes(self):
+        CargarJsonCommand()._guardar_lote([
+            EventoDeAcceso(email_usuario='r@empresa.com', tipo_evento='view', archivo_id='f',
+                           nombre_archivo='f.txt', direccion_ip='10.0.0.1', timestamp=timezone.now())
+        ])
+        self.assertEqual(ResumenHora.objects.get().total, 1)
+
+    def test_api_tendencias_por_tipo(self):
+        acumular_resumenes(crear_eventos_prueba(30))
+        response = self.client.get(reverse('monitoreo:api_tendencias'), {'granularidad': 'hora', 'agrupar': 'tipo'})
+        self.assertEqual(response.status_code, 200)
+
+        datos = response.json()
+        self.assertEqual({s['clave'] for s in datos['series']}, {'view', 'edit', 'download'})
+        self.assertEqual(sum(sum(s['total']) for s in datos['series']), 30)
+        self.assertTrue(all(len(s['total']) == len(datos['periodos']) for s in datos['series']))
+
+    def test_api_tendencias_por_usuario_con_etiquetas(self):
+        acumular_resumenes(crear_eventos_prueba(10))
+        response = self.client.get(reverse('monitoreo:api_tendencias'), {'agrupar': 'usuario'})
+        claves = {s['clave'] for s in response.json()['series']}
+        self.assertEqual(claves, {f'usuario{i}@example.com' for i in range(5)})
+
+    def test_api_tendencias_no_lee_eventos(self):
+        acumular_resumenes(crear_eventos_prueba(10))
+        with CaptureQueriesContext(connection) as consultas:
+            self.client.get(reverse('monitoreo:api_tendencias'))
+        self.assertFalse(any('monitoreo_eventodeacceso' in q['sql'] for q in consultas.captured_queries))
+
+    def test_api_tendencias_parametros_invalidos(self):
+        url = reverse('monitoreo:api_tendencias')
+        self.assertEqual(self.client.get(url, {'granularidad': 'minuto'}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'dias': 'muchos'}).status_code, 400)
+
+
+class AuditoriaConsultasTests(TestCase):
+    """SPRINT 7: índices según las consultas del dashboard / admin / ML"""
+
+    def setUp(self):
+        crear_eventos_prueba(20)
+
+    def plan(self, queryset):
+        return ' '.join(plan_consulta(*queryset.query.sql_with_params()))
+
+    def test_anomalias_recientes_usan_indice_parcial(self):
+        plan = self.plan(EventoDeAcceso.objects.filter(es_anomalia=True).order_by('-timestamp')[:20])
+        self.assertIn('idx_anomalias_recientes', plan)
+        self.assertNotIn('TEMP B-TREE', plan)
+
+    def test_filtro_por_tipo_ordenado_sin_ordenar_en_memoria(self):
+        plan = self.plan(EventoDeAcceso.objects.filter(tipo_evento='download').order_by('-timestamp')[:20])
+        self.assertIn('idx_tipo_time', plan)
+        self.assertNotIn('TEMP B-TREE', plan)
+
+    def test_comando_sin_alertas_y_salida_json(self):
+        with tempfile.TemporaryDirectory() as carpeta:
+            salida = os.path.join(carpeta, 'auditoria.json')
+            call_command('auditar_consultas', repeticiones=1, fallar_con_alertas=True,
+                         salida=salida, stdout=StringIO())
+            with open(salida) as f:
+                resultado = json.load(f)
+        self.assertEqual(resultado['eventos'], 20)
+        self.assertIn('ml_ventana_180_dias', resultado['escenarios'])
+
+
+class TransmisionEnVivoTests(TestCase):
+    """
+        Tests del flujo en vivo del dashboard por Server-Sent Events (SPRINT 7)
+    """
+
+    def setUp(self):
+        cache.clear()
+        crear_eventos_prueba(10)
+        self.revisor = RevisorCambios()
+        self.revisor.iniciar()
+
+    def test_sin_cambios_no_consulta_la_bd(self):
+        with self.assertNumQueries(0):
+            self.assertEqual(self.revisor.revisar(), [])
+
+    def test_eventos_nuevos_y_delta_de_kpis(self):
+        nuevos = crear_eventos_prueba(3, prefijo='nuevo')
+        cache_sistema.invalidar(cache_sistema.DASHBOARD)
+
+        mensajes = dict(self.revisor.revisar())
+        self.assertEqual({e['id'] for e in mensajes['eventos']['eventos']}, {e.pk for e in nuevos})
+        self.assertEqual(mensajes['kpis']['delta'], {'total_eventos': 3, 'eventos_normales': 3})
+        self.assertNotIn('anomalias', mensajes)
+
+        # Lo ya enviado no se repite
+        self.assertEqual(self.revisor.revisar(forzar=True), [])
+
+    def test_anomalias_nuevas(self):
+        evento = EventoDeAcceso.objects.order_by('id').first()
+        EventoDeAcceso.objects.filter(pk=evento.pk).update(es_anomalia=True, severidad='CRITICA')
+        cache_sistema.invalidar(cache_sistema.DASHBOARD)
+
+        mensajes = dict(self.revisor.revisar())
+        self.assertEqual([a['id'] for a in mensajes['anomalias']['anomalias']], [evento.pk])
+        self.assertEqual(mensajes['kpis']['delta']['anomalias_criticas'], 1)
+
+    async def test_un_productor_reparte_a_todos_los_clientes(self):
+        transmisor = Transmisor()
+        colas = [transmisor.suscribir() for _ in range(3)]
+        tarea = transmisor._tarea
+        self.assertEqual(transmisor.clientes, 3)
+
+        transmisor.publicar('kpis', {'delta': {'total_eventos': 1}})
+        mensajes = [cola.get_nowait() for cola in colas]
+        self.assertEqual(len(set(mensajes)), 1)
+        self.assertTrue(mensajes[0].startswith('event: kpis\ndata: '))
+
+        for cola in colas:
+            transmisor.desuscribir(cola)
+        tarea.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await tarea
+
+    async def test_cliente_lento_se_desconecta(self):
+        transmisor = Transmisor()
+        cola = transmisor.suscribir()
+        transmisor._tarea.cancel()
+        for i in range(cola.maxsize + 1):
+            transmisor.publicar('eventos', {'i': i})
+        self.assertEqual(transmisor.clientes, 0)
+        self.assertIsNone(cola.get_nowait())
+
+    def test_requiere_login(self):
+        response = self.client.get(reverse('monitoreo:api_transmision'))
+        self.assertEqual(response.status_code, 302)
+
+    def test_bajo_wsgi_responde_204(self):
+        """Con el cliente sync (WSGI) no se abre un flujo infinito"""
+        usuario = UsuarioPersonalizado.objects.create_user(username='monitor_wsgi', password='clave12345')
+        self.client.force_login(usuario)
+        response = self.client.get(reverse('monitoreo:api_transmision'))
+        self.assertEqual(response.status_code, 204)
+        self.assertFalse(response.streaming)
+
+    async def test_flujo_envia_kpis_iniciales(self):
+        usuario = await UsuarioPersonalizado.objects.acreate(username='monitor')
+        cliente = AsyncClient()
+        await cliente.aforce_login(usuario)
+
+        response = await cliente.get(reverse('monitoreo:api_transmision'))
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        flujo = aiter(response.streaming_content)
+        self.assertTrue((await anext(flujo)).startswith(b'retry: '))
+        self.assertIn(b'"total_eventos": 10', await anext(flujo))
+        await flujo.aclose()
+
+
+class ApiLecturaTests(TestCase):
+    """
+        Tests de la API de lectura JSON (eventos / anomalías) para herramientas externas (SPRINT 7)
+    """
+
+    def setUp(self):
+        self.auditor = UsuarioPersonalizado.objects.create_user(
+            username='siem', password='clave12345', rol=Role.objects.get(nombre='auditor'))
+        self.client.force_login(self.auditor)
+        crear_eventos_prueba(20)
+        # Empates de timestamp: el id desempata el orden de la paginación
+        momento = timezone.now() - timedelta(minutes=30)
+        EventoDeAcceso.objects.bulk_create([
+            EventoDeAcceso(id_evento_google=f'empate_{i}', email_usuario='empate@example.com',
+                           direccion_ip='10.0.0.1', timestamp=momento, archivo_id='f', tipo_evento='view')
+            for i in range(5)
+        ])
+
+    def test_paginacion_por_cursor_recorre_todo_sin_repetir(self):
+        url, vistos = reverse('monitoreo:api_eventos'), []
+        params = {'limite': 7, 'campos': 'id,timestamp'}
+        while url:
+            datos = self.client.get(url, params).json()
+            vistos.extend(datos['resultados'])
+            url, params = datos['siguiente'], None
+
+        self.assertEqual(len(vistos), 25)
+        self.assertEqual(len({e['id'] for e in vistos}), 25)
+        esperado = list(EventoDeAcceso.objects.order_by('-timestamp', '-id').values_list('id', flat=True))
+        self.assertEqual([e['id'] for e in vistos], esperado)
+
+    def test_seleccion_de_campos(self):
+        datos = self.client.get(reverse('monitoreo:api_eventos'), {'campos': 'email_usuario,severidad'}).json()
+        self.assertEqual(set(datos['resultados'][0]), {'email_usuario', 'severidad'})
+        self.assertNotIn('detalles', self.client.get(reverse('monitoreo:api_eventos')).json()['resultados'][0])
+
+        response = self.client.get(reverse('monitoreo:api_eventos'), {'campos': 'password'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_filtros_del_dashboard_y_rango_de_fechas(self):
+        desde = (timezone.now() - timedelta(hours=5, minutes=30)).isoformat()
+        datos = self.client.get(reverse('monitoreo:api_eventos'), {'tipo': 'view', 'desde': desde}).json()
+        esperado = EventoDeAcceso.objects.filter(tipo_evento='view', timestamp__gte=desde).count()
+        self.assertEqual(datos['cantidad'], esperado)
+        self.assertTrue(all(e['tipo_evento'] == 'view' for e in datos['resultados']))
+
+        self.assertEqual(self.client.get(reverse('monitoreo:api_eventos'), {'desde': 'ayer'}).status_code, 400)
+        self.assertEqual(self.client.get(reverse('monitoreo:api_eventos'), {'cursor': 'x'}).status_code, 400)
+
+    def test_anomalias_solo_devuelve_anomalias(self):
+        EventoDeAcceso.objects.filter(id_evento_google='evt_3').update(es_anomalia=True, severidad='ALTA')
+        datos = self.client.get(reverse('monitoreo:api_anomalias')).json()
+        self.assertEqual([e['id_evento_google'] for e in datos['resultados']], ['evt_3'])
+
+    def test_etag_y_get_condicional(self):
+        url = reverse('monitoreo:api_eventos')
+        response = self.client.get(url, {'limite': 5})
+        self.assertEqual(response.status_code, 200)
+
+        response = self.client.get(url, {'limite': 5}, headers={'if-none-match': response['ETag']})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+
+        # Un cambio en los datos cambia el ETag
+        EventoDeAcceso.objects.filter(id_evento_google='evt_0').update(severidad='CRITICA')
+        response = self.client.get(url, {'limite': 5}, headers={'if-none-match': response['ETag']})
+        self.assertEqual(response.status_code, 200)
+
+    def test_permisos_por_recurso(self):
+        visor = UsuarioPersonalizado.objects.create_user(
+            username='visor', password='clave12345', rol=Role.objects.get(nombre='viewer'))
+        self.client.force_login(visor)
+        # El rol viewer ve anomalías pero no el registro completo de eventos
+        self.assertEqual(self.client.get(reverse('monitoreo:api_anomalias')).status_code, 200)
+        self.assertEqual(self.client.get(reverse('monitoreo:api_eventos')).status_code, 302)
+
+
+class ExportacionTests(TestCase):
+    """
+        Tests de la exportación NDJSON / CSV por streaming (SPRINT 7)
+    """
+
+    def setUp(self):
+        self.auditor = UsuarioPersonalizado.objects.create_user(
+            username='auditor_export', password='clave12345', rol=Role.objects.get(nombre='auditor'))
+        self.client.force_login(self.auditor)
+        crear_eventos_prueba(30)
+        self.url = reverse('monitoreo:exportar_eventos')
+
+    def test_ndjson_con_filtros_y_campos(self):
+        response = self.client.get(self.url, {'tipo': 'edit', 'campos': 'id,timestamp,tipo_evento'})
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+
+        filas = [json.loads(linea) for linea in b''.join(response.streaming_content).decode().splitlines()]
+        self.assertEqual(len(filas), EventoDeAcceso.objects.filter(tipo_evento='edit').count())
+        self.assertTrue(all(set(f) == {'id', 'timestamp', 'tipo_evento'} and f['tipo_evento'] == 'edit'
+                            for f in filas))
+        # Orden cronológico
+        self.assertEqual([f['timestamp'] for f in filas], sorted(f['timestamp'] for f in filas))
+
+    def test_csv_comprimido(self):
+        response = self.client.get(self.url, {'formato': 'csv', 'gzip': '1'})
+        self.assertEqual(response['Content-Type'], 'application/gzip')
+        self.assertIn('.csv.gz', response['Content-Disposition'])
+
+        filas = list(csv.reader(StringIO(gzip.decompress(b''.join(response.streaming_content)).decode())))
+        self.assertEqual(filas[0], CAMPOS_API_DEFECTO)
+        self.assertEqual(len(filas), 31)
+
+    def test_csv_neutraliza_formulas(self):
+        """Un nombre de archivo de Drive como '=HYPERLINK(...)' no se ejecuta al abrir el CSV"""
+        EventoDeAcceso.objects.create(email_usuario='x@empresa.com', tipo_evento='view', id_evento_google='f_1',
+                                      nombre_archivo='=HYPERLINK("http://x")', timestamp=timezone.now())
+        response = self.client.get(self.url, {'formato': 'csv', 'campos': 'id_evento_google,nombre_archivo'})
+
+        filas = list(csv.reader(StringIO(b''.join(response.streaming_content).decode())))
+        self.assertIn(['f_1', '\'=HYPERLINK("http://x")'], filas)
+        # Los números negativos no son texto: no se tocan
+        self.assertEqual(list(lineas_exportacion([(-0.5, '-x')], ['a', 'b'], 'csv')), ['a,b\r\n', "-0.5,'-x\r\n"])
+
+    def test_exportacion_queda_en_el_log(self):
+        with self.assertLogs('monitoreo.views', level='INFO') as logs:
+            self.client.get(self.url, {'formato': 'csv', 'tipo': 'view'})
+        registro_log = logs.records[0]
+        self.assertEqual((registro_log.usuario, registro_log.formato), ('auditor_export', 'csv'))
+        self.assertEqual(registro_log.filtros, {'formato': 'csv', 'tipo': 'view'})
+
+    def test_bloques_agrupan_las_lineas(self):
+        lineas = (f'{i:09d}\n' for i in range(20000))  # 200 KB
+        bloques = list(bloques_exportacion(lineas))
+        self.assertEqual(len(bloques), 4)
+        self.assertEqual(b''.join(bloques).count(b'\n'), 20000)
+
+    def test_parametros_invalidos_y_permiso(self):
+        self.assertEqual(self.client.get(self.url, {'formato': 'xml'}).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {'campos': 'password'}).status_code, 400)
+
+        sin_permiso = UsuarioPersonalizado.objects.create_user(username='sin_rol', password='clave12345')
+        self.client.force_login(sin_permiso)
+        self.assertEqual(self.client.get(self.url).status_code, 302)
+
+
+class AdminRendimientoTests(TestCase):
+    """
+        Tests del modo rendimiento del listado de eventos en el admin (SPRINT 7)
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.admin = UsuarioPersonalizado.objects.create_superuser(
+            username='admin_rendimiento', email='admin@example.com', password='adminpass123')
+        self.client.force_login(self.admin)
+        self.url = reverse('admin:monitoreo_eventodeacceso_changelist')
+        acumular_resumenes(crear_eventos_prueba(30))
+
+    def test_listado_sin_recorrer_la_tabla_por_fechas_ni_conteos(self):
+        # El total de la tabla se cuenta una vez y queda en caché para las páginas siguientes
+        self.client.get(self.url)
+        with CaptureQueriesContext(connection) as consultas:
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+
+        sql_eventos = [q['sql'] for q in consultas.captured_queries if 'monitoreo_eventodeacceso' in q['sql']]
+        self.assertFalse(any('COUNT(' in sql for sql in sql_eventos))
+        self.assertFalse(any('MIN(' in sql or 'django_datetime_trunc' in sql for sql in sql_eventos))
+        # El JSON crudo no se lee para el listado
+        self.assertFalse(any('"detalles"' in sql for sql in sql_eventos))
+        # Jerarquía de fechas armada desde los resúmenes
+        self.assertEqual(response.context['jerarquia_fechas']['show'], True)
+
+    def test_opciones_de_filtro_cacheadas(self):
+        self.client.get(self.url)
+        with CaptureQueriesContext(connection) as consultas:
+            response = self.client.get(self.url)
+        self.assertFalse(any('DISTINCT' in q['sql'] for q in consultas.captured_queries))
+        self.assertContains(response, '?tipo_evento__exact=download')
+
+    def test_drilldown_por_dia_local(self):
+        evento = EventoDeAcceso.objects.order_by('timestamp').first()
+        dia = timezone.localtime(evento.timestamp)
+        response = self.client.get(self.url, {'timestamp__year': dia.year, 'timestamp__month': dia.month,
+                                              'timestamp__day': dia.day})
+        esperados = [e for e in EventoDeAcceso.objects.all()
+                     if timezone.localdate(e.timestamp) == dia.date()]
+        self.assertEqual(response.context['cl'].result_count, len(esperados))
+
+    def test_paginador_estimado(self):
+        todos = EventoDeAcceso.objects.all()
+        self.assertEqual(PaginadorEstimado(todos, 10).count, todos.count())
+        filtrados = todos.filter(tipo_evento='view')
+        self.assertEqual(PaginadorEstimado(filtrados, 10).count, filtrados.count())
+        with patch('monitoreo.admin.LIMITE_CONTEO_ADMIN', 3):
+            self.assertEqual(PaginadorEstimado(filtrados, 10).count, 3)
+
+    def test_conteo_acotado_se_muestra_aproximado(self):
+        """Con el COUNT filtrado en el tope el listado no lo presenta como exacto"""
+        filtrados = EventoDeAcceso.objects.filter(tipo_evento='view')
+        self.assertFalse(PaginadorEstimado(filtrados, 10).acotado)
+        with patch('monitoreo.admin.LIMITE_CONTEO_ADMIN', 3):
+            paginador = PaginadorEstimado(filtrados, 10)
+            paginador.count
+            self.assertTrue(paginador.acotado)
+            response = self.client.get(self.url, {'tipo_evento__exact': 'view'})
+        self.assertEqual(response.context['cl'].conteo_mostrado, '3+')
+        self.assertContains(response, '3+ ')
+
+    def test_paginador_estimado_despues_de_borrados(self):
+        """Borrar filas no deja páginas fantasma (MAX(id) ya no es el total)"""
+        EventoDeAcceso.objects.filter(pk__lt=EventoDeAcceso.objects.order_by('-pk').first().pk).delete()
+        cache_sistema.invalidar(cache_sistema.DASHBOARD)
+        paginador = PaginadorEstimado(EventoDeAcceso.objects.all(), 10)
+        self.assertEqual((paginador.count, paginador.num_pages), (1, 1))
+        response = self.client.get(self.url, {'p': 2})
+        self.assertEqual(response.context['cl'].result_count, 1)
+        self.assertEqual(len(response.context['cl'].result_list), 1)
+
+    @override_settings(ADMIN_MODO_RENDIMIENTO=False)
+    def test_modo_normal_sigue_funcionando(self):
+        response = self.client.get(self.url, {'tipo_evento__exact': 'view'})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('jerarquia_fechas', response.context)
+
+
+
+class MetricasTests(TestCase):
+    """
+        Tests de la instrumentación de solicitudes y etapas (SPRINT 7)
+    """
+
+    def setUp(self):
+        cache.clear()
+        registro.limpiar()
+        self.addCleanup(registro.limpiar)
+        self.admin = UsuarioPersonalizado.objects.create_superuser(
+            username='admin_metricas', email='admin@test.com', password='clave12345')
+
+    def test_middleware_agrega_server_timing_y_contadores(self):
+        self.client.force_login(self.admin)
+        response = self.client.get(reverse('monitoreo:api_tendencias'))
+
+        self.assertIn('db;dur=', response['Server-Timing'])
+        self.assertIn('consultas', response['Server-Timing'])
+        self.assertEqual(registro.valor('sgsi_http_solicitudes_total', vista='monitoreo:api_tendencias',
+                                        metodo='GET', estado=200), 1)
+        self.assertEqual(registro.valor('sgsi_http_duracion_segundos', vista='monitoreo:api_tendencias'), 1)
+        self.assertGreater(registro.valor('sgsi_db_consultas_total', contexto='http:monitoreo:api_tendencias'), 0)
+
+    def test_etapa_registra_duracion_y_resultado(self):
+        with etapa('prueba'):
+            EventoDeAcceso.objects.count()
+        with self.assertRaises(ValueError):
+            with etapa('prueba'):
+                raise ValueError('falla')
+
+        self.assertEqual(registro.valor('sgsi_etapa_duracion_segundos', etapa='prueba'), 2)
+        self.assertEqual(registro.valor('sgsi_etapa_ejecuciones_total', etapa='prueba', resultado='ok'), 1)
+        self.assertEqual(registro.valor('sgsi_etapa_ejecuciones_total', etapa='prueba', resultado='error'), 1)
+        self.assertEqual(registro.valor('sgsi_db_consultas_total', contexto='etapa:prueba'), 1)
+
+    def test_etapa_como_decorador_y_anidada(self):
+        @etapa('externa')
+        def externa():
+            with etapa('interna'):
+                EventoDeAcceso.objects.count()
+
+        externa()
+        externa()
+        self.assertEqual(registro.valor('sgsi_etapa_ejecuciones_total', etapa='externa', resultado='ok'), 2)
+        self.assertEqual(registro.valor('sgsi_etapa_ejecuciones_total', etapa='interna', resultado='ok'), 2)
+        # La consulta de la etapa interna se suma a la medición de la externa
+        self.assertEqual(registro.valor('sgsi_db_consultas_total', contexto='etapa:externa'), 2)
+        self.assertEqual(registro.valor('sgsi_db_consultas_total', contexto='etapa:interna'), 0)
+
+    @override_settings(METRICAS_UMBRAL_CONSULTA_LENTA_MS=0)
+    def test_consulta_lenta_registrada(self):
+        with self.assertLogs('sgsi.consultas_lentas', level='WARNING') as logs:
+            with etapa('lenta'):
+                EventoDeAcceso.objects.count()
+        self.assertIn('monitoreo_eventodeacceso', logs.output[0])
+        self.assertEqual(registro.valor('sgsi_db_consultas_lentas_total', contexto='etapa:lenta'), 1)
+
+    def test_aciertos_y_fallos_de_cache(self):
+        cache_sistema.obtener_o_calcular(cache_sistema.DASHBOARD, 'x', calcular=lambda: 1)
+        cache_sistema.obtener_o_calcular(cache_sistema.DASHBOARD, 'x', calcular=lambda: 1)
+        self.assertEqual(registro.valor('sgsi_cache_fallos_total', espacio=cache_sistema.DASHBOARD), 1)
+        self.assertEqual(registro.valor('sgsi_cache_aciertos_total', espacio=cache_sistema.DASHBOARD), 1)
+
+    def test_endpoint_metricas(self):
+        with etapa('prueba'):
+            pass
+        # Loopback no basta (detrás de un proxy local todas las solicitudes llegan así)
+        self.assertEqual(self.client.get('/metricas/', REMOTE_ADDR='127.0.0.1').status_code, 403)
+
+        with override_settings(METRICAS_TOKEN='secreto'):
+            self.assertEqual(self.client.get('/metricas/', HTTP_AUTHORIZATION='Bearer otro').status_code, 403)
+            response = self.client.get('/metricas/', HTTP_AUTHORIZATION='Bearer secreto')
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, '# TYPE sgsi_etapa_duracion_segundos histogram')
+        self.assertContains(response, 'sgsi_etapa_duracion_segundos_count{etapa="prueba"} 1')
+
+        self.client.force_login(self.admin)
+        self.assertEqual(self.client.get('/metricas/', REMOTE_ADDR='10.0.0.8').status_code, 200)
+
+    def test_middleware_async_sin_streaming_en_latencia(self):
+        """En modo async no se adapta a sync, y el streaming no entra en el histograma"""
+        from asgiref.sync import iscoroutinefunction
+        from django.http import HttpResponse, StreamingHttpResponse
+        from django.test import RequestFactory
+        from system_core.metricas import MiddlewareInstrumentacion
+
+        async def vista(request):
+            if request.path.endswith('transmision/'):
+                return StreamingHttpResponse(iter([b'data: {}\n\n']))
+            return HttpResponse('ok')
+
+        middleware = MiddlewareInstrumentacion(vista)
+        self.assertTrue(iscoroutinefunction(middleware))
+        fabrica = RequestFactory()
+        for ruta in (reverse('monitoreo:api_transmision'), reverse('monitoreo:dashboard')):
+            respuesta = asyncio.run(middleware(fabrica.get(ruta)))
+            self.assertIn('app;dur=', respuesta['Server-Timing'])
+
+        self.assertEqual(registro.valor('sgsi_http_solicitudes_total', vista='monitoreo:api_transmision',
+                                        metodo='GET', estado=200), 1)
+        self.assertEqual(registro.valor('sgsi_http_duracion_segundos', vista='monitoreo:api_transmision'), 0)
+        self.assertEqual(registro.valor('sgsi_http_duracion_segundos', vista='monitoreo:dashboard'), 1)
+
+    def test_volcado_a_archivo(self):
+        with tempfile.TemporaryDirectory() as directorio:
+            with override_settings(METRICAS_DIRECTORIO=directorio):
+                with etapa('etl_lote'):
+                    pass
+            archivos = os.listdir(directorio)
+            self.assertEqual(len(archivos), 1)
+            self.assertTrue(archivos[0].endswith('.prom'))
+            with open(os.path.join(directorio, archivos[0]), encoding='utf-8') as f:
+                self.assertIn('sgsi_etapa_ejecuciones_total{etapa="etl_lote",resultado="ok"} 1', f.read())
+
+    def test_endpoint_suma_los_procesos_web(self):
+        """Con varios workers web, /metricas/ responde la suma de todos y no solo la del que atiende"""
+        from system_core.metricas import RegistroMetricas
+
+        otro_worker = RegistroMetricas()
+        otro_worker.incrementar('sgsi_etapa_ejecuciones_total', 2, etapa='prueba', resultado='ok')
+        otro_worker.observar('sgsi_etapa_duracion_segundos', 0.2, etapa='prueba')
+
+        with tempfile.TemporaryDirectory() as directorio, \
+                override_settings(METRICAS_DIRECTORIO=directorio, METRICAS_TOKEN='secreto'), \
+                patch('system_core.metricas.nombre_proceso', return_value='web'):
+            os.makedirs(os.path.join(directorio, 'web'))
+            with open(os.path.join(directorio, 'web', '99999.json'), 'w', encoding='utf-8') as f:
+                json.dump(otro_worker.estado(), f)
+            with etapa('prueba'):
+                pass
+
+            response = self.client.get('/metricas/', HTTP_AUTHORIZATION='Bearer secreto')
+            # En la web no se escribe un .prom por proceso (los workers se pisarían)
+            self.assertEqual(sorted(os.listdir(directorio)), ['web'])
+
+        self.assertContains(response, 'sgsi_etapa_ejecuciones_total{etapa="prueba",resultado="ok"} 3')
+        self.assertContains(response, 'sgsi_etapa_duracion_segundos_count{etapa="prueba"} 2')
+
+
+class HistorialPipelineTests(TestCase):
+    """
+        Tests del historial de ejecuciones del pipeline (SPRINT 7)
+    """
+
+    def setUp(self):
+        # La detección entrena y guarda el modelo: que no toque el de ml_models/
+        dir_modelos = tempfile.TemporaryDirectory()
+        self.addCleanup(dir_modelos.cleanup)
+        ajustes = override_settings(ML_MODELS_DIR=dir_modelos.name)
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+
+    def test_ejecucion_guarda_etapas_y_contadores(self):
+        with ejecucion_pipeline('etl_historico'):
+            with paso_pipeline('etl_lectura'):
+                sumar(bytes_descargados=2048)
+            for _ in range(3):
+                with paso_pipeline('etl_lote'):
+                    sumar(eventos_insertados=10)
+            sumar(eventos_vistos=40, eventos_conservados=30)
+
+        ejecucion = EjecucionPipeline.objects.get()
+        self.assertEqual(ejecucion.estado, EjecucionPipeline.OK)
+        self.assertIsNotNone(ejecucion.fin)
+        self.assertEqual((ejecucion.eventos_vistos, ejecucion.eventos_insertados, ejecucion.bytes_descargados),
+                         (40, 30, 2048))
+        self.assertGreater(ejecucion.filas_por_segundo, 0)
+
+        etapas = list(ejecucion.etapas.values_list('nombre', 'repeticiones', 'eventos_insertados'))
+        self.assertEqual(etapas, [('etl_lectura', 1, 0), ('etl_lote', 3, 30)])
+        # Sin eventos vistos, filas/s de la etapa se calcula con los escritos
+        self.assertGreater(ejecucion.etapas.get(nombre='etl_lote').filas_por_segundo, 0)
+
+    def test_error_en_etapa_marca_la_ejecucion(self):
+        with self.assertRaises(ValueError):
+            with ejecucion_pipeline('deteccion'):
+                with paso_pipeline('ml_entrenamiento'):
+                    raise ValueError('sin datos')
+
+        ejecucion = EjecucionPipeline.objects.get()
+        self.assertEqual(ejecucion.estado, EjecucionPipeline.ERROR)
+        self.assertIn('sin datos', ejecucion.error)
+        self.assertEqual(ejecucion.errores, 1)
+        self.assertEqual(ejecucion.etapas.get().errores, 1)
+
+    def test_fuera_de_una_ejecucion_no_se_guarda(self):
+        with paso_pipeline('ingesta_lote'):
+            sumar(eventos_insertados=5)
+        self.assertFalse(EjecucionPipeline.objects.exists())
+        # La etapa sigue midiéndose en las métricas del proceso
+        self.assertGreater(registro.valor('sgsi_etapa_ejecuciones_total', etapa='ingesta_lote', resultado='ok'), 0)
+
+    def test_hilos_con_contexto_copiado_suman_a_la_etapa(self):
+        from concurrent.futures import ThreadPoolExecutor
+        import contextvars
+
+        with ejecucion_pipeline('recoleccion'):
+            with paso_pipeline('auditoria'), ThreadPoolExecutor(max_workers=4) as pool:
+                for _ in range(20):
+                    pool.submit(contextvars.copy_context().run, sumar, paginas=1, bytes_descargados=100)
+
+        etapa_auditoria = EjecucionPipeline.objects.get().etapas.get(nombre='auditoria')
+        self.assertEqual((etapa_auditoria.paginas, etapa_auditoria.bytes_descargados), (20, 2000))
+
+    def test_ingesta_online_registra_insertados_y_actualizados(self):
+        evento = {
+            'timestamp': timezone.now(), 'usuario': 'online@empresa.com', 'accion': 'view',
+            'archivo_id': 'f1', 'archivo_titulo': 'f1.txt', 'ip': '10.0.0.1', 'detalles_json': {},
+        }
+        with ejecucion_pipeline('sincronizacion'):
+            self.assertEqual(guardar_eventos_en_db([evento]), 1)
+            self.assertEqual(guardar_eventos_en_db([evento]), 0)
+
+        etapa_ingesta = EjecucionPipeline.objects.get().etapas.get(nombre='ingesta_lote')
+        self.assertEqual((etapa_ingesta.repeticiones, etapa_ingesta.eventos_insertados,
+                          etapa_ingesta.eventos_actualizados), (2, 1, 1))
+        self.assertIsNotNone(etapa_ingesta.rss_pico_mb)
+
+    def test_memoria_no_arrastra_el_pico_de_ejecuciones_anteriores(self):
+        # El proceso ya tuvo un pico de 900 MB en otra ejecución; esta no lo supera
+        with patch('monitoreo.ejecuciones.rss_pico_mb', return_value=900.0), \
+                patch('monitoreo.ejecuciones.rss_actual_mb', side_effect=[100.0, 120.0, 150.0, 110.0, 110.0, 105.0]):
+            with ejecucion_pipeline('deteccion'):
+                with paso_pipeline('ml_entrenamiento'):
+                    pass
+
+        ejecucion = EjecucionPipeline.objects.get()
+        self.assertEqual(ejecucion.rss_pico_mb, 150.0)
+        self.assertEqual(ejecucion.etapas.get().rss_pico_mb, 150.0)
+
+    def test_etl_historico_registra_su_ejecucion(self):
+        datos = {'eventos': [
+            {'hora': '05/01/2025 10:15 AM', 'usuario': 'etl@empresa.com', 'accion': 'view',
+             'archivo': 'Informe (f1)', 'ip': '10.0.0.1'},
+            {'hora': '05/01/2025 10:20 AM', 'usuario': 'etl@empresa.com', 'accion': 'edit',
+             'archivo': '~$temporal.docx (f2)', 'ip': '10.0.0.1'},
+            {'hora': 'fecha inválida', 'usuario': 'etl@empresa.com', 'accion': 'view', 'archivo': '(f3)'},
+        ]}
+        with tempfile.NamedTemporaryFile('w', suffix='.json', delete=False, encoding='utf-8') as f:
+            json.dump(datos, f)
+        self.addCleanup(os.remove, f.name)
+
+        call_command('cargar_json_historico', f.name, stdout=StringIO())
+
+        ejecucion = EjecucionPipeline.objects.get(pipeline='etl_historico')
+        self.assertEqual(ejecucion.estado, EjecucionPipeline.OK)
+        self.assertEqual((ejecucion.eventos_vistos, ejecucion.eventos_conservados, ejecucion.eventos_insertados,
+                          ejecucion.errores), (3, 1, 1, 1))
+        self.assertEqual(ejecucion.bytes_descargados, os.path.getsize(f.name))
+        self.assertEqual(list(ejecucion.etapas.values_list('nombre', flat=True)), ['etl_lectura', 'etl_lote'])
+
+    def test_deteccion_registra_etapas_de_ml(self):
+        crear_eventos_prueba(60)
+        ejecutar_deteccion_anomalias()
+
+        ejecucion = EjecucionPipeline.objects.get(pipeline='deteccion')
+        self.assertEqual(ejecucion.eventos_vistos, 60)
+        self.assertEqual(list(ejecucion.etapas.values_list('nombre', flat=True)),
+                         ['ml_carga', 'ml_preprocesamiento', 'ml_entrenamiento', 'ml_puntuacion', 'ml_persistencia'])
+
+    def test_aviso_de_regresion(self):
+        for _ in range(3):
+            EjecucionPipeline.objects.create(pipeline='etl_historico', estado=EjecucionPipeline.OK,
+                                             filas_por_segundo=1e12)
+        with self.assertLogs('sgsi.pipeline', level='WARNING') as logs:
+            with ejecucion_pipeline('etl_historico'):
+                sumar(eventos_vistos=10)
+        self.assertIn('Regresión de rendimiento', logs.output[0])
+
+    def test_formateador_json_incluye_campos_extra(self):
+        import logging
+        record = logging.LogRecord('sgsi.pipeline', logging.INFO, __file__, 1, 'Etapa %s', ('auditoria',), None)
+        record.paginas = 12
+        linea = json.loads(FormateadorJSON().format(record))
+        self.assertEqual(linea['mensaje'], 'Etapa auditoria')
+        self.assertEqual(linea['paginas'], 12)
+        self.assertEqual(linea['nivel'], 'INFO')
+
+
+class DatosSinteticosTests(TestCase):
+    """
+        Tests del generador de eventos sintéticos y del benchmark (SPRINT 7)
+    """
+
+    def setUp(self):
+        self.fin = timezone.now().replace(minute=0, second=0, microsecond=0)
+        self.generador = GeneradorSintetico(usuarios=30, archivos=300, ips=20, dias=7, fraccion_anomalias=0.1,
+                                            semilla=3, fin=self.fin)
+
+    def test_misma_semilla_mismos_eventos(self):
+        otro = GeneradorSintetico(usuarios=30, archivos=300, ips=20, dias=7, fraccion_anomalias=0.1,
+                                  semilla=3, fin=self.fin)
+        primero, segundo = self.generador.lote(500, 2), otro.lote(500, 2)
+        for columna in primero:
+            np.testing.assert_array_equal(primero[columna], segundo[columna])
+        self.assertFalse(np.array_equal(primero['timestamp_us'], self.generador.lote(500, 3)['timestamp_us']))
+
+    def test_lote_dentro_de_la_ventana_con_anomalias(self):
+        lote = self.generador.lote(5000)
+        fechas = self.generador.fechas(lote)
+        self.assertLessEqual(max(fechas), self.fin)
+        self.assertGreater(min(fechas), self.fin - timedelta(days=8))
+        self.assertAlmostEqual(lote['anomalia'].mean(), 0.1, delta=0.02)
+
+        valores = self.generador.valores(lote)
+        anomalas = valores['direccion_ip'][lote['anomalia']]
+        self.assertTrue(all(ip.startswith('203.0.113.') for ip in anomalas))
+        self.assertFalse(any(ip.startswith('203.0.113.') for ip in valores['direccion_ip'][~lote['anomalia']]))
+        self.assertTrue((valores['tipo_evento'][lote['anomalia']] == 'download').all())
+
+    def test_carga_con_ids_huellas_y_dimensiones_de_la_ingesta(self):
+        insertados = cargar_sinteticos(self.generador, 1200, tamano_lote=500)
+        self.assertEqual(insertados, EventoDeAcceso.objects.count())
+        self.assertGreater(insertados, 1150)  # colisiones de (µs, usuario, archivo, acción) descartadas
+        # Recargar con la misma semilla no duplica
+        self.assertEqual(cargar_sinteticos(self.generador, 1200, tamano_lote=500), 0)
+
+        for evento in EventoDeAcceso.objects.select_related('dim_actor', 'dim_archivo', 'dim_ip')[:50]:
+            self.assertEqual(evento.id_evento_google, id_evento(evento.timestamp, evento.email_usuario,
+                                                                evento.archivo_id, evento.tipo_evento))
+            self.assertEqual(evento.huella, huella_evento(evento.id_evento_google))
+            self.assertEqual((evento.dim_actor.email, evento.dim_archivo.id_drive, evento.dim_ip.ip),
+                             (evento.email_usuario, evento.archivo_id, evento.direccion_ip))
+        self.assertEqual(EventoDeAcceso.objects.filter(detalles__anomalia_inyectada=True).count(),
+                         EventoDeAcceso.objects.filter(direccion_ip__startswith='203.0.113.').count())
+
+    def test_comando_generar_datos_simulados(self):
+        crear_eventos_prueba(5)
+        call_command('generar_datos_simulados', eventos=800, usuarios=10, archivos=100, ips=10, dias=3,
+                     semilla=1, lote=300, stdout=StringIO())
+        total = EventoDeAcceso.objects.count()
+        self.assertGreater(total, 780)
+        self.assertFalse(EventoDeAcceso.objects.filter(email_usuario__endswith='@example.com').exists())
+        self.assertEqual(sum(ResumenDia.objects.values_list('total', flat=True)), total)
+
+    def test_benchmark_genera_json_y_limpia_la_ingesta(self):
+        cargar_sinteticos(self.generador, 300)
+        antes = EventoDeAcceso.objects.count()
+        with tempfile.TemporaryDirectory() as directorio:
+            salida = os.path.join(directorio, 'benchmark.json')
+            call_command('benchmark_rendimiento', repeticiones=2, eventos_ingesta=100, salida=salida,
+                         solo=['ingesta_online', 'ingesta_etl', 'dashboard_kpis', 'exportacion_csv'],
+                         stdout=StringIO())
+            with open(salida, encoding='utf-8') as f:
+                resultado = json.load(f)
+
+            self.assertEqual(set(resultado['escenarios']),
+                             {'ingesta_online', 'ingesta_etl', 'dashboard_kpis', 'exportacion_csv'})
+            self.assertEqual(resultado['escenarios']['ingesta_etl']['filas'], 100)
+            self.assertEqual(resultado['escenarios']['exportacion_csv']['filas'], antes)
+            self.assertEqual(EventoDeAcceso.objects.count(), antes)
+            self.assertFalse(Actor.objects.filter(email__endswith='@benchmark.invalid').exists())
+
+            # Contra una referencia mucho más rápida, el benchmark falla
+            for medicion in resultado['escenarios'].values():
+                medicion['mediana_ms'] = 1e-6
+            with open(salida, 'w', encoding='utf-8') as f:
+                json.dump(resultado, f)
+            with self.assertRaisesMessage(CommandError, 'Regresiones de rendimiento'):
+                call_command('benchmark_rendimiento', repeticiones=1, solo=['dashboard_kpis'], referencia=salida,
+                             stdout=StringIO())
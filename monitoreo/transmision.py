@@ -0,0 +1,199 @@
+"""
+Transmisión en vivo del dashboard por Server-Sent Events (SPRINT 7).
+
+Un único productor por proceso ASGI (uno por event loop) revisa los cambios
+y reparte el mismo mensaje ya serializado a todos los dashboards conectados:
+N pestañas abiertas no multiplican las consultas a la BD.
+
+En cada ciclo el productor solo lee la versión del espacio 'dashboard' de la
+caché compartida (la ingesta y la detección la invalidan). La BD se consulta
+cuando esa versión cambia, o cada TRANSMISION_REVISION_FORZADA segundos por
+si algún proceso insertó eventos sin invalidar:
+  - eventos:   id > último id enviado (recorre la PK)
+  - kpis:      los del dashboard (misma caché) y su diferencia con los anteriores
+  - anomalias: las más recientes (índice parcial) que todavía no se enviaron
+
+Requiere servir con system_core.asgi: bajo WSGI (runserver, gunicorn sync)
+Django junta todo el generador asíncrono antes de enviar, así que la vista
+responde 204 y el dashboard sigue con la recarga tradicional.
+"""
+import asyncio
+import json
+import logging
+import time
+import weakref
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Max
+
+from system_core import cache as cache_sistema
+
+from .models import EventoDeAcceso
+
+logger = logging.getLogger(__name__)
+
+# Eventos / anomalías por mensaje (el resto se refleja en los KPIs)
+MAX_EVENTOS_MENSAJE = 50
+MAX_ANOMALIAS_MENSAJE = 10
+
+# Mensajes pendientes por cliente antes de desconectarlo por lento
+TAMANO_COLA = 100
+
+CAMPOS_EVENTO = ['id', 'timestamp', 'email_usuario', 'tipo_evento', 'nombre_archivo',
+                 'direccion_ip', 'es_anomalia', 'severidad', 'motivo_anomalia']
+KPIS_NUMERICOS = ['total_eventos', 'total_anomalias', 'eventos_normales', 'anomalias_criticas']
+
+
+def formatear_sse(evento, datos):
+    """Mensaje en formato text/event-stream"""
+    return f"event: {evento}\ndata: {json.dumps(datos, cls=DjangoJSONEncoder, ensure_ascii=False)}\n\n"
+
+
+def kpis_actuales():
+    """KPIs del dashboard, compartidos con la vista por la caché"""
+    from .views import TIMEOUT_KPIS_DASHBOARD, calcular_kpis_dashboard
+
+    return cache_sistema.obtener_o_calcular(cache_sistema.DASHBOARD, 'kpis',
+                                            calcular=calcular_kpis_dashboard,
+                                            timeout=TIMEOUT_KPIS_DASHBOARD)
+
+
+def _anomalias_recientes():
+    return list(EventoDeAcceso.objects.filter(es_anomalia=True)
+                .order_by('-timestamp').values(*CAMPOS_EVENTO)[:MAX_ANOMALIAS_MENSAJE])
+
+
+class RevisorCambios:
+    """Parte síncrona del productor: qué cambió desde la revisión anterior"""
+
+    def __init__(self):
+        self.version = None
+        self.ultimo_id = 0
+        self.kpis = {}
+        self.anomalias_enviadas = set()
+        self.ultima_revision = 0.0
+
+    def iniciar(self):
+        """Punto de partida: lo existente al conectarse el primer cliente no se reenvía"""
+        self.version = cache_sistema.version(cache_sistema.DASHBOARD)
+        self.ultimo_id = EventoDeAcceso.objects.aggregate(maximo=Max('id'))['maximo'] or 0
+        self.kpis = kpis_actuales()
+        self.anomalias_enviadas = {a['id'] for a in _anomalias_recientes()}
+        self.ultima_revision = time.monotonic()
+
+    def revisar(self, forzar=False):
+        """Lista de (evento, datos) a transmitir; vacía si la versión del dashboard no cambió"""
+        version = cache_sistema.version(cache_sistema.DASHBOARD)
+        vencida = time.monotonic() - self.ultima_revision >= settings.TRANSMISION_REVISION_FORZADA
+        if version == self.version and not (forzar or vencida):
+            return []
+        self.version = version
+        self.ultima_revision = time.monotonic()
+
+        mensajes = []
+        eventos = list(EventoDeAcceso.objects.filter(id__gt=self.ultimo_id)
+                       .order_by('-id').values(*CAMPOS_EVENTO)[:MAX_EVENTOS_MENSAJE])
+        if eventos:
+            self.ultimo_id = eventos[0]['id']
+            mensajes.append(('eventos', {'eventos': eventos}))
+
+        kpis = kpis_actuales()
+        delta = {k: kpis[k] - self.kpis.get(k, 0) for k in KPIS_NUMERICOS if kpis[k] != self.kpis.get(k, 0)}
+        if delta:
+            mensajes.append(('kpis', {'kpis': kpis, 'delta': delta}))
+        self.kpis = kpis
+
+        # Sin cambios en el conteo de anomalías no hay anomalías nuevas que buscar
+        if 'total_anomalias' in delta or 'anomalias_criticas' in delta:
+            nuevas = [a for a in _anomalias_recientes() if a['id'] not in self.anomalias_enviadas]
+            if nuevas:
+                self.anomalias_enviadas.update(a['id'] for a in nuevas)
+                mensajes.append(('anomalias', {'anomalias': nuevas}))
+            if len(self.anomalias_enviadas) > 10 * MAX_ANOMALIAS_MENSAJE:
+                self.anomalias_enviadas = {a['id'] for a in _anomalias_recientes()}
+        return mensajes
+
+
+class Transmisor:
+    """Productor compartido: revisa cada TRANSMISION_INTERVALO segundos mientras haya clientes"""
+
+    def __init__(self):
+        self._suscriptores = set()
+        self._tarea = None
+        self.revisor = RevisorCambios()
+
+    @property
+    def clientes(self):
+        return len(self._suscriptores)
+
+    def suscribir(self):
+        cola = asyncio.Queue(maxsize=TAMANO_COLA)
+        self._suscriptores.add(cola)
+        if self._tarea is None or self._tarea.done():
+            self._tarea = asyncio.get_running_loop().create_task(self._producir())
+        return cola
+
+    def desuscribir(self, cola):
+        self._suscriptores.discard(cola)
+
+    def publicar(self, evento, datos):
+        """Serializa una vez y reparte a todos los clientes"""
+        mensaje = formatear_sse(evento, datos)
+        for cola in list(self._suscriptores):
+            try:
+                cola.put_nowait(mensaje)
+            except asyncio.QueueFull:
+                # Cliente que no consume: se le cierra el flujo (el navegador reconecta)
+                self._suscriptores.discard(cola)
+                while not cola.empty():
+                    cola.get_nowait()
+                cola.put_nowait(None)
+
+    async def _producir(self):
+        await sync_to_async(self.revisor.iniciar)()
+        while self._suscriptores:
+            await asyncio.sleep(settings.TRANSMISION_INTERVALO)
+            if not self._suscriptores:
+                break
+            try:
+                mensajes = await sync_to_async(self.revisor.revisar)()
+            except Exception:
+                logger.exception("⚠️ Transmisión en vivo: error revisando cambios",
+                                 extra={'suscriptores': len(self._suscriptores)})
+                continue
+            for evento, datos in mensajes:
+                self.publicar(evento, datos)
+
+
+_transmisores = weakref.WeakKeyDictionary()
+
+
+def obtener_transmisor():
+    """Transmisor del event loop actual (uno por proceso ASGI)"""
+    loop = asyncio.get_running_loop()
+    if loop not in _transmisores:
+        _transmisores[loop] = Transmisor()
+    return _transmisores[loop]
+
+
+async def flujo_dashboard():
+    """Generador del StreamingHttpResponse: KPIs iniciales y luego los cambios"""
+    transmisor = obtener_transmisor()
+    cola = transmisor.suscribir()
+    try:
+        yield f"retry: {settings.TRANSMISION_REINTENTO_MS}\n\n"
+        yield formatear_sse('kpis', {'kpis': await sync_to_async(kpis_actuales)(), 'delta': {}})
+        while True:
+            try:
+                mensaje = await asyncio.wait_for(cola.get(), timeout=settings.TRANSMISION_LATIDO)
+            except asyncio.TimeoutError:
+                # Comentario SSE: mantiene viva la conexión a través de proxies
+                yield ': latido\n\n'
+                continue
+            if mensaje is None:
+                break
+            yield mensaje
+    finally:
+        transmisor.desuscribir(cola)
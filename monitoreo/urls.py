@@ -14,4 +14,16 @@ urlpatterns = [
     #APIs para sincronizacion y deteccion
     path('api/sincronizar/', views.api_sincronizar_eventos, name='api_sincronizar'),
     path('api/detectar/', views.api_ejecutar_deteccion, name='api_detectar'),
+    path('api/solicitudes/<int:solicitud_id>/', views.api_estado_solicitud, name='api_estado_solicitud'),
+
+    # Series de tiempo para las gráficas (resúmenes pre-agregados)
+    path('api/tendencias/', views.api_tendencias, name='api_tendencias'),
+
+    # API de lectura (JSON) para herramientas externas
+    path('api/eventos/', views.api_eventos, name='api_eventos'),
+    path('api/anomalias/', views.api_anomalias, name='api_anomalias'),
+    path('exportar/', views.exportar_eventos, name='exportar_eventos'),
+
+    # Flujo en vivo del dashboard (SSE, servir con system_core.asgi)
+    path('api/transmision/', views.api_transmision, name='api_transmision'),
 ]
\ No newline at end of file
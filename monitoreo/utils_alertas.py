@@ -1,7 +1,7 @@
 import logging
 from django.core.mail import send_mail
-from django.core.cache import cache
 from django.conf import settings
+from system_core import cache as cache_sistema
 from .models import GLPITicket
 
 logger = logging.getLogger(__name__)
@@ -10,15 +10,13 @@ def puede_enviar_alerta(evento_id, ventana_minutos=5): # Subí la ventana a 60 m
     """
     Verifica si ya enviamos alerta para este evento recientemente.
     Usa cache para evitar spam si el script corre varias veces.
+    La marca es atómica (cache.add, o la tabla ContadorCompartido con la
+    caché de archivos) y se comparte entre procesos, así que
+    dos workers o dos corridas del cron no envían el mismo correo.
     """
-    cache_key = f'alerta_email_enviada_{evento_id}'
-
-    if cache.get(cache_key):
-        return False # Se envio recientemente
-    
-    # Marca como enviado por N minutos
-    cache.set(cache_key, True, ventana_minutos * 60)
-    return True
+    # Marca como enviado por N minutos (False si otro proceso ya la puso)
+    return cache_sistema.marcar_una_vez(cache_sistema.ALERTAS, 'email', evento_id,
+                                        timeout=ventana_minutos * 60)
 
 
 def debe_enviar_alerta(evento):
@@ -53,7 +51,7 @@ def enviar_alerta_anomalia(evento):
     destinatario = getattr(settings, 'GOOGLE_ADMIN_EMAIL', settings.DEFAULT_FROM_EMAIL)
 
     if not destinatario:
-        print(f"⚠️ No hay destinatario configurado para alertas.")
+        logger.warning("⚠️ No hay destinatario configurado para alertas.", extra={'evento': evento.id})
         return False
     
     # Construir email
@@ -125,8 +123,10 @@ def enviar_alerta_anomalia(evento):
             recipient_list=[destinatario],
             fail_silently=False,
         )
-        print(f"📧 Email de alerta enviado a {destinatario}")
+        logger.info("📧 Email de alerta enviado a %s", destinatario,
+                    extra={'evento': evento.id, 'severidad': severidad, 'destinatario': destinatario})
         return True
-    except Exception as e:
-        print(f' Error enviando email: {e}')
+    except Exception:
+        logger.exception("Error enviando email de alerta",
+                         extra={'evento': evento.id, 'severidad': severidad, 'destinatario': destinatario})
         return False
\ No newline at end of file
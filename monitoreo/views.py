@@ -1,32 +1,131 @@
-from django.shortcuts import render, redirect
+import base64
+import csv
+import hashlib
+import json
+import logging
+import zlib
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+
+from django.shortcuts import render, redirect, get_object_or_404
+from django.conf import settings
 from django.contrib.auth.decorators import login_required
 from django.views.decorators.http import require_http_methods
+from django.core.handlers.asgi import ASGIRequest
 from django.core.paginator import Paginator
-from django.http import JsonResponse
-from django.db.models import Q
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.dateparse import parse_date, parse_datetime
+from django.utils.http import quote_etag
+from django.db.models import Q, Sum
+from django.urls import reverse
 from django.utils import timezone
+from system_core import cache as cache_sistema
+from usuarios.views import tiene_permiso
 
 # Importamos Modelos
-from .models import EventoDeAcceso
+from .models import Actor, Archivo, EventoDeAcceso, ResumenDia, ResumenHora, SolicitudProcesamiento
+from .dimensiones import valores_dimension
+from .identidad import EPOCH, MICROSEGUNDO, timestamp_canonico
+from .resumenes import dia_local
+from .transmision import flujo_dashboard
+
+logger = logging.getLogger(__name__)
+
+# Segundos que los KPIs del dashboard se sirven desde la caché
+# (además se invalidan al ingerir eventos o re-entrenar el modelo)
+TIMEOUT_KPIS_DASHBOARD = 60
+
+# SPRINT 7: Series de tiempo (leen los resúmenes pre-agregados, no los eventos)
+GRANULARIDADES = {'hora': ResumenHora, 'dia': ResumenDia}
+MAX_DIAS_TENDENCIA = {'hora': 31, 'dia': 366 * 2}
+AGRUPACIONES = {'tipo': 'tipo_evento', 'severidad': 'severidad', 'usuario': 'actor', 'archivo': 'archivo'}
+MAX_SERIES_TENDENCIA = 10
+
+# SPRINT 7: API de lectura (JSON) para herramientas externas (SIEM)
+CAMPOS_API = ['id', 'id_evento_google', 'timestamp', 'email_usuario', 'tipo_evento', 'archivo_id',
+              'nombre_archivo', 'direccion_ip', 'es_anomalia', 'anomaly_score', 'severidad',
+              'motivo_anomalia', 'detalles']
+# 'detalles' (JSON crudo de Google) solo si se pide explícitamente con ?campos=
+CAMPOS_API_DEFECTO = [c for c in CAMPOS_API if c != 'detalles']
+LIMITE_API = 100
+MAX_LIMITE_API = 1000
+
+# Exportación por streaming: filas leídas por lote y tamaño de cada bloque enviado
+FORMATOS_EXPORTACION = {'ndjson': 'application/x-ndjson', 'csv': 'text/csv; charset=utf-8'}
+TAMANO_LOTE_EXPORTACION = 2000
+BYTES_POR_BLOQUE = 64 * 1024
+
+
+def calcular_kpis_dashboard():
+    """Conteos globales del dashboard (independientes de los filtros del usuario)"""
+    total_eventos = EventoDeAcceso.objects.count()
+    qs_anomalias = EventoDeAcceso.objects.filter(es_anomalia=True)
+    total_anomalias = qs_anomalias.count()
+
+    return {
+        'total_eventos': total_eventos,
+        'total_anomalias': total_anomalias,
+        'eventos_normales': total_eventos - total_anomalias,
+        # KPI Amarillo: Anomalías de alto riesgo
+        'anomalias_criticas': qs_anomalias.filter(severidad__in=['ALTA', 'CRITICA']).count(),
+        'tipos_evento': list(EventoDeAcceso.objects.values_list(
+            'tipo_evento', flat=True
+        ).distinct().order_by('tipo_evento')),
+    }
 
 # --- IMPORTANTE: Reutilizamos la lógica probada del Sprint 2 ---
 # Esto evita duplicar código y errores de inconsistencia en la BD
-try:
-    from .management.commands.recolectar_eventos_reales import GoogleDriveCollector, guardar_eventos_en_db
-except ImportError:
-    GoogleDriveCollector = None
-    guardar_eventos_en_db = None
+# SPRINT 7: El recolector (googleapiclient) y el pipeline de IA (pandas / scikit-learn)
+# se importan recién cuando se usan, no al arrancar cada worker o comando de gestión.
+# Con ML_WORKER_DEDICADO las vistas solo encolan y el trabajo lo hace `manage.py worker_ml`.
+from .worker import cargar_recolector, encolar, tarea_sincronizacion
+
 
 # --- INTEGRACION CON SPRINT 5 (IA) ---
-try:
-    # Importamos la función real que creamos en analisis.py
-    from .analisis import ejecutar_deteccion_anomalias
-except ImportError:
-    # Fallback por si acaso, pero debería existir
-    def ejecutar_deteccion_anomalias(): return 0
+def ejecutar_deteccion_anomalias(*args, **kwargs):
+    """Importa y ejecuta la función real de analisis.py"""
+    from .analisis import ejecutar_deteccion_anomalias as ejecutar
+    return ejecutar(*args, **kwargs)
 
 # --- VISTAS ---
 
+def filtrar_eventos(eventos, params):
+    """
+        Filtros del dashboard (ACTUALIZADO SPRINT 5), también usados por la API de lectura:
+        anomalia (si / no / severidad), severidad, tipo, usuario y búsqueda general q.
+    """
+    filtro_anomalia = params.get('anomalia', '')
+    if filtro_anomalia == 'no':
+        # Mostrar solo normales
+        eventos = eventos.filter(es_anomalia=False)
+    elif filtro_anomalia == 'si':
+        # Mostrar TODAS las anomalias (cualquier severidad)
+        eventos = eventos.filter(es_anomalia=True)
+    elif filtro_anomalia in ['CRITICA', 'ALTA', 'MEDIA']:
+        # Mostrar solo una severidad especifica
+        eventos = eventos.filter(severidad=filtro_anomalia)
+
+    if params.get('severidad'):
+        eventos = eventos.filter(severidad=params['severidad'])
+
+    if params.get('tipo'):
+        eventos = eventos.filter(tipo_evento=params['tipo'])
+
+    if params.get('usuario'):
+        eventos = eventos.filter(email_usuario__icontains=params['usuario'])
+
+    # Filtro de Búsqueda General (El Q object)
+    busqueda_q = params.get('q', '')
+    if busqueda_q:
+        eventos = eventos.filter(
+            Q(email_usuario__icontains=busqueda_q) |
+            Q(nombre_archivo__icontains=busqueda_q) |
+            Q(direccion_ip__icontains=busqueda_q)
+        )
+    return eventos
+
+
 @login_required
 def dashboard_anomalias(request):
     """Redirección para mantener compatibilidad"""
@@ -46,66 +145,31 @@ def dashboard_monitoreo(request):
     # 2. QuerySet Base (Ordenado por fecha)
     eventos = EventoDeAcceso.objects.all().order_by('-timestamp')
 
-    # 3. Aplicar Filtros Dinámicos (ACTUALIZADO SPRINT 5)
-    if filtro_anomalia:
-        if filtro_anomalia == 'no':
-            # Mostrar solo normales
-            eventos = eventos.filter(es_anomalia=False)
-
-        elif filtro_anomalia == 'si':
-            # Mostrar TODAS las anomalias (cualquier severidad)
-            eventos = eventos.filter(es_anomalia=True)
-
-        elif filtro_anomalia in ['CRITICA', 'ALTA', 'MEDIA']:
-            # Mostrar solo una severidad especifica
-            eventos = eventos.filter(severidad=filtro_anomalia)
-
-    if filtro_tipo:
-        eventos = eventos.filter(tipo_evento=filtro_tipo)
-
-    if filtro_usuario:
-        eventos = eventos.filter(email_usuario__icontains=filtro_usuario)
-
-    # Filtro de Búsqueda General (El Q object)
-    if busqueda_q:
-        eventos = eventos.filter(
-            Q(email_usuario__icontains=busqueda_q) |
-            Q(nombre_archivo__icontains=busqueda_q) |
-            Q(direccion_ip__icontains=busqueda_q)
-        )
+    # 3. Aplicar Filtros Dinámicos (compartidos con la API de lectura)
+    eventos = filtrar_eventos(eventos, request.GET)
     
-    #4. Calcular estadísticas (KPIs)
-    total_eventos = EventoDeAcceso.objects.count()
-    qs_anomalias = EventoDeAcceso.objects.filter(es_anomalia=True)
-    total_anomalias = qs_anomalias.count()
-
-    eventos_normales = total_eventos - total_anomalias
-
-    # KPI Amarillo: Anomalías de alto riesgo
-    anomalias_criticas = qs_anomalias.filter(severidad__in=['ALTA', 'CRITICA']).count()
+    #4. Calcular estadísticas (KPIs) - cacheadas en el espacio 'dashboard'
+    kpis = cache_sistema.obtener_o_calcular(cache_sistema.DASHBOARD, 'kpis',
+                                            calcular=calcular_kpis_dashboard,
+                                            timeout=TIMEOUT_KPIS_DASHBOARD)
 
     # 5. Tabla de "Últimas Anomalías"
-    anomalias_recientes = qs_anomalias.order_by('-timestamp')[:10]
+    anomalias_recientes = EventoDeAcceso.objects.filter(es_anomalia=True).order_by('-timestamp')[:10]
 
     #6. Paginación
     paginator = Paginator(eventos, 20) # 20 eventos por pagina para mejor visualizacion
     page_number = request.GET.get('page')
     page_obj = paginator.get_page(page_number)
 
-    #7. Listas para el Select de Tipos
-    tipos_evento = EventoDeAcceso.objects.values_list(
-        'tipo_evento', flat=True
-    ).distinct().order_by('tipo_evento')
-
-    #8. Preparar contexto para plantilla
+    #7. Preparar contexto para plantilla
     context = {
         'page_obj':             page_obj,               # Para la tabla principal
-        'total_eventos':        total_eventos,          # KPI Azul
-        'total_anomalias':      total_anomalias,        # KPI Rojo
-        'eventos_normales':     eventos_normales,       # KPI Verde
-        'anomalias_criticas':   anomalias_criticas,     # KPI Amarillo
-        'anomalias_recientes':  anomalias_recientes,    # Tabla Pequeña roja
-        'tipos_evento':         tipos_evento,           # Para el <select>
+        'total_eventos':        kpis['total_eventos'],      # KPI Azul
+        'total_anomalias':      kpis['total_anomalias'],    # KPI Rojo
+        'eventos_normales':     kpis['eventos_normales'],   # KPI Verde
+        'anomalias_criticas':   kpis['anomalias_criticas'], # KPI Amarillo
+        'anomalias_recientes':  anomalias_recientes,        # Tabla Pequeña roja
+        'tipos_evento':         kpis['tipos_evento'],       # Para el <select>
         # Mantener el estado de los filtros en la vista
         'filtro_anomalia':      filtro_anomalia,
         'filtro_tipo':          filtro_tipo,
@@ -117,6 +181,17 @@ def dashboard_monitoreo(request):
 
 # --- APIs (AJAX) ---
 
+def respuesta_encolada(request, tipo):
+    """Encola la tarea para el worker de ML y responde 202 con la URL para consultar su estado"""
+    solicitud = encolar(tipo, solicitado_por=request.user.get_username())
+    return JsonResponse({
+        'success': True,
+        'mensaje': 'Solicitud en cola. El worker de ML la procesará en breve.',
+        'solicitud_id': solicitud.pk,
+        'estado_url': reverse('monitoreo:api_estado_solicitud', args=[solicitud.pk]),
+    }, status=202)
+
+
 @login_required
 @require_http_methods(["POST"])
 def api_sincronizar_eventos(request):
@@ -124,38 +199,20 @@ def api_sincronizar_eventos(request):
         API para el botón 'Sincronizar'.
         Usa el recolector del Sprint 2/4 para mantener consistencia.
     """
+    if getattr(settings, 'ML_WORKER_DEDICADO', False):
+        return respuesta_encolada(request, 'sincronizacion')
+
+    GoogleDriveCollector, _ = cargar_recolector()
     if not GoogleDriveCollector:
         return JsonResponse({'success': False, 'message': 'Error: Collector no encontrado'}, status=500)
 
     try:
-        # 1. Instanciar Recolector
-        collector = GoogleDriveCollector()
-
-        # 2. Obtener eventos crudos de Google
-        eventos_raw = collector.obtener_eventos()
-
-        if not eventos_raw:
-            return JsonResponse({
-                'success': True,
-                'mensaje': 'Sincronización completada. No se encontraron eventos nuevos.',
-                'nuevos': 0,
-            })
-        
-        # 3. Guardar en BD (Reutilizando lógica del Sprint 2)
-        count_inicio = EventoDeAcceso.objects.count()
-        guardar_eventos_en_db(eventos_raw)
-        count_fin = EventoDeAcceso.objects.count()
-
-        nuevos = count_fin - count_inicio
-
-        return JsonResponse({
-            'success': True,
-            'mensaje': f'Sincronización exitosa. {nuevos} eventos nuevos registrados.',
-        })
+        # Recolección + guardado en BD (misma tarea que ejecuta el worker de ML)
+        resultado = tarea_sincronizacion()
+        return JsonResponse({'success': True, **resultado})
     
     except Exception as e:
-        # Log del error en la consola para debugging
-        print(f"Error Sync API: {e}")
+        logger.exception("Error en la API de sincronización")
         return JsonResponse({'success': False, 'error': str(e)}, status=500)
     
 @login_required
@@ -165,6 +222,8 @@ def api_ejecutar_deteccion(request):
         API para el botón 'Detectar IA'.
         Ejecuta el Isolation Forest real (Sprint 5).
     """
+    if getattr(settings, 'ML_WORKER_DEDICADO', False):
+        return respuesta_encolada(request, 'deteccion')
 
     try:
         # Ejecutamos la función de análisis real
@@ -176,4 +235,356 @@ def api_ejecutar_deteccion(request):
         })
     except Exception as e:
         # Si algo falla (ej: falta memoria, error de sklearn), lo reportamos al frontend
-        return JsonResponse({'success': False, 'mensaje': f'Error en IA: {str(e)}'}, status=500)
\ No newline at end of file
+        return JsonResponse({'success': False, 'mensaje': f'Error en IA: {str(e)}'}, status=500)
+
+@login_required
+@require_http_methods(["GET"])
+def api_estado_solicitud(request, solicitud_id):
+    """
+        Estado de una solicitud encolada para el worker de ML (el dashboard la consulta periódicamente).
+    """
+    solicitud = get_object_or_404(SolicitudProcesamiento, pk=solicitud_id)
+    terminada = solicitud.estado in (SolicitudProcesamiento.COMPLETADA, SolicitudProcesamiento.ERROR)
+
+    return JsonResponse({
+        'success': solicitud.estado != SolicitudProcesamiento.ERROR,
+        'estado': solicitud.estado,
+        'terminada': terminada,
+        'mensaje': solicitud.resultado.get('mensaje') or solicitud.error or solicitud.get_estado_display(),
+        'resultado': solicitud.resultado,
+        'error': solicitud.error,
+    })
+
+
+def calcular_tendencias(granularidad, dias, agrupar='', usuario='', tipo='', severidad=''):
+    """
+    Series de tiempo desde ResumenHora / ResumenDia. Con `agrupar` retorna
+    una serie por valor (por usuario / archivo, las MAX_SERIES_TENDENCIA de mayor volumen).
+    """
+    modelo = GRANULARIDADES[granularidad]
+    desde = timezone.now() - timedelta(days=dias)
+    resumenes = modelo.objects.filter(periodo__gte=desde if granularidad == 'hora' else dia_local(desde))
+
+    if tipo:
+        resumenes = resumenes.filter(tipo_evento=tipo)
+    if severidad:
+        resumenes = resumenes.filter(severidad=severidad)
+    if usuario:
+        resumenes = resumenes.filter(actor=Actor.objects.filter(email=usuario).values_list('pk', flat=True).first() or -1)
+
+    campo = AGRUPACIONES.get(agrupar)
+    columnas = ['periodo', campo] if campo else ['periodo']
+    if campo in ('actor', 'archivo'):
+        # Cardinalidad alta: solo las series de mayor volumen (tipo y severidad tienen pocos valores)
+        principales = list(resumenes.values(campo).annotate(suma=Sum('total'))
+                           .order_by('-suma').values_list(campo, flat=True)[:MAX_SERIES_TENDENCIA])
+        resumenes = resumenes.filter(**{f'{campo}__in': principales})
+
+    filas = list(resumenes.values(*columnas).annotate(total=Sum('total'), anomalias=Sum('anomalias')).order_by('periodo'))
+
+    # Nombres legibles para las series por usuario / archivo (una consulta por dimensión)
+    etiquetas = {}
+    if campo == 'actor':
+        etiquetas = valores_dimension(Actor, 'email', [f[campo] for f in filas])
+    elif campo == 'archivo':
+        etiquetas = {pk: nombre or id_drive for pk, nombre, id_drive in Archivo.objects.filter(
+            pk__in={f[campo] for f in filas}).values_list('pk', 'nombre', 'id_drive')}
+
+    periodos = sorted({f['periodo'] for f in filas})
+    posicion = {p: i for i, p in enumerate(periodos)}
+    series = {}
+    for fila in filas:
+        clave = fila[campo] if campo else 'total'
+        serie = series.setdefault(clave, {
+            'clave': etiquetas.get(clave, clave),
+            'total': [0] * len(periodos),
+            'anomalias': [0] * len(periodos),
+        })
+        serie['total'][posicion[fila['periodo']]] = fila['total']
+        serie['anomalias'][posicion[fila['periodo']]] = fila['anomalias']
+
+    return {
+        'granularidad': granularidad,
+        'desde': desde.isoformat(),
+        'agrupar': agrupar,
+        'periodos': [p.isoformat() for p in periodos],
+        'series': list(series.values()),
+    }
+
+
+@login_required
+@require_http_methods(["GET"])
+def api_tendencias(request):
+    """
+        Series de tiempo para las gráficas del dashboard (JSON).
+        Parámetros: granularidad (hora|dia), dias, agrupar (tipo|severidad|usuario|archivo),
+        y filtros usuario, tipo, severidad.
+    """
+    granularidad = request.GET.get('granularidad', 'dia')
+    agrupar = request.GET.get('agrupar', '')
+    if granularidad not in GRANULARIDADES or (agrupar and agrupar not in AGRUPACIONES):
+        return JsonResponse({'success': False, 'error': 'Parámetros inválidos'}, status=400)
+
+    try:
+        dias = int(request.GET.get('dias', 7 if granularidad == 'hora' else 30))
+    except ValueError:
+        return JsonResponse({'success': False, 'error': 'dias debe ser un número'}, status=400)
+    dias = max(1, min(dias, MAX_DIAS_TENDENCIA[granularidad]))
+
+    filtros = {c: request.GET.get(c, '') for c in ('usuario', 'tipo', 'severidad')}
+    datos = cache_sistema.obtener_o_calcular(
+        cache_sistema.DASHBOARD, 'tendencias', granularidad, dias, agrupar, *filtros.values(),
+        calcular=lambda: calcular_tendencias(granularidad, dias, agrupar, **filtros),
+        timeout=TIMEOUT_KPIS_DASHBOARD,
+    )
+    return JsonResponse({'success': True, **datos})
+
+
+@login_required
+@require_http_methods(["GET"])
+async def api_transmision(request):
+    """
+        SPRINT 7: Flujo en vivo del dashboard (Server-Sent Events).
+        Eventos nuevos, anomalías nuevas y cambios en los KPIs sin recargar la página.
+
+        Solo bajo ASGI: con WSGI (runserver, gunicorn sync) Django junta el generador
+        asíncrono completo antes de enviar nada y el worker quedaría tomado para siempre.
+        Ahí se responde 204: EventSource no reintenta y la página usa la recarga.
+    """
+    if not isinstance(request, ASGIRequest):
+        return HttpResponse(status=204)
+
+    respuesta = StreamingHttpResponse(flujo_dashboard(), content_type='text/event-stream')
+    respuesta['Cache-Control'] = 'no-cache'
+    respuesta['X-Accel-Buffering'] = 'no'  # nginx: no acumular el flujo
+    return respuesta
+
+
+# --- API DE LECTURA (SPRINT 7) ---
+
+def codificar_cursor(timestamp, pk):
+    """Cursor opaco de la paginación por clave: (timestamp en µs, id) del último elemento"""
+    return base64.urlsafe_b64encode(f'{timestamp_canonico(timestamp)}:{pk}'.encode()).decode()
+
+
+def decodificar_cursor(cursor):
+    """(timestamp, id) del cursor; ValueError si no es válido"""
+    try:
+        microsegundos, pk = base64.urlsafe_b64decode(cursor.encode()).decode().split(':')
+        return EPOCH + int(microsegundos) * MICROSEGUNDO, int(pk)
+    except (UnicodeError, TypeError, ValueError, base64.binascii.Error):
+        raise ValueError('cursor inválido')
+
+
+def parsear_fecha(valor, fin=False):
+    """Fecha ISO 8601 (con hora o solo día); sin zona horaria se toma como UTC"""
+    momento = parse_datetime(valor)
+    if momento is None:
+        dia = parse_date(valor)
+        if dia is None:
+            raise ValueError(f'fecha inválida: {valor}')
+        # Un día completo: 'hasta=2025-01-31' incluye todo el 31
+        momento = datetime.combine(dia + timedelta(days=1) if fin else dia, time.min)
+    if timezone.is_naive(momento):
+        momento = momento.replace(tzinfo=dt_timezone.utc)
+    return momento
+
+
+def campos_solicitados(params):
+    """Campos pedidos con ?campos=a,b (los de CAMPOS_API_DEFECTO si no se indica)"""
+    campos = params.get('campos')
+    campos = [c.strip() for c in campos.split(',') if c.strip()] if campos else CAMPOS_API_DEFECTO
+    desconocidos = sorted(set(campos) - set(CAMPOS_API))
+    if desconocidos:
+        raise ValueError(f"campos desconocidos: {', '.join(desconocidos)}")
+    return campos
+
+
+def filtrar_eventos_api(eventos, params):
+    """Filtros del dashboard + rango de fechas desde / hasta"""
+    eventos = filtrar_eventos(eventos, params)
+    if params.get('desde'):
+        eventos = eventos.filter(timestamp__gte=parsear_fecha(params['desde']))
+    if params.get('hasta'):
+        eventos = eventos.filter(timestamp__lt=parsear_fecha(params['hasta'], fin=True))
+    return eventos
+
+
+def listar_eventos_api(eventos, params):
+    """
+        Una página de la API: filtros del dashboard + rango de fechas, orden
+        (-timestamp, -id) y paginación por clave (sin OFFSET ni COUNT: cada página
+        cuesta lo mismo sin importar cuán atrás esté). Serializa con .values().
+    """
+    campos = campos_solicitados(params)
+    limite = min(max(int(params.get('limite', LIMITE_API)), 1), MAX_LIMITE_API)
+
+    eventos = filtrar_eventos_api(eventos, params)
+    if params.get('cursor'):
+        ultimo_timestamp, ultimo_id = decodificar_cursor(params['cursor'])
+        # (timestamp, id) < (último): el rango timestamp <= último lo resuelve el índice;
+        # escrito como "t < T OR (t = T AND id < I)" SQLite cae en MULTI-INDEX OR + ordenamiento completo
+        eventos = eventos.filter(timestamp__lte=ultimo_timestamp).filter(
+            Q(timestamp__lt=ultimo_timestamp) | Q(id__lt=ultimo_id)
+        )
+
+    # id y timestamp siempre se leen (arman el cursor), se devuelven solo si se pidieron
+    columnas = list(dict.fromkeys([*campos, 'id', 'timestamp']))
+    filas = list(eventos.order_by('-timestamp', '-id').values(*columnas)[:limite + 1])
+
+    cursor = None
+    if len(filas) > limite:
+        filas = filas[:limite]
+        cursor = codificar_cursor(filas[-1]['timestamp'], filas[-1]['id'])
+    sobrantes = set(columnas) - set(campos)
+    if sobrantes:
+        for fila in filas:
+            for campo in sobrantes:
+                del fila[campo]
+    return {'success': True, 'campos': campos, 'cantidad': len(filas), 'cursor': cursor, 'resultados': filas}
+
+
+def respuesta_condicional(request, datos):
+    """
+        JSON con ETag (hash del contenido): si el cliente ya tiene esa versión
+        (If-None-Match) responde 304 sin cuerpo.
+    """
+    contenido = json.dumps(datos, cls=DjangoJSONEncoder, ensure_ascii=False).encode('utf-8')
+    etag = quote_etag(hashlib.blake2b(contenido, digest_size=16).hexdigest())
+    respuesta = get_conditional_response(request, etag=etag)
+    if respuesta is None:
+        respuesta = HttpResponse(contenido, content_type='application/json')
+    respuesta['ETag'] = etag
+    patch_cache_control(respuesta, private=True, no_cache=True)
+    return respuesta
+
+
+def respuesta_api_lectura(request, eventos):
+    """Página JSON de `eventos` según los parámetros GET (400 si alguno es inválido)"""
+    try:
+        datos = listar_eventos_api(eventos, request.GET)
+    except ValueError as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=400)
+
+    datos['siguiente'] = None
+    if datos['cursor']:
+        siguiente = request.GET.copy()
+        siguiente['cursor'] = datos['cursor']
+        datos['siguiente'] = request.build_absolute_uri(f'{request.path}?{siguiente.urlencode()}')
+    return respuesta_condicional(request, datos)
+
+
+@tiene_permiso('view_events')
+@require_http_methods(["GET"])
+def api_eventos(request):
+    """
+        API de lectura de eventos. Parámetros: filtros del dashboard (tipo, usuario,
+        anomalia, severidad, q), desde / hasta, campos=, limite= y cursor=.
+    """
+    return respuesta_api_lectura(request, EventoDeAcceso.objects.all())
+
+
+@tiene_permiso('view_anomalies')
+@require_http_methods(["GET"])
+def api_anomalias(request):
+    """API de lectura de anomalías (mismos parámetros que api_eventos)"""
+    return respuesta_api_lectura(request, EventoDeAcceso.objects.filter(es_anomalia=True))
+
+
+# --- EXPORTACIÓN POR STREAMING (SPRINT 7) ---
+
+class _Eco:
+    """Pseudo-archivo para csv.writer: write() retorna la línea en lugar de guardarla"""
+
+    def write(self, valor):
+        return valor
+
+
+# Excel / LibreOffice interpretan como fórmula las celdas que empiezan así (CSV injection)
+INICIOS_FORMULA = ('=', '+', '-', '@', '\t', '\r')
+
+
+def _valor_csv(valor):
+    if isinstance(valor, datetime):
+        return valor.isoformat()
+    if isinstance(valor, (dict, list)):
+        valor = json.dumps(valor, ensure_ascii=False)
+    if isinstance(valor, str) and valor.startswith(INICIOS_FORMULA):
+        # Nombres de archivo, emails y motivos vienen de Drive: el apóstrofo los deja como texto
+        return "'" + valor
+    return valor
+
+
+def lineas_exportacion(filas, campos, formato):
+    """Una línea de texto por fila (más la cabecera en CSV)"""
+    if formato == 'csv':
+        escritor = csv.writer(_Eco())
+        yield escritor.writerow(campos)
+        for fila in filas:
+            yield escritor.writerow([_valor_csv(valor) for valor in fila])
+    else:
+        codificador = DjangoJSONEncoder(ensure_ascii=False)
+        for fila in filas:
+            yield codificador.encode(dict(zip(campos, fila))) + '\n'
+
+
+def bloques_exportacion(lineas, comprimir=False):
+    """
+        Agrupa las líneas en bloques de ~BYTES_POR_BLOQUE (pocos writes al socket)
+        y opcionalmente los comprime en gzip a medida que salen.
+    """
+    compresor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS) if comprimir else None  # formato gzip
+    pendientes, tamano = [], 0
+    for linea in lineas:
+        pendientes.append(linea)
+        tamano += len(linea)
+        if tamano >= BYTES_POR_BLOQUE:
+            bloque = ''.join(pendientes).encode('utf-8')
+            pendientes, tamano = [], 0
+            if compresor:
+                bloque = compresor.compress(bloque)
+            if bloque:
+                yield bloque
+
+    bloque = ''.join(pendientes).encode('utf-8')
+    if compresor:
+        bloque = compresor.compress(bloque) + compresor.flush()
+    if bloque:
+        yield bloque
+
+
+@tiene_permiso('download_report')
+@require_http_methods(["GET"])
+def exportar_eventos(request):
+    """
+        Exportación completa para auditores: NDJSON o CSV (?formato=), opcionalmente
+        gzip (?gzip=1), con los mismos filtros y campos que la API de lectura.
+        Las filas se leen por lotes con .iterator() y se envían a medida que se
+        generan: la memoria del worker no depende de la cantidad de filas.
+    """
+    formato = request.GET.get('formato', 'ndjson')
+    if formato not in FORMATOS_EXPORTACION:
+        return JsonResponse({'success': False, 'error': f'formato inválido: {formato}'}, status=400)
+    try:
+        campos = campos_solicitados(request.GET)
+        eventos = filtrar_eventos_api(EventoDeAcceso.objects.all(), request.GET)
+    except ValueError as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=400)
+
+    filas = eventos.order_by('timestamp', 'id').values_list(*campos).iterator(chunk_size=TAMANO_LOTE_EXPORTACION)
+    comprimir = request.GET.get('gzip', '').lower() in ('1', 'true', 'si')
+
+    respuesta = StreamingHttpResponse(
+        bloques_exportacion(lineas_exportacion(filas, campos, formato), comprimir),
+        content_type='application/gzip' if comprimir else FORMATOS_EXPORTACION[formato],
+    )
+    nombre = f"eventos_{timezone.now():%Y%m%d_%H%M%S}.{formato}{'.gz' if comprimir else ''}"
+    respuesta['Content-Disposition'] = f'attachment; filename="{nombre}"'
+    respuesta['X-Accel-Buffering'] = 'no'
+    # Registro de auditoría: quién exportó qué
+    logger.info("📤 Exportación solicitada", extra={
+        'formato': formato, 'gzip': comprimir, 'usuario': request.user.get_username(),
+        'filtros': request.GET.dict(), 'archivo': nombre,
+    })
+    return respuesta
+
@@ -0,0 +1,145 @@
+"""
+Worker de ML (SPRINT 7).
+
+Las vistas web encolan una SolicitudProcesamiento y responden de inmediato;
+el comando `manage.py worker_ml` las toma de a una y ejecuta la tarea.
+Así pandas / scikit-learn y el DataFrame de la ventana viven solo en el
+worker, y el bundle del modelo queda cargado entre solicitudes.
+
+Este módulo se importa desde las vistas: las dependencias pesadas se
+cargan dentro de las tareas, no al importar.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+from .ejecuciones import ejecucion_pipeline
+from .models import SolicitudProcesamiento
+
+
+def cargar_recolector():
+    """Retorna (GoogleDriveCollector, guardar_eventos_en_db) o (None, None) si no está disponible"""
+    try:
+        from .management.commands.recolectar_eventos_reales import GoogleDriveCollector, guardar_eventos_en_db
+    except ImportError:
+        return None, None
+    return GoogleDriveCollector, guardar_eventos_en_db
+
+
+# ============================================================================
+# TAREAS
+# ============================================================================
+
+@ejecucion_pipeline('sincronizacion')
+def tarea_sincronizacion():
+    """Descarga los eventos de Google Drive y los guarda (ya puntuados) en la BD"""
+    GoogleDriveCollector, guardar_eventos_en_db = cargar_recolector()
+    if not GoogleDriveCollector:
+        raise RuntimeError('Collector no encontrado')
+
+    eventos_raw = GoogleDriveCollector().obtener_eventos()
+    if not eventos_raw:
+        return {'nuevos': 0, 'mensaje': 'Sincronización completada. No se encontraron eventos nuevos.'}
+
+    nuevos = guardar_eventos_en_db(eventos_raw)
+    return {'nuevos': nuevos, 'mensaje': f'Sincronización exitosa. {nuevos} eventos nuevos registrados.'}
+
+
+def tarea_deteccion():
+    """Ejecuta el Isolation Forest sobre la ventana completa"""
+    from .analisis import ejecutar_deteccion_anomalias
+
+    anomalias = ejecutar_deteccion_anomalias()
+    return {
+        'anomalias': anomalias,
+        'mensaje': f'Análisis completado. Se detectaron/actualizaron {anomalias} anomalías.',
+    }
+
+
+TAREAS = {
+    'deteccion': tarea_deteccion,
+    'sincronizacion': tarea_sincronizacion,
+}
+
+
+# ============================================================================
+# COLA
+# ============================================================================
+
+def encolar(tipo, solicitado_por=''):
+    """
+    Crea una solicitud pendiente. Si ya hay una del mismo tipo sin terminar
+    se reutiliza (varios clics en el botón no encolan trabajos repetidos).
+    """
+    activa = SolicitudProcesamiento.objects.filter(
+        tipo=tipo,
+        estado__in=[SolicitudProcesamiento.PENDIENTE, SolicitudProcesamiento.EN_PROCESO],
+    ).first()
+    if activa:
+        return activa
+    return SolicitudProcesamiento.objects.create(tipo=tipo, solicitado_por=solicitado_por)
+
+
+def reclamar_siguiente():
+    """
+    Toma la solicitud pendiente más antigua. El cambio de estado es un
+    UPDATE condicionado, así dos workers nunca procesan la misma solicitud.
+    """
+    pendientes = SolicitudProcesamiento.objects.filter(estado=SolicitudProcesamiento.PENDIENTE)
+    while True:
+        pk = pendientes.order_by('fecha_creacion').values_list('pk', flat=True).first()
+        if pk is None:
+            return None
+
+        tomada = pendientes.filter(pk=pk).update(
+            estado=SolicitudProcesamiento.EN_PROCESO,
+            fecha_inicio=timezone.now(),
+        )
+        if tomada:
+            return SolicitudProcesamiento.objects.get(pk=pk)
+
+
+def procesar(solicitud):
+    """Ejecuta la tarea de la solicitud y guarda el resultado o el error"""
+    try:
+        solicitud.resultado = TAREAS[solicitud.tipo]()
+        solicitud.estado = SolicitudProcesamiento.COMPLETADA
+    except Exception as e:
+        solicitud.error = str(e)
+        solicitud.estado = SolicitudProcesamiento.ERROR
+
+    solicitud.fecha_fin = timezone.now()
+    solicitud.save(update_fields=['estado', 'resultado', 'error', 'fecha_fin'])
+    return solicitud
+
+
+def recuperar_interrumpidas():
+    """
+    Devuelve a la cola las solicitudes que quedaron en proceso si el worker murió.
+
+    Solo se recuperan las que llevan más de ML_WORKER_TIMEOUT_SOLICITUD
+    segundos en proceso: con varios workers, las recientes siguen en manos
+    de otro proceso vivo y no deben ejecutarse dos veces.
+    """
+    limite = timezone.now() - timedelta(seconds=settings.ML_WORKER_TIMEOUT_SOLICITUD)
+    return SolicitudProcesamiento.objects.filter(
+        Q(fecha_inicio__lt=limite) | Q(fecha_inicio__isnull=True),
+        estado=SolicitudProcesamiento.EN_PROCESO,
+    ).update(
+        estado=SolicitudProcesamiento.PENDIENTE,
+        fecha_inicio=None,
+    )
+
+
+def procesar_pendientes(max_solicitudes=None):
+    """Procesa la cola hasta vaciarla (o hasta max_solicitudes). Retorna cuántas procesó."""
+    procesadas = 0
+    while max_solicitudes is None or procesadas < max_solicitudes:
+        solicitud = reclamar_siguiente()
+        if solicitud is None:
+            break
+        procesar(solicitud)
+        procesadas += 1
+    return procesadas
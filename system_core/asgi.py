@@ -5,6 +5,10 @@ It exposes the ASGI callable as a module-level variable named ``application``.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
+
+SPRINT 7: El flujo en vivo del dashboard (monitoreo/api/transmision/) es una
+vista async; servido por ASGI todas las conexiones del proceso comparten un
+solo productor. Ej: uvicorn system_core.asgi:application --workers 2
 """
 
 import os
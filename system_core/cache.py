@@ -0,0 +1,160 @@
+"""
+Capa de caché del proyecto (sobre django.core.cache, backend en settings.CACHES).
+
+Cada componente usa un espacio de nombres con su propia versión:
+
+    clave('dashboard', 'kpis')  ->  'dashboard:v<version>:kpis'
+
+invalidar('dashboard') incrementa la versión del espacio y con eso todas
+sus claves anteriores dejan de leerse (expiran solas por timeout), sin
+tener que listarlas ni borrarlas una por una. Funciona igual en todos los
+procesos porque la versión vive en la caché compartida.
+
+Las marcas (marcar_una_vez) y los contadores con ventana (incrementar_contador)
+necesitan add() / incr() atómicos entre procesos. Redis y la memoria local los
+dan; la caché de archivos no, y en ese caso se usa la tabla ContadorCompartido.
+"""
+import time
+from datetime import timedelta
+
+from django.core.cache import cache, caches
+from django.core.cache.backends.filebased import FileBasedCache
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .metricas import registrar_cache
+
+# Espacios de nombres usados por la aplicación
+DASHBOARD = 'dashboard'
+PERMISOS = 'permisos'
+MODELO = 'modelo'
+ALERTAS = 'alertas'
+
+
+def _clave_version(espacio):
+    return f'{espacio}:version'
+
+
+def version(espacio):
+    """Versión vigente del espacio de nombres"""
+    clave_version = _clave_version(espacio)
+    valor = cache.get(clave_version)
+    if valor is None:
+        # Valor inicial basado en el reloj: si la clave se pierde (reinicio, evicción)
+        # nunca se reutiliza una versión anterior con datos viejos
+        cache.add(clave_version, int(time.time() * 1000), timeout=None)
+        valor = cache.get(clave_version)
+    return valor
+
+
+def invalidar(espacio):
+    """Incrementa la versión: todas las claves anteriores del espacio quedan obsoletas"""
+    clave_version = _clave_version(espacio)
+    try:
+        return cache.incr(clave_version)
+    except ValueError:
+        valor = int(time.time() * 1000)
+        cache.set(clave_version, valor, timeout=None)
+        return valor
+
+
+def clave(espacio, *partes):
+    """Clave con espacio de nombres y versión vigente"""
+    return ':'.join([espacio, f'v{version(espacio)}', *map(str, partes)])
+
+
+def obtener(espacio, *partes, default=None):
+    valor = cache.get(clave(espacio, *partes), default)
+    registrar_cache(espacio, valor is not default)
+    return valor
+
+
+def guardar(espacio, *partes, valor, timeout=None):
+    cache.set(clave(espacio, *partes), valor, timeout)
+
+
+def obtener_o_calcular(espacio, *partes, calcular, timeout=None):
+    """Lee la clave o la calcula con `calcular()` y la guarda (los None no se cachean)"""
+    clave_versionada = clave(espacio, *partes)
+    valor = cache.get(clave_versionada)
+    registrar_cache(espacio, valor is not None)
+    if valor is None:
+        valor = calcular()
+        if valor is not None:
+            cache.set(clave_versionada, valor, timeout)
+    return valor
+
+
+def marcar_una_vez(espacio, *partes, timeout):
+    """
+    Marca atómica: True solo para el primer llamador dentro del timeout.
+    Sirve para deduplicar entre procesos (alertas, tareas programadas).
+    """
+    clave_versionada = clave(espacio, *partes)
+    if _atomico():
+        return cache.add(clave_versionada, True, timeout)
+    return _marcar_bd(clave_versionada, timeout)
+
+
+def incrementar_contador(clave_contador, ventana):
+    """Suma 1 al contador (la ventana empieza con el primer incremento) y retorna el valor"""
+    if not _atomico():
+        return _incrementar_bd(clave_contador, ventana)
+    cache.add(clave_contador, 0, ventana)
+    try:
+        return cache.incr(clave_contador)
+    except ValueError:
+        # La clave expiró entre add() e incr()
+        cache.set(clave_contador, 1, ventana)
+        return 1
+
+
+def leer_contadores(claves):
+    """{clave: valor} de los contadores vigentes (los que no existen no aparecen)"""
+    if _atomico():
+        return cache.get_many(claves)
+    from usuarios.models import ContadorCompartido
+
+    return dict(ContadorCompartido.objects.filter(clave__in=claves, expira__gt=timezone.now())
+                .values_list('clave', 'valor'))
+
+
+def borrar_contador(clave_contador):
+    if _atomico():
+        cache.delete(clave_contador)
+        return
+    from usuarios.models import ContadorCompartido
+
+    ContadorCompartido.objects.filter(clave=clave_contador).delete()
+
+
+def _atomico():
+    """¿El backend hace add() / incr() atómicos? FileBasedCache los hace como leer + escribir"""
+    return not isinstance(caches['default'], FileBasedCache)
+
+
+def _marcar_bd(clave_marca, timeout):
+    from usuarios.models import ContadorCompartido
+
+    ahora = timezone.now()
+    ContadorCompartido.objects.filter(expira__lte=ahora).delete()
+    try:
+        # La clave primaria decide: solo un INSERT gana
+        with transaction.atomic():
+            ContadorCompartido.objects.create(clave=clave_marca, valor=1, expira=ahora + timedelta(seconds=timeout))
+    except IntegrityError:
+        return False
+    return True
+
+
+def _incrementar_bd(clave_contador, ventana):
+    from usuarios.models import ContadorCompartido
+
+    ahora = timezone.now()
+    ContadorCompartido.objects.filter(expira__lte=ahora).delete()
+    ContadorCompartido.objects.get_or_create(
+        clave=clave_contador, defaults={'valor': 0, 'expira': ahora + timedelta(seconds=ventana)})
+    contador = ContadorCompartido.objects.filter(clave=clave_contador)
+    contador.update(valor=F('valor') + 1)
+    return contador.values_list('valor', flat=True).first() or 1
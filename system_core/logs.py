@@ -0,0 +1,51 @@
+"""
+Formateadores de logs estructurados (SPRINT 7).
+
+Los pipelines registran sus datos en `extra={...}` en lugar de armarlos
+dentro del mensaje:
+
+    logger.info('Etapa finalizada', extra={'etapa': 'auditoria', 'paginas': 12})
+
+FormateadorJSON emite una línea JSON por registro (para agregadores de logs);
+FormateadorTexto agrega los mismos campos como clave=valor al final del
+mensaje. El formato se elige con settings.LOG_FORMATO.
+"""
+import json
+import logging
+
+# Atributos propios de LogRecord: todo lo demás vino en `extra`
+_ATRIBUTOS_RECORD = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+
+def campos_extra(record):
+    return {clave: valor for clave, valor in vars(record).items() if clave not in _ATRIBUTOS_RECORD}
+
+
+class FormateadorJSON(logging.Formatter):
+
+    def format(self, record):
+        datos = {
+            'momento': self.formatTime(record),
+            'nivel': record.levelname,
+            'logger': record.name,
+            'mensaje': record.getMessage(),
+            **campos_extra(record),
+        }
+        if record.exc_info:
+            datos['excepcion'] = self.formatException(record.exc_info)
+        return json.dumps(datos, default=str, ensure_ascii=False)
+
+
+class FormateadorTexto(logging.Formatter):
+
+    def __init__(self):
+        super().__init__('%(asctime)s %(levelname)s %(name)s: %(message)s')
+
+    def format(self, record):
+        texto = super().format(record)
+        extra = campos_extra(record)
+        if not extra:
+            return texto
+        primera, salto, resto = texto.partition('\n')
+        campos = ' '.join(f'{clave}={valor}' for clave, valor in extra.items())
+        return f'{primera} | {campos}{salto}{resto}'
@@ -0,0 +1,434 @@
+"""
+Instrumentación del proyecto (SPRINT 7).
+
+Registro de métricas en memoria del proceso, exportable en formato de texto
+de Prometheus:
+
+  - Por vista (MiddlewareInstrumentacion): tiempo total, cantidad y tiempo
+    de consultas a la BD, aciertos / fallos de la caché del proyecto.
+  - Por etapa del pipeline: `with etapa('ml_entrenamiento'):` o como
+    decorador `@etapa('sincronizacion')` (sincronización, ETL, ML).
+  - Consultas lentas: las que superan METRICAS_UMBRAL_CONSULTA_LENTA_MS se
+    cuentan y se registran en el logger 'sgsi.consultas_lentas'.
+
+La web expone su registro en /metricas/ (token bearer o staff). El registro
+es de cada proceso; con METRICAS_DIRECTORIO definido:
+
+  - Cada proceso web (gunicorn / uvicorn con varios workers) guarda su estado
+    en <directorio>/web/<pid>.json, como mucho cada METRICAS_INTERVALO_VOLCADO
+    segundos, y /metricas/ suma los de todos los workers, así el scrape no
+    depende de a qué worker le tocó responder.
+  - Los comandos de gestión y el worker de ML vuelcan el registro en cada
+    etapa a <directorio>/sgsi_<proceso>.prom, formato que lee el textfile
+    collector de node_exporter.
+"""
+import contextvars
+import hmac
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from contextlib import ContextDecorator, ExitStack
+from pathlib import Path
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.http import HttpResponse, HttpResponseForbidden
+from django.urls import Resolver404, resolve
+
+logger_consultas_lentas = logging.getLogger('sgsi.consultas_lentas')
+
+# Cubetas de los histogramas de duración (segundos): de requests rápidos a entrenamientos
+CUBETAS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300)
+
+# nombre -> (tipo, ayuda)
+METRICAS = {
+    'sgsi_http_solicitudes_total': ('counter', 'Solicitudes HTTP atendidas'),
+    'sgsi_http_duracion_segundos': ('histogram', 'Tiempo total de la vista'),
+    'sgsi_db_consultas_total': ('counter', 'Consultas a la base de datos'),
+    'sgsi_db_duracion_segundos_total': ('counter', 'Tiempo acumulado en consultas a la base de datos'),
+    'sgsi_db_consultas_lentas_total': ('counter', 'Consultas por encima del umbral de consulta lenta'),
+    'sgsi_cache_aciertos_total': ('counter', 'Lecturas de la caché del proyecto encontradas'),
+    'sgsi_cache_fallos_total': ('counter', 'Lecturas de la caché del proyecto no encontradas'),
+    'sgsi_etapa_duracion_segundos': ('histogram', 'Duración de las etapas del pipeline (sync, ETL, ML)'),
+    'sgsi_etapa_ejecuciones_total': ('counter', 'Ejecuciones de etapas del pipeline por resultado'),
+}
+
+
+def _etiquetas_texto(etiquetas):
+    if not etiquetas:
+        return ''
+    partes = []
+    for clave, valor in etiquetas:
+        valor = str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        partes.append(f'{clave}="{valor}"')
+    return '{' + ','.join(partes) + '}'
+
+
+def _numero(valor):
+    return repr(float(valor)) if valor != int(valor) else str(int(valor))
+
+
+class RegistroMetricas:
+    """Contadores e histogramas con etiquetas, seguros entre hilos"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._contadores = defaultdict(float)
+        self._histogramas = {}
+
+    def limpiar(self):
+        with self._lock:
+            self._contadores.clear()
+            self._histogramas.clear()
+
+    def incrementar(self, nombre, valor=1, **etiquetas):
+        clave = (nombre, tuple(sorted(etiquetas.items())))
+        with self._lock:
+            self._contadores[clave] += valor
+
+    def observar(self, nombre, valor, **etiquetas):
+        clave = (nombre, tuple(sorted(etiquetas.items())))
+        with self._lock:
+            conteos = self._histogramas.get(clave)
+            if conteos is None:
+                # [conteo por cubeta..., +Inf] + suma
+                conteos = self._histogramas[clave] = [0] * (len(CUBETAS) + 1) + [0.0]
+            conteos[bisect_left(CUBETAS, valor)] += 1
+            conteos[-1] += valor
+
+    def estado(self):
+        """Contadores e histogramas serializables (JSON) para sumarlos en otro proceso"""
+        with self._lock:
+            return {
+                'contadores': [[n, etiquetas, v] for (n, etiquetas), v in self._contadores.items()],
+                'histogramas': [[n, etiquetas, list(v)] for (n, etiquetas), v in self._histogramas.items()],
+            }
+
+    def combinar(self, estado):
+        """Suma el estado de otro registro (ver estado()) a este"""
+        with self._lock:
+            for nombre, etiquetas, valor in estado['contadores']:
+                self._contadores[(nombre, tuple(map(tuple, etiquetas)))] += valor
+            for nombre, etiquetas, valores in estado['histogramas']:
+                clave = (nombre, tuple(map(tuple, etiquetas)))
+                conteos = self._histogramas.setdefault(clave, [0] * (len(CUBETAS) + 1) + [0.0])
+                for i, valor in enumerate(valores):
+                    conteos[i] += valor
+
+    def valor(self, nombre, **etiquetas):
+        """Valor de un contador (o cantidad de observaciones de un histograma)"""
+        clave = (nombre, tuple(sorted(etiquetas.items())))
+        with self._lock:
+            if clave in self._histogramas:
+                return sum(self._histogramas[clave][:-1])
+            return self._contadores.get(clave, 0)
+
+    def texto_prometheus(self):
+        """Exposición en formato de texto de Prometheus (versión 0.0.4)"""
+        with self._lock:
+            contadores = dict(self._contadores)
+            histogramas = {clave: list(valores) for clave, valores in self._histogramas.items()}
+
+        lineas = []
+        for nombre, (tipo, ayuda) in METRICAS.items():
+            series = histogramas if tipo == 'histogram' else contadores
+            propias = sorted((etiquetas, valor) for (n, etiquetas), valor in series.items() if n == nombre)
+            if not propias:
+                continue
+            lineas += [f'# HELP {nombre} {ayuda}', f'# TYPE {nombre} {tipo}']
+            for etiquetas, valor in propias:
+                if tipo != 'histogram':
+                    lineas.append(f'{nombre}{_etiquetas_texto(etiquetas)} {_numero(valor)}')
+                    continue
+                acumulado = 0
+                for limite, conteo in zip((*CUBETAS, '+Inf'), valor[:-1]):
+                    acumulado += conteo
+                    lineas.append(f'{nombre}_bucket{_etiquetas_texto(etiquetas + (("le", limite),))} {acumulado}')
+                lineas.append(f'{nombre}_sum{_etiquetas_texto(etiquetas)} {_numero(valor[-1])}')
+                lineas.append(f'{nombre}_count{_etiquetas_texto(etiquetas)} {acumulado}')
+        return '\n'.join(lineas) + '\n'
+
+
+registro = RegistroMetricas()
+
+# Medición en curso (solicitud o etapa): consultas, tiempo en BD y caché
+_medicion = contextvars.ContextVar('medicion_sgsi', default=None)
+
+
+class Medicion:
+    """Acumula lo que ocurre dentro de una solicitud o etapa"""
+
+    def __init__(self, contexto):
+        self.contexto = contexto
+        self.consultas = 0
+        self.duracion_db = 0.0
+        self.consultas_lentas = 0
+        self.cache_aciertos = 0
+        self.cache_fallos = 0
+
+
+def _envoltura_consultas(execute, sql, params, many, context):
+    """connection.execute_wrapper: cuenta y cronometra cada consulta, registra las lentas"""
+    inicio = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        duracion = time.perf_counter() - inicio
+        medicion = _medicion.get()
+        if medicion is not None:
+            medicion.consultas += 1
+            medicion.duracion_db += duracion
+            if duracion * 1000 >= settings.METRICAS_UMBRAL_CONSULTA_LENTA_MS:
+                medicion.consultas_lentas += 1
+                registro.incrementar('sgsi_db_consultas_lentas_total', contexto=medicion.contexto)
+                logger_consultas_lentas.warning(
+                    'Consulta lenta (%.1f ms) en %s: %s', duracion * 1000, medicion.contexto, sql[:2000],
+                    extra={'duracion_ms': round(duracion * 1000, 1), 'contexto': medicion.contexto},
+                )
+
+
+class _Medir:
+    """Activa una Medicion y la envoltura de consultas en todas las conexiones"""
+
+    def __init__(self, contexto):
+        self.medicion = Medicion(contexto)
+
+    def __enter__(self):
+        self._token = _medicion.set(self.medicion)
+        self._pila = ExitStack()
+        for conexion in connections.all():
+            self._pila.enter_context(conexion.execute_wrapper(_envoltura_consultas))
+        return self.medicion
+
+    def __exit__(self, *exc):
+        self._pila.close()
+        _medicion.reset(self._token)
+        return False
+
+
+def registrar_cache(espacio, acierto):
+    """Llamado por system_core.cache en cada lectura"""
+    medicion = _medicion.get()
+    if medicion is not None:
+        if acierto:
+            medicion.cache_aciertos += 1
+        else:
+            medicion.cache_fallos += 1
+    registro.incrementar('sgsi_cache_aciertos_total' if acierto else 'sgsi_cache_fallos_total', espacio=espacio)
+
+
+def nombre_proceso():
+    """Nombre corto del proceso para el archivo .prom (comando de gestión o 'web')"""
+    if len(sys.argv) > 1 and Path(sys.argv[0]).name == 'manage.py':
+        return sys.argv[1]
+    return 'web'
+
+
+def es_proceso_web():
+    return nombre_proceso() in ('web', 'runserver')
+
+
+_ultimo_volcado_web = {'momento': None}
+_lock_volcado_web = threading.Lock()
+
+
+def _escribir_atomico(ruta, texto):
+    ruta.parent.mkdir(parents=True, exist_ok=True)
+    temporal = ruta.with_suffix(f'{ruta.suffix}.{os.getpid()}.tmp')
+    temporal.write_text(texto, encoding='utf-8')
+    os.replace(temporal, ruta)
+
+
+def volcar_estado_web(forzar=False):
+    """
+    Guarda el estado del registro de este proceso web en <directorio>/web/<pid>.json.
+    Sin `forzar`, como mucho una vez cada METRICAS_INTERVALO_VOLCADO segundos.
+    """
+    if not settings.METRICAS_DIRECTORIO:
+        return None
+    ahora = time.monotonic()
+    with _lock_volcado_web:
+        previo = _ultimo_volcado_web['momento']
+        if not forzar and previo is not None and ahora - previo < settings.METRICAS_INTERVALO_VOLCADO:
+            return None
+        _ultimo_volcado_web['momento'] = ahora
+    ruta = Path(settings.METRICAS_DIRECTORIO) / 'web' / f'{os.getpid()}.json'
+    _escribir_atomico(ruta, json.dumps(registro.estado()))
+    return ruta
+
+
+def texto_procesos_web():
+    """
+    Suma los registros de todos los procesos web (este incluido, al día).
+    Los archivos de workers ya terminados se siguen sumando: sus contadores
+    no vuelven a cero para Prometheus por un reinicio de gunicorn.
+    """
+    volcar_estado_web(forzar=True)
+    total = RegistroMetricas()
+    for ruta in sorted((Path(settings.METRICAS_DIRECTORIO) / 'web').glob('*.json')):
+        try:
+            total.combinar(json.loads(ruta.read_text(encoding='utf-8')))
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            logging.getLogger('sgsi.metricas').warning('Métricas ilegibles en %s: %s', ruta, e)
+    return total.texto_prometheus()
+
+
+def volcar_archivo(directorio=None):
+    """
+    Escribe el registro del proceso en <directorio>/<proceso>.prom (reemplazo
+    atómico: el lector nunca ve un archivo a medio escribir).
+    """
+    directorio = directorio or settings.METRICAS_DIRECTORIO
+    if not directorio:
+        return None
+    ruta = Path(directorio) / f'sgsi_{nombre_proceso()}.prom'
+    _escribir_atomico(ruta, registro.texto_prometheus())
+    return ruta
+
+
+class etapa(ContextDecorator):
+    """
+    Cronómetro de una etapa del pipeline: duración (histograma), resultado
+    ('ok' / 'error') y consultas a la BD dentro de la etapa.
+
+        with etapa('ml_entrenamiento'):
+            modelo.fit(X)
+
+        @etapa('sincronizacion')
+        def tarea_sincronizacion(): ...
+    """
+
+    def __init__(self, nombre):
+        self.nombre = nombre
+
+    def _recreate_cm(self):
+        # Como decorador: una instancia por llamada (reentrante y segura entre hilos)
+        return etapa(self.nombre)
+
+    def __enter__(self):
+        # Las etapas anidadas suman a la medición de la etapa / solicitud que las contiene
+        self._medir = _Medir(f'etapa:{self.nombre}') if _medicion.get() is None else None
+        if self._medir:
+            self._medir.__enter__()
+        self._inicio = time.perf_counter()
+        return self
+
+    def __exit__(self, tipo_error, *exc):
+        self.duracion = time.perf_counter() - self._inicio
+        if self._medir:
+            medicion = self._medir.medicion
+            self._medir.__exit__(tipo_error, *exc)
+            registro.incrementar('sgsi_db_consultas_total', medicion.consultas, contexto=f'etapa:{self.nombre}')
+            registro.incrementar('sgsi_db_duracion_segundos_total', medicion.duracion_db,
+                                 contexto=f'etapa:{self.nombre}')
+        registro.observar('sgsi_etapa_duracion_segundos', self.duracion, etapa=self.nombre)
+        registro.incrementar('sgsi_etapa_ejecuciones_total', etapa=self.nombre,
+                             resultado='error' if tipo_error else 'ok')
+        if settings.METRICAS_DIRECTORIO:
+            try:
+                # En la web lo publica /metricas/ (sumando workers); un .prom por proceso web se pisaría
+                volcar_estado_web() if es_proceso_web() else volcar_archivo()
+            except OSError as e:
+                logging.getLogger('sgsi.metricas').warning('No se pudieron volcar las métricas: %s', e)
+        return False
+
+
+class MiddlewareInstrumentacion:
+    """
+    Por solicitud: tiempo de la vista, consultas y tiempo en BD, aciertos /
+    fallos de caché. Los agrega al registro (etiqueta = nombre de la ruta) y
+    los devuelve en la cabecera Server-Timing (visible en las DevTools).
+
+    Soporta vistas sync y async (sin adaptar la cadena de middlewares). En
+    modo async las consultas corren en otros hilos y no se cuentan. Las
+    respuestas por streaming (SSE, exportación) no entran en el histograma
+    de latencia: duran lo que dure la conexión.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        if not settings.METRICAS_ACTIVAS:
+            return self.get_response(request)
+
+        vista = self._vista(request)
+        inicio = time.perf_counter()
+        with _Medir(f'http:{vista}') as medicion:
+            respuesta = self.get_response(request)
+        return self._registrar(request, respuesta, vista, medicion, time.perf_counter() - inicio)
+
+    async def __acall__(self, request):
+        if not settings.METRICAS_ACTIVAS:
+            return await self.get_response(request)
+
+        vista = self._vista(request)
+        inicio = time.perf_counter()
+        medicion = Medicion(f'http:{vista}')
+        token = _medicion.set(medicion)
+        try:
+            respuesta = await self.get_response(request)
+        finally:
+            _medicion.reset(token)
+        return self._registrar(request, respuesta, vista, medicion, time.perf_counter() - inicio)
+
+    @staticmethod
+    def _vista(request):
+        # Nombre de la ruta (no la URL): cardinalidad acotada de etiquetas
+        try:
+            return resolve(request.path_info).view_name
+        except Resolver404:
+            return 'sin_ruta'
+
+    def _registrar(self, request, respuesta, vista, medicion, duracion):
+        registro.incrementar('sgsi_http_solicitudes_total', vista=vista, metodo=request.method,
+                             estado=respuesta.status_code)
+        if not respuesta.streaming:
+            registro.observar('sgsi_http_duracion_segundos', duracion, vista=vista)
+        registro.incrementar('sgsi_db_consultas_total', medicion.consultas, contexto=medicion.contexto)
+        registro.incrementar('sgsi_db_duracion_segundos_total', medicion.duracion_db, contexto=medicion.contexto)
+
+        if settings.METRICAS_DIRECTORIO:
+            try:
+                volcar_estado_web()
+            except OSError as e:
+                logging.getLogger('sgsi.metricas').warning('No se pudieron volcar las métricas: %s', e)
+
+        respuesta['Server-Timing'] = ', '.join([
+            f'app;dur={duracion * 1000:.1f}',
+            f'db;dur={medicion.duracion_db * 1000:.1f};desc="{medicion.consultas} consultas"',
+            f'cache;desc="{medicion.cache_aciertos} aciertos, {medicion.cache_fallos} fallos"',
+        ])
+        return respuesta
+
+
+def token_valido(request):
+    """Authorization: Bearer <METRICAS_TOKEN> (sin token configurado nunca es válido)"""
+    esperado = settings.METRICAS_TOKEN
+    tipo, _, token = request.META.get('HTTP_AUTHORIZATION', '').partition(' ')
+    return bool(esperado) and tipo.lower() == 'bearer' and hmac.compare_digest(token.strip(), esperado)
+
+
+def vista_metricas(request):
+    """
+    Endpoint para Prometheus: token de METRICAS_TOKEN (bearer) o usuarios staff.
+    No se confía en la IP de origen: detrás de un proxy local todas llegan como 127.0.0.1.
+    Con METRICAS_DIRECTORIO responde la suma de todos los procesos web.
+    """
+    if not (token_valido(request) or (request.user.is_authenticated and request.user.is_staff)):
+        return HttpResponseForbidden('Métricas no disponibles para este cliente')
+    texto = texto_procesos_web() if settings.METRICAS_DIRECTORIO else registro.texto_prometheus()
+    return HttpResponse(texto, content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,22 @@
+"""
+Runner de tests del proyecto.
+
+Los tests usan una caché en memoria del proceso en lugar del backend
+configurado (archivos o Redis): cada corrida empieza limpia y no toca la
+caché que comparten los procesos en ejecución.
+"""
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+
+class EjecutorPruebas(DiscoverRunner):
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self._cache_pruebas = override_settings(CACHES=settings.CACHE_MEMORIA)
+        self._cache_pruebas.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self._cache_pruebas.disable()
+        super().teardown_test_environment(**kwargs)
@@ -10,8 +10,11 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
+from django.core.exceptions import ImproperlyConfigured
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -44,6 +47,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'system_core.metricas.MiddlewareInstrumentacion',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -75,13 +79,92 @@ WSGI_APPLICATION = 'system_core.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
-DATABASES = {
+# Perfil de SQLite para ingesta y dashboard concurrentes (se aplica en cada conexión nueva)
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',      # Lectores y escritor no se bloquean entre sí
+    'synchronous': 'NORMAL',    # Seguro con WAL: fsync solo en los checkpoints
+    'mmap_size': 268435456,     # 256 MB de lecturas vía memory-map
+    'cache_size': -65536,       # 64 MB de page cache por conexión (negativo = KiB)
+    'temp_store': 'MEMORY',     # Ordenamientos / GROUP BY temporales en memoria
+}
+
+# PostgreSQL si POSTGRES_DB está definido (producción / tests contra Postgres local);
+# si no, SQLite con el perfil de arriba
+if os.environ.get('POSTGRES_DB'):
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ['POSTGRES_DB'],
+            'USER': os.environ.get('POSTGRES_USER', 'postgres'),
+            'PASSWORD': os.environ.get('POSTGRES_PASSWORD', ''),
+            'HOST': os.environ.get('POSTGRES_HOST', 'localhost'),
+            'PORT': os.environ.get('POSTGRES_PORT', '5432'),
+            'CONN_MAX_AGE': int(os.environ.get('POSTGRES_CONN_MAX_AGE', '60')),
+            'CONN_HEALTH_CHECKS': True,
+        }
+    }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': BASE_DIR / 'db.sqlite3',
+            'OPTIONS': {
+                # busy_timeout: segundos esperando el lock antes de "database is locked"
+                'timeout': 20,
+                # BEGIN IMMEDIATE: el lock de escritura se toma al iniciar la transacción,
+                # evita el error inmediato al "subir" de lector a escritor
+                'transaction_mode': 'IMMEDIATE',
+                'init_command': ';'.join(f'PRAGMA {k}={v}' for k, v in SQLITE_PRAGMAS.items()),
+            },
+        }
+    }
+
+# Ingesta por COPY + INSERT ... ON CONFLICT cuando el motor es PostgreSQL
+INGESTA_COPY_POSTGRES = True
+
+
+# Cache compartida entre procesos (gunicorn, cron, comandos de gestión)
+# DJANGO_CACHE_BACKEND elige el backend: 'redis', 'archivos' o 'memoria'. Sin definir:
+# - REDIS_URL definido: Redis (producción)
+# - Sin Redis: caché en archivos, funciona sin conexión y la comparten todos los procesos del host
+#   (sus add()/incr() no son atómicos: marcas y contadores usan la tabla ContadorCompartido)
+# Los tests usan memoria local (TEST_RUNNER, o DJANGO_CACHE_BACKEND=memoria con otros runners)
+# Los espacios de nombres y la invalidación por versión están en system_core/cache.py
+
+REDIS_URL = os.environ.get('REDIS_URL')
+CACHE_BACKEND = os.environ.get('DJANGO_CACHE_BACKEND') or ('redis' if REDIS_URL else 'archivos')
+
+CACHE_MEMORIA = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
     }
 }
 
+if CACHE_BACKEND == 'memoria':
+    CACHES = CACHE_MEMORIA
+elif CACHE_BACKEND == 'redis':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+            'KEY_PREFIX': 'sgsi',
+        }
+    }
+elif CACHE_BACKEND == 'archivos':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': BASE_DIR / 'cache_sgsi' / 'django_cache',
+            'KEY_PREFIX': 'sgsi',
+            'OPTIONS': {'MAX_ENTRIES': 10000},
+        }
+    }
+else:
+    raise ImproperlyConfigured(f"DJANGO_CACHE_BACKEND desconocido: {CACHE_BACKEND!r} (redis, archivos o memoria)")
+
+# Cada corrida de tests empieza con una caché vacía y propia (ver system_core/pruebas.py)
+TEST_RUNNER = 'system_core.pruebas.EjecutorPruebas'
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -151,4 +234,105 @@ ADMINS = [
 ]
 
 SECURITY_OFFICER_EMAIL = 'rrguerrerop@gmail.com'  # Ajusta el email real
-MONITOR_EMAIL = 'raynoldguerrerop@gmail.com'  # Ajusta el email real
\ No newline at end of file
+MONITOR_EMAIL = 'raynoldguerrerop@gmail.com'  # Ajusta el email real
+
+# ===============================
+# CONFIGURACIÓN DEL MODELO DE IA
+# ===============================
+
+# Carpeta donde se serializa el Isolation Forest entrenado
+ML_MODELS_DIR = BASE_DIR / 'monitoreo' / 'ml_models'
+
+# Clasificar cada lote nuevo con el modelo cacheado antes de insertarlo en BD
+ML_SCORING_EN_INGESTA = True
+
+# Scoring en paralelo: a partir de cuántas filas se reparte la matriz entre procesos
+ML_SCORING_UMBRAL_PARALELO = 200_000
+ML_SCORING_PROCESOS = None  # None = todos los núcleos
+
+# Worker de ML dedicado: las vistas encolan la sincronización / detección y
+# `python manage.py worker_ml` las ejecuta con el modelo precargado
+# (los workers web no cargan pandas / scikit-learn)
+ML_WORKER_DEDICADO = os.environ.get('ML_WORKER_DEDICADO', '0') == '1'
+
+# Una solicitud en proceso por más de este tiempo se considera de un worker
+# caído y vuelve a la cola al arrancar otro worker (segundos)
+ML_WORKER_TIMEOUT_SOLICITUD = int(os.environ.get('ML_WORKER_TIMEOUT_SOLICITUD', '1800'))
+
+# ===============================
+# TRANSMISIÓN EN VIVO (SSE)
+# ===============================
+
+# Un productor por proceso ASGI revisa cambios y los reparte a todos los dashboards
+TRANSMISION_INTERVALO = 2  # segundos entre revisiones (solo lee la versión en caché)
+TRANSMISION_REVISION_FORZADA = 30  # consulta la BD aunque la versión no haya cambiado
+TRANSMISION_LATIDO = 15  # comentario SSE para mantener viva la conexión
+TRANSMISION_REINTENTO_MS = 5000  # reconexión del navegador
+
+# ===============================
+# ADMIN
+# ===============================
+
+# Listado de eventos en modo rendimiento: conteos estimados, opciones de filtro cacheadas
+# y jerarquía de fechas desde los resúmenes diarios (monitoreo/admin.py)
+ADMIN_MODO_RENDIMIENTO = True
+
+# ===============================
+# MÉTRICAS E INSTRUMENTACIÓN
+# ===============================
+
+# Tiempo, consultas y caché por vista (system_core/metricas.py), expuestos en /metricas/
+METRICAS_ACTIVAS = True
+# Consultas más lentas que esto se registran en el logger 'sgsi.consultas_lentas'
+METRICAS_UMBRAL_CONSULTA_LENTA_MS = 200
+# Token que Prometheus envía como "Authorization: Bearer <token>" para leer /metricas/ sin sesión
+# (sin definir: solo usuarios staff). No se filtra por IP: detrás de un proxy todas son locales
+METRICAS_TOKEN = os.environ.get('METRICAS_TOKEN')
+# Comandos y worker de ML: volcar sus métricas a <dir>/sgsi_<comando>.prom (textfile collector).
+# Procesos web: cada worker guarda su estado en <dir>/web/<pid>.json y /metricas/ los suma
+# (necesario con varios workers de gunicorn / uvicorn; sin definir, cada worker responde solo lo suyo)
+METRICAS_DIRECTORIO = os.environ.get('METRICAS_DIRECTORIO')
+# Cada cuántos segundos, como mucho, un worker web reescribe su archivo de estado
+METRICAS_INTERVALO_VOLCADO = 5
+
+# ===============================
+# HISTORIAL DEL PIPELINE Y LOGS
+# ===============================
+
+# Una ejecución se compara con la mediana de filas/s de las últimas N completadas del mismo pipeline
+PIPELINE_HISTORIAL_REFERENCIA = 10
+# Por debajo de esta fracción de la mediana se registra un aviso de regresión de rendimiento
+PIPELINE_UMBRAL_REGRESION = 0.5
+
+# Logs de recolección, ETL y ML: 'texto' (campos extra como clave=valor) o 'json' (una línea por registro)
+LOG_FORMATO = os.environ.get('LOG_FORMATO', 'texto')
+LOG_NIVEL = os.environ.get('LOG_NIVEL', 'INFO')
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'texto': {'()': 'system_core.logs.FormateadorTexto'},
+        'json': {'()': 'system_core.logs.FormateadorJSON'},
+    },
+    'handlers': {
+        'consola': {'class': 'logging.StreamHandler', 'formatter': LOG_FORMATO},
+    },
+    'loggers': {
+        'monitoreo': {'handlers': ['consola'], 'level': LOG_NIVEL, 'propagate': False},
+        'sgsi': {'handlers': ['consola'], 'level': LOG_NIVEL, 'propagate': False},
+    },
+}
+
+# ===============================
+# AUDITORÍA DE LOGIN
+# ===============================
+
+# Agrupar las escrituras de ultimo_acceso por usuario (un UPDATE cada N segundos)
+AUDITORIA_ACCESOS_DIFERIDOS = False
+AUDITORIA_INTERVALO_VOLCADO = 30
+
+# Throttle de login (caché): intentos fallidos permitidos por ventana
+LOGIN_MAX_INTENTOS_IP = 20
+LOGIN_MAX_INTENTOS_USUARIO = 10
+LOGIN_VENTANA_THROTTLE = 300  # segundos
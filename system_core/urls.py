@@ -17,8 +17,11 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path, include
 
+from .metricas import vista_metricas
+
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('metricas/', vista_metricas, name='metricas'),
     path('usuarios/', include(('usuarios.urls', 'usuarios'), namespace='usuarios')),
     path('monitoreo/', include(('monitoreo.urls', 'monitoreo'), namespace='monitoreo')),
 ]
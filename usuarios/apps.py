@@ -4,3 +4,16 @@ from django.apps import AppConfig
 class UsuariosConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'usuarios'
+
+    def ready(self):
+        from django.contrib.auth.signals import user_logged_in
+        from django.core.signals import request_finished
+
+        from .auditoria import registrar_login, volcar_al_terminar_request
+
+        # update_last_login de django.contrib.auth hace un save() por login: se reemplaza por
+        # registrar_login, que escribe last_login junto con ultimo_acceso (o lo difiere al buffer).
+        # Mismo dispatch_uid: si auth aún no cargó, su connect() queda ignorado; si ya cargó, se quita.
+        user_logged_in.disconnect(dispatch_uid='update_last_login')
+        user_logged_in.connect(registrar_login, dispatch_uid='update_last_login')
+        request_finished.connect(volcar_al_terminar_request, dispatch_uid='usuarios_volcar_accesos')
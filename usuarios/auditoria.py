@@ -0,0 +1,131 @@
+"""
+Auditoría de login con escrituras mínimas.
+
+- BufferAccesos: agrupa las actualizaciones de `ultimo_acceso` por usuario y
+  las vuelca en un solo UPDATE cada N segundos (opcional, ver settings).
+  `last_login` de Django se escribe en ese mismo UPDATE: registrar_login
+  reemplaza al receptor update_last_login de django.contrib.auth (ver apps.py),
+  que guardaba la fila en cada login.
+- El buffer se vuelca al registrar un acceso o al terminar cualquier request
+  una vez vencido el intervalo, y al salir del proceso.
+- Throttle de login por IP y por username con los contadores de
+  system_core.cache (atómicos también con la caché de archivos): los
+  intentos que superan el límite se rechazan sin tocar la tabla de usuarios.
+"""
+import atexit
+import logging
+import threading
+import time
+
+from django.conf import settings
+
+from system_core import cache as cache_sistema
+
+logger = logging.getLogger(__name__)
+
+
+class BufferAccesos:
+    """
+        Acumula {usuario_id: último acceso} en memoria del proceso.
+        Varios logins del mismo usuario dentro del intervalo se reducen a una
+        sola escritura con el valor más reciente.
+    """
+
+    def __init__(self, intervalo_segundos=30):
+        self.intervalo = intervalo_segundos
+        self._pendientes = {}
+        self._lock = threading.Lock()
+        self._ultimo_volcado = time.monotonic()
+
+    def registrar(self, usuario_id, momento):
+        with self._lock:
+            previo = self._pendientes.get(usuario_id)
+            if previo is None or momento > previo:
+                self._pendientes[usuario_id] = momento
+        self.volcar_si_vencido()
+
+    def volcar_si_vencido(self):
+        """Vuelca si hay pendientes y pasó el intervalo (sin pendientes no toca la base)"""
+        with self._lock:
+            vencido = bool(self._pendientes) and time.monotonic() - self._ultimo_volcado >= self.intervalo
+        if vencido:
+            self.volcar()
+
+    def pendientes(self):
+        with self._lock:
+            return dict(self._pendientes)
+
+    def volcar(self):
+        """Escribe los accesos pendientes con un único bulk_update (UPDATE ... CASE)"""
+        with self._lock:
+            pendientes, self._pendientes = self._pendientes, {}
+            self._ultimo_volcado = time.monotonic()
+
+        if not pendientes:
+            return 0
+
+        from .models import UsuarioPersonalizado
+
+        usuarios = [UsuarioPersonalizado(pk=pk, ultimo_acceso=momento, last_login=momento)
+                    for pk, momento in pendientes.items()]
+        UsuarioPersonalizado.objects.bulk_update(usuarios, ['ultimo_acceso', 'last_login'])
+        return len(usuarios)
+
+
+buffer_accesos = BufferAccesos(getattr(settings, 'AUDITORIA_INTERVALO_VOLCADO', 30))
+
+
+def registrar_login(sender, user, **kwargs):
+    """Receptor de user_logged_in: auditoría del acceso (login propio, admin y force_login)"""
+    user.registrar_acceso()
+
+
+def volcar_al_terminar_request(sender, **kwargs):
+    """Receptor de request_finished: no deja accesos esperando al próximo login"""
+    try:
+        buffer_accesos.volcar_si_vencido()
+    except Exception:
+        logger.exception('No se pudo volcar el buffer de accesos')
+
+
+@atexit.register
+def _volcar_al_salir():
+    try:
+        buffer_accesos.volcar()
+    except Exception:
+        # La conexión puede no estar disponible al cerrar el proceso
+        pass
+
+
+# ============================================================================
+# THROTTLE DE LOGIN
+# ============================================================================
+
+def _claves_throttle(ip, username):
+    return [f'login_throttle:ip:{ip}', f'login_throttle:usuario:{username.lower()}']
+
+
+def _limites():
+    return [
+        getattr(settings, 'LOGIN_MAX_INTENTOS_IP', 20),
+        getattr(settings, 'LOGIN_MAX_INTENTOS_USUARIO', 10),
+    ]
+
+
+def login_bloqueado(ip, username):
+    """¿La IP o el username superaron el límite de intentos fallidos en la ventana?"""
+    conteos = cache_sistema.leer_contadores(_claves_throttle(ip, username))
+    return any(conteos.get(clave, 0) >= limite
+               for clave, limite in zip(_claves_throttle(ip, username), _limites()))
+
+
+def registrar_fallo_login(ip, username):
+    """Incrementa los contadores de fallos (la ventana empieza con el primer fallo)"""
+    ventana = getattr(settings, 'LOGIN_VENTANA_THROTTLE', 300)
+    for clave in _claves_throttle(ip, username):
+        cache_sistema.incrementar_contador(clave, ventana)
+
+
+def limpiar_fallos_usuario(username):
+    """Tras un login exitoso se libera el contador del username (no el de la IP)"""
+    cache_sistema.borrar_contador(_claves_throttle('', username)[1])
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-19 11:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('usuarios', '0007_alter_permission_options_alter_permission_nombre_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ContadorCompartido',
+            fields=[
+                ('clave', models.CharField(max_length=250, primary_key=True, serialize=False)),
+                ('valor', models.IntegerField(default=0)),
+                ('expira', models.DateTimeField(db_index=True)),
+            ],
+            options={
+                'verbose_name': 'Contador Compartido',
+                'verbose_name_plural': 'Contadores Compartidos',
+            },
+        ),
+    ]
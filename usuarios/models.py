@@ -1,9 +1,14 @@
+from django.conf import settings
 from django.contrib.auth.models import AbstractUser
 from django.db import models
+from django.db.models import Case, F, Value, When
 from django.utils import timezone
 from django.db.models.signals import post_migrate
 from django.dispatch import receiver
 
+from .auditoria import buffer_accesos
+from .permisos import datos_rol, permisos_de_rol
+
 # ============================================================================
 # MODELO: Permission (Permisos individuales)
 # ============================================================================
@@ -112,8 +117,8 @@ class Role(models.Model):
         return f"<Role: {self.nombre}>"
     
     def tiene_permiso(self, nombre_permiso):
-        """Verifica si el rol tiene un permiso especifico"""
-        return self.permisos.filter(nombre=nombre_permiso).exists()
+        """Verifica si el rol tiene un permiso especifico (caché de permisos por rol)"""
+        return nombre_permiso in permisos_de_rol(self.pk)
     
     def agregar_permisos(self, nombre_permiso):
         """Agrega un permiso al rol"""
@@ -210,15 +215,16 @@ class UsuarioPersonalizado(AbstractUser):
         ]
 
     def __str__(self):
-        return f"{self.username} ({self.get_nombre_rol_display() if self.rol else 'Sin Rol'})"
+        return f"{self.username} ({self.get_nombre_rol_display()})"
     
     def __repr__(self):
         return f"<UsuarioPersonalizado: {self.username}>"
     
     def get_nombre_rol_display(self):
         """Retorna el nombre legible del rol asignado"""
-        if self.rol:
-            return self.rol.get_nombre_display()
+        nombre = self._datos_rol()['nombre']
+        if nombre:
+            return dict(Role.ROLE_CHOICES).get(nombre, nombre)
         return "Sin Rol"
     
      # ========== MÉTODOS SOFT-DELETE ==========
@@ -244,6 +250,18 @@ class UsuarioPersonalizado(AbstractUser):
     
 # ========== MÉTODOS DE PERMISOS ==========
 
+    def _datos_rol(self):
+        """
+            Nombre y permisos del rol, memorizados en la instancia (request.user).
+            Usa rol_id para no cargar el FK; la primera consulta pasa por la caché
+            de permisos (usuarios/permisos.py), las siguientes no tocan la base de datos.
+        """
+        memo = getattr(self, '_memo_rol', None)
+        if memo is None or memo[0] != self.rol_id:
+            memo = (self.rol_id, datos_rol(self.rol_id))
+            self._memo_rol = memo
+        return memo[1]
+
     def tiene_permiso(self, nombre_permiso):
         """
              Verifica si el usuario tiene un permiso específico.
@@ -254,22 +272,22 @@ class UsuarioPersonalizado(AbstractUser):
             Returns:
                 bool: True si el usuario tiene el permiso, False en caso contrario
         """
-        if not self.rol or not self.es_activo:
+        if not self.rol_id or not self.es_activo:
             return False
         
-        return self.rol.tiene_permiso(nombre_permiso)
+        return nombre_permiso in self._datos_rol()['permisos']
     
     def es_admin(self):
         """¿El usuario es administrador?"""
-        return self.rol and self.rol.nombre == 'admin'
+        return self._datos_rol()['nombre'] == 'admin'
     
     def es_auditor(self):
         """¿El usuario es auditor?"""
-        return self.rol and self.rol.nombre == 'auditor'
+        return self._datos_rol()['nombre'] == 'auditor'
     
     def es_visualizador(self):
         """¿El usuario es visualizador?"""
-        return self.rol and self.rol.nombre == 'viewer'
+        return self._datos_rol()['nombre'] == 'viewer'
     
     def puede_ver_dashboard(self):
         """¿El usuario puede ver el dashboard?"""
@@ -293,28 +311,51 @@ class UsuarioPersonalizado(AbstractUser):
     
     # ========== MÉTODOS DE AUDITORÍA ==========
 
+    # Intentos fallidos que provocan el bloqueo automático
+    MAX_INTENTOS_LOGIN = 5
+
     def registrar_acceso(self):
-        """Registra que el usuario ha accedido al sistema"""
+        """
+            Registra que el usuario ha accedido al sistema.
+            Escribe solo las columnas de auditoría (UPDATE, sin save() de la fila completa),
+            incluida last_login de Django. Se llama desde user_logged_in (ver apps.py).
+            Con AUDITORIA_ACCESOS_DIFERIDOS el ultimo_acceso se acumula en el buffer
+            y se vuelca agrupado; el contador solo se escribe si no estaba en cero.
+        """
         self.ultimo_acceso = timezone.now()
-        self.intentos_login = 0  # Resetea intentos fallidos tras acceso exitoso
-        self.save()
+        intentos_previos, self.intentos_login = self.intentos_login, 0  # Resetea intentos tras acceso exitoso
+        usuarios = UsuarioPersonalizado.objects.filter(pk=self.pk)
 
-    def registrar_intento_fallido(self):
-        """Registra un intento fallido de login"""
-        self.intentos_login += 1
-        self.save()
+        self.last_login = self.ultimo_acceso
 
-        # Bloqueo automático tras 5 intentos fallidos
-        if self.intentos_login >= 5:
-            self.es_activo = False
-            self.save()
-            return False
-        return True
+        if getattr(settings, 'AUDITORIA_ACCESOS_DIFERIDOS', False):
+            buffer_accesos.registrar(self.pk, self.ultimo_acceso)
+            if intentos_previos:
+                usuarios.update(intentos_login=0)
+        else:
+            usuarios.update(ultimo_acceso=self.ultimo_acceso, last_login=self.last_login, intentos_login=0)
+
+    def registrar_intento_fallido(self):
+        """
+            Registra un intento fallido de login.
+            Incremento y bloqueo en un solo UPDATE atómico con F() (sin carreras
+            entre workers); luego se leen solo las dos columnas afectadas.
+        """
+        UsuarioPersonalizado.objects.filter(pk=self.pk).update(
+            intentos_login=F('intentos_login') + 1,
+            # Bloqueo automático tras MAX_INTENTOS_LOGIN intentos fallidos
+            es_activo=Case(
+                When(intentos_login__gte=self.MAX_INTENTOS_LOGIN - 1, then=Value(False)),
+                default=F('es_activo'),
+            ),
+        )
+        self.refresh_from_db(fields=['intentos_login', 'es_activo'])
+        return self.intentos_login < self.MAX_INTENTOS_LOGIN
     
     def resetear_intentos_fallido(self):
         """Resetea el contador de intentos fallidos tras un login exitoso"""
         self.intentos_login = 0
-        self.save()
+        self.save(update_fields=['intentos_login'])
 
 # ============================================================================
 # SIGNAL: Crear datos iniciales (Roles y Permisos)
@@ -437,3 +478,29 @@ def crear_roles_y_permisos_iniciales(sender, **kwargs):
         print("Rol 'Viewer' ACTUALIZADO con 3 permisos")
     
     print("Permisos y roles iniciales configurados")
+
+
+# ============================================================================
+# MODELO: ContadorCompartido (SPRINT 7)
+# ============================================================================
+
+class ContadorCompartido(models.Model):
+    """
+        Marca / contador con vencimiento guardado en la base de datos.
+
+        Respaldo de system_core.cache cuando la caché es de archivos:
+        FileBasedCache implementa add() e incr() como leer + escribir, así
+        que dos procesos podían enviar la misma alerta o perder fallos de
+        login. Aquí la clave primaria y UPDATE valor = valor + 1 son atómicos.
+    """
+
+    clave = models.CharField(max_length=250, primary_key=True)
+    valor = models.IntegerField(default=0)
+    expira = models.DateTimeField(db_index=True)
+
+    class Meta:
+        verbose_name = "Contador Compartido"
+        verbose_name_plural = "Contadores Compartidos"
+
+    def __str__(self):
+        return f"{self.clave}={self.valor}"
@@ -0,0 +1,81 @@
+"""
+Caché de permisos por rol.
+
+El conjunto de permisos de cada rol se consulta una sola vez y se guarda:
+  - en un diccionario local del proceso (costo cero en las siguientes consultas),
+  - en la caché compartida (espacio 'permisos' de system_core.cache).
+
+Cualquier cambio en roles, permisos o en la relación Role.permisos
+incrementa la versión del espacio, lo que invalida de golpe todas las
+entradas (locales y compartidas) sin tener que recorrerlas.
+"""
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from system_core import cache as cache_sistema
+
+TIMEOUT_PERMISOS = 60 * 60
+
+# Versión del espacio con la que se llenó la caché local y {rol_id: {'nombre': str, 'permisos': frozenset}}.
+# Al ver otra versión (invalidada en cualquier proceso) se vacía: nunca acumula versiones viejas
+_CACHE_LOCAL = {'version': None, 'roles': {}}
+
+ROL_VACIO = {'nombre': None, 'permisos': frozenset()}
+
+
+def invalidar_permisos():
+    """Incrementa la versión del espacio: todas las entradas anteriores dejan de usarse"""
+    cache_sistema.invalidar(cache_sistema.PERMISOS)
+    _CACHE_LOCAL.update(version=None, roles={})
+
+
+def _cargar_rol(rol_id):
+    from .models import Permission, Role
+
+    nombre = Role.objects.filter(pk=rol_id).values_list('nombre', flat=True).first()
+    permisos = Permission.objects.filter(roles__id=rol_id).values_list('nombre', flat=True)
+    return {'nombre': nombre, 'permisos': frozenset(permisos)}
+
+
+def datos_rol(rol_id):
+    """
+    Retorna {'nombre', 'permisos'} del rol. Solo consulta la base de datos
+    cuando el rol no está en ninguna de las dos cachés (2 queries).
+    """
+    if rol_id is None:
+        return ROL_VACIO
+
+    version = cache_sistema.version(cache_sistema.PERMISOS)
+    if _CACHE_LOCAL['version'] != version:
+        _CACHE_LOCAL.update(version=version, roles={})
+
+    datos = _CACHE_LOCAL['roles'].get(rol_id)
+    if datos is None:
+        datos = cache_sistema.obtener_o_calcular(cache_sistema.PERMISOS, 'rol', rol_id,
+                                                 calcular=lambda: _cargar_rol(rol_id),
+                                                 timeout=TIMEOUT_PERMISOS)
+        _CACHE_LOCAL['roles'][rol_id] = datos
+    return datos
+
+
+def permisos_de_rol(rol_id):
+    """Conjunto (frozenset) de nombres de permisos del rol"""
+    return datos_rol(rol_id)['permisos']
+
+
+# ============================================================================
+# SIGNALS: Invalidación
+# ============================================================================
+
+@receiver(post_save, sender='usuarios.Role')
+@receiver(post_delete, sender='usuarios.Role')
+@receiver(post_save, sender='usuarios.Permission')
+@receiver(post_delete, sender='usuarios.Permission')
+def invalidar_por_cambio(sender, **kwargs):
+    invalidar_permisos()
+
+
+@receiver(m2m_changed, sender='usuarios.Role_permisos')
+def invalidar_por_cambio_m2m(sender, action, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        invalidar_permisos()
@@ -1,6 +1,11 @@
-from django.test import TestCase, Client
+from datetime import timedelta
+from unittest.mock import patch
+from django.core.cache import cache
+from django.test import TestCase, Client, override_settings
 from django.urls import reverse
 from django.utils import timezone
+from . import auditoria
+from .auditoria import BufferAccesos
 from .models import UsuarioPersonalizado, Role, Permission
 
 class ModuloUsuariosTestCase(TestCase):
@@ -320,6 +325,59 @@ class UsuarioRoleTestCase(TestCase):
         )
         self.assertTrue(usuario.tiene_permiso('permiso_1'))
 
+    def test_tiene_permiso_sin_queries_repetidas(self):
+        usuario = UsuarioPersonalizado.objects.create_user(
+            username='cache_test',
+            email='cache@test.com',
+            password='testpass123',
+            rol=self.rol_admin
+        )
+        usuario = UsuarioPersonalizado.objects.get(pk=usuario.pk)
+        usuario.tiene_permiso('permiso_1')
+
+        # Rol y permisos ya memorizados: ninguna consulta adicional
+        with self.assertNumQueries(0):
+            self.assertTrue(usuario.tiene_permiso('permiso_2'))
+            self.assertFalse(usuario.tiene_permiso('no_existe'))
+            self.assertTrue(usuario.es_admin())
+            self.assertEqual(usuario.get_nombre_rol_display(), 'Administrador')
+
+        # Otra instancia del mismo usuario (otro request) usa la caché del proceso
+        otra = UsuarioPersonalizado.objects.get(pk=usuario.pk)
+        with self.assertNumQueries(0):
+            self.assertTrue(otra.tiene_permiso('permiso_3'))
+
+    def test_cache_permisos_se_invalida_al_cambiar_rol(self):
+        usuario = UsuarioPersonalizado.objects.create_user(
+            username='inval_test',
+            email='inval@test.com',
+            password='testpass123',
+            rol=self.rol_viewer
+        )
+        self.assertFalse(usuario.tiene_permiso('permiso_1'))
+
+        self.rol_viewer.agregar_permisos('permiso_1')
+        usuario = UsuarioPersonalizado.objects.get(pk=usuario.pk)
+        self.assertTrue(usuario.tiene_permiso('permiso_1'))
+
+        self.rol_viewer.remover_permiso('permiso_1')
+        usuario = UsuarioPersonalizado.objects.get(pk=usuario.pk)
+        self.assertFalse(usuario.tiene_permiso('permiso_1'))
+
+    def test_cache_local_se_vacia_con_invalidacion_de_otro_proceso(self):
+        from system_core import cache as cache_sistema
+        from .permisos import _CACHE_LOCAL, datos_rol
+
+        datos_rol(self.rol_admin.pk)
+        datos_rol(self.rol_viewer.pk)
+        self.assertEqual(len(_CACHE_LOCAL['roles']), 2)
+
+        # Otro worker invalida en la caché compartida: este proceso no llama a invalidar_permisos()
+        cache_sistema.invalidar(cache_sistema.PERMISOS)
+        datos_rol(self.rol_viewer.pk)
+        self.assertEqual(list(_CACHE_LOCAL['roles']), [self.rol_viewer.pk])
+        self.assertEqual(_CACHE_LOCAL['version'], cache_sistema.version(cache_sistema.PERMISOS))
+
 # ============================================================================
 # GRUPO D: Tests de Auditoría
 # ============================================================================
@@ -369,6 +427,100 @@ class AuditoriaTestCase(TestCase):
 
         self.assertEqual(self.usuario.intentos_login, 0)
 
+    def test_intento_fallido_una_sola_escritura(self):
+        # UPDATE con F() + lectura de las columnas afectadas
+        with self.assertNumQueries(2):
+            self.usuario.registrar_intento_fallido()
+        self.assertEqual(self.usuario.intentos_login, 1)
+
+    def test_registrar_acceso_no_pisa_otros_campos(self):
+        # Otra instancia en memoria (valores viejos) no debe sobrescribir el email
+        UsuarioPersonalizado.objects.filter(pk=self.usuario.pk).update(email='nuevo@test.com')
+
+        self.usuario.registrar_acceso()
+        self.usuario.refresh_from_db()
+
+        self.assertEqual(self.usuario.email, 'nuevo@test.com')
+
+    @override_settings(AUDITORIA_ACCESOS_DIFERIDOS=True)
+    def test_buffer_agrupa_accesos(self):
+        buffer = BufferAccesos(intervalo_segundos=3600)
+        otro = UsuarioPersonalizado.objects.create_user(username='otro', password='testpass123')
+        ahora = timezone.now()
+
+        buffer.registrar(self.usuario.pk, ahora - timedelta(minutes=5))
+        buffer.registrar(self.usuario.pk, ahora)
+        buffer.registrar(otro.pk, ahora)
+        self.assertEqual(buffer.pendientes()[self.usuario.pk], ahora)
+
+        # Un solo UPDATE para todos los usuarios pendientes
+        with self.assertNumQueries(1):
+            self.assertEqual(buffer.volcar(), 2)
+
+        self.usuario.refresh_from_db()
+        self.assertEqual(self.usuario.ultimo_acceso, ahora)
+        self.assertEqual(buffer.volcar(), 0)
+
+    def test_login_escribe_last_login_con_la_auditoria(self):
+        # update_last_login de Django (un save() por login) queda reemplazado por registrar_acceso
+        from django.contrib.auth.models import update_last_login
+        from django.contrib.auth.signals import user_logged_in
+        self.assertNotIn(update_last_login, [r() for _, r, *_ in user_logged_in.receivers])
+
+        self.client.post(reverse('usuarios:login'), {'username': 'audit_user', 'password': 'testpass123'})
+
+        self.usuario.refresh_from_db()
+        self.assertIsNotNone(self.usuario.last_login)
+        self.assertEqual(self.usuario.last_login, self.usuario.ultimo_acceso)
+
+    @override_settings(AUDITORIA_ACCESOS_DIFERIDOS=True)
+    def test_buffer_se_vuelca_al_terminar_un_request(self):
+        from django.core.signals import request_finished
+
+        buffer = BufferAccesos(intervalo_segundos=3600)
+        with patch.object(auditoria, 'buffer_accesos', buffer), \
+                patch('usuarios.models.buffer_accesos', buffer):
+            self.client.force_login(self.usuario)
+            self.usuario.refresh_from_db()
+            self.assertIsNone(self.usuario.last_login)
+
+            # Vencido el intervalo, el fin de cualquier request vuelca sin esperar otro login
+            buffer.intervalo = 0
+            request_finished.send(sender=self.__class__)
+
+        self.usuario.refresh_from_db()
+        self.assertIsNotNone(self.usuario.ultimo_acceso)
+        self.assertEqual(self.usuario.last_login, self.usuario.ultimo_acceso)
+
+
+@override_settings(LOGIN_MAX_INTENTOS_USUARIO=3, LOGIN_MAX_INTENTOS_IP=5)
+class ThrottleLoginTestCase(TestCase):
+    """Throttle de login por IP / username"""
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.usuario = UsuarioPersonalizado.objects.create_user(username='spray', password='correcta123')
+
+    def test_bloqueo_por_username(self):
+        for _ in range(3):
+            self.client.post(reverse('usuarios:login'), {'username': 'spray', 'password': 'mala'})
+
+        response = self.client.post(reverse('usuarios:login'), {'username': 'spray', 'password': 'correcta123'})
+        self.assertEqual(response.status_code, 429)
+
+        # Los intentos rechazados por el throttle no llegan a la tabla de usuarios
+        self.usuario.refresh_from_db()
+        self.assertEqual(self.usuario.intentos_login, 3)
+
+    def test_bloqueo_por_ip_con_usuarios_inexistentes(self):
+        for i in range(5):
+            self.client.post(reverse('usuarios:login'), {'username': f'fantasma{i}', 'password': 'x'})
+
+        with self.assertNumQueries(0):
+            response = self.client.post(reverse('usuarios:login'), {'username': 'spray', 'password': 'correcta123'})
+        self.assertEqual(response.status_code, 429)
+
 # ============================================================================
 # GRUPO E: Tests de Soft-Delete avanzado
 # ============================================================================
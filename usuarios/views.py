@@ -9,6 +9,7 @@ from django.core.paginator import Paginator
 from django.http import HttpResponseForbidden
 from django.urls import reverse_lazy
 from .forms import FormularioRegistro, FormularioCrearUsuario, FormularioEditarUsuario
+from .auditoria import limpiar_fallos_usuario, login_bloqueado, registrar_fallo_login
 from .models import UsuarioPersonalizado
 
 # ============================================================================
@@ -27,7 +28,7 @@ def es_auditor_o_admin(usuario):
     if not usuario.is_authenticated:
         return False
     # Usamos los metodos de nuestro modelo UsuarioPersonalizado
-    return usuario.is_superuser or (hasattr(usuario, 'rol') and (usuario.es_admin() or usuario.es_audito()))
+    return usuario.is_superuser or (hasattr(usuario, 'rol') and (usuario.es_admin() or usuario.es_auditor()))
 
 # Decorador: Permiso General (Recomendado para la logica de la tesis)
 def tiene_permiso(nombre_permiso):
@@ -177,12 +178,19 @@ def login_view(request):
     if request.method == 'POST':
         username = request.POST['username']
         password = request.POST['password']
+        ip = request.META.get('REMOTE_ADDR', '')
+
+        # 0. Throttle por IP / username (caché): se corta antes de tocar la tabla de usuarios
+        if login_bloqueado(ip, username):
+            messages.error(request, "Demasiados intentos. Espere unos minutos antes de volver a intentar.")
+            return render(request, 'usuarios/login.html', status=429)
 
         # Primero, buscamos el usuario sin autenticar para manejar intentos fallidos.
         try:
             usuario_obj = UsuarioPersonalizado.objects.get(username=username)
         except UsuarioPersonalizado.DoesNotExist:
             # No encontramos el usuario, error genérico para no dar pistas
+            registrar_fallo_login(ip, username)
             return render(request, 'usuarios/login.html', {'error': 'Credenciales inválidas'})
         
         # 1. Verificar si el usuario esta bloqueado o desactivado
@@ -196,14 +204,15 @@ def login_view(request):
 
         if usuario is not None:
             #A. Login Exitoso
-            login(request, usuario)
-            usuario.registrar_acceso() # Auditoria de ISO 27001
+            login(request, usuario)  # Auditoria de ISO 27001: user_logged_in -> registrar_acceso()
+            limpiar_fallos_usuario(username)
             messages.success(request, f"Bienvenido, {usuario.username}. Acceso registrado")
             return redirect('usuarios:home')
         
         else:
             # B. CREDENCUALES INVALIDAS
             # Se registra un intento falldio y se verifica si la cuenta debe bloquearse.
+            registrar_fallo_login(ip, username)
             puede_intentar = usuario_obj.registrar_intento_fallido()
 
             if not puede_intentar: